@@ -0,0 +1,6 @@
+"""
+Benchmarki gorących ścieżek (kalkulacja TP, zapytania okna głównego, monitor, migracja SL)
+
+Uruchomienie:
+    python -m benchmarks.run --months 3 --output wyniki_benchmark.json
+"""
@@ -0,0 +1,170 @@
+"""
+Generator syntetycznej bazy o schemacie jak u EA
+
+Tabela positions (kolumny okna głównego + sl_recznie, close_*, profit) oraz
+tabele świeczek minutowych per instrument ("ger40.cash", ...) tylko w dni
+robocze i w godzinach sesji. Transakcje skupiają się wokół otwarcia rynku
+danego instrumentu (rozkład normalny), reszta rozłożona równomiernie w sesji.
+"""
+import random
+import sqlite3
+from dataclasses import dataclass, field, asdict
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+from config.field_definitions import COLUMNS
+from utils.date_utils import date_string_to_unix
+
+# Dni handlowe w miesiącu (do przeliczania --months / --years)
+TRADING_DAYS_PER_MONTH = 21
+
+# Parametry instrumentów: cena bazowa, zmienność minutowa, sesja (godziny), otwarcie rynku (godzina)
+INSTRUMENT_PROFILES: Dict[str, Dict[str, float]] = {
+    "ger40.cash": {"price": 18000.0, "volatility": 4.0, "session_start": 1, "session_end": 23, "market_open": 9.0},
+    "us100.cash": {"price": 17500.0, "volatility": 5.0, "session_start": 1, "session_end": 23, "market_open": 15.5},
+    "us30.cash": {"price": 38000.0, "volatility": 9.0, "session_start": 1, "session_end": 23, "market_open": 15.5},
+    "xauusd": {"price": 2300.0, "volatility": 0.6, "session_start": 1, "session_end": 23, "market_open": 14.5},
+}
+
+SETUPS = ["Wybicie", "Korekta", "Odbicie", "Trend"]
+
+
+@dataclass
+class DatasetSpec:
+    """Parametry generowanej bazy"""
+    trading_days: int = TRADING_DAYS_PER_MONTH
+    instruments: List[str] = field(default_factory=lambda: ["ger40.cash", "us100.cash"])
+    trades_per_day: int = 12
+    start_date: str = "2024-01-01"
+    clustered_share: float = 0.8        # Część transakcji skupiona wokół otwarcia rynku
+    cluster_sigma_minutes: float = 45.0
+    pending_opening_sl: int = 0         # Wiersze position_opening_sl do migracji SL
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def trading_dates(start_date: str, count: int) -> List[str]:
+    """Kolejne dni robocze (bez weekendów) od start_date"""
+    current = date.fromisoformat(start_date)
+    result = []
+    while len(result) < count:
+        if current.weekday() < 5:
+            result.append(current.isoformat())
+        current += timedelta(days=1)
+    return result
+
+
+def _candle_rows(rng: random.Random, day_start: int, profile: Dict[str, float],
+                 price: float) -> Tuple[List[tuple], float]:
+    """Świeczki minutowe jednej sesji (błądzenie losowe), zwraca też cenę zamknięcia"""
+    rows = []
+    volatility = profile["volatility"]
+    first = int(profile["session_start"] * 60)
+    last = int(profile["session_end"] * 60)
+    for minute in range(first, last):
+        open_price = price
+        close = open_price + rng.gauss(0, volatility)
+        high = max(open_price, close) + abs(rng.gauss(0, volatility / 2))
+        low = min(open_price, close) - abs(rng.gauss(0, volatility / 2))
+        rows.append((day_start + minute * 60, round(open_price, 2), round(high, 2), round(low, 2),
+                     round(close, 2), rng.randint(10, 500), rng.randint(1, 3), 0))
+        price = close
+    return rows, price
+
+
+def _trade_minute(rng: random.Random, spec: DatasetSpec, profile: Dict[str, float]) -> int:
+    """Minuta otwarcia transakcji - skupienie wokół otwarcia rynku lub równomiernie w sesji"""
+    first = int(profile["session_start"] * 60)
+    last = int(profile["session_end"] * 60) - 30  # Zostaw świeczki po wejściu
+    if rng.random() < spec.clustered_share:
+        minute = int(rng.gauss(profile["market_open"] * 60, spec.cluster_sigma_minutes))
+    else:
+        minute = rng.randint(first, last)
+    return min(max(minute, first), last)
+
+
+def generate_dataset(path: str, spec: DatasetSpec) -> dict:
+    """
+    Tworzy bazę SQLite z pozycjami i świeczkami
+
+    Args:
+        path: Ścieżka nowego pliku bazy (nie może istnieć)
+        spec: Parametry generowania
+
+    Returns:
+        Słownik z liczbą wierszy per tabela
+    """
+    rng = random.Random(spec.seed)
+    conn = sqlite3.connect(path)
+    counts = {}
+    try:
+        # Typy kolumn jak w tabeli EA (ticket INTEGER - zapytania porównują tickety jako tekst)
+        column_types = {"open_time": "INTEGER", "ticket": "INTEGER", "volume": "REAL", "open_price": "REAL",
+                        "sl": "REAL", "sl_opening": "REAL", "profit_points": "REAL", "magic_number": "INTEGER"}
+        extra_columns = ["sl_recznie REAL", "close_price REAL", "close_time INTEGER", "profit REAL", "tp REAL"]
+        definitions = [f"{column} {column_types[column]}" if column in column_types else column for column in COLUMNS]
+        conn.execute(f"CREATE TABLE positions ({', '.join(definitions + extra_columns)})")
+        for instrument in spec.instruments:
+            conn.execute(f"""
+                CREATE TABLE `{instrument}` (
+                    time INTEGER PRIMARY KEY, open REAL, high REAL, low REAL, close REAL,
+                    tick_volume INTEGER, spread INTEGER, real_volume INTEGER
+                )
+            """)
+
+        prices = {instrument: INSTRUMENT_PROFILES[instrument]["price"] for instrument in spec.instruments}
+        positions = []
+        ticket = 1000000
+        for day in trading_dates(spec.start_date, spec.trading_days):
+            day_start = date_string_to_unix(day)
+            day_candles = {}
+            for instrument in spec.instruments:
+                rows, prices[instrument] = _candle_rows(rng, day_start, INSTRUMENT_PROFILES[instrument],
+                                                        prices[instrument])
+                conn.executemany(f"INSERT INTO `{instrument}` VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                counts[instrument] = counts.get(instrument, 0) + len(rows)
+                day_candles[instrument] = {row[0]: row for row in rows}
+
+            for _ in range(spec.trades_per_day):
+                instrument = rng.choice(spec.instruments)
+                profile = INSTRUMENT_PROFILES[instrument]
+                open_time = day_start + _trade_minute(rng, spec, profile) * 60 + rng.randint(0, 59)
+                candle = day_candles[instrument][open_time - open_time % 60]
+                is_buy = rng.random() < 0.5
+                open_price = candle[4]
+                sl_distance = profile["volatility"] * rng.uniform(2, 6)
+                ticket += rng.randint(1, 7)
+
+                record = dict.fromkeys(COLUMNS)
+                record.update(
+                    open_time=open_time, ticket=ticket, type=0 if is_buy else 1, volume=1.0,
+                    symbol=instrument + ("\x00" if rng.random() < 0.5 else ""),  # EA zapisuje oba formaty
+                    open_price=open_price,
+                    sl=round(open_price - sl_distance if is_buy else open_price + sl_distance, 2),
+                    profit_points=rng.randint(-800, 1500),
+                    setup=rng.choice(SETUPS),
+                    trends=rng.choice([1, -1, None]),
+                    trendl=rng.choice([1, -1, None]),
+                    magic_number=7 if rng.random() < 0.05 else 0,
+                )
+                sl_recznie = record["sl"] if rng.random() < 0.5 else None
+                positions.append([record[column] for column in COLUMNS] + [sl_recznie, None, None, None, None])
+
+        conn.executemany(
+            f"INSERT INTO positions VALUES ({', '.join('?' for _ in range(len(COLUMNS) + 5))})", positions
+        )
+        counts["positions"] = len(positions)
+
+        # Bufor SL z momentu otwarcia (źródło migracji SLOpeningMigrator)
+        conn.execute("CREATE TABLE position_opening_sl (ticket INTEGER PRIMARY KEY, sl_opening REAL, opening_time INTEGER)")
+        pending = rng.sample(positions, min(spec.pending_opening_sl, len(positions)))
+        ticket_index = COLUMNS.index("ticket")
+        sl_index = COLUMNS.index("sl")
+        conn.executemany("INSERT INTO position_opening_sl VALUES (?, ?, ?)",
+                         [(row[ticket_index], row[sl_index], row[0]) for row in pending])
+        counts["position_opening_sl"] = len(pending)
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,45 @@
+"""
+Pomiar czasu benchmarków - powtórzenia, statystyki, wyciszone logi
+"""
+import io
+import statistics
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Optional
+
+
+def measure(name: str, func: Callable[[], Optional[dict]], repeat: int = 3,
+            setup: Optional[Callable[[], None]] = None) -> dict:
+    """
+    Mierzy funkcję repeat razy (setup przed każdym powtórzeniem nie jest mierzony)
+
+    Logi (print) mierzonego kodu są przechwytywane - formatowanie zostaje
+    w pomiarze, zapis na terminal nie.
+
+    Args:
+        name: Nazwa benchmarku w wynikach
+        func: Mierzona funkcja; może zwrócić słownik z licznikami (np. liczba wyników)
+        repeat: Liczba powtórzeń
+        setup: Przygotowanie przed każdym powtórzeniem (np. czyszczenie cache)
+
+    Returns:
+        Słownik z czasami (min/median/mean/max w sekundach) i licznikami ostatniego przebiegu
+    """
+    timings = []
+    counters = {}
+    for _ in range(max(1, repeat)):
+        with redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            counters = func() or {}
+            timings.append(time.perf_counter() - started)
+    return {
+        "name": name,
+        "repeat": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.mean(timings),
+        "max_s": max(timings),
+        "counters": counters,
+    }
@@ -0,0 +1,270 @@
+"""
+Uruchamia benchmarki gorących ścieżek i zapisuje wyniki jako JSON
+
+Przykłady:
+    python -m benchmarks.run --months 3 --output bench.json
+    python -m benchmarks.run --years 1 --only tp_for_tickets,load_data_query --repeat 5
+    python -m benchmarks.run --db kopia_bazy.db --output bench.json
+
+Baza jest wskazywana przez DZIENNIK_DB_PATH (ustawiane przed importem
+konfiguracji), więc benchmarki trzeba uruchamiać w osobnym procesie.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.dataset import DatasetSpec, TRADING_DAYS_PER_MONTH, generate_dataset
+from benchmarks.harness import measure
+
+# Wersja formatu wyników (porównywanie między commitami)
+RESULTS_SCHEMA = 1
+
+BENCHMARK_NAMES = ["tp_for_tickets", "tp_for_date_range", "load_data_query", "order_monitor_check", "sl_migration"]
+
+# Parametry kalkulacji TP w benchmarkach
+SL_STALY_POINTS = 20
+BE_PROG = 15
+BE_OFFSET = 2
+
+
+def _git_commit() -> Optional[str]:
+    """Hash bieżącego commita (None poza repozytorium)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except Exception:
+        return None
+
+
+def _table_counts(db_path: str) -> Dict[str, int]:
+    """Liczba wierszy w tabelach bazy"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        return {table: conn.execute(f"SELECT COUNT(*) FROM `{table}`").fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+def _journal_bounds(db_path: str) -> Tuple[List[str], List[str], str, str]:
+    """Tickety, instrumenty oraz pierwsza i ostatnia data pozycji"""
+    from utils.date_utils import unix_to_date_string
+    conn = sqlite3.connect(db_path)
+    try:
+        tickets = [str(row[0]) for row in conn.execute("SELECT ticket FROM positions ORDER BY open_time")]
+        symbols = sorted({row[0].replace("\x00", "").strip().lower()
+                          for row in conn.execute("SELECT DISTINCT symbol FROM positions") if row[0]})
+        first, last = conn.execute("SELECT MIN(open_time), MAX(open_time) FROM positions").fetchone()
+    finally:
+        conn.close()
+    return tickets, symbols, unix_to_date_string(first, "%Y-%m-%d"), unix_to_date_string(last, "%Y-%m-%d")
+
+
+def build_benchmarks(db_path: str) -> Dict[str, Tuple[Callable[[], dict], Optional[Callable[[], None]]]]:
+    """
+    Przygotowuje benchmarki (nazwa -> (mierzona funkcja, setup przed powtórzeniem))
+
+    Każdy benchmark startuje z zimnym cache świeczek i bez cache wyników.
+    """
+    from calculations.tp_calculator import TPCalculator
+    from config.field_definitions import COLUMNS
+    from config.instrument_tickets_config import get_instrument_tickets_config
+    from database.connection import execute_query
+    from database.migration.sl_opening_migrator import SLOpeningMigrator
+    from database.queries import PositionQueries
+    from monitoring.order_monitor import NewOrderMonitor
+    from utils.date_utils import date_range_to_unix, format_time_for_display
+
+    tickets, instruments, first_date, last_date = _journal_bounds(db_path)
+    tickets_config = get_instrument_tickets_config()
+    sl_staly_values = {}
+    for instrument in instruments:
+        main_instrument = tickets_config.get_main_instrument_for_ticket(instrument)
+        if main_instrument:
+            sl_staly_values[main_instrument] = SL_STALY_POINTS
+    sl_types = {'sl_staly': True, 'sl_recznie': True}
+
+    calculator = TPCalculator(db_path=db_path)
+
+    def cold_caches():
+        calculator.candle_analyzer.candle_cache.clear()
+        calculator.result_cache.clear()
+
+    def tp_for_tickets():
+        results = calculator.calculate_tp_for_tickets(
+            tickets, sl_types, sl_staly_values, BE_PROG, BE_OFFSET, use_cache=False
+        )
+        return dict(results.stats.counters, results=len(results), stages=results.stats.stage_seconds)
+
+    def tp_for_date_range():
+        results = calculator.calculate_tp_for_date_range(
+            first_date, last_date, instruments, sl_types, sl_staly_values, BE_PROG, BE_OFFSET, use_cache=False
+        )
+        return dict(results.stats.counters, results=len(results), stages=results.stats.stage_seconds)
+
+    def load_data_query():
+        # Ścieżka zapytania DataViewer.load_data: filtry + formatowanie czasu w wierszach tabeli
+        start_unix, end_unix = date_range_to_unix(first_date, last_date)
+        query, params = PositionQueries.build_filtered_positions_query(
+            COLUMNS, start_unix, end_unix, symbols=instruments[:1],
+            suspicious=PositionQueries.SUSPICIOUS_HIDE
+        )
+        rows = execute_query(query, params)
+        for row in rows:
+            format_time_for_display(row[0])
+        return {"rows": len(rows)}
+
+    monitor = NewOrderMonitor(check_interval=30)
+
+    def order_monitor_check():
+        monitor._check_for_new_orders()
+        return {"known_tickets": len(monitor.known_tickets)}
+
+    # Kopia bufora SL - przywracana przed każdym powtórzeniem migracji
+    conn = sqlite3.connect(db_path)
+    with conn:
+        has_opening_sl = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' "
+                                      "AND name='position_opening_sl'").fetchone() is not None
+        if has_opening_sl:
+            conn.execute("CREATE TABLE IF NOT EXISTS benchmark_opening_sl_source AS "
+                         "SELECT * FROM position_opening_sl")
+    conn.close()
+    migrator = SLOpeningMigrator()
+
+    def restore_opening_sl():
+        if not has_opening_sl:
+            return
+        restore = sqlite3.connect(db_path, timeout=30.0)
+        with restore:
+            columns = [row[1] for row in restore.execute("PRAGMA table_info(positions)")]
+            if "sl_opening" in columns:
+                restore.execute("UPDATE positions SET sl_opening = NULL "
+                                "WHERE ticket IN (SELECT ticket FROM benchmark_opening_sl_source)")
+            restore.execute("DELETE FROM position_opening_sl")
+            restore.execute("INSERT INTO position_opening_sl SELECT * FROM benchmark_opening_sl_source")
+        restore.close()
+
+    def sl_migration():
+        return {"migrated": migrator.run_migration()}
+
+    return {
+        "tp_for_tickets": (tp_for_tickets, cold_caches),
+        "tp_for_date_range": (tp_for_date_range, cold_caches),
+        "load_data_query": (load_data_query, None),
+        "order_monitor_check": (order_monitor_check, None),
+        "sl_migration": (sl_migration, restore_opening_sl),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarki gorących ścieżek dziennika")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--days", type=int, help="Liczba dni handlowych syntetycznej bazy")
+    size.add_argument("--months", type=float, help="Rozmiar bazy w miesiącach (domyślnie 1)")
+    size.add_argument("--years", type=float, help="Rozmiar bazy w latach")
+    parser.add_argument("--instruments", default="ger40.cash,us100.cash", help="Instrumenty oddzielone przecinkami")
+    parser.add_argument("--trades-per-day", type=int, default=12, help="Średnia liczba transakcji dziennie")
+    parser.add_argument("--pending-sl", type=int, default=200, help="Wiersze position_opening_sl do migracji")
+    parser.add_argument("--seed", type=int, default=0, help="Ziarno generatora")
+    parser.add_argument("--db", help="Istniejąca baza zamiast syntetycznej (np. kopia produkcyjnej)")
+    parser.add_argument("--workdir", help="Katalog na syntetyczną bazę (domyślnie tymczasowy)")
+    parser.add_argument("--indexes", action="store_true", help="Utwórz indeksy (IndexManager) przed pomiarami")
+    parser.add_argument("--repeat", type=int, default=3, help="Liczba powtórzeń każdego benchmarku")
+    parser.add_argument("--only", help=f"Wybrane benchmarki: {','.join(BENCHMARK_NAMES)}")
+    parser.add_argument("-o", "--output", help="Plik JSON z wynikami (domyślnie stdout)")
+    return parser
+
+
+def _trading_days(args) -> int:
+    if args.days:
+        return args.days
+    if args.years:
+        return max(1, round(args.years * 12 * TRADING_DAYS_PER_MONTH))
+    return max(1, round((args.months or 1) * TRADING_DAYS_PER_MONTH))
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    selected = [name.strip() for name in args.only.split(",")] if args.only else BENCHMARK_NAMES
+    unknown = [name for name in selected if name not in BENCHMARK_NAMES]
+    if unknown:
+        print(f"[Benchmark] Nieznane benchmarki: {unknown}. Dostępne: {BENCHMARK_NAMES}", file=sys.stderr)
+        return 2
+
+    temp_dir = None
+    spec = None
+    if args.db:
+        db_path = os.path.abspath(args.db)
+    else:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="dziennik_bench_")
+        temp_dir = None if args.workdir else workdir
+        os.makedirs(workdir, exist_ok=True)
+        spec = DatasetSpec(trading_days=_trading_days(args),
+                           instruments=[name.strip() for name in args.instruments.split(",") if name.strip()],
+                           trades_per_day=args.trades_per_day, pending_opening_sl=args.pending_sl, seed=args.seed)
+        db_path = os.path.join(workdir, f"bench_{spec.trading_days}d_seed{spec.seed}.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        print(f"[Benchmark] Generuję bazę {db_path} ({spec.trading_days} dni handlowych)", file=sys.stderr)
+        generate_dataset(db_path, spec)
+
+    # Konfiguracja (i globalne połączenie) musi wskazywać na bazę benchmarku
+    os.environ["DZIENNIK_DB_PATH"] = db_path
+    from config import database_config
+    if database_config.DB_PATH != db_path:
+        print("[Benchmark] Konfiguracja bazy była już zaimportowana - uruchom benchmarki w osobnym procesie",
+              file=sys.stderr)
+        return 1
+
+    if args.indexes:
+        from database.migration.index_manager import IndexManager
+        conn = sqlite3.connect(db_path)
+        IndexManager(conn).ensure_indexes()
+        conn.close()
+
+    report = {
+        "schema": RESULTS_SCHEMA,
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "path": db_path,
+            "synthetic": spec is not None,
+            "spec": spec.to_dict() if spec else None,
+            "rows": _table_counts(db_path),
+        },
+        "benchmarks": [],
+    }
+
+    benchmarks = build_benchmarks(db_path)
+    for name in selected:
+        func, setup = benchmarks[name]
+        print(f"[Benchmark] {name}...", file=sys.stderr)
+        result = measure(name, func, args.repeat, setup)
+        print(f"[Benchmark] {name}: median {result['median_s']:.4f}s {result['counters']}", file=sys.stderr)
+        report["benchmarks"].append(result)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if temp_dir:
+        from database.connection import get_db_connection
+        get_db_connection().close_connection()
+        print(f"[Benchmark] Syntetyczna baza pozostaje w {temp_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,106 @@
 """
 Analiza świeczek dla kalkulacji TP
 """
+import os
 import sqlite3
+from contextlib import nullcontext
+from pathlib import Path
 from database.queries import CandleQueries
 from config.database_config import DB_PATH
-from database.models import Candle
-from utils.date_utils import unix_to_datetime, get_day_end_unix
-from typing import List, Optional
+import numpy as np
+from database.models import Candle, CandleSeries
+from database.table_registry import CandleTableRegistry
+from utils.date_utils import unix_to_datetime, get_day_start_unix, get_day_end_unix, get_current_unix
+from typing import Callable, List, Optional, Tuple, Union
+from calculations import vectorized_tp, range_index
+from calculations.candle_cache import CandleCache, DayCandles, get_candle_cache
+from database.columnar_store import ColumnarCandleStore, get_candle_store
+from utils.trace import TRACE, get_tracer
+
+# Silniki obliczeń TP
+ENGINE_PYTHON = "python"  # Pętla świeczka po świeczce (referencyjna, ze szczegółowymi logami)
+ENGINE_NUMPY = "numpy"    # Operacje na tablicach (vectorized_tp)
+ENGINE_RANGE_INDEX = "range_index"  # Sparse table high/low z wyszukiwaniem przekroczeń (range_index)
+ENGINE_SQL = "sql"        # TP bez BE liczony zapytaniami agregującymi w SQLite (BE - jak numpy)
+AVAILABLE_ENGINES = [ENGINE_PYTHON, ENGINE_NUMPY, ENGINE_RANGE_INDEX, ENGINE_SQL]
+
+_tracer = get_tracer("CandleAnalyzer")
 
 
 class CandleAnalyzer:
     """Klasa do analizy danych świeczkowych"""
     
-    def __init__(self):
+    def __init__(self, engine: str = ENGINE_NUMPY, db_path: Optional[str] = None,
+                 candle_cache: Optional[CandleCache] = None,
+                 candle_store: Optional[ColumnarCandleStore] = None,
+                 read_only: bool = False):
         self.candle_queries = CandleQueries()
+        self.db_path = db_path or DB_PATH
+        self.read_only = read_only
+        # Cache dni świeczek - domyślnie współdzielony w całym procesie
+        self.candle_cache = candle_cache if candle_cache is not None else get_candle_cache()
+        # Magazyn kolumnowy (memmap) - domyślny tylko dla domyślnej bazy
+        if candle_store is None and self.db_path == DB_PATH:
+            candle_store = get_candle_store()
+        self.candle_store = candle_store
         self._connection = None
+        self._table_registry = CandleTableRegistry()
+        self._arrays_cache = None
+        self._range_index_cache = None
+        self.run_stats = None  # RunStats bieżącego przebiegu (liczniki zapytań i wierszy)
+        self.set_engine(engine)
+    
+    def set_engine(self, engine: str):
+        """Ustawia silnik obliczeń TP (python / numpy / range_index / sql)"""
+        if engine not in AVAILABLE_ENGINES:
+            raise ValueError(f"Nieznany silnik obliczeń: {engine}. Dostępne: {AVAILABLE_ENGINES}")
+        self.engine = engine
+    
+    def _get_arrays(self, candles: Union[CandleSeries, List[Candle]]):
+        """
+        Zwraca tablice (high, low, close) dla świeczek
+        
+        CandleSeries oddaje swoje kolumny bez konwersji. Lista Candle jest
+        analizowana kilka razy na pozycję (różne typy SL), więc ostatnia
+        konwersja jest zapamiętywana.
+        """
+        if isinstance(candles, CandleSeries):
+            return candles.high, candles.low, candles.close
+        cached = self._arrays_cache
+        if cached is not None and cached[0] is candles:
+            return cached[1]
+        arrays = vectorized_tp.candles_to_arrays(candles)
+        self._arrays_cache = (candles, arrays)
+        return arrays
+    
+    def get_range_index(self, candles: Union[CandleSeries, List[Candle]]) -> Tuple[range_index.CandleRangeIndex, int]:
+        """
+        Zwraca indeks zakresowy i indeks świeczki otwarcia (start) dla świeczek pozycji
+        
+        Wycinek dnia (get_candles_for_position) korzysta z indeksu całego dnia
+        z cache świeczek - budowa raz na dzień, pozycja to tylko przesunięcie.
+        Inne serie (dzień, który jeszcze trwa, zakres przez północ) dostają
+        własny indeks - ostatni zbudowany jest zapamiętywany.
+        """
+        origin = getattr(candles, 'origin', None)
+        if origin is not None:
+            return self.candle_cache.get_range_index(origin.key, origin.day), origin.offset
+        cached = self._range_index_cache
+        if cached is not None and cached[0] is candles:
+            return cached[1], 0
+        index = range_index.CandleRangeIndex(*self._get_arrays(candles))
+        self._range_index_cache = (candles, index)
+        return index, 0
     
     def _get_connection(self):
         """Zwraca połączenie dla aktualnego wątku"""
         if self._connection is None:
-            self._connection = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
+            if self.read_only:
+                # Tylko odczyt (procesy robocze) - nie blokuje zapisów EA
+                uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+                self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30.0)
+            else:
+                self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
         return self._connection
     
     def _execute_query(self, query, params=None):
@@ -31,54 +112,40 @@ class CandleAnalyzer:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            if self.run_stats is not None:
+                self.run_stats.add("queries")
+                self.run_stats.add("rows_read", len(rows))
+            return rows
         finally:
             cursor.close()
     
+    def _stage(self, name: str):
+        """Etap pomiaru bieżącego przebiegu (bez pomiaru gdy brak RunStats)"""
+        return self.run_stats.stage(name) if self.run_stats is not None else nullcontext()
+    
     def close_connection(self):
         """Zamyka połączenie"""
         if self._connection:
             self._connection.close()
             self._connection = None
+            # Rejestr tabel jest per połączenie
+            self._table_registry.invalidate()
     
     def _find_table_name(self, instrument: str) -> Optional[str]:
-        """Znajduje prawdziwą nazwę tabeli dla instrumentu"""
+        """Znajduje prawdziwą nazwę tabeli dla instrumentu (rejestr tabel, bez skanowania katalogu)"""
         try:
-            # Sprawdź najpierw bezpośrednio
-            if self._table_exists_simple(instrument):
-                return instrument
-            
-            # Pobierz wszystkie tabele z danymi świeczkymi
-            all_tables_query = "SELECT name FROM sqlite_master WHERE type='table' AND (name LIKE '%cash%' OR name LIKE '%XAUUSD%')"
-            all_tables = self._execute_query(all_tables_query)
-            
-            normalized_target = instrument.lower().replace('\x00', '').strip()
-            
-            for row in all_tables:
-                table_name = row[0]
-                normalized_table = table_name.lower().replace('\x00', '').strip()
-                
-                if normalized_table == normalized_target:
-                    print(f"CandleAnalyzer: Znaleziono tabelę '{table_name}' dla instrumentu '{instrument}'")
-                    return table_name
-            
-            print(f"CandleAnalyzer: Nie znaleziono tabeli dla instrumentu '{instrument}'")
-            return None
+            with self._stage("table_resolution"):
+                table_name = self._table_registry.resolve(self._get_connection(), instrument)
+            if table_name is None:
+                print(f"CandleAnalyzer: Nie znaleziono tabeli dla instrumentu '{instrument}'")
+            return table_name
             
         except Exception as e:
             print(f"CandleAnalyzer: Błąd przy szukaniu tabeli dla {instrument}: {e}")
             return None
     
-    def _table_exists_simple(self, table_name: str) -> bool:
-        """Prosta funkcja sprawdzająca istnienie tabeli"""
-        try:
-            query = self.candle_queries.check_table_exists()
-            result = self._execute_query(query, (table_name,))
-            return len(result) > 0
-        except Exception:
-            return False
-    
-    def get_candles_for_position(self, instrument: str, open_time: int) -> List[Candle]:
+    def get_candles_for_position(self, instrument: str, open_time: int) -> CandleSeries:
         """
         Pobiera świeczki dla pozycji od świeczki przed otwarciem do końca dnia
         
@@ -87,45 +154,153 @@ class CandleAnalyzer:
             open_time: Unix timestamp otwarcia pozycji
         
         Returns:
-            Lista obiektów Candle
+            Seria świeczek CandleSeries (pusta gdy brak danych)
         """
         # Znajdź prawdziwą nazwę tabeli
         real_table_name = self._find_table_name(instrument)
         if not real_table_name:
-            return []
+            return CandleSeries.empty()
         
-        print(f"CandleAnalyzer: Używam tabeli '{real_table_name}' dla instrumentu '{instrument}'")
+        _tracer.debug("Używam tabeli '%s' dla instrumentu '%s'", real_table_name, instrument)
         
         # Pobierz świeczki od 60 sekund przed otwarciem pozycji do końca dnia
         # To zapewni że mamy świeczkę otwarcia pozycji jako pierwszą w obliczeniach
         start_time = open_time - 60  # 60 sekund wcześniej
         end_time = get_day_end_unix(open_time)
-        print(f"CandleAnalyzer: Pobieranie świeczek od {start_time} (60s przed {open_time}) do {end_time}")
+        _tracer.debug("Pobieranie świeczek od %s (60s przed %s) do %s", start_time, open_time, end_time)
         
         try:
-            query = self.candle_queries.get_candles_by_time_range(real_table_name)
-            rows = self._execute_query(query, (start_time, end_time))
-            print(f"CandleAnalyzer: Znaleziono {len(rows)} świeczek")
-            
-            candles = []
-            for row in rows:
-                candle = Candle(
-                    time=row[0],
-                    open=row[1],
-                    high=row[2],
-                    low=row[3],
-                    close=row[4],
-                    tick_volume=row[5] if len(row) > 5 else None,
-                    spread=row[6] if len(row) > 6 else None,
-                    real_volume=row[7] if len(row) > 7 else None
+            day_start = get_day_start_unix(open_time)
+            within_day = start_time >= day_start
+            # Z magazynu cały dzień (wycinek pamięta dzień - indeks zakresowy raz na dzień)
+            stored = self._get_store_range(real_table_name, day_start if within_day else start_time, end_time)
+            day = self._get_day_candles(real_table_name, open_time) if stored is None else None
+            if stored is not None:
+                # Widoki memmap z magazynu kolumnowego (bez zapytania do SQLite)
+                no_volume = np.zeros(len(stored['time']), dtype=np.int64)
+                candles = CandleSeries(
+                    time=stored['time'], open=stored['open'], high=stored['high'], low=stored['low'],
+                    close=stored['close'], tick_volume=no_volume, spread=stored['spread'], real_volume=no_volume
                 )
-                candles.append(candle)
+                if within_day:
+                    candles = candles.day_window((self.db_path, real_table_name, day_start, "store"),
+                                                 start_time, end_time)
+            elif day is not None and within_day:
+                # Wycinek dnia z cache zamiast osobnego zapytania (widok bez kopiowania)
+                candles = day.day_window((self.db_path, real_table_name, day_start), start_time, end_time)
+            else:
+                query = self.candle_queries.get_candles_by_time_range(real_table_name)
+                candles = CandleSeries.from_rows(self._execute_query(query, (start_time, end_time)))
             
+            _tracer.debug("Znaleziono %d świeczek", len(candles))
             return candles
             
         except Exception as e:
             print(f"CandleAnalyzer: Błąd podczas pobierania świeczek dla {real_table_name}: {e}")
-            return []
+            return CandleSeries.empty()
+    
+    def _get_store_range(self, table_name: str, start_time: int, end_time: int):
+        """Zwraca kolumny świeczek z magazynu kolumnowego lub None gdy go nie ma / nie pokrywa zakresu"""
+        if self.candle_store is None:
+            return None
+        try:
+            return self.candle_store.get_range(table_name, start_time, end_time)
+        except Exception as e:
+            print(f"CandleAnalyzer: Błąd odczytu magazynu świeczek dla {table_name}: {e}")
+            return None
+    
+    def sync_candle_store(self, should_stop: Optional[Callable[[], bool]] = None) -> dict:
+        """
+        Synchronizuje magazyn kolumnowy z tabelami świeczek (tylko nowe świeczki)
+        
+        Args:
+            should_stop: Sprawdzane przed każdą tabelą - True przerywa synchronizację
+        
+        Returns:
+            Słownik tabela -> liczba dopisanych świeczek
+        """
+        from database.columnar_store import sync_all_candle_tables
+        if self.candle_store is None:
+            self.candle_store = ColumnarCandleStore()
+        return sync_all_candle_tables(self._get_connection(), self.candle_store, should_stop)
+    
+    def _get_day_candles(self, table_name: str, open_time: int) -> Optional[DayCandles]:
+        """
+        Zwraca świeczki całego dnia handlowego z cache (ładuje przy chybieniu)
+        
+        Dni, które jeszcze trwają, nie są cache'owane - EA wciąż dopisuje świeczki.
+        
+        Returns:
+            Obiekt DayCandles lub None jeśli dzień nie może być cache'owany
+        """
+        day_start = get_day_start_unix(open_time)
+        day_end = get_day_end_unix(open_time)
+        if day_end >= get_current_unix():
+            return None
+        
+        key = (self.db_path, table_name, day_start)
+        day = self.candle_cache.get(key)
+        if day is None:
+            query = self.candle_queries.get_candles_by_time_range(table_name)
+            day = DayCandles.from_rows(self._execute_query(query, (day_start, day_end)))
+            self.candle_cache.put(key, day)
+        return day
+    
+    def preload_candles(self, positions) -> int:
+        """
+        Wczytuje do cache świeczki wszystkich dni potrzebnych dla listy pozycji
+        
+        Pozycje są grupowane po (tabela, dzień). Dla gęstych zakresów wykonywane
+        jest jedno zapytanie na instrument obejmujące cały zakres, które jest
+        dzielone na dni wyszukiwaniem binarnym (widoki bez kopiowania). Dla
+        rzadkich zakresów - jedno zapytanie na grupę (tabela, dzień).
+        
+        Args:
+            positions: Lista obiektów Position
+        
+        Returns:
+            Liczba wykonanych zapytań o świeczki
+        """
+        now = get_current_unix()
+        days_by_table = {}
+        for position in positions:
+            table_name = self._find_table_name(position.symbol)
+            if not table_name:
+                continue
+            day_start = get_day_start_unix(position.open_time)
+            day_end = get_day_end_unix(position.open_time)
+            if day_end >= now:
+                continue  # Dzień jeszcze trwa - nie cache'ujemy
+            key = (self.db_path, table_name, day_start)
+            if self.candle_cache.contains(key):
+                continue
+            if self._get_store_range(table_name, day_start, day_end) is not None:
+                continue  # Dzień dostępny w magazynie kolumnowym
+            days_by_table.setdefault(table_name, {})[day_start] = day_end
+        
+        query_count = 0
+        for table_name, days in days_by_table.items():
+            query = self.candle_queries.get_candles_by_time_range(table_name)
+            span_start = min(days)
+            span_end = max(days.values())
+            span_days = (span_end - span_start) // 86400 + 1
+            
+            if len(days) > 1 and span_days <= 2 * len(days):
+                # Gęsty zakres - jedno zapytanie na instrument, podział na dni
+                span = DayCandles.from_rows(self._execute_query(query, (span_start, span_end)))
+                query_count += 1
+                for day_start, day_end in days.items():
+                    i0, i1 = span.window_bounds(day_start, day_end)
+                    self.candle_cache.put((self.db_path, table_name, day_start), span.slice(i0, i1))
+            else:
+                for day_start, day_end in days.items():
+                    day = DayCandles.from_rows(self._execute_query(query, (day_start, day_end)))
+                    query_count += 1
+                    self.candle_cache.put((self.db_path, table_name, day_start), day)
+        
+        print(f"CandleAnalyzer: Preload świeczek - {sum(len(d) for d in days_by_table.values())} dni, "
+              f"{query_count} zapytań")
+        return query_count
     
     def _table_exists(self, table_name: str) -> bool:
         """Sprawdza czy tabela istnieje w bazie danych"""
@@ -152,11 +327,38 @@ class CandleAnalyzer:
             print(f"CandleAnalyzer: Błąd przy sprawdzaniu tabeli {table_name}: {e}")
             return False
     
-    def calculate_max_tp_basic(self, candles: List[Candle], position_type: int, 
+    def calculate_max_tp_basic(self, candles: Union[CandleSeries, List[Candle]], position_type: int, 
                               open_price: float, stop_loss: float, spread: float = 0, detailed_logs: bool = False) -> Optional[float]:
         """
         Oblicza maksymalny TP dla podstawowego scenariusza (bez BE)
         
+        Wybiera silnik według self.engine. Szczegółowe logi (świeczka po świeczce)
+        są dostępne tylko w pętli, więc detailed_logs=True zawsze używa pętli.
+        
+        Returns:
+            Maksymalny TP w punktach lub None jeśli brak świeczek
+        """
+        if self.engine in (ENGINE_NUMPY, ENGINE_SQL) and not detailed_logs:
+            if not candles:
+                return None
+            high, low, close = self._get_arrays(candles)
+            return vectorized_tp.max_tp_basic(high, low, close, position_type,
+                                              open_price, stop_loss, spread)
+        if self.engine == ENGINE_RANGE_INDEX and not detailed_logs:
+            if not candles:
+                return None
+            index, start = self.get_range_index(candles)
+            return range_index.max_tp_basic(index, position_type, open_price, stop_loss, spread, start)
+        
+        return self._calculate_max_tp_basic_loop(candles, position_type, open_price,
+                                                 stop_loss, spread, detailed_logs)
+    
+    def _calculate_max_tp_basic_loop(self, candles: Union[CandleSeries, List[Candle]], position_type: int,
+                                     open_price: float, stop_loss: float, spread: float = 0,
+                                     detailed_logs: bool = False) -> Optional[float]:
+        """
+        Oblicza maksymalny TP dla podstawowego scenariusza (bez BE) - pętla referencyjna
+        
         Algorytm:
         1. Idzie po kolejnych świeczkach od otwarcia pozycji
         2. Na każdej świeczce sprawdza czy cena uderzyła w SL
@@ -164,6 +366,9 @@ class CandleAnalyzer:
         4. Zapisuje maksymalny zysk jeśli jest większy od poprzedniego
         5. Kończy gdy cena uderzy w SL lub skończą się świeczki
         
+        Przebieg świeczka po świeczce trafia do śledzenia (poziom trace) tylko
+        gdy jest włączone lub przy detailed_logs (wtedy także na konsolę).
+        
         Args:
             candles: Lista świeczek
             position_type: 0 = buy, 1 = sell
@@ -174,109 +379,122 @@ class CandleAnalyzer:
         Returns:
             Maksymalny TP w punktach lub None jeśli pozycja została zamknięta na SL
         """
+        verbose = detailed_logs or _tracer.enabled(TRACE)
         if not candles:
-            if detailed_logs:
-                print("CandleAnalyzer: Brak świeczek do analizy")
+            if verbose:
+                _tracer.trace("Brak świeczek do analizy", force=detailed_logs)
             return None
         
-        if detailed_logs:
-            print(f"CandleAnalyzer: Rozpoczynam obliczenia TP:")
-            print(f"  - Pozycja: {'BUY' if position_type == 0 else 'SELL'}")
-            print(f"  - Cena otwarcia: {open_price}")
-            print(f"  - Stop Loss: {stop_loss}")
-            print(f"  - Spread: {spread}")
-            print(f"  - Liczba świeczek: {len(candles)}")
+        if verbose:
+            _tracer.trace("Rozpoczynam obliczenia TP: pozycja %s, cena otwarcia %s, SL %s, spread %s, świeczek %d",
+                          'BUY' if position_type == 0 else 'SELL', open_price, stop_loss, spread, len(candles),
+                          force=detailed_logs)
         
         max_profit = 0.0
         is_buy = (position_type == 0)
         spread_adjustment = spread  # Spread już w punktach
         
         for i, candle in enumerate(candles):
-            if detailed_logs:
-                print(f"\nCandleAnalyzer: Świeczka {i+1}/{len(candles)}")
-                print(f"  - OHLC: O={candle.open}, H={candle.high}, L={candle.low}, C={candle.close}")
-            
+            if verbose:
+                _tracer.trace("Świeczka %d/%d: O=%s, H=%s, L=%s, C=%s", i + 1, len(candles),
+                              candle.open, candle.high, candle.low, candle.close, force=detailed_logs)
+        
             if i == 0:
                 # Pierwsza świeczka - sprawdzamy czy maksymalna strata przekroczyła SL
-                if detailed_logs:
-                    print(f"  - Pierwsza świeczka, sprawdzam czy udażyła w SL")
-                
                 if is_buy:
                     # Dla BUY: sprawdzamy czy low uderzyło w SL
                     if candle.low <= stop_loss + spread_adjustment:
-                        if detailed_logs:
-                            print(f"  - SL uderzony przez low ({candle.low} <= {stop_loss + spread_adjustment})")
-                            print(f"  - Pozycja od razu wybita na pierwszej świeczce - TP = 0")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony przez low (%s <= %s) na pierwszej świeczce - TP = 0",
+                                          candle.low, stop_loss + spread_adjustment, force=detailed_logs)
                         return 0.0  # Została wybita, ale TP = 0 (nie None!)
-                    
+        
                     # Jeśli SL nie został uderzony, sprawdź zysk na close
                     profit = candle.close - open_price
-                    if detailed_logs:
-                        print(f"  - SL nie uderzony, zysk na close: {candle.close} - {open_price} = {profit}")
-                    
-                    if profit > max_profit:
-                        max_profit = profit
-                        if detailed_logs:
-                            print(f"  - Nowy maksymalny zysk: {max_profit}")
-                        
                 else:  # sell
                     # Dla SELL: sprawdzamy czy high uderzyło w SL
                     if candle.high >= stop_loss - spread_adjustment:
-                        print(f"  - SL uderzony przez high ({candle.high} >= {stop_loss - spread_adjustment})")
-                        print(f"  - Pozycja od razu wybita na pierwszej świeczce - TP = 0")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony przez high (%s >= %s) na pierwszej świeczce - TP = 0",
+                                          candle.high, stop_loss - spread_adjustment, force=detailed_logs)
                         return 0.0  # Została wybita, ale TP = 0 (nie None!)
-                    
+        
                     # Jeśli SL nie został uderzony, sprawdź zysk na close
                     profit = open_price - candle.close
-                    print(f"  - SL nie uderzony, zysk na close: {open_price} - {candle.close} = {profit}")
-                    
-                    if profit > max_profit:
-                        max_profit = profit
-                        print(f"  - Nowy maksymalny zysk: {max_profit}")
-                        
+                if verbose:
+                    _tracer.trace("  - SL nie uderzony, zysk na close: %s", profit, force=detailed_logs)
             else:
                 # Kolejne świeczki - możemy sprawdzać extrema (high/low)
-                print(f"  - Kolejna świeczka, sprawdzam extrema")
-                
                 if is_buy:
                     # Sprawdź czy low uderzyło w SL
                     if candle.low <= stop_loss + spread_adjustment:
-                        print(f"  - SL uderzony przez low ({candle.low} <= {stop_loss + spread_adjustment})")
-                        print(f"  - Pozycja zamknięta, zwracam maksymalny zysk: {max_profit}")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony przez low (%s <= %s), maksymalny zysk: %s",
+                                          candle.low, stop_loss + spread_adjustment, max_profit, force=detailed_logs)
                         return max_profit
-                    
+        
                     # Sprawdź maksymalny zysk na tej świeczce (high)
                     profit = candle.high - open_price
-                    print(f"  - Potencjalny zysk na high: {candle.high} - {open_price} = {profit}")
-                    
-                    if profit > max_profit:
-                        max_profit = profit
-                        print(f"  - Nowy maksymalny zysk: {max_profit}")
-                        
                 else:  # sell
                     # Sprawdź czy high uderzyło w SL
                     if candle.high >= stop_loss - spread_adjustment:
-                        print(f"  - SL uderzony przez high ({candle.high} >= {stop_loss - spread_adjustment})")
-                        print(f"  - Pozycja zamknięta, zwracam maksymalny zysk: {max_profit}")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony przez high (%s >= %s), maksymalny zysk: %s",
+                                          candle.high, stop_loss - spread_adjustment, max_profit, force=detailed_logs)
                         return max_profit
-                    
+        
                     # Sprawdź maksymalny zysk na tej świeczce (low)
                     profit = open_price - candle.low
-                    print(f"  - Potencjalny zysk na low: {open_price} - {candle.low} = {profit}")
-                    
-                    if profit > max_profit:
-                        max_profit = profit
-                        print(f"  - Nowy maksymalny zysk: {max_profit}")
+                if verbose:
+                    _tracer.trace("  - Potencjalny zysk na %s: %s", 'high' if is_buy else 'low', profit,
+                                  force=detailed_logs)
+        
+            if profit > max_profit:
+                max_profit = profit
+                if verbose:
+                    _tracer.trace("  - Nowy maksymalny zysk: %s", max_profit, force=detailed_logs)
         
-        print(f"\nCandleAnalyzer: Koniec świeczek, końcowy maksymalny zysk: {max_profit}")
+        if verbose:
+            _tracer.trace("Koniec świeczek, końcowy maksymalny zysk: %s", max_profit, force=detailed_logs)
         return max_profit
     
-    def calculate_max_tp_with_be(self, candles: List[Candle], position_type: int,
+    def calculate_max_tp_with_be(self, candles: Union[CandleSeries, List[Candle]], position_type: int,
                                 open_price: float, initial_sl: float, be_prog: float,
                                 be_offset: float, spread: float = 0, detailed_logs: bool = False) -> Optional[float]:
         """
         Oblicza maksymalny TP z uwzględnieniem przesuwania SL na BE
         
+        Wybiera silnik według self.engine (detailed_logs=True zawsze używa pętli).
+        
+        Returns:
+            Maksymalny TP w punktach lub None jeśli brak świeczek
+        """
+        if self.engine in (ENGINE_NUMPY, ENGINE_SQL) and not detailed_logs:
+            if not candles:
+                return None
+            high, low, close = self._get_arrays(candles)
+            return vectorized_tp.max_tp_with_be(high, low, close, position_type, open_price,
+                                                initial_sl, be_prog, be_offset, spread)
+        if self.engine == ENGINE_RANGE_INDEX and not detailed_logs:
+            if not candles:
+                return None
+            index, start = self.get_range_index(candles)
+            return range_index.max_tp_with_be(index, position_type, open_price,
+                                              initial_sl, be_prog, be_offset, spread, start)
+        
+        return self._calculate_max_tp_with_be_loop(candles, position_type, open_price, initial_sl,
+                                                   be_prog, be_offset, spread, detailed_logs)
+    
+    def _calculate_max_tp_with_be_loop(self, candles: Union[CandleSeries, List[Candle]], position_type: int,
+                                       open_price: float, initial_sl: float, be_prog: float,
+                                       be_offset: float, spread: float = 0,
+                                       detailed_logs: bool = False) -> Optional[float]:
+        """
+        Oblicza maksymalny TP z uwzględnieniem przesuwania SL na BE - pętla referencyjna
+        
+        Przebieg świeczka po świeczce - jak w _calculate_max_tp_basic_loop
+        (śledzenie trace lub detailed_logs).
+        
         Args:
             candles: Lista świeczek
             position_type: 0 = buy, 1 = sell
@@ -292,8 +510,11 @@ class CandleAnalyzer:
         if not candles:
             return None
         
-        print(f"\n=== ROZPOCZYNAM OBLICZENIA TP Z BREAK EVEN ====")
-        print(f"Pozycja: {'BUY' if position_type == 0 else 'SELL'}, Próg BE: {be_prog}, Offset: {be_offset}")
+        verbose = detailed_logs or _tracer.enabled(TRACE)
+        if verbose:
+            _tracer.trace("Obliczenia TP z Break Even: pozycja %s, próg BE %s, offset %s, świeczek %d",
+                          'BUY' if position_type == 0 else 'SELL', be_prog, be_offset, len(candles),
+                          force=detailed_logs)
         
         max_profit = 0.0
         is_buy = (position_type == 0)
@@ -311,137 +532,202 @@ class CandleAnalyzer:
         else:
             new_sl_after_be = open_price - be_offset_price
         
-        print(f"Mam {len(candles)} świeczek do analizy BE")
-        
         for i, candle in enumerate(candles):
-            print(f"\nCandleAnalyzer BE: Świeczka {i+1}/{len(candles)}")
-            print(f"  - OHLC: O={candle.open}, H={candle.high}, L={candle.low}, C={candle.close}")
-            print(f"  - Aktualny SL: {current_sl}, BE aktywne: {be_triggered}")
-            
+            if verbose:
+                _tracer.trace("BE świeczka %d/%d: O=%s, H=%s, L=%s, C=%s, SL %s, BE aktywne: %s",
+                              i + 1, len(candles), candle.open, candle.high, candle.low, candle.close,
+                              current_sl, be_triggered, force=detailed_logs)
+        
             if i == 0:
                 # Pierwsza świeczka
-                print(f"  - Pierwsza świeczka BE")
                 if is_buy:
                     # Sprawdź czy uderzył w aktualny SL
                     if candle.low <= current_sl + spread_adjustment:
-                        print(f"  - SL uderzony na pierwszej świeczce, zwrócić 0")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony na pierwszej świeczce - TP = 0", force=detailed_logs)
                         return 0.0
-                    
+        
                     # Sprawdź czy osiągnął próg BE na close
                     profit_close = candle.close - open_price
-                    print(f"  - Zysk na close: {profit_close:.1f} pkt")
-                    
-                    if not be_triggered and profit_close >= be_prog_price:
-                        be_triggered = True
-                        current_sl = new_sl_after_be
-                        print(f"  *** BE AKTYWOWANE! Zysk {profit_close:.1f} >= {be_prog_price}, SL przesunięty na {current_sl} ***")
-                    
-                    profit = profit_close
-                    max_profit = max(max_profit, profit)
-                    
                 else:  # sell
                     if candle.high >= current_sl - spread_adjustment:
-                        print(f"  - SL uderzony na pierwszej świeczce, zwrócić 0")
+                        if verbose:
+                            _tracer.trace("  - SL uderzony na pierwszej świeczce - TP = 0", force=detailed_logs)
                         return 0.0
-                    
+        
                     profit_close = open_price - candle.close
-                    print(f"  - Zysk na close: {profit_close:.1f} pkt")
-                    
-                    if not be_triggered and profit_close >= be_prog_price:
+        
+                if not be_triggered and profit_close >= be_prog_price:
+                    be_triggered = True
+                    current_sl = new_sl_after_be
+                    if verbose:
+                        _tracer.trace("  *** BE AKTYWOWANE! Zysk na close %.1f >= %s, SL przesunięty na %s ***",
+                                      profit_close, be_prog_price, current_sl, force=detailed_logs)
+        
+                max_profit = max(max_profit, profit_close)
+            else:
+                # Kolejne świeczki - próg BE sprawdzany przed SL
+                be_activated_this_candle = False
+                if not be_triggered:
+                    profit_extreme = candle.high - open_price if is_buy else open_price - candle.low
+                    if profit_extreme >= be_prog_price:
                         be_triggered = True
+                        be_activated_this_candle = True
                         current_sl = new_sl_after_be
-                        print(f"  *** BE AKTYWOWANE! Zysk {profit_close:.1f} >= {be_prog_price}, SL przesunięty na {current_sl} ***")
-                    
-                    profit = profit_close
-                    max_profit = max(max_profit, profit)
-            else:
-                # Kolejne świeczki
-                print(f"  - Kolejna świeczka BE")
+                        if verbose:
+                            _tracer.trace("  *** BE AKTYWOWANE! Zysk na %s %.1f >= %s, SL przesunięty na %s "
+                                          "(sprawdzany od następnej świeczki) ***",
+                                          'high' if is_buy else 'low', profit_extreme, be_prog_price, current_sl,
+                                          force=detailed_logs)
+        
+                # Sprawdź czy uderzył w aktualny SL (ale tylko jeśli BE nie zostało właśnie aktywowane)
                 if is_buy:
-                    # Sprawdź próg BE przed sprawdzeniem SL
-                    be_activated_this_candle = False
-                    if not be_triggered:
-                        profit_high = candle.high - open_price
-                        print(f"  - Zysk na high: {profit_high:.1f} pkt")
-                        if profit_high >= be_prog_price:
-                            be_triggered = True
-                            be_activated_this_candle = True
-                            current_sl = new_sl_after_be
-                            print(f"  *** BE AKTYWOWANE! Zysk na high {profit_high:.1f} >= {be_prog_price}, SL przesunięty na {current_sl} ***")
-                            print(f"  - Przesunięty SL będzie sprawdzany od następnej świeczki")
-                    
-                    # Sprawdź czy uderzył w aktualny SL (ale tylko jeśli BE nie zostało właśnie aktywowane)
-                    if not be_activated_this_candle and candle.low <= current_sl + spread_adjustment:
-                        if be_triggered:
-                            print(f"  *** NOWY SL UDERZONY! Low {candle.low} <= {current_sl + spread_adjustment}, TP = {max_profit:.1f} ***")
-                        else:
-                            print(f"  - Oryginalny SL uderzony przez low, TP = {max_profit:.1f}")
-                        return max_profit
-                    elif be_activated_this_candle:
-                        print(f"  - BE właśnie aktywowane, pomijam sprawdzenie SL na tej świeczce")
-                    
-                    profit = candle.high - open_price
-                    if profit > max_profit:
-                        max_profit = profit
-                        print(f"  - NOWY maksymalny zysk: {max_profit:.1f} pkt")
-                    else:
-                        max_profit = max(max_profit, profit)
-                        
-                else:  # sell
-                    # Sprawdź próg BE przed sprawdzeniem SL
-                    be_activated_this_candle = False
-                    if not be_triggered:
-                        profit_low = open_price - candle.low
-                        print(f"  - Zysk na low: {profit_low:.1f} pkt")
-                        if profit_low >= be_prog_price:
-                            be_triggered = True
-                            be_activated_this_candle = True
-                            current_sl = new_sl_after_be
-                            print(f"  *** BE AKTYWOWANE! Zysk na low {profit_low:.1f} >= {be_prog_price}, SL przesunięty na {current_sl} ***")
-                            print(f"  - Przesunięty SL będzie sprawdzany od następnej świeczki")
-                    
-                    if not be_activated_this_candle and candle.high >= current_sl - spread_adjustment:
-                        if be_triggered:
-                            print(f"  *** NOWY SL UDERZONY! High {candle.high} >= {current_sl - spread_adjustment}, TP = {max_profit:.1f} ***")
-                        else:
-                            print(f"  - Oryginalny SL uderzony przez high, TP = {max_profit:.1f}")
-                        return max_profit
-                    elif be_activated_this_candle:
-                        print(f"  - BE właśnie aktywowane, pomijam sprawdzenie SL na tej świeczce")
-                    
-                    profit = open_price - candle.low
-                    if profit > max_profit:
-                        max_profit = profit
-                        print(f"  - NOWY maksymalny zysk: {max_profit:.1f} pkt")
-                    else:
-                        max_profit = max(max_profit, profit)
+                    sl_hit = candle.low <= current_sl + spread_adjustment
+                else:
+                    sl_hit = candle.high >= current_sl - spread_adjustment
+                if not be_activated_this_candle and sl_hit:
+                    if verbose:
+                        _tracer.trace("  - %s SL uderzony, TP = %.1f", 'Przesunięty' if be_triggered else 'Oryginalny',
+                                      max_profit, force=detailed_logs)
+                    return max_profit
+        
+                profit = candle.high - open_price if is_buy else open_price - candle.low
+                if profit > max_profit:
+                    max_profit = profit
+                    if verbose:
+                        _tracer.trace("  - NOWY maksymalny zysk: %.1f pkt", max_profit, force=detailed_logs)
         
         return max_profit
     
-    def has_sufficient_data(self, instrument: str, open_time: int) -> bool:
+    def get_first_candle_for_position(self, instrument: str, open_time: int):
         """
-        Sprawdza czy są dostępne wystarczające dane świeczkowe
+        Zwraca świeczkę otwarcia pozycji (pierwszą od 60 sekund przed otwarciem do końca dnia)
+        
+        Returns:
+            Krotka (tabela, time, high, low, close) lub None jeśli brak danych
+        """
+        real_table_name = self._find_table_name(instrument)
+        if not real_table_name:
+            return None
+        query = self.candle_queries.get_first_candle_in_range(real_table_name)
+        rows = self._execute_query(query, (open_time - 60, get_day_end_unix(open_time)))
+        return (real_table_name,) + tuple(rows[0]) if rows else None
+    
+    def calculate_max_tp_basic_sql(self, instrument: str, open_time: int, position_type: int,
+                                   open_price: float, stop_loss: float, spread: float = 0) -> Optional[float]:
+        """
+        Oblicza maksymalny TP bez BE zapytaniami agregującymi (świeczki nie trafiają do Pythona)
+        
+        Reguły jak w pętli: świeczka otwarcia - SL na low/high, zysk tylko na close;
+        dalej pierwsze uderzenie SL to MIN(time) z warunkiem na low/high, a zysk
+        to MAX(high) / MIN(low) przed nim. Wszystkie zapytania idą po indeksie time.
+        
+        Returns:
+            Maksymalny TP w punktach, 0.0 gdy SL uderzony na pierwszej świeczce,
+            None gdy brak świeczek
+        """
+        first = self.get_first_candle_for_position(instrument, open_time)
+        if first is None:
+            return None
+        
+        table_name, first_time, first_high, first_low, first_close = first
+        end_time = get_day_end_unix(open_time)
+        is_buy = (position_type == 0)
+        
+        if is_buy:
+            threshold = stop_loss + spread
+            if first_low <= threshold:
+                return 0.0
+            hit_query = self.candle_queries.get_first_time_low_at_or_below(table_name)
+            best = first_close - open_price
+        else:
+            threshold = stop_loss - spread
+            if first_high >= threshold:
+                return 0.0
+            hit_query = self.candle_queries.get_first_time_high_at_or_above(table_name)
+            best = open_price - first_close
+        
+        hit_time = self._execute_query(hit_query, (first_time, end_time, threshold))[0][0]
+        stop_time = hit_time if hit_time is not None else end_time + 1
+        
+        if is_buy:
+            extreme = self._execute_query(self.candle_queries.get_max_high_in_range(table_name),
+                                          (first_time, stop_time))[0][0]
+            if extreme is not None:
+                best = max(best, extreme - open_price)
+        else:
+            extreme = self._execute_query(self.candle_queries.get_min_low_in_range(table_name),
+                                          (first_time, stop_time))[0][0]
+            if extreme is not None:
+                best = max(best, open_price - extreme)
+        
+        return max(0.0, best)
+    
+    def get_day_candle_version(self, instrument: str, open_time: int) -> Optional[str]:
+        """
+        Zwraca wersję danych świeczkowych dnia pozycji ("liczba:czas ostatniej")
+        
+        Zmienia się gdy EA dopisze świeczki - wyniki liczone na starszej
+        wersji nie są wtedy brane z cache. Dzień z cache świeczek nie
+        wymaga zapytania.
+        
+        Returns:
+            Wersja lub None jeśli brak tabeli / świeczek
+        """
+        real_table_name = self._find_table_name(instrument)
+        if not real_table_name:
+            return None
+        
+        day_start = get_day_start_unix(open_time)
+        day_end = get_day_end_unix(open_time)
+        if day_end < get_current_unix():
+            day = self.candle_cache.get((self.db_path, real_table_name, day_start))
+            if day is not None:
+                return f"{len(day)}:{int(day.time[-1])}" if len(day) else None
+        
+        try:
+            count, last_time = self._execute_query(
+                self.candle_queries.get_candle_version(real_table_name), (day_start, day_end)
+            )[0]
+        except Exception as e:
+            print(f"CandleAnalyzer: Błąd przy sprawdzaniu wersji danych dla {real_table_name}: {e}")
+            return None
+        return f"{count}:{last_time}" if count else None
+    
+    def get_data_availability(self, instrument: str, open_time: int) -> Optional[int]:
+        """
+        Sprawdza dostępność danych świeczkowych jednym zapytaniem po indeksie
         
         Args:
             instrument: Nazwa instrumentu
             open_time: Unix timestamp otwarcia pozycji
         
         Returns:
-            True jeśli są dane, False jeśli brak
+            Czas pierwszej świeczki od 60 sekund przed otwarciem lub None jeśli brak danych
         """
         # Znajdź prawdziwą nazwę tabeli
         real_table_name = self._find_table_name(instrument)
         if not real_table_name:
-            return False
+            return None
         
         try:
-            # Sprawdź czy jest przynajmniej jedna świeczka od 60 sekund przed otwarciem
             start_time = open_time - 60
-            query = self.candle_queries.get_candles_from_time(real_table_name)
+            query = self.candle_queries.get_first_candle_time_from(real_table_name)
             rows = self._execute_query(query, (start_time,))
-            result = len(rows) > 0
-            print(f"CandleAnalyzer: Tabela {real_table_name} ma {len(rows)} świeczek od {start_time}")
-            return result
+            return rows[0][0] if rows else None
         except Exception as e:
             print(f"CandleAnalyzer: Błąd przy sprawdzaniu danych dla {real_table_name}: {e}")
-            return False
+            return None
+    
+    def has_sufficient_data(self, instrument: str, open_time: int) -> bool:
+        """
+        Sprawdza czy są dostępne wystarczające dane świeczkowe
+        
+        Args:
+            instrument: Nazwa instrumentu
+            open_time: Unix timestamp otwarcia pozycji
+        
+        Returns:
+            True jeśli są dane, False jeśli brak
+        """
+        return self.get_data_availability(instrument, open_time) is not None
@@ -0,0 +1,121 @@
+"""
+Cache świeczek dziennych (per tabela instrumentu i dzień handlowy) z wypieraniem LRU
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from config.database_config import CANDLE_CACHE_MAX_MB
+from database.models import CandleSeries
+from calculations.range_index import CandleRangeIndex
+
+
+# Świeczki jednego dnia - seria kolumnowa (database.models.CandleSeries)
+DayCandles = CandleSeries
+
+
+class CandleCache:
+    """
+    Cache świeczek dziennych współdzielony przez pozycje
+
+    Klucz: (ścieżka bazy, prawdziwa nazwa tabeli, początek dnia).
+    Obok dni - indeksy zakresowe dni (silnik range_index), w tym samym
+    budżecie pamięci. Wypieranie LRU po przekroczeniu budżetu. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = CANDLE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[tuple, DayCandles]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[DayCandles]:
+        """Zwraca świeczki dnia z cache lub None (liczy trafienia/chybienia)"""
+        with self._lock:
+            day = self._entries.get(key)
+            if day is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return day
+
+    def contains(self, key: tuple) -> bool:
+        """Czy dzień jest w cache (bez wpływu na liczniki i kolejność LRU)"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: tuple, day: DayCandles):
+        """Dodaje świeczki dnia do cache, wypierając najdawniej używane wpisy"""
+        size = day.nbytes
+        if size > self.max_bytes:
+            return  # Pojedynczy dzień większy niż cały budżet - nie cache'ujemy
+
+        with self._lock:
+            # Nowe świeczki dnia unieważniają jego indeks zakresowy
+            for stale_key in (key, key + ("range_index",)):
+                previous = self._entries.pop(stale_key, None)
+                if previous is not None:
+                    self.current_bytes -= previous.nbytes
+
+            self._entries[key] = day
+            self.current_bytes += size
+            self._evict_over_budget()
+
+    def get_range_index(self, key: tuple, day: DayCandles) -> CandleRangeIndex:
+        """Indeks zakresowy całego dnia (budowany przy pierwszym użyciu, bez wpływu na liczniki)"""
+        index_key = key + ("range_index",)
+        with self._lock:
+            index = self._entries.get(index_key)
+            if index is not None:
+                self._entries.move_to_end(index_key)
+                return index
+        index = CandleRangeIndex.from_series(day)
+        self.put(index_key, index)
+        return index
+
+    def set_max_bytes(self, max_bytes: int):
+        """Zmienia budżet pamięci (nadmiarowe wpisy są od razu wypierane)"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict_over_budget()
+
+    def _evict_over_budget(self):
+        """Wypiera najdawniej używane wpisy aż zmieszczą się w budżecie (wywoływane pod lockiem)"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """Czyści cache (liczniki pozostają)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Zwraca statystyki cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
+
+
+# Singleton instance - cache współdzielony przez wszystkie kalkulacje w procesie
+_cache_instance: Optional[CandleCache] = None
+
+def get_candle_cache() -> CandleCache:
+    """Zwraca singleton instance cache świeczek"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = CandleCache()
+    return _cache_instance
@@ -0,0 +1,279 @@
+"""
+Profile wychyleń cenowych pozycji (MFE/MAE) zapisywane w bazie
+
+Dla pozycji BUY profil to kolejne rekordy low od wejścia do końca dnia
+(każde nowe najniższe low = nowy maksymalny MAE) wraz z maksymalnym zyskiem
+(MFE) osiągniętym przed tym rekordem. Dla SELL - rekordy high. Z profilu
+można odpowiedzieć na maksymalny TP dla dowolnego stałego SL i spreadu bez
+czytania świeczek: pierwsze uderzenie SL to zawsze pierwszy rekord za
+poziomem SL, a TP to MFE sprzed niego.
+
+Wyniki są identyczne z CandleAnalyzer.calculate_max_tp_basic (te same
+wartości float64, te same porównania).
+"""
+import sqlite3
+import zlib
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from config.database_config import DB_PATH
+from database.models import CandleSeries, Position
+from database.queries import ExcursionProfileQueries
+from calculations.candle_analyzer import CandleAnalyzer
+from calculations.position_analyzer import PositionAnalyzer
+from utils.date_utils import get_day_end_unix, get_current_unix
+
+# Liczba pozycji przetwarzanych (preload świeczek + zapis) w jednej porcji
+BUILD_CHUNK_SIZE = 500
+
+
+def compress_array(values: np.ndarray) -> bytes:
+    """Kompresuje tablicę float64 (zlib)"""
+    return zlib.compress(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+
+
+def decompress_array(blob: bytes) -> np.ndarray:
+    """Odtwarza tablicę float64 z postaci skompresowanej"""
+    return np.frombuffer(zlib.decompress(blob), dtype=np.float64)
+
+
+@dataclass
+class ExcursionProfile:
+    """
+    Profil wychyleń jednej pozycji
+
+    record_prices[k] - k-ty rekord low (BUY, malejąco) / high (SELL, rosnąco);
+                       rekord 0 to zawsze świeczka otwarcia
+    record_mfe[k]    - maksymalny zysk na świeczkach przed rekordem k (dla k=0 nieużywany)
+    max_profit       - maksymalny zysk do końca dnia bez SL ("co gdybym trzymał")
+    """
+    ticket: int
+    symbol: str
+    open_time: int
+    position_type: int  # 0 = buy, 1 = sell
+    open_price: float
+    candle_count: int
+    max_profit: Optional[float]
+    record_prices: np.ndarray
+    record_mfe: np.ndarray
+
+    @classmethod
+    def from_candles(cls, position: Position, candles: CandleSeries) -> 'ExcursionProfile':
+        """Buduje profil ze świeczek pozycji (pierwsza = świeczka otwarcia)"""
+        is_buy = position.type_as_int == 0
+        count = len(candles)
+        empty = np.empty(0, dtype=np.float64)
+        if count == 0:
+            return cls(position.ticket, position.symbol, position.open_time, position.type_as_int,
+                       position.open_price, 0, None, empty, empty)
+
+        high = np.asarray(candles.high, dtype=np.float64)
+        low = np.asarray(candles.low, dtype=np.float64)
+        close = np.asarray(candles.close, dtype=np.float64)
+
+        # Zysk jak w pętli: świeczka otwarcia na close, dalej na high / low
+        if is_buy:
+            profit = high - position.open_price
+            profit[0] = close[0] - position.open_price
+            adverse = low
+            running_extreme = np.minimum.accumulate(adverse)
+            is_record = np.concatenate(([True], adverse[1:] < running_extreme[:-1]))
+        else:
+            profit = position.open_price - low
+            profit[0] = position.open_price - close[0]
+            adverse = high
+            running_extreme = np.maximum.accumulate(adverse)
+            is_record = np.concatenate(([True], adverse[1:] > running_extreme[:-1]))
+
+        record_index = np.nonzero(is_record)[0]
+        running_mfe = np.maximum.accumulate(profit)
+        record_mfe = np.empty(len(record_index), dtype=np.float64)
+        record_mfe[0] = np.nan
+        record_mfe[1:] = running_mfe[record_index[1:] - 1]
+
+        return cls(position.ticket, position.symbol, position.open_time, position.type_as_int,
+                   position.open_price, count, float(running_mfe[-1]),
+                   adverse[record_index].copy(), record_mfe)
+
+    def max_tp_for_sl_level(self, stop_loss: float, spread: float = 0) -> Optional[float]:
+        """
+        Maksymalny TP dla poziomu SL (cena) - bez świeczek
+
+        Returns:
+            TP w punktach, 0.0 gdy SL uderzony na świeczce otwarcia, None gdy brak świeczek
+        """
+        if self.candle_count == 0:
+            return None
+
+        if self.position_type == 0:
+            threshold = stop_loss + spread
+            # Rekordy low maleją - pierwszy rekord <= progu
+            k = int(np.searchsorted(-self.record_prices, -threshold, side='left'))
+        else:
+            threshold = stop_loss - spread
+            # Rekordy high rosną - pierwszy rekord >= progu
+            k = int(np.searchsorted(self.record_prices, threshold, side='left'))
+
+        if k == 0:
+            return 0.0
+        if k >= len(self.record_prices):
+            return max(0.0, self.max_profit)
+        return max(0.0, float(self.record_mfe[k]))
+
+    def max_tp_for_fixed_sl(self, sl_points: float, spread: float = 0) -> Optional[float]:
+        """Maksymalny TP dla stałego SL w punktach (poziom SL jak w PositionAnalyzer)"""
+        if self.position_type == 0:
+            stop_loss = self.open_price - sl_points
+        else:
+            stop_loss = self.open_price + sl_points
+        return self.max_tp_for_sl_level(stop_loss, spread)
+
+
+class ExcursionProfileBuilder:
+    """Buduje profile wychyleń przyrostowo (watermark open_time) i odpowiada na zapytania"""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 candle_analyzer: Optional[CandleAnalyzer] = None,
+                 position_analyzer: Optional[PositionAnalyzer] = None):
+        self.db_path = db_path or DB_PATH
+        self.candle_analyzer = candle_analyzer or CandleAnalyzer(db_path=self.db_path)
+        self.position_analyzer = position_analyzer or PositionAnalyzer(db_path=self.db_path)
+        self.queries = ExcursionProfileQueries()
+        self._connection = None
+        self._ensure_table_exists()
+
+    def _get_connection(self):
+        """Zwraca połączenie dla aktualnego wątku"""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+        return self._connection
+
+    def _ensure_table_exists(self):
+        """Tworzy tabelę profili jeśli nie istnieje"""
+        try:
+            conn = self._get_connection()
+            conn.execute(self.queries.create_profiles_table())
+            conn.execute(self.queries.create_open_time_index())
+            conn.commit()
+        except Exception as e:
+            print(f"ExcursionProfileBuilder: Błąd podczas tworzenia tabeli profili: {e}")
+
+    def close_connection(self):
+        """Zamyka połączenie"""
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def get_watermark(self) -> Optional[int]:
+        """Zwraca open_time ostatniej pozycji z zapisanym profilem"""
+        row = self._get_connection().execute(self.queries.get_watermark()).fetchone()
+        return row[0] if row else None
+
+    def build_incremental(self) -> int:
+        """
+        Buduje profile pozycji otwartych od watermarku
+
+        Pozycje z dni, które jeszcze trwają, są pomijane (EA dopisuje świeczki) -
+        zostaną zbudowane przy następnym wywołaniu. Pozycje bez świeczek
+        (opóźniona synchronizacja EA, brakująca tabela) dostają pusty profil,
+        który jest budowany ponownie przy każdym wywołaniu - watermark nie
+        odcina ich na stałe.
+
+        Returns:
+            Liczba zapisanych profili
+        """
+        watermark = self.get_watermark()
+        ready = self._positions_without_candles()
+        # >= watermark: pozycje z tym samym open_time co ostatnia zapisana (zapis jest idempotentny)
+        positions = self.position_analyzer.get_positions_after(watermark - 1 if watermark is not None else -1)
+        retried = {position.ticket for position in ready}
+
+        now = get_current_unix()
+        for position in positions:
+            if get_day_end_unix(position.open_time) >= now:
+                break  # Posortowane po open_time - dalej tylko trwający dzień
+            if position.type_as_int not in (0, 1):
+                print(f"ExcursionProfileBuilder: Pomijam pozycję {position.ticket} - nieznany typ {position.type!r}")
+                continue
+            if position.ticket not in retried:
+                ready.append(position)
+
+        saved = 0
+        without_candles = 0
+        for chunk_start in range(0, len(ready), BUILD_CHUNK_SIZE):
+            chunk = ready[chunk_start:chunk_start + BUILD_CHUNK_SIZE]
+            self.candle_analyzer.preload_candles(chunk)
+            profiles = [
+                ExcursionProfile.from_candles(
+                    position, self.candle_analyzer.get_candles_for_position(position.symbol, position.open_time)
+                )
+                for position in chunk
+            ]
+            self._save_profiles(profiles)
+            saved += len(profiles)
+            without_candles += sum(1 for profile in profiles if profile.candle_count == 0)
+
+        print(f"ExcursionProfileBuilder: Zapisano {saved} profili (watermark przed: {watermark}, "
+              f"ponowione bez świeczek: {len(retried)}, nadal bez świeczek: {without_candles})")
+        return saved
+
+    def _positions_without_candles(self) -> List[Position]:
+        """Pozycje z zapisanym pustym profilem (candle_count = 0) - ponawiane przy każdej budowie"""
+        rows = self._get_connection().execute(self.queries.get_tickets_without_candles()).fetchall()
+        if not rows:
+            return []
+        positions = self.position_analyzer.get_positions_by_tickets([str(row[0]) for row in rows])
+        return [position for position in positions if position.type_as_int in (0, 1)]
+
+    def _save_profiles(self, profiles: List[ExcursionProfile]):
+        """Zapisuje porcję profili w jednej transakcji"""
+        rows = [
+            (p.ticket, p.symbol, p.open_time, p.position_type, p.open_price, p.candle_count, p.max_profit,
+             compress_array(p.record_prices) if p.candle_count else None,
+             compress_array(p.record_mfe) if p.candle_count else None)
+            for p in profiles
+        ]
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(self.queries.upsert_profile(), rows)
+
+    def get_profiles(self, tickets: List[int]) -> Dict[int, ExcursionProfile]:
+        """Zwraca zapisane profile dla ticketów (ticket -> profil)"""
+        profiles = {}
+        conn = self._get_connection()
+        tickets = list(tickets)
+        # Limit parametrów SQLite - porcje po 500
+        for start in range(0, len(tickets), 500):
+            batch = tickets[start:start + 500]
+            rows = conn.execute(self.queries.get_profiles_by_tickets(len(batch)), batch).fetchall()
+            for row in rows:
+                has_data = row[5] > 0
+                empty = np.empty(0, dtype=np.float64)
+                profiles[row[0]] = ExcursionProfile(
+                    ticket=row[0], symbol=row[1], open_time=row[2], position_type=row[3],
+                    open_price=row[4], candle_count=row[5], max_profit=row[6],
+                    record_prices=decompress_array(row[7]) if has_data else empty,
+                    record_mfe=decompress_array(row[8]) if has_data else empty
+                )
+        return profiles
+
+    def max_tp_for_fixed_sl(self, ticket: int, sl_points: float, spread: float = 0) -> Optional[float]:
+        """
+        Maksymalny TP dla ticketu przy stałym SL i spreadzie - tylko z profilu
+
+        Returns:
+            TP w punktach lub None gdy brak profilu / świeczek
+        """
+        profile = self.get_profiles([ticket]).get(ticket)
+        if profile is None:
+            return None
+        return profile.max_tp_for_fixed_sl(sl_points, spread)
+
+    def max_tp_for_fixed_sl_many(self, tickets: List[int], sl_points: float,
+                                 spread: float = 0) -> Dict[int, Optional[float]]:
+        """Maksymalny TP dla wielu ticketów (jedno zapytanie na porcję ticketów)"""
+        profiles = self.get_profiles(tickets)
+        return {
+            ticket: profiles[ticket].max_tp_for_fixed_sl(sl_points, spread) if ticket in profiles else None
+            for ticket in tickets
+        }
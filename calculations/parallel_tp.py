@@ -0,0 +1,145 @@
+"""
+Równoległe obliczenia TP w procesach roboczych
+
+Pozycje są niezależne, więc dzielimy je na porcje po (instrument, dzień) -
+każda porcja trafia do jednego procesu, który ma własne połączenie tylko do
+odczytu i własny cache świeczek (dzień wczytany raz obsługuje wszystkie
+pozycje z tego dnia). Wyniki wracają w kolejności pozycji wejściowych,
+dokładnie jak w ścieżce szeregowej.
+
+Strumień wyników (TPCalculator.iter_tp_for_*) liczy wszystkie porcje w jednej
+puli (WorkerPool) - procesy, połączenia i cache dni zostają między porcjami.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from database.models import Position, TPCalculationResult
+from database.table_registry import normalize_symbol
+from utils.date_utils import get_day_start_unix
+
+# Docelowa liczba porcji na proces (mniejsze porcje = lepsze równoważenie obciążenia)
+CHUNKS_PER_WORKER = 4
+
+# Kalkulator procesu roboczego (tworzony raz w initializerze)
+_worker_calculator = None
+
+
+def partition_positions(positions: List[Position], chunk_count: int) -> List[List[int]]:
+    """
+    Dzieli pozycje na porcje zachowując grupy (instrument, dzień)
+
+    Grupy są posortowane po instrumencie i dniu, a kolejne grupy łączone
+    w porcje o zbliżonej liczbie pozycji. Grupa nigdy nie jest dzielona.
+
+    Returns:
+        Lista porcji - każda to lista indeksów pozycji
+    """
+    groups: Dict[Tuple[str, int], List[int]] = {}
+    for index, position in enumerate(positions):
+        key = (normalize_symbol(position.symbol or ""), get_day_start_unix(position.open_time))
+        groups.setdefault(key, []).append(index)
+
+    target = max(1, -(-len(positions) // max(1, chunk_count)))  # zaokrąglenie w górę
+    chunks, current = [], []
+    for key in sorted(groups):
+        current.extend(groups[key])
+        if len(current) >= target:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _init_worker(db_path: str, engine: str):
+    """Initializer procesu roboczego - kalkulator z połączeniami tylko do odczytu"""
+    global _worker_calculator
+    from calculations.tp_calculator import TPCalculator
+    _worker_calculator = TPCalculator(db_path=db_path, read_only=True)
+    _worker_calculator.candle_analyzer.set_engine(engine)
+
+
+def _calculate_chunk(args) -> Tuple[List[Tuple[Optional[TPCalculationResult], bool]], Dict[str, int]]:
+    """Oblicza porcję pozycji w procesie roboczym (wyniki i liczniki przebiegu porcji)"""
+    positions, sl_types, sl_staly_values, be_prog, be_offset, spread, calculation_date = args
+    stats = _worker_calculator._begin_run_stats()
+    try:
+        outcomes = _worker_calculator._calculate_outcomes(
+            positions, sl_types, sl_staly_values, be_prog, be_offset, spread, False, calculation_date
+        )
+    finally:
+        _worker_calculator._set_run_stats(None)
+    return outcomes, stats.counters
+
+
+class WorkerPool:
+    """Pula procesów roboczych tworzona przy pierwszym użyciu i współdzielona przez kolejne wywołania"""
+
+    def __init__(self, db_path: str, engine: str, workers: int):
+        self.db_path = db_path
+        self.engine = engine
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def matches(self, db_path: str, engine: str, workers: int) -> bool:
+        """Czy pula liczy dla tej bazy, silnika i liczby procesów"""
+        return (self.db_path, self.engine, self.workers) == (db_path, engine, workers)
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.db_path, self.engine))
+        return self._executor
+
+    def close(self):
+        """Zamyka procesy (bez oczekiwania na anulowane zadania)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def calculate_outcomes_parallel(db_path: str,
+                                engine: str,
+                                positions: List[Position],
+                                workers: int,
+                                sl_types: Dict[str, bool],
+                                sl_staly_values: Optional[Dict[str, float]],
+                                be_prog: Optional[float],
+                                be_offset: Optional[float],
+                                spread: float,
+                                calculation_date: str,
+                                run_stats=None,
+                                pool: Optional[WorkerPool] = None) -> List[Tuple[Optional[TPCalculationResult], bool]]:
+    """
+    Oblicza TP dla pozycji w puli procesów
+
+    Liczniki procesów roboczych (zapytania, wiersze, świeczki) są dodawane
+    do run_stats, jeśli podano. Bez pool pula jest tworzona na to wywołanie
+    i zamykana na końcu.
+
+    Returns:
+        Lista (wynik lub None, brak danych świeczkowych) w kolejności pozycji -
+        taka sama jak TPCalculator._calculate_outcomes
+    """
+    chunks = partition_positions(positions, workers * CHUNKS_PER_WORKER)
+    print(f"TPCalculator: Obliczenia równoległe - {len(positions)} pozycji, "
+          f"{len(chunks)} porcji, {workers} procesów")
+
+    tasks = [
+        ([positions[index] for index in chunk], sl_types, sl_staly_values, be_prog, be_offset, spread,
+         calculation_date)
+        for chunk in chunks
+    ]
+
+    outcomes: List[Optional[Tuple[Optional[TPCalculationResult], bool]]] = [None] * len(positions)
+    own_pool = pool is None
+    pool = pool or WorkerPool(db_path, engine, workers)
+    try:
+        for chunk, (chunk_outcomes, counters) in zip(chunks, pool.get_executor().map(_calculate_chunk, tasks)):
+            if run_stats is not None:
+                run_stats.merge_counters(counters)
+            for index, outcome in zip(chunk, chunk_outcomes):
+                outcomes[index] = outcome
+    finally:
+        if own_pool:
+            pool.close()
+    return outcomes
@@ -8,19 +8,24 @@ from config.sl_config import get_default_sl_for_instrument
 from database.models import Position
 from typing import List, Optional, Dict
 from utils.date_utils import date_range_to_unix
+from utils.trace import DEBUG, get_tracer
+
+_tracer = get_tracer("PositionAnalyzer")
 
 
 class PositionAnalyzer:
     """Klasa do analizy pozycji tradingowych"""
     
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None):
         self.position_queries = PositionQueries()
+        self.db_path = db_path or DB_PATH
         self._connection = None
+        self.run_stats = None  # RunStats bieżącego przebiegu (liczniki zapytań i wierszy)
     
     def _get_connection(self):
         """Zwraca połączenie dla aktualnego wątku"""
         if self._connection is None:
-            self._connection = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
         return self._connection
     
     def _execute_query(self, query, params=None):
@@ -32,7 +37,11 @@ class PositionAnalyzer:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            if self.run_stats is not None:
+                self.run_stats.add("queries")
+                self.run_stats.add("rows_read", len(rows))
+            return rows
         finally:
             cursor.close()
     
@@ -60,8 +69,8 @@ class PositionAnalyzer:
         print(f"PositionAnalyzer: Unix timestamps: {start_unix} - {end_unix}")
         
         try:
-            # Używamy konkretnych kolumn potrzebnych do kalkulacji TP
-            columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup"
+            # Używamy konkretnych kolumn potrzebnych do kalkulacji TP (trendy - grupowanie wyników)
+            columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup, trends, trendl"
             query = f"""
             SELECT {columns}
             FROM positions 
@@ -73,29 +82,34 @@ class PositionAnalyzer:
             
             # Debug - sprawdź pierwszą pozycję
             if rows:
-                print(f"PositionAnalyzer: Przykładowy wiersz: {rows[0]}")
+                _tracer.debug("Przykładowy wiersz: %s", rows[0])
             
+            verbose = _tracer.enabled(DEBUG)
             positions = []
             instruments_found = set()  # Zbieraj nazwy instrumentów z bazy
+            normalized_instruments = {instr.strip().replace('\x00', '').lower() for instr in (instruments or [])}
             
             for row in rows:
                 position = self._row_to_position(row)
                 
                 # Normalizuj nazwę instrumentu (usuń spacje, null bytes i ujednolic wielkość liter)
                 normalized_symbol = position.symbol.strip().replace('\x00', '').lower() if position.symbol else ""
-                normalized_instruments = [instr.strip().replace('\x00', '').lower() for instr in (instruments or [])]
                 
-                instruments_found.add(repr(position.symbol))  # repr pokaże spacje
+                instruments_found.add(position.symbol)
                 
                 # Filtruj po instrumentach jeśli podano
                 if instruments is None or normalized_symbol in normalized_instruments:
                     positions.append(position)
-                    print(f"PositionAnalyzer: Dodano pozycję {position.ticket} (oryginalny: {repr(position.symbol)}, znormalizowany: {repr(normalized_symbol)})")
-                else:
-                    print(f"PositionAnalyzer: Pominięto pozycję {position.ticket} (oryginalny: {repr(position.symbol)}, znormalizowany: {repr(normalized_symbol)}) - nie w instrumentach")
+                    if verbose:
+                        _tracer.debug("Dodano pozycję %s (oryginalny: %r, znormalizowany: %r)",
+                                      position.ticket, position.symbol, normalized_symbol)
+                elif verbose:
+                    _tracer.debug("Pominięto pozycję %s (oryginalny: %r, znormalizowany: %r) - nie w instrumentach",
+                                  position.ticket, position.symbol, normalized_symbol)
             
-            print(f"PositionAnalyzer: Instrumenty znalezione w bazie: {sorted(instruments_found)}")
-            print(f"PositionAnalyzer: Instrumenty poszukiwane: {instruments}")
+            # repr pokaże spacje i null bytes
+            _tracer.debug("Instrumenty znalezione w bazie: %s", sorted(repr(symbol) for symbol in instruments_found))
+            _tracer.debug("Instrumenty poszukiwane: %s", instruments)
             print(f"PositionAnalyzer: Końcowo zwrócono {len(positions)} pozycji")
             return positions
             
@@ -103,15 +117,65 @@ class PositionAnalyzer:
             print(f"Błąd podczas pobierania pozycji: {e}")
             return []
     
+    def get_positions_filtered(self, start_date: str, end_date: str,
+                               instruments: Optional[List[str]] = None,
+                               setups: Optional[List[str]] = None,
+                               trends: Optional[List] = None,
+                               trendl: Optional[List] = None,
+                               suspicious: str = PositionQueries.SUSPICIOUS_ALL) -> List[Position]:
+        """
+        Pobiera pozycje z filtrami okna głównego (instrumenty, setup, TrendS/TrendL, wątpliwe)
+        
+        Args:
+            start_date: Data początkowa w formacie 'YYYY-MM-DD'
+            end_date: Data końcowa w formacie 'YYYY-MM-DD'
+            instruments: Instrumenty (None = wszystkie)
+            setups: Setupy (None = bez filtra)
+            trends, trendl: Wartości trendów, "NULL" = brak trendu (None = bez filtra)
+            suspicious: Tryb filtra wątpliwych trejdów (PositionQueries.SUSPICIOUS_*)
+        
+        Returns:
+            Lista obiektów Position posortowana po open_time
+        """
+        start_unix, end_unix = date_range_to_unix(start_date, end_date)
+        columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup, trends, trendl, magic_number"
+        try:
+            query, params = self.position_queries.build_filtered_positions_query(
+                columns, start_unix, end_unix, instruments, setups, trends, trendl, suspicious
+            )
+            rows = self._execute_query(query, params)
+            print(f"PositionAnalyzer: Znaleziono {len(rows)} pozycji dla filtrów")
+            return [self._row_to_position(row) for row in rows]
+        except Exception as e:
+            print(f"Błąd podczas pobierania pozycji z filtrami: {e}")
+            return []
+    
+    def get_positions_after(self, open_time: int) -> List[Position]:
+        """
+        Pobiera pozycje otwarte po podanym czasie (przyrostowe przetwarzanie z watermarkiem)
+        
+        Args:
+            open_time: Unix timestamp - zwracane są pozycje z open_time > tej wartości
+        
+        Returns:
+            Lista obiektów Position posortowana po open_time
+        """
+        try:
+            columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup"
+            rows = self._execute_query(self.position_queries.get_positions_after_time(columns), (open_time,))
+            return [self._row_to_position(row) for row in rows]
+        except Exception as e:
+            print(f"Błąd podczas pobierania pozycji po {open_time}: {e}")
+            return []
+    
     def _row_to_position(self, row) -> Position:
         """Konwertuje wiersz z bazy danych na obiekt Position"""
         # Kolumny: open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup
+        # (opcjonalnie dalej: trends, trendl, magic_number)
         
         if len(row) < 6:
             raise ValueError(f"Niewystarczająca liczba kolumn w wierszu: {len(row)}")
         
-        print(f"PositionAnalyzer: Konwertuję wiersz: ticket={row[1]}, type={row[2]}, symbol={repr(row[4])}")
-        
         return Position(
             open_time=row[0],      # open_time
             ticket=row[1],         # ticket
@@ -130,8 +194,9 @@ class PositionAnalyzer:
             profit=None,
             tp=None,
             uwagi=None,
-            trends=None,
-            trendl=None,
+            trends=row[9] if len(row) > 9 else None,
+            trendl=row[10] if len(row) > 10 else None,
+            magic_number=row[11] if len(row) > 11 else None,
             interwal=None,
             setup_param1=None,
             setup_param2=None,
@@ -182,9 +247,10 @@ class PositionAnalyzer:
                     else:  # sell
                         result['sl_staly'] = position.open_price + sl_value
                         
-                print(f"PositionAnalyzer: Symbol {position.symbol} -> Instrument {main_instrument} -> SL {sl_value} -> Final SL {result['sl_staly']}")
+                _tracer.debug("Symbol %s -> Instrument %s -> SL %s -> Final SL %s",
+                              position.symbol, main_instrument, sl_value, result['sl_staly'])
             else:
-                print(f"PositionAnalyzer: Symbol {position.symbol} -> Nie znaleziono mapowania lub brak wartości SL")
+                _tracer.debug("Symbol %s -> Nie znaleziono mapowania lub brak wartości SL", position.symbol)
         
         return result
     
@@ -263,8 +329,8 @@ class PositionAnalyzer:
         print(f"PositionAnalyzer: Pobieram pozycje dla {len(tickets)} ticketów")
         
         try:
-            # Używamy konkretnych kolumn potrzebnych do kalkulacji TP
-            columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup"
+            # Używamy konkretnych kolumn potrzebnych do kalkulacji TP (trendy - grupowanie wyników)
+            columns = "open_time, ticket, type, volume, symbol, open_price, sl, sl_recznie, setup, trends, trendl"
             
             # Budujemy zapytanie z placeholderami dla ticketów
             placeholders = ','.join(['?' for _ in tickets])
@@ -283,8 +349,9 @@ class PositionAnalyzer:
             
             # Debug - sprawdź pierwsze pozycje
             if rows:
-                print(f"PositionAnalyzer: Przykładowy wiersz: {rows[0]}")
+                _tracer.debug("Przykładowy wiersz: %s", rows[0])
             
+            verbose = _tracer.enabled(DEBUG)
             positions = []
             found_tickets = set()
             
@@ -292,7 +359,8 @@ class PositionAnalyzer:
                 position = self._row_to_position(row)
                 positions.append(position)
                 found_tickets.add(str(position.ticket))
-                print(f"PositionAnalyzer: Dodano pozycję {position.ticket} (symbol: {repr(position.symbol)})")
+                if verbose:
+                    _tracer.debug("Dodano pozycję %s (symbol: %r)", position.ticket, position.symbol)
             
             # Sprawdź czy wszystkie tickety zostały znalezione
             missing_tickets = set(str(t) for t in tickets) - found_tickets
@@ -0,0 +1,125 @@
+"""
+Potok producent/konsument: wątki czytające świeczki z wyprzedzeniem
+
+Wątki czytające (każdy z własnym CandleAnalyzer i połączeniem) ładują
+świeczki kolejnych pozycji, podczas gdy wątek główny symuluje bieżącą.
+Ograniczona głębokość wyprzedzenia (semafor) daje back-pressure - czytelnicy
+nie wyprzedzają konsumenta o więcej niż depth pozycji. Błąd czytelnika
+zatrzymuje potok i jest zgłaszany w wątku konsumenta.
+"""
+import threading
+from typing import Iterator, List, Optional, Tuple
+from database.models import CandleSeries, Position
+from calculations.candle_analyzer import CandleAnalyzer
+from calculations.candle_cache import CandleCache
+from database.columnar_store import ColumnarCandleStore
+
+# Co ile sekund czekające wątki sprawdzają sygnał zatrzymania
+_POLL_INTERVAL = 0.1
+
+
+class CandlePrefetcher:
+    """
+    Ładuje świeczki pozycji z wyprzedzeniem w wątkach czytających
+
+    Użycie:
+        with CandlePrefetcher(positions, db_path) as prefetcher:
+            for position, candles in prefetcher:
+                ...
+    """
+
+    def __init__(self, positions: List[Position], db_path: str, depth: int = 8, readers: int = 2,
+                 candle_cache: Optional[CandleCache] = None,
+                 candle_store: Optional[ColumnarCandleStore] = None,
+                 run_stats=None):
+        self.positions = positions
+        self.db_path = db_path
+        self.depth = max(1, depth)
+        self.readers = max(1, readers)
+        self.candle_cache = candle_cache
+        self.candle_store = candle_store
+        self.run_stats = run_stats  # Liczniki zapytań i wierszy czytelników (RunStats)
+
+        self._slots = {}
+        self._in_flight = set()
+        self._next_index = 0
+        self._capacity = threading.Semaphore(self.depth)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self) -> 'CandlePrefetcher':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self):
+        """Uruchamia wątki czytające"""
+        for reader_index in range(min(self.readers, len(self.positions))):
+            thread = threading.Thread(target=self._reader_loop, name=f"CandlePrefetcher-{reader_index}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _reader_loop(self):
+        """Pętla wątku czytającego - pobiera kolejne pozycje aż do końca lub zatrzymania"""
+        analyzer = CandleAnalyzer(db_path=self.db_path, candle_cache=self.candle_cache,
+                                  candle_store=self.candle_store, read_only=True)
+        analyzer.run_stats = self.run_stats
+        index = None
+        try:
+            while not self._stop_event.is_set():
+                # Back-pressure - czekaj na wolne miejsce w oknie wyprzedzenia
+                if not self._capacity.acquire(timeout=_POLL_INTERVAL):
+                    continue
+
+                with self._condition:
+                    index = self._next_index
+                    self._next_index += 1
+                    if index < len(self.positions):
+                        self._in_flight.add(index)
+                if index >= len(self.positions):
+                    self._capacity.release()
+                    break
+
+                position = self.positions[index]
+                candles = analyzer.get_candles_for_position(position.symbol, position.open_time)
+                with self._condition:
+                    self._slots[index] = candles
+                    self._in_flight.discard(index)
+                    self._condition.notify_all()
+        except BaseException as e:
+            with self._condition:
+                self._in_flight.discard(index)
+                if self._error is None:
+                    self._error = e
+                self._stop_event.set()
+                self._condition.notify_all()
+        finally:
+            analyzer.close_connection()
+
+    def __iter__(self) -> Iterator[Tuple[Position, CandleSeries]]:
+        """Zwraca (pozycja, świeczki) w kolejności pozycji"""
+        for index, position in enumerate(self.positions):
+            with self._condition:
+                # Po błędzie czekaj jeszcze na pozycje wczytywane przez inne wątki
+                while index not in self._slots and (self._error is None or index in self._in_flight):
+                    self._condition.wait(_POLL_INTERVAL)
+                if index not in self._slots:
+                    raise self._error  # Pozycje wczytane przed błędem zostały już oddane
+                candles = self._slots.pop(index)
+            self._capacity.release()
+            yield position, candles
+
+    def close(self):
+        """Zatrzymuje wątki czytające i czeka na ich zakończenie"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._condition:
+            self._slots.clear()
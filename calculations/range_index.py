@@ -0,0 +1,232 @@
+"""
+Indeks zakresowy (sparse table) nad high/low świeczek
+
+Odpowiada w O(1) na "najwyższe high / najniższe low w [i, j)" i w O(log n)
+na "pierwsza świeczka od i, na której cena przekroczyła poziom X". Na nim
+zbudowane są symulacje TP (basic i BE) - każdy poziom SL kosztuje kilka
+zapytań do indeksu zamiast przejścia po całym dniu.
+
+Wyniki są identyczne z pętlą i z vectorized_tp: warunki przekroczenia są
+sprawdzane na agregatach bloków tymi samymi operacjami co w pętli
+(np. (high - open_price) >= be_prog), a są one monotoniczne względem ceny.
+"""
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+
+class SparseTable:
+    """Sparse table dla max lub min nad tablicą (budowa O(n log n), zapytanie O(1))"""
+
+    def __init__(self, values: np.ndarray, use_max: bool):
+        self.use_max = use_max
+        self._op = np.maximum if use_max else np.minimum
+        self.levels: List[np.ndarray] = [np.asarray(values, dtype=np.float64)]
+        count = len(values)
+        width = 1
+        while width * 2 <= count:
+            previous = self.levels[-1]
+            self.levels.append(self._op(previous[:-width], previous[width:]))
+            width *= 2
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels)
+
+    def query(self, start: int, stop: int) -> float:
+        """Zwraca max/min wartości z przedziału [start, stop) (wymaga start < stop)"""
+        level = (stop - start).bit_length() - 1
+        table = self.levels[level]
+        a = table[start]
+        b = table[stop - (1 << level)]
+        return float(a if (a >= b) == self.use_max else b)
+
+    def first_index(self, hit: Callable[[float], bool], start: int = 0) -> int:
+        """
+        Zwraca pierwszy indeks >= start, dla którego hit(wartość) jest True, lub -1
+
+        hit musi być monotoniczny względem agregatu: jeśli jest True dla jakiegoś
+        elementu bloku, to jest True dla max (use_max) / min bloku.
+        """
+        count = len(self)
+        position = start
+        # Przeskakuj możliwie największe bloki bez przekroczenia
+        for level in range(len(self.levels) - 1, -1, -1):
+            width = 1 << level
+            if position + width <= count and not hit(float(self.levels[level][position])):
+                position += width
+        if position < count and hit(float(self.levels[0][position])):
+            return position
+        return -1
+
+
+class CandleRangeIndex:
+    """Indeks zakresowy dla serii świeczek (np. całego dnia)"""
+
+    def __init__(self, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self.max_high = SparseTable(high, use_max=True)
+        self.min_low = SparseTable(low, use_max=False)
+        self.close = np.asarray(close, dtype=np.float64)
+
+    @classmethod
+    def from_series(cls, candles) -> 'CandleRangeIndex':
+        """Buduje indeks z CandleSeries (lub obiektu z kolumnami high/low/close)"""
+        return cls(candles.high, candles.low, candles.close)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @property
+    def nbytes(self) -> int:
+        """Rozmiar w bajtach (do budżetu pamięci cache świeczek)"""
+        return self.max_high.nbytes + self.min_low.nbytes + self.close.nbytes
+
+    def first_sl_hit(self, is_buy: bool, stop_loss: float, spread: float, start: int) -> int:
+        """Pierwsza świeczka od start, na której cena uderzyła w SL (-1 gdy brak)"""
+        if is_buy:
+            threshold = stop_loss + spread
+            return self.min_low.first_index(lambda low: low <= threshold, start)
+        threshold = stop_loss - spread
+        return self.max_high.first_index(lambda high: high >= threshold, start)
+
+    def first_profit_at_least(self, is_buy: bool, open_price: float, level: float, start: int) -> int:
+        """
+        Pierwsza świeczka od start z zyskiem >= level (-1 gdy brak)
+
+        Zysk na świeczce start liczony jest z close (jak w pętli),
+        na kolejnych z high (BUY) / low (SELL).
+        """
+        first_profit = (self.close[start] - open_price) if is_buy else (open_price - self.close[start])
+        if first_profit >= level:
+            return start
+        if is_buy:
+            return self.max_high.first_index(lambda high: high - open_price >= level, start + 1)
+        return self.min_low.first_index(lambda low: open_price - low >= level, start + 1)
+
+    def max_profit(self, is_buy: bool, open_price: float, start: int, end: int) -> float:
+        """Maksymalny zysk na świeczkach [start, end) - nigdy mniej niż 0.0"""
+        if end <= start:
+            return 0.0
+        if is_buy:
+            best = float(self.close[start] - open_price)
+            if end > start + 1:
+                best = max(best, self.max_high.query(start + 1, end) - open_price)
+        else:
+            best = float(open_price - self.close[start])
+            if end > start + 1:
+                best = max(best, open_price - self.min_low.query(start + 1, end))
+        return max(0.0, best)
+
+
+def max_tp_basic(index: CandleRangeIndex, position_type: int, open_price: float,
+                 stop_loss: float, spread: float = 0, start: int = 0) -> Optional[float]:
+    """
+    Oblicza maksymalny TP bez BE na indeksie zakresowym
+
+    Args:
+        index: Indeks świeczek (np. całego dnia)
+        position_type: 0 = buy, 1 = sell
+        open_price: Cena otwarcia pozycji
+        stop_loss: Poziom stop loss
+        spread: Spread w punktach
+        start: Indeks świeczki otwarcia pozycji w indeksie
+
+    Returns:
+        Maksymalny TP w punktach, 0.0 gdy SL uderzony na pierwszej świeczce,
+        None gdy brak świeczek
+    """
+    count = len(index)
+    if start >= count:
+        return None
+
+    is_buy = (position_type == 0)
+    hit_index = index.first_sl_hit(is_buy, stop_loss, spread, start)
+    if hit_index == start:
+        return 0.0
+
+    end = hit_index if hit_index > 0 else count
+    return index.max_profit(is_buy, open_price, start, end)
+
+
+def _be_end(index: CandleRangeIndex, is_buy: bool, open_price: float, original_hit: int,
+            trigger_index: int, be_offset: float, spread: float, count: int) -> int:
+    """Koniec symulacji BE (indeks uderzenia SL lub count) przy znanych uderzeniu SL i aktywacji"""
+    # Faza 1: oryginalny SL przed świeczką aktywacji
+    if original_hit > 0 and (trigger_index < 0 or original_hit < trigger_index):
+        return original_hit
+    if trigger_index < 0:
+        return count
+
+    # Faza 2: przesunięty SL od świeczki po aktywacji
+    new_sl_after_be = open_price + be_offset if is_buy else open_price - be_offset
+    hit_index = index.first_sl_hit(is_buy, new_sl_after_be, spread, trigger_index + 1) \
+        if trigger_index + 1 < count else -1
+    return hit_index if hit_index > 0 else count
+
+
+def max_tp_with_be(index: CandleRangeIndex, position_type: int, open_price: float,
+                   initial_sl: float, be_prog: float, be_offset: float,
+                   spread: float = 0, start: int = 0) -> Optional[float]:
+    """
+    Oblicza maksymalny TP z przesuwaniem SL na BE na indeksie zakresowym
+
+    Reguły jak w vectorized_tp.max_tp_with_be: oryginalny SL sprawdzany do
+    świeczki aktywacji, przesunięty SL od następnej świeczki.
+
+    Returns:
+        Maksymalny TP w punktach, 0.0 gdy SL uderzony na pierwszej świeczce,
+        None gdy brak świeczek
+    """
+    count = len(index)
+    if start >= count:
+        return None
+
+    is_buy = (position_type == 0)
+    original_hit = index.first_sl_hit(is_buy, initial_sl, spread, start)
+    if original_hit == start:
+        return 0.0
+
+    trigger_index = index.first_profit_at_least(is_buy, open_price, be_prog, start)
+    end = _be_end(index, is_buy, open_price, original_hit, trigger_index, be_offset, spread, count)
+    return index.max_profit(is_buy, open_price, start, end)
+
+
+def max_tp_grid(index: CandleRangeIndex, position_type: int, open_price: float,
+                sl_levels, be_progs, be_offsets, spread: float = 0,
+                start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Oblicza TP dla siatki parametrów - kilka zapytań do indeksu na komórkę
+
+    Returns:
+        Krotka (basic, be) jak w vectorized_tp.max_tp_grid
+    """
+    sl_levels = list(sl_levels)
+    be_progs = list(be_progs)
+    be_offsets = list(be_offsets)
+    basic = np.full(len(sl_levels), np.nan)
+    be = np.full((len(sl_levels), len(be_progs), len(be_offsets)), np.nan)
+
+    count = len(index)
+    if start >= count:
+        return basic, be
+
+    is_buy = (position_type == 0)
+    triggers = [index.first_profit_at_least(is_buy, open_price, be_prog, start) for be_prog in be_progs]
+
+    for s_index, stop_loss in enumerate(sl_levels):
+        original_hit = index.first_sl_hit(is_buy, stop_loss, spread, start)
+        if original_hit == start:
+            basic[s_index] = 0.0
+            be[s_index] = 0.0
+            continue
+
+        basic[s_index] = index.max_profit(is_buy, open_price, start,
+                                          original_hit if original_hit > 0 else count)
+        for b_index, trigger_index in enumerate(triggers):
+            for o_index, be_offset in enumerate(be_offsets):
+                end = _be_end(index, is_buy, open_price, original_hit, trigger_index, be_offset, spread, count)
+                be[s_index, b_index, o_index] = index.max_profit(is_buy, open_price, start, end)
+
+    return basic, be
@@ -0,0 +1,158 @@
+"""
+Cache wyników TP: klucz (ticket, hash parametrów, wersja danych świeczkowych)
+
+Hash parametrów to sha1 kanonicznego JSON-a z (wybrane typy SL, sl_staly_values
+per instrument, be_prog, be_offset, spread) - kolejność słowników nie ma
+znaczenia. Wersja danych to "liczba świeczek:czas ostatniej" dla dnia pozycji,
+więc dopisanie świeczek przez EA unieważnia wynik. Silnik obliczeń nie jest
+częścią klucza - wszystkie silniki dają identyczne wyniki.
+
+Trafienia są brane z pamięci, a potem z tabeli wyników (jedno zapytanie na
+porcję ticketów). Wynik jest przyjmowany tylko gdy dane pozycji (cena i
+czas otwarcia, typ, setup, sl_recznie, SL z bazy) zgadzają się z aktualnymi.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+from config.database_config import TP_RESULT_CACHE_MAX_ENTRIES
+from database.models import Position, TPCalculationResult
+from database.queries import TPCalculationQueries
+
+# Limit parametrów SQLite - tickety pobierane porcjami
+LOOKUP_BATCH_SIZE = 500
+
+CacheKey = Tuple[int, str, str]
+
+
+def compute_param_hash(sl_types: Dict[str, bool],
+                       sl_staly_values: Optional[Dict[str, float]],
+                       be_prog: Optional[float],
+                       be_offset: Optional[float],
+                       spread: float) -> str:
+    """
+    Zwraca kanoniczny hash parametrów obliczeń
+
+    Uwzględniane są tylko włączone typy SL; liczby są normalizowane do float
+    (10 i 10.0 dają ten sam hash).
+    """
+    def number(value):
+        return None if value is None else float(value)
+
+    canonical = {
+        'sl_types': sorted(name for name, enabled in (sl_types or {}).items() if enabled),
+        'sl_staly_values': sorted((name, number(value)) for name, value in (sl_staly_values or {}).items()),
+        'be_prog': number(be_prog),
+        'be_offset': number(be_offset),
+        'spread': number(spread),
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def result_matches_position(result: TPCalculationResult, position: Position, sl_types: Dict[str, bool]) -> bool:
+    """Sprawdza czy zapisany wynik został policzony dla aktualnych danych pozycji"""
+    if (result.open_price != position.open_price or result.open_time != position.open_time
+            or result.position_type != position.position_type_string or result.setup != position.setup):
+        return False
+    if sl_types.get('sl_recznie', False) and result.sl_recznie_value != position.sl_recznie:
+        return False  # sl_recznie edytowany ręcznie po obliczeniach
+    if sl_types.get('sl_baza', False) and result.sl_baza_value != position.sl:
+        return False  # SL z bazy zmieniony (ponowny import, korekta) po obliczeniach
+    return True
+
+
+class TPResultCache:
+    """Cache wyników TP w pamięci (LRU) z odczytem zapisanych wyników z bazy"""
+
+    def __init__(self, connection_provider, max_entries: int = TP_RESULT_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            connection_provider: Funkcja zwracająca połączenie SQLite (odczyt tabeli wyników)
+            max_entries: Maksymalna liczba wyników w pamięci
+        """
+        self._connection_provider = connection_provider
+        self.max_entries = max_entries
+        self.queries = TPCalculationQueries()
+        self._entries: 'OrderedDict[CacheKey, TPCalculationResult]' = OrderedDict()
+        self.hits_memory = 0
+        self.hits_db = 0
+        self.misses = 0
+        self.run_stats = None  # RunStats bieżącego przebiegu (liczniki zapytań i wierszy)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Czyści cache w pamięci"""
+        self._entries.clear()
+
+    def put(self, result: TPCalculationResult):
+        """Dodaje wynik (z ustawionymi param_hash i candle_version) do pamięci"""
+        if result.param_hash is None or result.candle_version is None:
+            return
+        key = (result.ticket, result.param_hash, result.candle_version)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self,
+               positions: List[Position],
+               versions: List[Optional[str]],
+               param_hash: str,
+               sl_types: Dict[str, bool],
+               calculation_date: str) -> List[Optional[TPCalculationResult]]:
+        """
+        Szuka wyników dla pozycji (wersje danych w kolejności pozycji)
+
+        Returns:
+            Lista wyników lub None (chybienie) - w kolejności pozycji; trafienia
+            są kopiami z bieżącą calculation_date i trendami pozycji
+        """
+        found: List[Optional[TPCalculationResult]] = [None] * len(positions)
+        pending = []
+        for index, (position, version) in enumerate(zip(positions, versions)):
+            if version is None:
+                continue  # Brak świeczek - liczone zawsze (szybko, bez danych)
+            result = self._entries.get((position.ticket, param_hash, version))
+            if result is not None and result_matches_position(result, position, sl_types):
+                self._entries.move_to_end((position.ticket, param_hash, version))
+                found[index] = result
+                self.hits_memory += 1
+            else:
+                pending.append(index)
+
+        if pending:
+            stored = self._load_from_db([positions[index].ticket for index in pending], param_hash)
+            for index in pending:
+                position = positions[index]
+                for result in stored.get(position.ticket, []):
+                    if result.candle_version == versions[index] and result_matches_position(result, position, sl_types):
+                        found[index] = result
+                        self.put(result)
+                        self.hits_db += 1
+                        break
+
+        self.misses += sum(1 for result in found if result is None)
+        return [replace(result, calculation_date=calculation_date, trends=position.trends, trendl=position.trendl)
+                if result is not None else None
+                for result, position in zip(found, positions)]
+
+    def _load_from_db(self, tickets: List[int], param_hash: str) -> Dict[int, List[TPCalculationResult]]:
+        """Pobiera zapisane wyniki dla ticketów (ticket -> wyniki, najnowsze pierwsze)"""
+        stored: Dict[int, List[TPCalculationResult]] = {}
+        try:
+            conn = self._connection_provider()
+            for start in range(0, len(tickets), LOOKUP_BATCH_SIZE):
+                batch = tickets[start:start + LOOKUP_BATCH_SIZE]
+                rows = conn.execute(self.queries.get_cached_tp_results(len(batch)), [param_hash] + batch).fetchall()
+                if self.run_stats is not None:
+                    self.run_stats.add("queries")
+                    self.run_stats.add("rows_read", len(rows))
+                for row in rows:
+                    stored.setdefault(row[0], []).append(TPCalculationResult(*row))
+        except Exception as e:
+            print(f"TPResultCache: Błąd podczas odczytu zapisanych wyników: {e}")
+        return stored
@@ -0,0 +1,94 @@
+"""
+Pomiary przebiegu kalkulacji TP - czasy etapów i liczniki
+
+Etapy są mierzone rozłącznie: wejście w etap zagnieżdżony (np. rozpoznanie
+tabeli w trakcie pobierania świeczek) wstrzymuje zegar etapu zewnętrznego,
+więc suma czasów etapów odpowiada czasowi przebiegu. Czasy liczy tylko
+wątek obliczeń (twórca RunStats) - wątki czytające potoku i procesy robocze
+dokładają wyłącznie liczniki.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Etapy przebiegu (kolejność wyświetlania) i ich opisy
+STAGES = [
+    ("position_fetch", "Pobranie pozycji"),
+    ("cache_lookup", "Cache wyników"),
+    ("table_resolution", "Rozpoznanie tabel"),
+    ("availability", "Dostępność danych"),
+    ("candle_fetch", "Pobranie świeczek"),
+    ("simulation", "Symulacja"),
+    ("save", "Zapis wyników"),
+]
+
+# Liczniki przebiegu i ich opisy
+COUNTERS = [
+    ("positions", "Pozycje"),
+    ("cache_hits", "Trafienia cache"),
+    ("missing_data", "Bez świeczek"),
+    ("queries", "Zapytania"),
+    ("rows_read", "Wiersze odczytane"),
+    ("candles_simulated", "Świeczki w symulacji"),
+]
+
+
+class RunStats:
+    """Czasy etapów i liczniki jednego przebiegu kalkulacji"""
+
+    def __init__(self):
+        self.stage_seconds: Dict[str, float] = {name: 0.0 for name, _ in STAGES}
+        self.counters: Dict[str, int] = {name: 0 for name, _ in COUNTERS}
+        self.total_seconds = 0.0
+        self._owner = threading.get_ident()
+        self._lock = threading.Lock()
+        self._stack: List[list] = []  # [nazwa, początek bieżącego odcinka]
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mierzy etap (rozłącznie z etapami zagnieżdżonymi, tylko w wątku obliczeń)"""
+        if threading.get_ident() != self._owner:
+            yield
+            return
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.stage_seconds[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            current = self._stack.pop()
+            self.stage_seconds[current[0]] = self.stage_seconds.get(current[0], 0.0) + now - current[1]
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def add(self, counter: str, value: int = 1):
+        """Zwiększa licznik (bezpieczne dla wątków czytających)"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Dodaje liczniki z procesu roboczego"""
+        for name, value in counters.items():
+            self.add(name, value)
+
+    def finish(self):
+        """Zamyka pomiar całego przebiegu"""
+        self.total_seconds = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'total_seconds': self.total_seconds,
+            'stage_seconds': dict(self.stage_seconds),
+            'counters': dict(self.counters),
+        }
+
+    def format_summary(self) -> str:
+        """Podsumowanie w jednej linii na etapy i jednej na liczniki"""
+        stages = ", ".join(f"{label} {self.stage_seconds.get(name, 0.0):.3f}s" for name, label in STAGES)
+        counters = ", ".join(f"{label} {self.counters.get(name, 0)}" for name, label in COUNTERS)
+        return f"Czas {self.total_seconds:.3f}s: {stages}\n{counters}"
@@ -0,0 +1,300 @@
+"""
+Statystyki wyników kalkulacji TP - kolumny numpy z jednego przejścia po wynikach
+
+Wyniki są raz zamieniane na tablice (ResultColumns), a wszystkie miary
+liczone wektorowo: liczność, średnia, mediana, percentyle, odsetek trafień
+i wartość oczekiwana dla poziomów TP, osobno dla każdego typu SL oraz w
+podziale na setup i symbol. Ten sam silnik obsługuje okna wyników GUI,
+tryb wsadowy (tp_cli.py) i eksport, więc liczby są wszędzie identyczne.
+
+Wartość oczekiwana stałego TP na poziomie T (punkty na pozycję):
+pozycja z max TP >= T zarabia T, pozostałe tracą odległość do SL; przy BE
+pozycja, która doszła do progu BE (max TP >= be_prog), wychodzi na +offset.
+Rozkład max TP jest sortowany, a straty pozycji bez trafienia sumowane
+prefiksowo - dowolna liczba poziomów kosztuje jedno searchsorted
+(ExcursionDistribution, także podstawa optymalizacji TP).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config.database_config import TP_STATS_TARGETS, TP_STATS_PERCENTILES
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.models import TPCalculationResult
+
+# Typy SL: klucz statystyk -> kolumna TP w TPCalculationResult
+SL_TYPES = (
+    ("sl_staly", "max_tp_sl_staly"),
+    ("sl_recznie", "max_tp_sl_recznie"),
+    ("sl_be", "max_tp_sl_be"),
+)
+
+# Podziały wyników: klucz -> opis
+BREAKDOWNS = (
+    ("setup", "Setup"),
+    ("symbol", "Symbol"),
+)
+
+# Etykieta grupy dla pustej wartości (np. pozycja bez setupu)
+NO_VALUE = "(brak)"
+
+# Kolumny numeryczne zbierane z wyników (kolejność w tablicy 2D)
+_NUMERIC_FIELDS = ("max_tp_sl_staly", "max_tp_sl_recznie", "max_tp_sl_be", "open_price",
+                   "sl_staly_value", "sl_recznie_value", "be_prog", "be_offset")
+
+
+def _label(value) -> str:
+    if value is None:
+        return NO_VALUE
+    text = str(value).replace('\x00', '').strip()
+    return text or NO_VALUE
+
+
+@dataclass
+class ResultColumns:
+    """
+    Wyniki TP jako kolumny numpy
+
+    tp[typ] - max TP pozycji (NaN = brak wyniku dla typu SL)
+    miss[typ] - punkty pozycji, która nie trafiła TP (NaN = nieznana odległość SL)
+    groups[podział] - etykiety grup (setup, symbol, instrument główny, trends, trendl)
+    """
+    tickets: np.ndarray
+    tp: Dict[str, np.ndarray]
+    miss: Dict[str, np.ndarray]
+    groups: Dict[str, np.ndarray]
+
+    @classmethod
+    def from_results(cls, results: Iterable[TPCalculationResult]) -> 'ResultColumns':
+        """Jedno przejście po wynikach - reszta wektorowo"""
+        numeric = []
+        labels = []
+        for result in results:
+            numeric.append(tuple(getattr(result, name) for name in _NUMERIC_FIELDS))
+            labels.append((result.ticket, _label(result.setup), _label(result.symbol),
+                           _label(result.trends), _label(result.trendl)))
+        values = np.array(numeric, dtype=float).reshape(-1, len(_NUMERIC_FIELDS))  # None -> NaN
+        tp_staly, tp_recznie, tp_be, open_price, sl_staly, sl_recznie, be_prog, be_offset = values.T
+
+        risk_staly = np.abs(open_price - sl_staly)
+        risk_recznie = np.abs(open_price - sl_recznie)
+        with np.errstate(invalid='ignore'):
+            be_reached = tp_be >= be_prog
+        tickets, setups, symbols, trends, trendl = (zip(*labels) if labels else ((), (), (), (), ()))
+        # Instrument główny (np. DAX) - mapowanie raz na symbol
+        instruments_config = get_instrument_tickets_config()
+        instruments = {symbol: _label(instruments_config.normalize_instrument_name(symbol)) for symbol in set(symbols)}
+        return cls(
+            tickets=np.array(tickets, dtype=np.int64),
+            tp={"sl_staly": tp_staly, "sl_recznie": tp_recznie, "sl_be": tp_be},
+            miss={
+                "sl_staly": -risk_staly,
+                "sl_recznie": -risk_recznie,
+                "sl_be": np.where(be_reached, be_offset, -risk_staly),
+            },
+            groups={
+                "setup": np.array(setups, dtype=object),
+                "symbol": np.array(symbols, dtype=object),
+                "instrument": np.array([instruments[symbol] for symbol in symbols], dtype=object),
+                "trends": np.array(trends, dtype=object),
+                "trendl": np.array(trendl, dtype=object),
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def take(self, indices: np.ndarray) -> 'ResultColumns':
+        """Podzbiór wierszy (indeksy lub maska)"""
+        return ResultColumns(
+            tickets=self.tickets[indices],
+            tp={name: column[indices] for name, column in self.tp.items()},
+            miss={name: column[indices] for name, column in self.miss.items()},
+            groups={name: column[indices] for name, column in self.groups.items()},
+        )
+
+    def split(self, by: str) -> Dict[str, 'ResultColumns']:
+        """Podział na grupy według etykiet (posortowane) - jedno sortowanie zamiast masek per grupa"""
+        keys = self.groups[by]
+        if len(keys) == 0:
+            return {}
+        names, inverse = np.unique(keys.astype(str), return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(names) + 1))
+        return {str(name): self.take(order[bounds[i]:bounds[i + 1]]) for i, name in enumerate(names)}
+
+
+class ExcursionDistribution:
+    """
+    Posortowany rozkład max TP jednego typu SL z sumami prefiksowymi strat
+
+    Dla dowolnych poziomów TP zwraca liczbę trafień i sumę punktów w
+    O(k log n) po jednym sortowaniu O(n log n). Uwzględnia tylko pozycje
+    ze znanym wynikiem i znaną stratą przy chybieniu.
+    """
+
+    def __init__(self, tp: np.ndarray, miss: np.ndarray):
+        known = ~(np.isnan(tp) | np.isnan(miss))
+        order = np.argsort(tp[known], kind="stable")
+        self.values = tp[known][order]
+        self._miss_prefix = np.concatenate(([0.0], np.cumsum(miss[known][order])))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def hits(self, levels) -> np.ndarray:
+        """Liczba pozycji z max TP >= poziom"""
+        levels = np.asarray(levels, dtype=float)
+        return len(self.values) - np.searchsorted(self.values, levels, side="left")
+
+    def total_points(self, levels) -> np.ndarray:
+        """Suma punktów stałego TP na poziomach: trafienia * poziom + straty chybionych"""
+        levels = np.asarray(levels, dtype=float)
+        misses = np.searchsorted(self.values, levels, side="left")
+        return (len(self.values) - misses) * levels + self._miss_prefix[misses]
+
+    def expectancy(self, levels) -> np.ndarray:
+        """Punkty na pozycję dla poziomów TP (NaN gdy brak pozycji)"""
+        if len(self.values) == 0:
+            return np.full(np.shape(levels), np.nan)
+        return self.total_points(levels) / len(self.values)
+
+
+@dataclass
+class SLTypeStats:
+    """Statystyki max TP jednego typu SL (None gdy brak wyników)"""
+    count: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[float, float] = field(default_factory=dict)
+    hit_rates: Dict[float, float] = field(default_factory=dict)    # Poziom TP -> odsetek trafień (0-1)
+    expectancy: Dict[float, float] = field(default_factory=dict)   # Poziom TP -> punkty na pozycję
+    expectancy_count: int = 0  # Pozycje ze znaną odległością SL (podstawa wartości oczekiwanej)
+
+    @classmethod
+    def compute(cls, tp: np.ndarray, miss: np.ndarray, targets: Sequence[float],
+                percentiles: Sequence[float]) -> 'SLTypeStats':
+        values = np.sort(tp[~np.isnan(tp)])
+        if values.size == 0:
+            return cls(count=0)
+        targets = np.asarray(targets, dtype=float)
+        quantiles = np.percentile(values, [50, *percentiles])
+        hit_counts = values.size - np.searchsorted(values, targets, side="left")
+        distribution = ExcursionDistribution(tp, miss)
+        expectancy = distribution.expectancy(targets) if len(distribution) else []
+        return cls(
+            count=int(values.size),
+            mean=float(values.mean()),
+            median=float(quantiles[0]),
+            min=float(values[0]),
+            max=float(values[-1]),
+            percentiles={float(p): float(q) for p, q in zip(percentiles, quantiles[1:])},
+            hit_rates={float(t): float(h) / values.size for t, h in zip(targets, hit_counts)},
+            expectancy={float(t): float(e) for t, e in zip(targets, expectancy)},
+            expectancy_count=len(distribution),
+        )
+
+
+@dataclass
+class GroupStats:
+    """Statystyki grupy wyników (całość, setup, symbol)"""
+    count: int
+    successful: int
+    by_sl_type: Dict[str, SLTypeStats]
+
+    @classmethod
+    def compute(cls, columns: ResultColumns, targets: Sequence[float],
+                percentiles: Sequence[float]) -> 'GroupStats':
+        has_value = np.zeros(len(columns), dtype=bool)
+        for name, _ in SL_TYPES:
+            has_value |= ~np.isnan(columns.tp[name])
+        return cls(
+            count=len(columns),
+            successful=int(has_value.sum()),
+            by_sl_type={name: SLTypeStats.compute(columns.tp[name], columns.miss[name], targets, percentiles)
+                        for name, _ in SL_TYPES},
+        )
+
+
+@dataclass
+class TPStatistics:
+    """Statystyki przebiegu: całość i podziały (setup, symbol)"""
+    targets: List[float]
+    percentiles: List[float]
+    overall: GroupStats
+    breakdowns: Dict[str, Dict[str, GroupStats]] = field(default_factory=dict)
+
+    @property
+    def total_positions(self) -> int:
+        return self.overall.count
+
+    def to_summary(self) -> Dict[str, any]:
+        """Podsumowanie w formacie TPCalculator.get_calculation_summary"""
+        by_sl_type = self.overall.by_sl_type
+        summary = {
+            'total_positions': self.overall.count,
+            'successful_calculations': self.overall.successful,
+        }
+        for name, _ in SL_TYPES:
+            summary[f'avg_tp_{name}'] = by_sl_type[name].mean if by_sl_type[name].count else 0
+        for name, _ in SL_TYPES:
+            summary[f'max_tp_{name}'] = by_sl_type[name].max if by_sl_type[name].count else 0
+        if self.overall.count:
+            summary['positions_with_data'] = {name: by_sl_type[name].count for name, _ in SL_TYPES}
+        return summary
+
+    def row_fields(self) -> List[str]:
+        """Kolumny to_rows() (CSV/JSON, tabela w GUI)"""
+        fields = ["group", "value", "sl_type", "positions", "count", "mean", "median", "min", "max"]
+        fields += [f"p{p:g}" for p in self.percentiles]
+        fields += [f"hit_rate_{t:g}" for t in self.targets]
+        fields += [f"expectancy_{t:g}" for t in self.targets]
+        return fields
+
+    def to_rows(self) -> List[Dict[str, any]]:
+        """Wiersz na grupę i typ SL z wynikami (całość, potem podziały)"""
+        rows = []
+        groups = [("all", "", self.overall)]
+        for by, _ in BREAKDOWNS:
+            groups += [(by, value, stats) for value, stats in self.breakdowns.get(by, {}).items()]
+        for group, value, stats in groups:
+            for name, _ in SL_TYPES:
+                sl_stats = stats.by_sl_type[name]
+                if not sl_stats.count:
+                    continue
+                row = {
+                    "group": group, "value": value, "sl_type": name, "positions": stats.count,
+                    "count": sl_stats.count, "mean": sl_stats.mean, "median": sl_stats.median,
+                    "min": sl_stats.min, "max": sl_stats.max,
+                }
+                row.update({f"p{p:g}": sl_stats.percentiles.get(p) for p in self.percentiles})
+                row.update({f"hit_rate_{t:g}": sl_stats.hit_rates.get(t) for t in self.targets})
+                row.update({f"expectancy_{t:g}": sl_stats.expectancy.get(t) for t in self.targets})
+                rows.append(row)
+        return rows
+
+
+def compute_statistics(results, targets: Optional[Sequence[float]] = None,
+                       percentiles: Optional[Sequence[float]] = None,
+                       breakdowns: bool = True) -> TPStatistics:
+    """
+    Statystyki wyników TP
+
+    Args:
+        results: Lista TPCalculationResult albo gotowe ResultColumns
+        targets: Poziomy TP dla trafień i wartości oczekiwanej (None = TP_STATS_TARGETS)
+        percentiles: Percentyle obok mediany (None = TP_STATS_PERCENTILES)
+        breakdowns: Podziały na setup i symbol (False = tylko całość)
+    """
+    columns = results if isinstance(results, ResultColumns) else ResultColumns.from_results(results)
+    targets = [float(t) for t in (TP_STATS_TARGETS if targets is None else targets)]
+    percentiles = [float(p) for p in (TP_STATS_PERCENTILES if percentiles is None else percentiles)]
+    statistics = TPStatistics(targets, percentiles, GroupStats.compute(columns, targets, percentiles))
+    if breakdowns:
+        for by, _ in BREAKDOWNS:
+            statistics.breakdowns[by] = {value: GroupStats.compute(group, targets, percentiles)
+                                         for value, group in columns.split(by).items()}
+    return statistics
@@ -1,31 +1,61 @@
 """
 Główny kalkulator Take Profit
 """
-from typing import List, Dict, Optional, Tuple
-from database.models import Position, TPCalculationResult
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+from database.models import Position, CandleSeries, TPCalculationResult
 import sqlite3
-from database.queries import TPCalculationQueries
-from config.database_config import DB_PATH
-from calculations.candle_analyzer import CandleAnalyzer
+from database.queries import PositionQueries, TPCalculationQueries
+from config.database_config import (
+    DB_PATH, TP_CALCULATION_WORKERS, TP_PREFETCH_DEPTH, TP_PREFETCH_READERS, TP_STREAM_CHUNK_SIZE
+)
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_RANGE_INDEX, ENGINE_SQL
 from calculations.position_analyzer import PositionAnalyzer
-from utils.date_utils import unix_to_date_string
+from calculations.tp_sweep import TPSweepResult
+from calculations.prefetch_pipeline import CandlePrefetcher
+from calculations.result_cache import TPResultCache, compute_param_hash
+from calculations.run_stats import RunStats
+from calculations.statistics import compute_statistics
+from calculations.tp_stream import (
+    EVENT_FINISHED, EVENT_MISSING_DATA, EVENT_RESULT, RunningTPSummary, TPStreamEvent, collect_results
+)
+from calculations import vectorized_tp, range_index, parallel_tp
+from utils.date_utils import unix_to_date_string, get_day_start_unix
+from utils.trace import DEBUG, get_tracer, trace_ticket
 from datetime import datetime
+from dataclasses import replace
+from contextlib import nullcontext
+import json
+import numpy as np
+
+_tracer = get_tracer("TPCalculator")
 
 
 class TPCalculator:
     """Główna klasa do obliczania maksymalnego Take Profit"""
     
-    def __init__(self):
-        self.candle_analyzer = CandleAnalyzer()
-        self.position_analyzer = PositionAnalyzer()
+    def __init__(self, db_path: Optional[str] = None, read_only: bool = False):
+        """
+        Args:
+            db_path: Ścieżka do bazy (None = DB_PATH)
+            read_only: Połączenia tylko do odczytu, bez tworzenia tabeli wyników (procesy robocze)
+        """
+        self.db_path = db_path or DB_PATH
+        self.read_only = read_only
+        self.candle_analyzer = CandleAnalyzer(db_path=self.db_path, read_only=read_only)
+        self.position_analyzer = PositionAnalyzer(db_path=self.db_path)
         self.tp_queries = TPCalculationQueries()
         self._connection = None
-        self._ensure_tp_table_exists()
+        self.result_cache = TPResultCache(self._get_connection)
+        self.last_missing_data_tickets: List[int] = []  # Pozycje bez świeczek z ostatniego obliczenia
+        self.run_stats: Optional[RunStats] = None  # Pomiary bieżącego przebiegu
+        self._worker_pool: Optional[parallel_tp.WorkerPool] = None  # Pula procesów bieżącego strumienia
+        if not read_only:
+            self._ensure_tp_table_exists()
     
     def _get_connection(self):
         """Zwraca połączenie dla aktualnego wątku"""
         if self._connection is None:
-            self._connection = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
         return self._connection
     
     def _execute_update(self, query, params=None):
@@ -43,10 +73,30 @@ class TPCalculator:
             cursor.close()
     
     def _ensure_tp_table_exists(self):
-        """Tworzy tabelę wyników TP jeśli nie istnieje"""
+        """Tworzy tabele wyników i przebiegów TP jeśli nie istnieją (z migracją starszych baz)"""
         try:
-            query = self.tp_queries.create_tp_results_table()
-            self._execute_update(query)
+            conn = self._get_connection()
+            with conn:
+                conn.execute(self.tp_queries.create_tp_results_table())
+                conn.execute(self.tp_queries.create_tp_runs_table())
+                
+                # Migracja starszych baz - kolumny klucza cache i przebiegu
+                existing = {row[1] for row in conn.execute(self.tp_queries.get_tp_results_columns())}
+                for column, column_type in (("param_hash", "TEXT"), ("candle_version", "TEXT"), ("run_id", "INTEGER"),
+                                            ("sl_baza_value", "REAL")):
+                    if column not in existing:
+                        conn.execute(self.tp_queries.add_tp_results_column(column, column_type))
+                
+                # Jednorazowo: duplikaty z wcześniejszych zapisów blokowałyby unikalny indeks upsertu,
+                # a z indeksem już nie powstaną - bez skanu tabeli i blokady zapisu przy każdym starcie
+                unique_index = conn.execute(self.tp_queries.check_index_exists(),
+                                            (self.tp_queries.RESULTS_UNIQUE_INDEX,)).fetchone()
+                if unique_index is None:
+                    conn.execute(self.tp_queries.drop_tp_results_cache_index())
+                    removed = conn.execute(self.tp_queries.deduplicate_tp_results()).rowcount
+                    if removed > 0:
+                        print(f"TPCalculator: Usunięto {removed} powtórzonych wyników TP")
+                    conn.execute(self.tp_queries.create_tp_results_unique_index())
         except Exception as e:
             print(f"Błąd podczas tworzenia tabeli TP: {e}")
     
@@ -56,6 +106,22 @@ class TPCalculator:
             self._connection.close()
             self._connection = None
     
+    def _begin_run_stats(self) -> RunStats:
+        """Rozpoczyna pomiary przebiegu (liczniki zbierają też analizatory i cache wyników)"""
+        stats = RunStats()
+        self._set_run_stats(stats)
+        return stats
+    
+    def _set_run_stats(self, stats: Optional[RunStats]):
+        self.run_stats = stats
+        self.candle_analyzer.run_stats = stats
+        self.position_analyzer.run_stats = stats
+        self.result_cache.run_stats = stats
+    
+    def _stage(self, name: str):
+        """Etap pomiaru bieżącego przebiegu (bez pomiaru gdy brak RunStats)"""
+        return self.run_stats.stage(name) if self.run_stats is not None else nullcontext()
+    
     def calculate_tp_for_date_range(self, 
                                   start_date: str, 
                                   end_date: str,
@@ -66,65 +132,118 @@ class TPCalculator:
                                   be_offset: Optional[float] = None,
                                   spread: float = 0,
                                   save_to_db: bool = False,
-                                  detailed_logs: bool = False) -> List[TPCalculationResult]:
-        """Oblicza maksymalny TP dla pozycji z zakresu dat"""
+                                  detailed_logs: bool = False,
+                                  engine: Optional[str] = None,
+                                  workers: Optional[int] = None,
+                                  prefetch_depth: Optional[int] = None,
+                                  use_cache: bool = True) -> List[TPCalculationResult]:
+        """
+        Oblicza maksymalny TP dla pozycji z zakresu dat
+        
+        engine - silnik obliczeń, workers - liczba procesów,
+        prefetch_depth - wyprzedzenie wczytywania świeczek (0 = bez potoku),
+        use_cache - wyniki z cache (pamięć / tabela wyników) zamiast ponownych obliczeń
+        """
+        return collect_results(self.iter_tp_for_date_range(
+            start_date, end_date, instruments, sl_types, sl_staly_values, be_prog, be_offset, spread, save_to_db,
+            detailed_logs, engine, workers, prefetch_depth, use_cache, chunk_size=0
+        ))
+    
+    def iter_tp_for_date_range(self,
+                               start_date: str,
+                               end_date: str,
+                               instruments: List[str],
+                               sl_types: Dict[str, bool],
+                               sl_staly_values: Optional[Dict[str, float]] = None,
+                               be_prog: Optional[float] = None,
+                               be_offset: Optional[float] = None,
+                               spread: float = 0,
+                               save_to_db: bool = False,
+                               detailed_logs: bool = False,
+                               engine: Optional[str] = None,
+                               workers: Optional[int] = None,
+                               prefetch_depth: Optional[int] = None,
+                               use_cache: bool = True,
+                               chunk_size: Optional[int] = None) -> Iterator[TPStreamEvent]:
+        """
+        Strumień wyników TP dla pozycji z zakresu dat (parametry jak calculate_tp_for_date_range)
+        
+        chunk_size - pozycje liczone (i zapisywane) jedną porcją
+        (None = TP_STREAM_CHUNK_SIZE na proces roboczy, 0 = cały przebieg)
+        """
         print(f"TPCalculator: Rozpoczynam obliczenia dla {start_date} - {end_date}")
         print(f"TPCalculator: Instrumenty: {instruments}")
         
         # Pobierz pozycje
         print("TPCalculator: Pobieram pozycje...")
-        positions = self.position_analyzer.get_positions_for_date_range(
-            start_date, end_date, instruments
+        calculation_date = start_date if start_date == end_date else f"{start_date}_{end_date}"
+        return self._iter_calculation(
+            lambda: self.position_analyzer.get_positions_for_date_range(start_date, end_date, instruments),
+            sl_types, sl_staly_values, be_prog, be_offset, spread, save_to_db, detailed_logs,
+            calculation_date, engine, workers, prefetch_depth, use_cache, chunk_size
         )
+    
+    def calculate_tp_for_filters(self,
+                                 start_date: str,
+                                 end_date: str,
+                                 sl_types: Dict[str, bool],
+                                 instruments: Optional[List[str]] = None,
+                                 setups: Optional[List[str]] = None,
+                                 trends: Optional[List] = None,
+                                 trendl: Optional[List] = None,
+                                 suspicious: str = PositionQueries.SUSPICIOUS_ALL,
+                                 sl_staly_values: Optional[Dict[str, float]] = None,
+                                 be_prog: Optional[float] = None,
+                                 be_offset: Optional[float] = None,
+                                 spread: float = 0,
+                                 save_to_db: bool = False,
+                                 detailed_logs: bool = False,
+                                 engine: Optional[str] = None,
+                                 workers: Optional[int] = None,
+                                 prefetch_depth: Optional[int] = None,
+                                 use_cache: bool = True) -> List[TPCalculationResult]:
+        """
+        Oblicza maksymalny TP dla pozycji wybranych filtrami okna głównego
         
-        print(f"TPCalculator: Znaleziono {len(positions)} pozycji")
-        
-        if not positions:
-            print("TPCalculator: Brak pozycji do analizy")
-            return []
-        
-        results = []
-        missing_data_positions = []
-        
-        for i, position in enumerate(positions):
-            print()  # Pusta linijka przed każdą pozycją
-            print(f"\033[94mTPCalculator: Analizuję pozycję {i+1}/{len(positions)}: {position.ticket}\033[0m")  # Niebieski kolor
-            
-            # Sprawdź dostępność danych świeczkowych
-            if not self.candle_analyzer.has_sufficient_data(position.symbol, position.open_time):
-                print(f"TPCalculator: Brak danych świeczkowych dla pozycji {position.ticket}")
-                missing_data_positions.append(position.ticket)
-                continue
-            
-            # Oblicz TP dla tej pozycji
-            try:
-                tp_result = self._calculate_tp_for_position(
-                    position, sl_types, sl_staly_values, be_prog, be_offset, spread, detailed_logs
-                )
-                
-                if tp_result:
-                    tp_result.calculation_date = start_date if start_date == end_date else f"{start_date}_{end_date}"
-                    results.append(tp_result)
-                    print(f"TPCalculator: Pozycja {position.ticket} - wynik dodany")
-                else:
-                    print(f"TPCalculator: Pozycja {position.ticket} - brak wyniku")
-                    
-            except Exception as e:
-                print(f"TPCalculator: Błąd przy obliczaniu pozycji {position.ticket}: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        # Zapisz do bazy danych jeśli wymagane
-        if save_to_db and results:
-            print(f"TPCalculator: Zapisuję {len(results)} wyników do bazy")
-            self._save_results_to_db(results)
-        
-        # Wyświetl komunikat o brakujących danych
-        if missing_data_positions:
-            print(f"TPCalculator: Brak danych świeczkowych dla pozycji: {', '.join(map(str, missing_data_positions))}")
-        
-        print(f"TPCalculator: Obliczenia zakończone. Wyników: {len(results)}")
-        return results
+        Filtry jak w DataViewer.load_data (PositionQueries.build_filtered_positions_query):
+        instrumenty, setupy, TrendS/TrendL ("NULL" = brak trendu), wątpliwe trejdy.
+        Wyniki oznaczone jak przy obliczeniach z okna głównego ("filtered_data").
+        """
+        return collect_results(self.iter_tp_for_filters(
+            start_date, end_date, sl_types, instruments, setups, trends, trendl, suspicious, sl_staly_values,
+            be_prog, be_offset, spread, save_to_db, detailed_logs, engine, workers, prefetch_depth, use_cache,
+            chunk_size=0
+        ))
+    
+    def iter_tp_for_filters(self,
+                            start_date: str,
+                            end_date: str,
+                            sl_types: Dict[str, bool],
+                            instruments: Optional[List[str]] = None,
+                            setups: Optional[List[str]] = None,
+                            trends: Optional[List] = None,
+                            trendl: Optional[List] = None,
+                            suspicious: str = PositionQueries.SUSPICIOUS_ALL,
+                            sl_staly_values: Optional[Dict[str, float]] = None,
+                            be_prog: Optional[float] = None,
+                            be_offset: Optional[float] = None,
+                            spread: float = 0,
+                            save_to_db: bool = False,
+                            detailed_logs: bool = False,
+                            engine: Optional[str] = None,
+                            workers: Optional[int] = None,
+                            prefetch_depth: Optional[int] = None,
+                            use_cache: bool = True,
+                            chunk_size: Optional[int] = None) -> Iterator[TPStreamEvent]:
+        """Strumień wyników TP dla filtrów okna głównego (parametry jak calculate_tp_for_filters)"""
+        print(f"TPCalculator: Rozpoczynam obliczenia dla filtrów {start_date} - {end_date}")
+        return self._iter_calculation(
+            lambda: self.position_analyzer.get_positions_filtered(
+                start_date, end_date, instruments, setups, trends, trendl, suspicious
+            ),
+            sl_types, sl_staly_values, be_prog, be_offset, spread, save_to_db, detailed_logs,
+            "filtered_data", engine, workers, prefetch_depth, use_cache, chunk_size
+        )
     
     def calculate_tp_for_tickets(self,
                                tickets: List[str],
@@ -134,63 +253,410 @@ class TPCalculator:
                                be_offset: Optional[float] = None,
                                spread: float = 0,
                                save_to_db: bool = False,
-                               detailed_logs: bool = False) -> List[TPCalculationResult]:
-        """Oblicza maksymalny TP dla konkretnych ticketów (z głównej tabeli)"""
+                               detailed_logs: bool = False,
+                               engine: Optional[str] = None,
+                               workers: Optional[int] = None,
+                               prefetch_depth: Optional[int] = None,
+                               use_cache: bool = True) -> List[TPCalculationResult]:
+        """
+        Oblicza maksymalny TP dla konkretnych ticketów (z głównej tabeli)
+        
+        engine - silnik obliczeń, workers - liczba procesów,
+        prefetch_depth - wyprzedzenie wczytywania świeczek (0 = bez potoku),
+        use_cache - wyniki z cache (pamięć / tabela wyników) zamiast ponownych obliczeń
+        """
+        return collect_results(self.iter_tp_for_tickets(
+            tickets, sl_types, sl_staly_values, be_prog, be_offset, spread, save_to_db, detailed_logs,
+            engine, workers, prefetch_depth, use_cache, chunk_size=0
+        ))
+    
+    def iter_tp_for_tickets(self,
+                            tickets: List[str],
+                            sl_types: Dict[str, bool],
+                            sl_staly_values: Optional[Dict[str, float]] = None,
+                            be_prog: Optional[float] = None,
+                            be_offset: Optional[float] = None,
+                            spread: float = 0,
+                            save_to_db: bool = False,
+                            detailed_logs: bool = False,
+                            engine: Optional[str] = None,
+                            workers: Optional[int] = None,
+                            prefetch_depth: Optional[int] = None,
+                            use_cache: bool = True,
+                            chunk_size: Optional[int] = None) -> Iterator[TPStreamEvent]:
+        """Strumień wyników TP dla ticketów (parametry jak calculate_tp_for_tickets)"""
         print(f"TPCalculator: Rozpoczynam obliczenia dla {len(tickets)} ticketów")
         print(f"TPCalculator: Tickety: {tickets[:5]}{'...' if len(tickets) > 5 else ''}")
         
         # Pobierz pozycje na podstawie ticketów
         print("TPCalculator: Pobieram pozycje dla ticketów...")
-        positions = self.position_analyzer.get_positions_by_tickets(tickets)
         
-        print(f"TPCalculator: Znaleziono {len(positions)} pozycji")
+        # Oznacz że to z przefiltrowanych danych
+        return self._iter_calculation(
+            lambda: self.position_analyzer.get_positions_by_tickets(tickets),
+            sl_types, sl_staly_values, be_prog, be_offset, spread, save_to_db, detailed_logs,
+            "filtered_data", engine, workers, prefetch_depth, use_cache, chunk_size
+        )
+    
+    def _iter_calculation(self,
+                          fetch_positions: Callable[[], List[Position]],
+                          sl_types: Dict[str, bool],
+                          sl_staly_values: Optional[Dict[str, float]],
+                          be_prog: Optional[float],
+                          be_offset: Optional[float],
+                          spread: float,
+                          save_to_db: bool,
+                          detailed_logs: bool,
+                          calculation_date: str,
+                          engine: Optional[str],
+                          workers: Optional[int],
+                          prefetch_depth: Optional[int],
+                          use_cache: bool,
+                          chunk_size: Optional[int]) -> Iterator[TPStreamEvent]:
+        """
+        Wspólna część metod publicznych - pozycje liczone porcjami, zdarzenia w kolejności pozycji
         
-        if not positions:
-            print("TPCalculator: Brak pozycji do analizy")
-            return []
+        Każda porcja przechodzi przez cache wyników, silnik i zapis jak cały
+        przebieg; z zapisem do bazy wszystkie porcje należą do jednego wiersza
+        przebiegu. Strumień nie trzyma wyników - tylko podsumowanie na bieżąco.
+        Kalkulator obsługuje jeden strumień naraz (wspólne pomiary przebiegu).
         
-        results = []
-        missing_data_positions = []
+        Yields:
+            TPStreamEvent - wynik lub pominięta pozycja, na końcu EVENT_FINISHED z pomiarami
+        """
+        started_at = datetime.now()
+        stats = self._begin_run_stats()
+        summary = RunningTPSummary()
+        missing: List[int] = []
+        done = 0
+        run_id = None
+        saved_chunks = saved_results = 0
+        run_closed = False
+        try:
+            with stats.stage("position_fetch"):
+                positions = fetch_positions()
+            print(f"TPCalculator: Znaleziono {len(positions)} pozycji")
+            self.last_missing_data_tickets = missing
+            stats.add("positions", len(positions))
+            
+            if not positions:
+                print("TPCalculator: Brak pozycji do analizy")
+            
+            # Porcje domyślne zaczynają od pozycji na proces i rosną dwukrotnie - pierwsze
+            # zdarzenia (postęp, anulowanie w GUI) bez czekania na pełną porcję
+            worker_count = max(1, TP_CALCULATION_WORKERS if workers is None else workers)
+            first_chunk = None
+            if chunk_size is None:
+                chunk_size = TP_STREAM_CHUNK_SIZE * worker_count
+                first_chunk = worker_count
+            chunk_size = chunk_size or max(len(positions), 1)
+            
+            # Jedna pula procesów na cały strumień (tworzona dopiero, gdy porcja trafi do procesów)
+            if worker_count > 1 and not detailed_logs:
+                self._worker_pool = parallel_tp.WorkerPool(
+                    self.db_path, engine or self.candle_analyzer.engine, worker_count)
+            run_info = self._build_run_info(
+                sl_types, sl_staly_values, be_prog, be_offset, spread, engine, calculation_date, started_at
+            ) if save_to_db else None
+            
+            for chunk in self._iter_chunks(positions, chunk_size, first_chunk or chunk_size):
+                outcomes = self._calculate_for_positions(
+                    chunk, sl_types, sl_staly_values, be_prog, be_offset, spread, detailed_logs, calculation_date,
+                    engine, workers, prefetch_depth, use_cache
+                )
+                
+                # Zapisz do bazy danych jeśli wymagane (porcja w jednej transakcji)
+                results = [result for result, _ in outcomes if result is not None]
+                if save_to_db and results:
+                    print(f"TPCalculator: Zapisuję {len(results)} wyników do bazy")
+                    with stats.stage("save"):
+                        chunk_run_id = self._save_results_to_db(results, None if run_id else run_info, run_id)
+                    run_id = run_id or chunk_run_id
+                    saved_chunks += 1
+                    saved_results += len(results)
+                
+                for position, (result, no_data) in zip(chunk, outcomes):
+                    done += 1
+                    if result is not None:
+                        summary.add(result)
+                        yield TPStreamEvent(EVENT_RESULT, done, len(positions), len(missing), summary, result=result)
+                    elif no_data:
+                        missing.append(position.ticket)
+                        stats.add("missing_data", 1)
+                        yield TPStreamEvent(EVENT_MISSING_DATA, done, len(positions), len(missing), summary,
+                                            ticket=position.ticket)
+            
+            # Przebieg zapisany w kilku porcjach - końcowa liczba wyników
+            if run_id is not None and saved_chunks > 1:
+                self._finish_tp_run(run_id, saved_results)
+            run_closed = True
+            
+            # Wyświetl komunikat o brakujących danych
+            if missing:
+                print(f"TPCalculator: Brak danych świeczkowych dla pozycji: {', '.join(map(str, missing))}")
+            
+            print(f"TPCalculator: Obliczenia zakończone. Wyników: {summary.total_positions}")
+            self._finish_run_stats(stats)
+            yield TPStreamEvent(EVENT_FINISHED, done, len(positions), len(missing), summary, stats=stats)
+        finally:
+            # Strumień przerwany (konsument przestał czytać lub błąd) - przebieg z dotychczasowymi wynikami
+            if not run_closed and run_id is not None and saved_chunks > 1:
+                self._finish_tp_run(run_id, saved_results)
+            if self._worker_pool is not None:
+                self._worker_pool.close()
+                self._worker_pool = None
+            if self.run_stats is stats:
+                self._finish_run_stats(stats)
+    
+    @staticmethod
+    def _iter_chunks(positions: List[Position], chunk_size: int, first_size: int) -> Iterator[List[Position]]:
+        """Kolejne porcje pozycji - od first_size, podwajane do chunk_size"""
+        start, size = 0, max(1, min(first_size, chunk_size))
+        while start < len(positions):
+            yield positions[start:start + size]
+            start += size
+            size = min(size * 2, chunk_size)
+    
+    def _finish_run_stats(self, stats: RunStats):
+        """Zamyka pomiary przebiegu i odłącza je od kalkulatora"""
+        stats.finish()
+        self._set_run_stats(None)
+        print(f"TPCalculator: {stats.format_summary()}")
+    
+    def _calculate_for_positions(self,
+                                 positions: List[Position],
+                                 sl_types: Dict[str, bool],
+                                 sl_staly_values: Optional[Dict[str, float]],
+                                 be_prog: Optional[float],
+                                 be_offset: Optional[float],
+                                 spread: float,
+                                 detailed_logs: bool,
+                                 calculation_date: str,
+                                 engine: Optional[str] = None,
+                                 workers: Optional[int] = None,
+                                 prefetch_depth: Optional[int] = None,
+                                 use_cache: bool = True) -> List[Tuple[Optional[TPCalculationResult], bool]]:
+        """
+        Oblicza TP dla listy pozycji
         
-        for i, position in enumerate(positions):
-            print()
-            print(f"\033[94mTPCalculator: Analizuję pozycję {i+1}/{len(positions)}: {position.ticket}\033[0m")
+        Świeczki są pobierane raz na pozycję - pusty wynik oznacza brak danych,
+        więc nie ma osobnego sprawdzania dostępności (has_sufficient_data).
+        Przy silniku sql bez BE świeczki w ogóle nie są pobierane - dostępność
+        danych sprawdza zapytanie o świeczkę otwarcia.
+        
+        Args:
+            engine: Silnik obliczeń na ten przebieg (None = aktualny silnik analizatora)
+            workers: Liczba procesów roboczych (None = TP_CALCULATION_WORKERS, 1 = szeregowo)
+            prefetch_depth: Wyprzedzenie potoku świeczek (None = TP_PREFETCH_DEPTH, 0 = wyłączony)
+            use_cache: Pozycje z wynikiem w cache nie są liczone (wyłączone przy szczegółowych logach)
+        
+        Returns:
+            Lista (wynik lub None, brak danych świeczkowych) - jedna krotka na pozycję
+        """
+        use_cache = use_cache and not detailed_logs
+        param_hash = compute_param_hash(sl_types, sl_staly_values, be_prog, be_offset, spread)
+        cached: List[Optional[TPCalculationResult]] = [None] * len(positions)
+        if use_cache:
+            with self._stage("cache_lookup"):
+                versions = self._get_candle_versions(positions)
+                cached = self.result_cache.lookup(positions, versions, param_hash, sl_types, calculation_date)
+        pending = [index for index, result in enumerate(cached) if result is None]
+        if use_cache:
+            if self.run_stats is not None:
+                self.run_stats.add("cache_hits", len(positions) - len(pending))
+            print(f"TPCalculator: Cache wyników - {len(positions) - len(pending)} trafień, "
+                  f"{len(pending)} pozycji do obliczenia")
+        
+        outcomes = [(result, False) for result in cached]
+        if pending:
+            computed = self._compute_outcomes(
+                [positions[index] for index in pending], sl_types, sl_staly_values, be_prog, be_offset, spread,
+                detailed_logs, calculation_date, engine, workers, prefetch_depth
+            )
+            for index, outcome in zip(pending, computed):
+                result = outcome[0]
+                if result is not None:
+                    result.param_hash = param_hash  # Klucz upsertu w tabeli wyników
+                if use_cache and result is not None:
+                    result.candle_version = versions[index]
+                    self.result_cache.put(replace(result))
+                outcomes[index] = outcome
+        
+        return outcomes
+    
+    def _get_candle_versions(self, positions: List[Position]) -> List[Optional[str]]:
+        """Wersje danych świeczkowych dnia dla pozycji (jedno sprawdzenie na instrument/dzień)"""
+        versions = {}
+        result = []
+        for position in positions:
+            key = (position.symbol, get_day_start_unix(position.open_time))
+            if key not in versions:
+                versions[key] = self.candle_analyzer.get_day_candle_version(position.symbol, position.open_time)
+            result.append(versions[key])
+        return result
+    
+    def _compute_outcomes(self,
+                          positions: List[Position],
+                          sl_types: Dict[str, bool],
+                          sl_staly_values: Optional[Dict[str, float]],
+                          be_prog: Optional[float],
+                          be_offset: Optional[float],
+                          spread: float,
+                          detailed_logs: bool,
+                          calculation_date: str,
+                          engine: Optional[str],
+                          workers: Optional[int],
+                          prefetch_depth: Optional[int]) -> List[Tuple[Optional[TPCalculationResult], bool]]:
+        """Oblicza pozycje wybranym silnikiem - szeregowo lub w procesach roboczych"""
+        previous_engine = self.candle_analyzer.engine
+        if engine is not None:
+            self.candle_analyzer.set_engine(engine)
+        workers = TP_CALCULATION_WORKERS if workers is None else workers
+        try:
+            if workers > 1 and len(positions) > 1 and not detailed_logs:
+                # Procesy robocze pobierają i symulują razem - jeden etap, liczniki z procesów
+                pool = self._worker_pool
+                if pool is not None and not pool.matches(self.db_path, self.candle_analyzer.engine, workers):
+                    pool = None
+                with self._stage("simulation"):
+                    outcomes = parallel_tp.calculate_outcomes_parallel(
+                        self.db_path, self.candle_analyzer.engine, positions, workers,
+                        sl_types, sl_staly_values, be_prog, be_offset, spread, calculation_date,
+                        run_stats=self.run_stats, pool=pool
+                    )
+            else:
+                outcomes = self._calculate_outcomes(
+                    positions, sl_types, sl_staly_values, be_prog, be_offset, spread, detailed_logs, calculation_date,
+                    prefetch_depth
+                )
+        finally:
+            self.candle_analyzer.set_engine(previous_engine)
+        return outcomes
+    
+    def _uses_sql_engine(self, detailed_logs: bool) -> bool:
+        """Czy TP bez BE jest liczony w SQLite (szczegółowe logi wymagają pętli)"""
+        return self.candle_analyzer.engine == ENGINE_SQL and not detailed_logs
+    
+    def _calculate_outcomes(self,
+                            positions: List[Position],
+                            sl_types: Dict[str, bool],
+                            sl_staly_values: Optional[Dict[str, float]],
+                            be_prog: Optional[float],
+                            be_offset: Optional[float],
+                            spread: float,
+                            detailed_logs: bool,
+                            calculation_date: str,
+                            prefetch_depth: Optional[int] = None) -> List[Tuple[Optional[TPCalculationResult], bool]]:
+        """
+        Pętla obliczeń po pozycjach dla ustawionego silnika
+        
+        Przy prefetch_depth > 0 (None = TP_PREFETCH_DEPTH) świeczki ładują wątki
+        czytające z wyprzedzeniem do prefetch_depth pozycji.
+        
+        Returns:
+            Lista (wynik lub None, brak danych świeczkowych) - jedna krotka na pozycję
+        """
+        # Silnik sql potrzebuje świeczek w Pythonie tylko dla BE
+        needs_candles = not self._uses_sql_engine(detailed_logs) or (be_prog is not None and be_offset is not None)
+        prefetch_depth = TP_PREFETCH_DEPTH if prefetch_depth is None else prefetch_depth
+        
+        if needs_candles and prefetch_depth > 0 and len(positions) > 1:
+            # Potok: wątki czytające ładują świeczki kolejnych pozycji w trakcie symulacji
+            with CandlePrefetcher(positions, self.db_path, prefetch_depth, TP_PREFETCH_READERS,
+                                  candle_cache=self.candle_analyzer.candle_cache,
+                                  candle_store=self.candle_analyzer.candle_store,
+                                  run_stats=self.run_stats) as prefetcher:
+                return self._calculate_outcomes_from(
+                    self._timed_fetch(prefetcher), len(positions), sl_types, sl_staly_values, be_prog, be_offset, spread,
+                    detailed_logs, calculation_date, needs_candles
+                )
+        
+        # Jedno zapytanie na instrument/dzień zamiast osobnego na każdą pozycję
+        if needs_candles:
+            with self._stage("candle_fetch"):
+                self.candle_analyzer.preload_candles(positions)
+        
+        def load_in_place():
+            for position in positions:
+                if needs_candles:
+                    with self._stage("candle_fetch"):
+                        candles = self.candle_analyzer.get_candles_for_position(position.symbol, position.open_time)
+                    yield position, candles
+                else:
+                    yield position, None
+        
+        return self._calculate_outcomes_from(
+            load_in_place(), len(positions), sl_types, sl_staly_values, be_prog, be_offset, spread,
+            detailed_logs, calculation_date, needs_candles
+        )
+    
+    def _timed_fetch(self, source):
+        """Źródło świeczek z pomiarem czasu oczekiwania na kolejną pozycję (etap candle_fetch)"""
+        iterator = iter(source)
+        while True:
+            with self._stage("candle_fetch"):
+                item = next(iterator, None)
+            if item is None:
+                return
+            yield item
+    
+    def _calculate_outcomes_from(self,
+                                 source,
+                                 count: int,
+                                 sl_types: Dict[str, bool],
+                                 sl_staly_values: Optional[Dict[str, float]],
+                                 be_prog: Optional[float],
+                                 be_offset: Optional[float],
+                                 spread: float,
+                                 detailed_logs: bool,
+                                 calculation_date: str,
+                                 needs_candles: bool) -> List[Tuple[Optional[TPCalculationResult], bool]]:
+        """Symulacja pozycji ze źródła (pozycja, świeczki lub None dla silnika sql)"""
+        outcomes = []
+        verbose = detailed_logs or _tracer.enabled(DEBUG)
+        
+        for i, (position, candles) in enumerate(source):
+            if verbose:
+                _tracer.log(DEBUG, "\033[94mAnalizuję pozycję %d/%d: %s\033[0m", i + 1, count, position.ticket,
+                            force=detailed_logs)  # Niebieski kolor
             
-            # Sprawdź dostępność danych świeczkowych
-            if not self.candle_analyzer.has_sufficient_data(position.symbol, position.open_time):
-                print(f"TPCalculator: Brak danych świeczkowych dla pozycji {position.ticket}")
-                missing_data_positions.append(position.ticket)
+            # Świeczki (jednocześnie sprawdzenie dostępności danych)
+            if needs_candles:
+                has_data = bool(candles)
+            else:
+                with self._stage("availability"):
+                    has_data = self.candle_analyzer.get_first_candle_for_position(
+                        position.symbol, position.open_time
+                    ) is not None
+            if not has_data:
+                if verbose:
+                    _tracer.log(DEBUG, "Brak danych świeczkowych dla pozycji %s", position.ticket, force=detailed_logs)
+                outcomes.append((None, True))
                 continue
             
             # Oblicz TP dla tej pozycji
+            tp_result = None
             try:
-                tp_result = self._calculate_tp_for_position(
-                    position, sl_types, sl_staly_values, be_prog, be_offset, spread, detailed_logs
-                )
+                with self._stage("simulation"), trace_ticket(position.ticket):
+                    tp_result = self._calculate_tp_for_position(
+                        position, sl_types, sl_staly_values, be_prog, be_offset, spread, detailed_logs, candles
+                    )
+                if candles is not None and self.run_stats is not None:
+                    self.run_stats.add("candles_simulated", len(candles))
                 
                 if tp_result:
-                    tp_result.calculation_date = "filtered_data"  # Oznacz że to z przefiltrowanych danych
-                    results.append(tp_result)
-                    print(f"TPCalculator: Pozycja {position.ticket} - wynik dodany")
-                else:
-                    print(f"TPCalculator: Pozycja {position.ticket} - brak wyniku")
+                    tp_result.calculation_date = calculation_date
+                if verbose:
+                    _tracer.log(DEBUG, "Pozycja %s - %s", position.ticket,
+                                "wynik dodany" if tp_result else "brak wyniku", force=detailed_logs)
                     
             except Exception as e:
-                print(f"TPCalculator: Błąd przy obliczaniu pozycji {position.ticket}: {e}")
+                _tracer.error("Błąd przy obliczaniu pozycji %s: %s", position.ticket, e)
                 import traceback
                 traceback.print_exc()
+            outcomes.append((tp_result or None, False))
         
-        # Zapisz do bazy danych jeśli wymagane
-        if save_to_db and results:
-            print(f"TPCalculator: Zapisuję {len(results)} wyników do bazy")
-            self._save_results_to_db(results)
-        
-        # Wyświetl komunikat o brakujących danych
-        if missing_data_positions:
-            print(f"TPCalculator: Brak danych świeczkowych dla pozycji: {', '.join(map(str, missing_data_positions))}")
-        
-        print(f"TPCalculator: Obliczenia zakończone. Wyników: {len(results)}")
-        return results
+        return outcomes
     
     def _calculate_tp_for_position(self,
                                  position: Position,
@@ -199,7 +665,8 @@ class TPCalculator:
                                  be_prog: Optional[float],
                                  be_offset: Optional[float],
                                  spread: float,
-                                 detailed_logs: bool = False) -> Optional[TPCalculationResult]:
+                                 detailed_logs: bool = False,
+                                 candles: Optional[CandleSeries] = None) -> Optional[TPCalculationResult]:
         """
         Oblicza TP dla pojedynczej pozycji
         
@@ -210,23 +677,43 @@ class TPCalculator:
             be_prog: Próg BE
             be_offset: Offset BE
             spread: Spread
+            candles: Już pobrane świeczki (None = pobierz z bazy; silnik sql - nie pobieraj dla TP bez BE)
         
         Returns:
             Obiekt TPCalculationResult lub None
         """
-        # Pobierz świeczki
-        candles = self.candle_analyzer.get_candles_for_position(
-            position.symbol, position.open_time
-        )
+        use_sql = self._uses_sql_engine(detailed_logs)
+        
+        # Pobierz świeczki (silnik sql liczy TP bez BE bez świeczek w Pythonie)
+        if candles is None and not use_sql:
+            candles = self.candle_analyzer.get_candles_for_position(
+                position.symbol, position.open_time
+            )
         
-        if not candles:
+        if candles is not None and not candles:
             return None
         
+        def max_tp_basic(stop_loss: float) -> Optional[float]:
+            if candles is None:
+                return self.candle_analyzer.calculate_max_tp_basic_sql(
+                    position.symbol, position.open_time, position.type_as_int,
+                    position.open_price, stop_loss, spread
+                )
+            return self.candle_analyzer.calculate_max_tp_basic(
+                candles, position.type_as_int, position.open_price, stop_loss, spread, detailed_logs
+            )
+        
+        verbose = detailed_logs or _tracer.enabled(DEBUG)
+        
+        def debug(message, *args):
+            if verbose:
+                _tracer.log(DEBUG, message, *args, force=detailed_logs)
+        
         # Pobierz stop lossy
         stop_losses = self.position_analyzer.get_position_stop_losses(
             position, sl_staly_values
         )
-        print(f"TPCalculator: Stop losses dla pozycji {position.ticket}: {stop_losses}")
+        debug("Stop losses dla pozycji %s: %s", position.ticket, stop_losses)
         
         # Inicjalizuj wynik
         result = TPCalculationResult(
@@ -236,90 +723,262 @@ class TPCalculator:
             position_type=position.position_type_string,  # Użyj nowej właściwości
             symbol=position.symbol,
             setup=position.setup,
-            spread=spread
+            spread=spread,
+            trends=position.trends,
+            trendl=position.trendl
         )
-        print(f"TPCalculator: Pozycja {position.ticket}: typ={position.position_type_string}, open_price={position.open_price}, type_int={position.type_as_int}")
+        debug("Pozycja %s: typ=%s, open_price=%s, type_int=%s", position.ticket, position.position_type_string,
+              position.open_price, position.type_as_int)
         
         # Oblicz TP dla sl_recznie
         if sl_types.get('sl_recznie', False) and stop_losses['sl_recznie'] is not None:
-            print(f"TPCalculator: Obliczam TP dla sl_recznie = {stop_losses['sl_recznie']}")
-            result.max_tp_sl_recznie = self.candle_analyzer.calculate_max_tp_basic(
-                candles, position.type_as_int, position.open_price, 
-                stop_losses['sl_recznie'], spread, detailed_logs
-            )
+            result.max_tp_sl_recznie = max_tp_basic(stop_losses['sl_recznie'])
             result.sl_recznie_value = stop_losses['sl_recznie']
-            print(f"TPCalculator: Wynik TP sl_recznie: {result.max_tp_sl_recznie}")
+            debug("TP dla sl_recznie = %s: %s", stop_losses['sl_recznie'], result.max_tp_sl_recznie)
         
         # Oblicz TP dla sl z bazy
         if sl_types.get('sl_baza', False) and stop_losses['sl_baza'] is not None:
-            print(f"TPCalculator: Obliczam TP dla sl_baza = {stop_losses['sl_baza']}")
-            result.max_tp_sl_recznie = self.candle_analyzer.calculate_max_tp_basic(
-                candles, position.type_as_int, position.open_price,
-                stop_losses['sl_baza'], spread, detailed_logs
-            )
-            print(f"TPCalculator: Wynik TP sl_baza: {result.max_tp_sl_recznie}")
+            result.max_tp_sl_recznie = max_tp_basic(stop_losses['sl_baza'])
+            result.sl_baza_value = stop_losses['sl_baza']
+            debug("TP dla sl_baza = %s: %s", stop_losses['sl_baza'], result.max_tp_sl_recznie)
         
         # Oblicz TP dla sl stałego
         if sl_types.get('sl_staly', False) and stop_losses['sl_staly'] is not None:
-            print(f"TPCalculator: Obliczam TP dla sl_staly = {stop_losses['sl_staly']}")
-            tp_result = self.candle_analyzer.calculate_max_tp_basic(
-                candles, position.type_as_int, position.open_price,
-                stop_losses['sl_staly'], spread, detailed_logs
-            )
+            tp_result = max_tp_basic(stop_losses['sl_staly'])
             result.max_tp_sl_staly = tp_result
             result.sl_staly_value = stop_losses['sl_staly']
-            
-            if tp_result is None:
-                print(f"TPCalculator: Wynik TP sl_staly: None (błąd danych)")
-            else:
-                print(f"TPCalculator: Wynik TP sl_staly: {tp_result} ({'pozycja wybita' if tp_result == 0 else 'normalny zysk'})")
+            debug("TP dla sl_staly = %s: %s (%s)", stop_losses['sl_staly'], tp_result,
+                  'błąd danych' if tp_result is None else 'pozycja wybita' if tp_result == 0 else 'normalny zysk')
         
         # Oblicz TP z BE jeśli parametry podane
         if (be_prog is not None and be_offset is not None and 
             sl_types.get('sl_staly', False) and stop_losses['sl_staly'] is not None):
             
-            print(f"TPCalculator: Obliczam TP z BE: prog={be_prog}, offset={be_offset}, initial_sl={stop_losses['sl_staly']}")
-            print(f"*** WYWOŁUJĘ METODĘ BE Z KOMUNIKATAMI ***")
+            if candles is None:
+                candles = self.candle_analyzer.get_candles_for_position(position.symbol, position.open_time)
             result.max_tp_sl_be = self.candle_analyzer.calculate_max_tp_with_be(
                 candles, position.type_as_int, position.open_price,
                 stop_losses['sl_staly'], be_prog, be_offset, spread, detailed_logs
             )
-            print(f"*** METODA BE ZAKOŃCZONA ***")
             result.be_prog = be_prog
             result.be_offset = be_offset
-            print(f"TPCalculator: Wynik TP BE: {result.max_tp_sl_be}")
+            debug("TP z BE (prog=%s, offset=%s, initial_sl=%s): %s", be_prog, be_offset, stop_losses['sl_staly'],
+                  result.max_tp_sl_be)
         
         return result
     
-    def _save_results_to_db(self, results: List[TPCalculationResult]):
-        """Zapisuje wyniki do bazy danych"""
-        try:
-            query = self.tp_queries.insert_tp_result()
+    def sweep_tp_parameters(self,
+                            tickets: List[str],
+                            sl_values: List[float],
+                            be_progs: Optional[List[float]] = None,
+                            be_offsets: Optional[List[float]] = None,
+                            spread: float = 0,
+                            sl_staly_values: Optional[Dict[str, float]] = None) -> TPSweepResult:
+        """
+        Przeszukuje siatkę parametrów SL stały × próg BE × offset BE
+        
+        Świeczki każdej pozycji są pobierane tylko raz, a cała siatka jest
+        liczona na tych samych tablicach (vectorized_tp.max_tp_grid) lub - przy
+        silniku range_index - na indeksie zakresowym (range_index.max_tp_grid).
+        
+        Bez sl_staly_values wartości sl_values to punkty, takie same dla każdego
+        instrumentu - przy kilku instrumentach o różnej zmienności sweep warto
+        robić osobno na instrument albo podać sl_staly_values.
+        
+        Args:
+            tickets: Lista ticketów do analizy
+            sl_values: Odległości SL stałego w punktach albo - z sl_staly_values - mnożniki
+                       SL stałego instrumentu (np. [0.5, 1, 1.5])
+            be_progs: Progi BE w punktach (puste = tylko wyniki bez BE)
+            be_offsets: Offsety BE w punktach
+            spread: Spread
+            sl_staly_values: SL stały per główny instrument jak w calculate_tp_* (np. {"DAX": 10});
+                             pozycje instrumentów spoza słownika są pomijane (no_sl_tickets)
+        
+        Returns:
+            Obiekt TPSweepResult z kostką wyników, średnimi i wartością oczekiwaną per komórka
+        """
+        be_progs = list(be_progs or [])
+        be_offsets = list(be_offsets or [])
+        sl_mode = "mnożniki SL stałego" if sl_staly_values else "punkty"
+        print(f"TPCalculator: Sweep dla {len(tickets)} ticketów: SL={sl_values} ({sl_mode}), "
+              f"BE prog={be_progs}, BE offset={be_offsets}")
+        
+        positions = self.position_analyzer.get_positions_by_tickets(tickets)
+        
+        basic_tp = np.full((len(positions), len(sl_values)), np.nan)
+        be_tp = np.full((len(positions), len(sl_values), len(be_progs), len(be_offsets)), np.nan)
+        missing_data_tickets = []
+        no_sl_tickets = []
+        
+        # Odległości SL per pozycja - punkty wprost albo mnożniki SL stałego głównego instrumentu
+        sl_distances = {}
+        if sl_staly_values:
+            from config.instrument_tickets_config import get_instrument_tickets_config
+            tickets_config = get_instrument_tickets_config()
+            for position in positions:
+                main_instrument = tickets_config.get_main_instrument_for_ticket(position.symbol)
+                if main_instrument in sl_staly_values:
+                    base = sl_staly_values[main_instrument]
+                    sl_distances[position.ticket] = [base * factor for factor in sl_values]
+                else:
+                    no_sl_tickets.append(position.ticket)
+            if no_sl_tickets:
+                print(f"TPCalculator: Brak SL stałego dla instrumentu pozycji: {', '.join(map(str, no_sl_tickets))}")
+        else:
+            sl_distances = {position.ticket: list(sl_values) for position in positions}
+        
+        self.candle_analyzer.preload_candles([position for position in positions
+                                              if position.ticket in sl_distances])
+        
+        for i, position in enumerate(positions):
+            if position.ticket not in sl_distances:
+                continue
+            candles = self.candle_analyzer.get_candles_for_position(position.symbol, position.open_time)
+            if not candles:
+                missing_data_tickets.append(position.ticket)
+                continue
+            
+            # Poziomy SL tak samo jak w PositionAnalyzer.get_position_stop_losses
+            if position.is_buy:
+                sl_levels = [position.open_price - sl_value for sl_value in sl_distances[position.ticket]]
+            else:
+                sl_levels = [position.open_price + sl_value for sl_value in sl_distances[position.ticket]]
             
-            for result in results:
-                params = (
-                    result.ticket,
-                    result.open_price,
-                    result.open_time,
-                    result.position_type,
-                    result.symbol,
-                    result.setup,
-                    result.max_tp_sl_staly,
-                    result.max_tp_sl_recznie,
-                    result.max_tp_sl_be,
-                    result.sl_staly_value,
-                    result.sl_recznie_value,
-                    result.be_prog,
-                    result.be_offset,
-                    result.spread,
-                    result.calculation_date,
-                    result.notes
+            if self.candle_analyzer.engine == ENGINE_RANGE_INDEX:
+                # Kilka zapytań do indeksu dnia na poziom SL zamiast przejścia po całym dniu
+                index, start = self.candle_analyzer.get_range_index(candles)
+                basic_tp[i], be_tp[i] = range_index.max_tp_grid(
+                    index, position.type_as_int, position.open_price, sl_levels, be_progs, be_offsets,
+                    spread, start
+                )
+            else:
+                high, low, close = vectorized_tp.candles_to_arrays(candles)
+                basic_tp[i], be_tp[i] = vectorized_tp.max_tp_grid(
+                    high, low, close, position.type_as_int, position.open_price,
+                    sl_levels, be_progs, be_offsets, spread
                 )
+        
+        if missing_data_tickets:
+            print(f"TPCalculator: Brak danych świeczkowych dla pozycji: {', '.join(map(str, missing_data_tickets))}")
+        
+        return TPSweepResult(
+            tickets=[position.ticket for position in positions],
+            sl_values=list(sl_values),
+            be_progs=be_progs,
+            be_offsets=be_offsets,
+            spread=spread,
+            basic_tp=basic_tp,
+            be_tp=be_tp,
+            missing_data_tickets=missing_data_tickets,
+            sl_staly_values=dict(sl_staly_values) if sl_staly_values else None,
+            no_sl_tickets=no_sl_tickets,
+            sl_distances=np.array([sl_distances.get(position.ticket, [np.nan] * len(sl_values))
+                                   for position in positions], dtype=float).reshape(len(positions), len(sl_values))
+        )
+    
+    def _build_run_info(self,
+                        sl_types: Dict[str, bool],
+                        sl_staly_values: Optional[Dict[str, float]],
+                        be_prog: Optional[float],
+                        be_offset: Optional[float],
+                        spread: float,
+                        engine: Optional[str],
+                        calculation_date: str,
+                        started_at: datetime) -> Dict[str, any]:
+        """Metadane przebiegu zapisywane w tabeli przebiegów"""
+        return {
+            'param_hash': compute_param_hash(sl_types, sl_staly_values, be_prog, be_offset, spread),
+            'engine': engine or self.candle_analyzer.engine,
+            'sl_types': json.dumps(sorted(name for name, enabled in sl_types.items() if enabled)),
+            'sl_staly_values': json.dumps(sl_staly_values or {}, sort_keys=True),
+            'be_prog': be_prog,
+            'be_offset': be_offset,
+            'spread': spread,
+            'calculation_date': calculation_date,
+            'started_at': started_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    
+    def _save_results_to_db(self, results: List[TPCalculationResult],
+                            run_info: Optional[Dict[str, any]] = None,
+                            run_id: Optional[int] = None) -> Optional[int]:
+        """
+        Zapisuje wyniki do bazy danych w jednej transakcji
+        
+        Wiersz przebiegu i wszystkie wyniki (upsert po param_hash, ticket)
+        trafiają do bazy jednym commitem - ponowny zapis tych samych
+        obliczeń nie powiększa tabeli wyników.
+        
+        Args:
+            results: Wyniki do zapisania
+            run_info: Metadane przebiegu (_build_run_info); None = wyniki bez przebiegu
+            run_id: Przebieg zapisany wcześniej (kolejna porcja strumienia) - bez nowego wiersza
+        
+        Returns:
+            Id przebiegu lub None
+        """
+        try:
+            conn = self._get_connection()
+            with conn:
+                if run_info is not None:
+                    cursor = conn.execute(self.tp_queries.insert_tp_run(), (
+                        run_info['param_hash'],
+                        run_info['engine'],
+                        run_info['sl_types'],
+                        run_info['sl_staly_values'],
+                        run_info['be_prog'],
+                        run_info['be_offset'],
+                        run_info['spread'],
+                        run_info['calculation_date'],
+                        run_info['started_at'],
+                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        len(results)
+                    ))
+                    run_id = cursor.lastrowid
                 
-                self._execute_update(query, params)
+                conn.executemany(self.tp_queries.insert_tp_result(), [
+                    (
+                        result.ticket,
+                        result.open_price,
+                        result.open_time,
+                        result.position_type,
+                        result.symbol,
+                        result.setup,
+                        result.max_tp_sl_staly,
+                        result.max_tp_sl_recznie,
+                        result.max_tp_sl_be,
+                        result.sl_staly_value,
+                        result.sl_recznie_value,
+                        result.be_prog,
+                        result.be_offset,
+                        result.spread,
+                        result.calculation_date,
+                        result.notes,
+                        result.param_hash,
+                        result.candle_version,
+                        run_id,
+                        result.sl_baza_value
+                    )
+                    for result in results
+                ])
+            if self.run_stats is not None:
+                self.run_stats.add("queries", len(results) + (1 if run_info is not None else 0))
+            return run_id
                 
         except Exception as e:
             print(f"Błąd podczas zapisywania wyników do bazy: {e}")
+            return None
+    
+    def _finish_tp_run(self, run_id: int, result_count: int):
+        """Uaktualnia koniec i liczbę wyników przebiegu zapisanego porcjami"""
+        try:
+            self._execute_update(self.tp_queries.finish_tp_run(), (
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), result_count, run_id
+            ))
+            if self.run_stats is not None:
+                self.run_stats.add("queries", 1)
+        except Exception as e:
+            print(f"Błąd podczas zapisywania przebiegu: {e}")
     
     def get_calculation_summary(self, results: List[TPCalculationResult]) -> Dict[str, any]:
         """
@@ -329,39 +988,6 @@ class TPCalculator:
             results: Lista wyników kalkulacji
         
         Returns:
-            Słownik z podsumowaniem
+            Słownik z podsumowaniem (średnie i maksima z calculations.statistics)
         """
-        if not results:
-            return {
-                'total_positions': 0,
-                'successful_calculations': 0,
-                'avg_tp_sl_staly': 0,
-                'avg_tp_sl_recznie': 0,
-                'avg_tp_sl_be': 0,
-                'max_tp_sl_staly': 0,
-                'max_tp_sl_recznie': 0,
-                'max_tp_sl_be': 0
-            }
-        
-        # Filtruj wyniki gdzie są dane (włącznie z 0.0)
-        tp_staly_values = [r.max_tp_sl_staly for r in results if r.max_tp_sl_staly is not None]
-        tp_recznie_values = [r.max_tp_sl_recznie for r in results if r.max_tp_sl_recznie is not None]
-        tp_be_values = [r.max_tp_sl_be for r in results if r.max_tp_sl_be is not None]
-        
-        return {
-            'total_positions': len(results),
-            'successful_calculations': len([r for r in results if any([
-                r.max_tp_sl_staly is not None, r.max_tp_sl_recznie is not None, r.max_tp_sl_be is not None
-            ])]),
-            'avg_tp_sl_staly': sum(tp_staly_values) / len(tp_staly_values) if tp_staly_values else 0,
-            'avg_tp_sl_recznie': sum(tp_recznie_values) / len(tp_recznie_values) if tp_recznie_values else 0,
-            'avg_tp_sl_be': sum(tp_be_values) / len(tp_be_values) if tp_be_values else 0,
-            'max_tp_sl_staly': max(tp_staly_values) if tp_staly_values else 0,
-            'max_tp_sl_recznie': max(tp_recznie_values) if tp_recznie_values else 0,
-            'max_tp_sl_be': max(tp_be_values) if tp_be_values else 0,
-            'positions_with_data': {
-                'sl_staly': len(tp_staly_values),
-                'sl_recznie': len(tp_recznie_values),
-                'sl_be': len(tp_be_values)
-            }
-        }
+        return compute_statistics(results, breakdowns=False).to_summary()
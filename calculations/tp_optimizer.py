@@ -0,0 +1,156 @@
+"""
+Optymalny stały TP - który poziom TP dałby najwięcej punktów w grupie pozycji
+
+Dla każdej grupy (kombinacja setup, instrument, TrendS, TrendL) i typu SL
+rozkład max TP jest sortowany raz (ExcursionDistribution), a suma punktów
+liczona dla wszystkich poziomów kandydujących jednym searchsorted na sumach
+prefiksowych - O(n log n) zamiast przeglądu poziom po poziomie.
+
+Kandydatami są wartości max TP pozycji: między dwiema kolejnymi wartościami
+liczba trafień jest stała, a suma punktów rośnie z poziomem, więc maksimum
+zawsze wypada na którejś z nich. Punkty jak w statystykach
+(calculations/statistics.py): trafienie +TP, chybienie -SL, przy BE +offset
+po dojściu do progu.
+
+Użycie:
+    optimization = optimize_tp(results, group_by=("setup", "instrument"))
+    for optimum in optimization.optima:
+        print(optimum.group, optimum.sl_type, optimum.level, optimum.curve.expectancy)
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.database_config import TP_OPTIMIZER_GROUP_BY, TP_OPTIMIZER_MIN_POSITIONS
+from calculations.statistics import SL_TYPES, ExcursionDistribution, ResultColumns
+
+# Wymiary grupowania: klucz (etykieta w ResultColumns.groups) -> opis
+GROUP_DIMENSIONS = (
+    ("setup", "Setup"),
+    ("instrument", "Instrument"),
+    ("trends", "TrendS"),
+    ("trendl", "TrendL"),
+)
+
+
+@dataclass
+class TPCurve:
+    """Suma punktów w funkcji poziomu TP (poziomy rosnąco)"""
+    levels: np.ndarray
+    hits: np.ndarray
+    total_points: np.ndarray
+    expectancy: np.ndarray  # Punkty na pozycję
+
+    @classmethod
+    def from_distribution(cls, distribution: ExcursionDistribution) -> 'TPCurve':
+        levels = np.unique(distribution.values[distribution.values > 0])  # Wartości posortowane - unique bez kosztu
+        total_points = distribution.total_points(levels)
+        return cls(
+            levels=levels,
+            hits=distribution.hits(levels),
+            total_points=total_points,
+            expectancy=total_points / len(distribution) if len(distribution) else total_points,
+        )
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def to_rows(self) -> List[Dict[str, float]]:
+        return [{"level": float(level), "hits": int(hits), "total_points": float(total), "expectancy": float(e)}
+                for level, hits, total, e in zip(self.levels, self.hits, self.total_points, self.expectancy)]
+
+
+@dataclass
+class TPOptimum:
+    """Optymalny poziom TP grupy dla typu SL (None gdy brak poziomów kandydujących)"""
+    group: Dict[str, str]  # Wymiar -> wartość (pusty słownik = wszystkie pozycje)
+    sl_type: str
+    positions: int         # Pozycje ze znanym max TP i znaną stratą przy chybieniu
+    curve: TPCurve
+    level: Optional[float] = None
+    hits: int = 0
+    total_points: Optional[float] = None
+    expectancy: Optional[float] = None
+
+    @classmethod
+    def compute(cls, group: Dict[str, str], sl_type: str, tp: np.ndarray, miss: np.ndarray) -> 'TPOptimum':
+        distribution = ExcursionDistribution(tp, miss)
+        curve = TPCurve.from_distribution(distribution)
+        optimum = cls(group=group, sl_type=sl_type, positions=len(distribution), curve=curve)
+        if len(curve):
+            best = int(np.argmax(curve.total_points))  # Przy remisie najniższy poziom
+            optimum.level = float(curve.levels[best])
+            optimum.hits = int(curve.hits[best])
+            optimum.total_points = float(curve.total_points[best])
+            optimum.expectancy = float(curve.expectancy[best])
+        return optimum
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return self.hits / self.positions if self.positions else None
+
+
+@dataclass
+class TPOptimization:
+    """Optymalne poziomy TP dla grup i typów SL"""
+    group_by: List[str]
+    min_positions: int
+    optima: List[TPOptimum] = field(default_factory=list)
+
+    def row_fields(self) -> List[str]:
+        """Kolumny to_rows() (CSV/JSON, tabela w GUI)"""
+        return self.group_by + ["sl_type", "positions", "level", "hits", "hit_rate", "total_points", "expectancy",
+                                "candidates"]
+
+    def to_rows(self) -> List[Dict[str, any]]:
+        """Wiersz na grupę i typ SL z optymalnym poziomem"""
+        rows = []
+        for optimum in self.optima:
+            row = dict(optimum.group)
+            row.update(
+                sl_type=optimum.sl_type, positions=optimum.positions, level=optimum.level, hits=optimum.hits,
+                hit_rate=optimum.hit_rate, total_points=optimum.total_points, expectancy=optimum.expectancy,
+                candidates=len(optimum.curve)
+            )
+            rows.append(row)
+        return rows
+
+
+def optimize_tp(results,
+                group_by: Optional[Sequence[str]] = None,
+                sl_types: Optional[Sequence[str]] = None,
+                min_positions: Optional[int] = None) -> TPOptimization:
+    """
+    Optymalny stały TP dla wyników TPCalculator
+
+    Args:
+        results: Lista TPCalculationResult albo gotowe ResultColumns
+        group_by: Wymiary grupowania z GROUP_DIMENSIONS (None = TP_OPTIMIZER_GROUP_BY, [] = bez podziału)
+        sl_types: Typy SL (None = wszystkie z wynikami)
+        min_positions: Minimalna liczba pozycji grupy (None = TP_OPTIMIZER_MIN_POSITIONS)
+
+    Returns:
+        TPOptimization - optima w kolejności grup (etykiety rosnąco), potem typów SL
+    """
+    group_by = list(TP_OPTIMIZER_GROUP_BY if group_by is None else group_by)
+    dimensions = dict(GROUP_DIMENSIONS)
+    unknown = [by for by in group_by if by not in dimensions]
+    if unknown:
+        raise ValueError(f"Nieznany wymiar grupowania: {', '.join(unknown)} (dostępne: {', '.join(dimensions)})")
+    selected = [name for name, _ in SL_TYPES if sl_types is None or name in sl_types]
+    min_positions = TP_OPTIMIZER_MIN_POSITIONS if min_positions is None else min_positions
+
+    columns = results if isinstance(results, ResultColumns) else ResultColumns.from_results(results)
+    groups = [({}, columns)]
+    for by in group_by:
+        groups = [({**key, by: value}, subset)
+                  for key, group in groups for value, subset in group.split(by).items()]
+
+    optimization = TPOptimization(group_by, min_positions)
+    for key, group in groups:
+        for name in selected:
+            optimum = TPOptimum.compute(key, name, group.tp[name], group.miss[name])
+            if optimum.positions and optimum.positions >= min_positions:
+                optimization.optima.append(optimum)
+    return optimization
@@ -0,0 +1,109 @@
+"""
+Strumień wyników kalkulacji TP - zdarzenia i podsumowanie liczone na bieżąco
+
+TPCalculator.iter_tp_for_* oddaje wyniki porcjami pozycji, w miarę liczenia:
+okno wyników pokazuje pierwsze wiersze od razu, a zapis do bazy idzie
+porcjami. Strumień nie trzyma listy wyników - podsumowanie (RunningTPSummary)
+jest aktualizowane przy każdym wyniku, więc pamięć nie rośnie z długością
+przebiegu.
+
+Użycie:
+    for event in calculator.iter_tp_for_date_range(...):
+        if event.kind == EVENT_RESULT:
+            table.append(event.result)
+        progress.set(event.done, event.total)
+    summary = event.summary.to_dict()
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from database.models import TPCalculationResult
+from calculations.run_stats import RunStats
+from calculations.statistics import SL_TYPES
+
+# Rodzaje zdarzeń strumienia
+EVENT_RESULT = "result"              # Wynik pozycji
+EVENT_MISSING_DATA = "missing_data"  # Pozycja pominięta - brak świeczek
+EVENT_FINISHED = "finished"          # Koniec przebiegu (ostatnie zdarzenie, z pomiarami)
+
+
+class RunningTPSummary:
+    """
+    Podsumowanie wyników aktualizowane wynik po wyniku (format get_calculation_summary)
+
+    Na bieżąco w trakcie strumienia; pełne statystyki końcowe liczy
+    calculations.statistics.compute_statistics.
+    """
+
+    def __init__(self):
+        self.total_positions = 0
+        self.successful_calculations = 0
+        self._counts = {name: 0 for name, _ in SL_TYPES}
+        self._sums = {name: 0.0 for name, _ in SL_TYPES}
+        self._maxima: Dict[str, Optional[float]] = {name: None for name, _ in SL_TYPES}
+
+    def add(self, result: TPCalculationResult):
+        self.total_positions += 1
+        has_value = False
+        for name, attribute in SL_TYPES:
+            value = getattr(result, attribute)
+            if value is None:
+                continue
+            has_value = True
+            self._counts[name] += 1
+            self._sums[name] += value
+            if self._maxima[name] is None or value > self._maxima[name]:
+                self._maxima[name] = value
+        if has_value:
+            self.successful_calculations += 1
+
+    def extend(self, results: Iterable[TPCalculationResult]):
+        for result in results:
+            self.add(result)
+
+    def to_dict(self) -> Dict[str, any]:
+        """Słownik jak TPCalculator.get_calculation_summary"""
+        summary = {
+            'total_positions': self.total_positions,
+            'successful_calculations': self.successful_calculations,
+        }
+        for name, _ in SL_TYPES:
+            count = self._counts[name]
+            summary[f'avg_tp_{name}'] = self._sums[name] / count if count else 0
+        for name, _ in SL_TYPES:
+            summary[f'max_tp_{name}'] = self._maxima[name] if self._maxima[name] is not None else 0
+        if self.total_positions:
+            summary['positions_with_data'] = dict(self._counts)
+        return summary
+
+
+@dataclass
+class TPStreamEvent:
+    """Zdarzenie strumienia - postęp przebiegu i ewentualny wynik lub pominięty ticket"""
+    kind: str
+    done: int                                   # Pozycje przetworzone
+    total: int                                  # Pozycje w przebiegu
+    missing: int                                # Pozycje pominięte (brak świeczek)
+    summary: RunningTPSummary                   # Podsumowanie dotychczasowych wyników
+    result: Optional[TPCalculationResult] = None  # EVENT_RESULT
+    ticket: Optional[int] = None                # EVENT_MISSING_DATA
+    stats: Optional[RunStats] = None            # EVENT_FINISHED
+
+
+class TPResultList(list):
+    """Lista wyników TP z pomiarami przebiegu (atrybut stats)"""
+
+    def __init__(self, results=(), stats: Optional[RunStats] = None):
+        super().__init__(results)
+        self.stats = stats
+
+
+def collect_results(events: Iterable[TPStreamEvent]) -> TPResultList:
+    """Zbiera wyniki strumienia w listę (z pomiarami przebiegu ze zdarzenia końcowego)"""
+    results = TPResultList()
+    for event in events:
+        if event.kind == EVENT_RESULT:
+            results.append(event.result)
+        elif event.kind == EVENT_FINISHED:
+            results.stats = event.stats
+    return results
@@ -0,0 +1,102 @@
+"""
+Wynik przeszukiwania siatki parametrów SL / BE dla kalkulatora TP
+"""
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Sequence
+
+from config.database_config import TP_STATS_TARGETS
+from calculations.statistics import ExcursionDistribution
+
+
+@dataclass
+class TPSweepResult:
+    """
+    Kostka wyników TP: pozycja × SL × próg BE × offset BE
+
+    basic_tp[p, s] - TP bez BE dla pozycji p i SL stałego s
+    be_tp[p, s, b, o] - TP z BE dla progu b i offsetu o
+    sl_distances[p, s] - odległość SL pozycji w punktach
+    NaN oznacza brak danych świeczkowych (lub SL stałego) dla pozycji.
+
+    sl_values to punkty wspólne dla wszystkich instrumentów, a przy podanym
+    sl_staly_values - mnożniki SL stałego głównego instrumentu pozycji.
+    Wartość oczekiwana komórki dla stałego TP liczona jak w statystykach
+    (calculations/statistics.py): trafienie +TP, chybienie -SL, przy BE
+    +offset po dojściu do progu. Średni max TP nie uwzględnia strat - szerszy
+    SL zawsze go podnosi, więc komórki porównuje się wartością oczekiwaną.
+    """
+    tickets: List[int]
+    sl_values: List[float]
+    be_progs: List[float]
+    be_offsets: List[float]
+    spread: float
+    basic_tp: np.ndarray
+    be_tp: np.ndarray
+    missing_data_tickets: List[int] = field(default_factory=list)
+    sl_staly_values: Optional[Dict[str, float]] = None  # None = sl_values w punktach
+    no_sl_tickets: List[int] = field(default_factory=list)  # Instrument spoza sl_staly_values
+    sl_distances: Optional[np.ndarray] = None
+
+    @property
+    def positions_with_data(self) -> int:
+        """Liczba pozycji, dla których były dostępne świeczki"""
+        if self.basic_tp.size == 0:
+            return 0
+        return int(np.sum(~np.isnan(self.basic_tp[:, 0])))
+
+    def basic_mean_max_tp(self) -> np.ndarray:
+        """Średni max TP (punkty na pozycję) bez BE - tablica [S]"""
+        return self._mean_over_positions(self.basic_tp)
+
+    def be_mean_max_tp(self) -> np.ndarray:
+        """Średni max TP (punkty na pozycję) z BE - tablica [S, B, O]"""
+        return self._mean_over_positions(self.be_tp)
+
+    def basic_expectancy(self, targets: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Punkty na pozycję dla stałych TP bez BE - tablica [S, T] (targets None = TP_STATS_TARGETS)"""
+        targets = self._targets(targets)
+        result = np.full((len(self.sl_values), len(targets)), np.nan)
+        for s in range(len(self.sl_values)):
+            result[s] = ExcursionDistribution(self.basic_tp[:, s], -self.sl_distances[:, s]).expectancy(targets)
+        return result
+
+    def be_expectancy(self, targets: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Punkty na pozycję dla stałych TP z BE - tablica [S, B, O, T] (targets None = TP_STATS_TARGETS)"""
+        targets = self._targets(targets)
+        result = np.full((len(self.sl_values), len(self.be_progs), len(self.be_offsets), len(targets)), np.nan)
+        for s in range(len(self.sl_values)):
+            risk = -self.sl_distances[:, s]
+            for b, be_prog in enumerate(self.be_progs):
+                for o, be_offset in enumerate(self.be_offsets):
+                    tp = self.be_tp[:, s, b, o]
+                    with np.errstate(invalid='ignore'):
+                        miss = np.where(tp >= be_prog, be_offset, risk)
+                    result[s, b, o] = ExcursionDistribution(tp, miss).expectancy(targets)
+        return result
+
+    def best_be_cell(self, targets: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+        """Zwraca parametry komórki siatki BE i poziom TP z najwyższą wartością oczekiwaną"""
+        targets = self._targets(targets)
+        expectancy = self.be_expectancy(targets)
+        if expectancy.size == 0 or np.all(np.isnan(expectancy)):
+            return {}
+        s_index, b_index, o_index, t_index = np.unravel_index(np.nanargmax(expectancy), expectancy.shape)
+        return {
+            'sl_value': self.sl_values[s_index],
+            'be_prog': self.be_progs[b_index],
+            'be_offset': self.be_offsets[o_index],
+            'target': targets[t_index],
+            'expectancy': float(expectancy[s_index, b_index, o_index, t_index]),
+            'mean_max_tp': float(self.be_mean_max_tp()[s_index, b_index, o_index])
+        }
+
+    @staticmethod
+    def _targets(targets: Optional[Sequence[float]]) -> List[float]:
+        return [float(t) for t in (TP_STATS_TARGETS if targets is None else targets)]
+
+    def _mean_over_positions(self, cube: np.ndarray) -> np.ndarray:
+        """Średnia po osi pozycji z pominięciem pozycji bez danych"""
+        if self.positions_with_data == 0:
+            return np.full(cube.shape[1:], np.nan)
+        return np.nanmean(cube, axis=0)
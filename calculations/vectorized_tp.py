@@ -0,0 +1,230 @@
+"""
+Wektorowy silnik kalkulacji TP (NumPy)
+
+Odpowiednik pętli z CandleAnalyzer.calculate_max_tp_basic działający na
+tablicach OHLC zamiast na liście obiektów Candle. Wyniki są identyczne
+z pętlą - łącznie z regułą pierwszej świeczki (tylko close).
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+
+def candles_to_arrays(candles) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Konwertuje świeczki na ciągłe tablice (high, low, close)
+
+    Args:
+        candles: CandleSeries (kolumny bez kopiowania) lub lista obiektów Candle
+
+    Returns:
+        Krotka tablic float64: (high, low, close)
+    """
+    if hasattr(candles, 'high') and isinstance(candles.high, np.ndarray):
+        return candles.high, candles.low, candles.close
+    count = len(candles)
+    high = np.fromiter((c.high for c in candles), dtype=np.float64, count=count)
+    low = np.fromiter((c.low for c in candles), dtype=np.float64, count=count)
+    close = np.fromiter((c.close for c in candles), dtype=np.float64, count=count)
+    return high, low, close
+
+
+def favorable_excursion(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                        is_buy: bool, open_price: float) -> np.ndarray:
+    """
+    Zwraca zysk na każdej świeczce tak jak liczy go pętla
+
+    Pierwsza świeczka - zysk na close (nie znamy przebiegu),
+    kolejne - zysk na high (BUY) lub low (SELL).
+    """
+    if is_buy:
+        profit = high - open_price
+        profit[0] = close[0] - open_price
+    else:
+        profit = open_price - low
+        profit[0] = open_price - close[0]
+    return profit
+
+
+def sl_hit_mask(high: np.ndarray, low: np.ndarray, is_buy: bool,
+                stop_loss: float, spread: float) -> np.ndarray:
+    """Zwraca maskę świeczek, na których cena uderzyła w podany SL"""
+    if is_buy:
+        return low <= stop_loss + spread
+    return high >= stop_loss - spread
+
+
+def first_true_index(mask: np.ndarray, start: int = 0) -> int:
+    """Indeks pierwszego True w masce od pozycji start lub -1 gdy brak"""
+    if start >= len(mask):
+        return -1
+    index = int(np.argmax(mask[start:])) + start
+    return index if mask[index] else -1
+
+
+def max_profit_before(profit: np.ndarray, end: int) -> float:
+    """Maksymalny zysk na świeczkach [0, end) - nigdy mniej niż 0.0"""
+    if end <= 0:
+        return 0.0
+    return max(0.0, float(profit[:end].max()))
+
+
+def max_tp_basic(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 position_type: int, open_price: float, stop_loss: float,
+                 spread: float = 0) -> Optional[float]:
+    """
+    Oblicza maksymalny TP bez BE na tablicach OHLC
+
+    Args:
+        high, low, close: Tablice float64 świeczek (pierwsza = świeczka otwarcia)
+        position_type: 0 = buy, 1 = sell
+        open_price: Cena otwarcia pozycji
+        stop_loss: Poziom stop loss
+        spread: Spread w punktach
+
+    Returns:
+        Maksymalny TP w punktach, 0.0 gdy SL uderzony na pierwszej świeczce,
+        None gdy brak świeczek
+    """
+    if len(close) == 0:
+        return None
+
+    is_buy = (position_type == 0)
+    hit_index = first_true_index(sl_hit_mask(high, low, is_buy, stop_loss, spread))
+
+    if hit_index == 0:
+        return 0.0
+
+    profit = favorable_excursion(high, low, close, is_buy, open_price)
+    end = hit_index if hit_index > 0 else len(profit)
+    return max_profit_before(profit, end)
+
+
+def max_tp_with_be(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                   position_type: int, open_price: float, initial_sl: float,
+                   be_prog: float, be_offset: float, spread: float = 0) -> Optional[float]:
+    """
+    Oblicza maksymalny TP z przesuwaniem SL na BE na tablicach OHLC
+
+    Dwie fazy:
+    1. Indeks aktywacji BE (T) i pierwsze uderzenie oryginalnego SL przed T
+    2. Jeśli oryginalny SL nie padł - pierwsze uderzenie przesuniętego SL
+       od świeczki T+1 (na świeczce aktywacji SL nie jest sprawdzany,
+       tak jak be_activated_this_candle w pętli)
+
+    Returns:
+        Maksymalny TP w punktach, 0.0 gdy SL uderzony na pierwszej świeczce,
+        None gdy brak świeczek
+    """
+    count = len(close)
+    if count == 0:
+        return None
+
+    is_buy = (position_type == 0)
+    original_hits = sl_hit_mask(high, low, is_buy, initial_sl, spread)
+
+    # Pierwsza świeczka - SL sprawdzany zawsze przed aktywacją BE
+    if original_hits[0]:
+        return 0.0
+
+    profit = favorable_excursion(high, low, close, is_buy, open_price)
+    trigger_index = first_true_index(profit >= be_prog)
+
+    # Faza 1: oryginalny SL na świeczkach [1, T)
+    original_end = trigger_index if trigger_index >= 0 else count
+    hit_index = first_true_index(original_hits[:original_end], 1)
+
+    # Faza 2: przesunięty SL od świeczki T+1
+    if hit_index < 0 and trigger_index >= 0:
+        new_sl_after_be = open_price + be_offset if is_buy else open_price - be_offset
+        moved_hits = sl_hit_mask(high, low, is_buy, new_sl_after_be, spread)
+        hit_index = first_true_index(moved_hits, trigger_index + 1)
+
+    end = hit_index if hit_index > 0 else count
+    return max_profit_before(profit, end)
+
+
+def next_true_index(mask: np.ndarray) -> np.ndarray:
+    """
+    Dla każdej pozycji i zwraca najbliższy indeks j >= i, gdzie mask[j] jest True
+
+    Brak takiego indeksu oznaczany jest jako len(mask). Pozwala odpowiadać
+    na pytanie "pierwsze uderzenie SL od świeczki i" w czasie O(1).
+    """
+    count = len(mask)
+    indices = np.where(mask, np.arange(count), count)
+    return np.minimum.accumulate(indices[::-1])[::-1]
+
+
+def max_tp_grid(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                position_type: int, open_price: float, sl_levels, be_progs,
+                be_offsets, spread: float = 0):
+    """
+    Oblicza TP dla całej siatki parametrów przy jednym przejściu po świeczkach
+
+    Wyniki dla każdej komórki są identyczne z max_tp_basic / max_tp_with_be.
+    Koszt: O(n * (S + B + O)) na przygotowanie + O(1) na komórkę siatki.
+
+    Args:
+        high, low, close: Tablice float64 świeczek
+        position_type: 0 = buy, 1 = sell
+        open_price: Cena otwarcia pozycji
+        sl_levels: Poziomy SL (ceny) - S wartości
+        be_progs: Progi BE w punktach - B wartości
+        be_offsets: Offsety BE w punktach - O wartości
+        spread: Spread w punktach
+
+    Returns:
+        Krotka (basic, be): tablica [S] wyników bez BE i tablica [S, B, O]
+        wyników z BE; NaN gdy brak świeczek
+    """
+    sl_levels = list(sl_levels)
+    be_progs = list(be_progs)
+    be_offsets = list(be_offsets)
+    basic = np.full(len(sl_levels), np.nan)
+    be = np.full((len(sl_levels), len(be_progs), len(be_offsets)), np.nan)
+
+    count = len(close)
+    if count == 0:
+        return basic, be
+
+    is_buy = (position_type == 0)
+    profit = favorable_excursion(high, low, close, is_buy, open_price)
+    running_max = np.maximum.accumulate(profit)
+
+    def best_before(end: int) -> float:
+        return max(0.0, float(running_max[end - 1])) if end > 0 else 0.0
+
+    # Aktywacja BE zależy tylko od progu
+    triggers = [first_true_index(profit >= be_prog) for be_prog in be_progs]
+
+    # Pierwsze uderzenie przesuniętego SL od dowolnej świeczki - per offset
+    moved_next_hits = []
+    for be_offset in be_offsets:
+        new_sl_after_be = open_price + be_offset if is_buy else open_price - be_offset
+        moved_next_hits.append(next_true_index(sl_hit_mask(high, low, is_buy, new_sl_after_be, spread)))
+
+    for s_index, stop_loss in enumerate(sl_levels):
+        original_hit = first_true_index(sl_hit_mask(high, low, is_buy, stop_loss, spread))
+
+        if original_hit == 0:
+            basic[s_index] = 0.0
+            be[s_index] = 0.0
+            continue
+
+        basic[s_index] = best_before(original_hit if original_hit > 0 else count)
+
+        for b_index, trigger_index in enumerate(triggers):
+            # Faza 1: oryginalny SL przed aktywacją BE
+            if original_hit > 0 and (trigger_index < 0 or original_hit < trigger_index):
+                be[s_index, b_index, :] = best_before(original_hit)
+                continue
+            if trigger_index < 0:
+                be[s_index, b_index, :] = best_before(count)
+                continue
+
+            # Faza 2: przesunięty SL od świeczki T+1
+            for o_index, next_hits in enumerate(moved_next_hits):
+                hit_index = int(next_hits[trigger_index + 1]) if trigger_index + 1 < count else count
+                be[s_index, b_index, o_index] = best_before(hit_index)
+
+    return basic, be
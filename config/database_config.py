@@ -1,9 +1,13 @@
 """
 Konfiguracja bazy danych
 """
+import os
 
-# Ścieżka do głównej bazy danych
-DB_PATH = r"C:\Users\anasy\AppData\Roaming\MetaQuotes\Terminal\7B8FFB3E490B2B8923BCC10180ACB2DC\MQL5\Files\multi_candles.db"
+# Ścieżka do głównej bazy danych (DZIENNIK_DB_PATH nadpisuje - np. tryb wsadowy na innej maszynie)
+DB_PATH = os.environ.get(
+    "DZIENNIK_DB_PATH",
+    r"C:\Users\anasy\AppData\Roaming\MetaQuotes\Terminal\7B8FFB3E490B2B8923BCC10180ACB2DC\MQL5\Files\multi_candles.db"
+)
 DB_PATH2 = r"C:\Users\Apollo\AppData\Roaming\MetaQuotes\Terminal\49CDDEAA95A409ED22BD2287BB67CB9C\MQL5\Files\multi_candles.db"
 
 
@@ -21,3 +25,44 @@ AVAILABLE_INSTRUMENTS = [
 
 # Nazwa tabeli dla wyników kalkulacji TP
 TP_RESULTS_TABLE = "tp_calculation_results"
+
+# Nazwa tabeli przebiegów kalkulacji TP (parametry, silnik, czasy)
+TP_RUNS_TABLE = "tp_calculation_runs"
+
+# Budżet pamięci cache świeczek dziennych (calculations/candle_cache.py) w MB
+CANDLE_CACHE_MAX_MB = 256
+
+# Katalog kolumnowego magazynu świeczek (database/columnar_store.py) - obok bazy EA
+CANDLE_STORE_DIR = os.path.join(os.path.dirname(DB_PATH), "candle_store")
+CANDLE_STORE_SYNC_ON_STARTUP = True  # Okno główne dopisuje nowe świeczki do magazynu w tle przy starcie
+
+# Nazwa tabeli profili wychyleń cenowych pozycji (calculations/excursion_profile.py)
+EXCURSION_PROFILES_TABLE = "tp_excursion_profiles"
+
+# Domyślna liczba procesów roboczych kalkulacji TP (1 = obliczenia szeregowe)
+TP_CALCULATION_WORKERS = 1
+
+# Potok wczytywania świeczek z wyprzedzeniem (calculations/prefetch_pipeline.py)
+TP_PREFETCH_DEPTH = 0    # Liczba pozycji ładowanych z wyprzedzeniem (0 = wyłączony)
+TP_PREFETCH_READERS = 2  # Liczba wątków czytających
+
+# Strumień wyników TP (calculations/tp_stream.py) - pozycje liczone i zapisywane jedną porcją
+# (mnożone przez liczbę procesów roboczych; pierwsza porcja to pozycja na proces, kolejne rosną dwukrotnie)
+TP_STREAM_CHUNK_SIZE = 50
+
+# Statystyki wyników TP (calculations/statistics.py)
+TP_STATS_TARGETS = (5, 10, 15, 20, 30, 50)  # Poziomy TP (punkty) dla trafień i wartości oczekiwanej
+TP_STATS_PERCENTILES = (25, 75, 90)         # Percentyle TP obok mediany
+
+# Optymalizacja stałego TP (calculations/tp_optimizer.py)
+TP_OPTIMIZER_GROUP_BY = ("setup", "instrument", "trends", "trendl")  # Grupy - kombinacje wartości
+TP_OPTIMIZER_MIN_POSITIONS = 10  # Grupy z mniejszą liczbą pozycji są pomijane
+
+# Cache wyników TP (calculations/result_cache.py)
+TP_RESULT_CACHE_MAX_ENTRIES = 50000  # Maksymalna liczba wyników w pamięci
+
+# Śledzenie obliczeń (utils/trace.py) - poziomy: trace, debug, info, warning, error, off
+TRACE_CONSOLE_LEVEL = os.environ.get("DZIENNIK_TRACE_LEVEL", "info")  # Co trafia na konsolę
+TRACE_BUFFER_LEVEL = "off"         # Co trafia do bufora per ticket (trace = każda świeczka)
+TRACE_BUFFER_TICKETS = 200         # Liczba ticketów pamiętanych w buforze
+TRACE_BUFFER_LINES_PER_TICKET = 5000  # Maksymalna liczba linii na ticket (najstarsze wypadają)
@@ -0,0 +1,69 @@
+"""
+Wspólne dane testowe - baza świeczek, tabela positions i parametry kalkulacji TP
+
+Ładowany automatycznie przez pytest; testy uruchamiane bezpośrednio
+(python test_*.py) importują go jak zwykły moduł (katalog główny w PATH).
+"""
+import sqlite3
+
+from config.instrument_tickets_config import get_instrument_tickets_config
+from utils.date_utils import get_day_start_unix
+
+DAY_START = get_day_start_unix(1700000000)
+
+
+def create_test_database(path, table="ger40.cash", days=2):
+    """Tworzy bazę z tabelą świeczek minutowych dla kilku dni"""
+    conn = sqlite3.connect(path)
+    conn.execute(f"""
+        CREATE TABLE `{table}` (
+            time INTEGER PRIMARY KEY, open REAL, high REAL, low REAL, close REAL,
+            tick_volume INTEGER, spread INTEGER, real_volume INTEGER
+        )
+    """)
+    rows = []
+    price = 15000.0
+    for minute in range(days * 1440):
+        close = price + ((minute * 7) % 11 - 5)
+        rows.append((DAY_START + minute * 60, price, max(price, close) + 2, min(price, close) - 2,
+                     close, 10 + minute % 5, 1, 0))
+        price = close
+    conn.executemany(f"INSERT INTO `{table}` VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def add_positions(db_path, rng, tickets):
+    """Dodaje pozycje (tabela positions jak u EA) i zwraca je jako krotki"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS positions (
+            open_time INTEGER, ticket INTEGER, type TEXT, volume REAL, symbol TEXT,
+            open_price REAL, sl REAL, sl_recznie REAL, setup TEXT, trends INTEGER, trendl INTEGER
+        )
+    """)
+    rows = []
+    for ticket in tickets:
+        open_time = DAY_START + rng.randint(0, 2 * 86400 - 600)
+        rows.append((open_time, ticket, rng.choice(["buy", "sell"]), 1.0, "ger40.cash\x00",
+                     15000 + rng.uniform(-3, 3), None, None, "test", (1, -1, None)[ticket % 3], ticket % 2 or None))
+    conn.executemany("INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def make_params(*sl_types, workers=None):
+    """
+    Parametry calculate_tp_* / iter_tp_*: SL stały 6 pkt dla instrumentu ger40.cash, BE 4/1, spread 0.5
+
+    Args:
+        sl_types: Włączone typy SL (domyślnie tylko sl_staly)
+        workers: Liczba procesów (None = bez klucza, domyślna kalkulatora)
+    """
+    main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+    params = dict(sl_types={sl_type: True for sl_type in sl_types or ("sl_staly",)},
+                  sl_staly_values={main_instrument: 6}, be_prog=4, be_offset=1, spread=0.5)
+    if workers is not None:
+        params["workers"] = workers
+    return params
@@ -0,0 +1,228 @@
+"""
+Kolumnowy magazyn świeczek w plikach mapowanych w pamięci (np.memmap)
+
+Układ na dysku (katalog CANDLE_STORE_DIR):
+    <tabela>/time.i8, open.f8, high.f8, low.f8, close.f8, spread.i8
+    <tabela>/meta.json - liczba świeczek i watermark (czas ostatniej świeczki)
+
+Magazyn jest synchronizowany przyrostowo z tabel SQLite tworzonych przez EA
+(tylko świeczki nowsze niż watermark). Odczyt zwraca widoki bez kopiowania.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, Optional, Tuple
+from config.database_config import CANDLE_STORE_DIR
+
+# Kolumny magazynu i ich typy
+STORE_COLUMNS = {
+    'time': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'spread': np.int64,
+}
+
+_FILE_SUFFIX = {np.int64: 'i8', np.float64: 'f8'}
+
+# Liczba wierszy czytanych z SQLite na jedną porcję podczas synchronizacji
+SYNC_BATCH_ROWS = 100000
+
+
+class ColumnarCandleStore:
+    """Magazyn kolumnowy świeczek - jeden plik na instrument i kolumnę"""
+
+    def __init__(self, root_dir: str = CANDLE_STORE_DIR):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[int, Dict[str, np.ndarray]]] = {}
+
+    @staticmethod
+    def _dir_name(table_name: str) -> str:
+        """Nazwa katalogu instrumentu (bez znaków niedozwolonych w nazwach plików)"""
+        cleaned = table_name.replace('\x00', '').strip()
+        return "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in cleaned)
+
+    def _table_dir(self, table_name: str) -> str:
+        return os.path.join(self.root_dir, self._dir_name(table_name))
+
+    def _column_path(self, table_name: str, column: str) -> str:
+        suffix = _FILE_SUFFIX[STORE_COLUMNS[column]]
+        return os.path.join(self._table_dir(table_name), f"{column}.{suffix}")
+
+    def _meta_path(self, table_name: str) -> str:
+        return os.path.join(self._table_dir(table_name), "meta.json")
+
+    def read_meta(self, table_name: str) -> Dict:
+        """Zwraca metadane instrumentu (count, watermark) lub pusty słownik"""
+        try:
+            with open(self._meta_path(table_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def has_table(self, table_name: str) -> bool:
+        """Czy magazyn zawiera dane dla tabeli"""
+        return self.read_meta(table_name).get('count', 0) > 0
+
+    def sync_table(self, connection: sqlite3.Connection, table_name: str) -> int:
+        """
+        Dopisuje do magazynu świeczki nowsze niż watermark
+
+        Args:
+            connection: Połączenie z bazą świeczek EA
+            table_name: Prawdziwa nazwa tabeli (np. "ger40.cash")
+
+        Returns:
+            Liczba dopisanych świeczek
+        """
+        sync_started = int(time.time())
+        with self._lock:
+            os.makedirs(self._table_dir(table_name), exist_ok=True)
+            meta = self.read_meta(table_name)
+            count = meta.get('count', 0)
+            watermark = meta.get('watermark')
+
+            # Dane niepełne (np. przerwany zapis) - przytnij pliki do liczby z meta
+            self._truncate_to(table_name, count)
+
+            columns = ", ".join(STORE_COLUMNS)
+            query = f"SELECT {columns} FROM `{table_name}` WHERE time > ? ORDER BY time"
+            cursor = connection.cursor()
+            appended = 0
+            try:
+                cursor.execute(query, (watermark if watermark is not None else -1,))
+                while True:
+                    rows = cursor.fetchmany(SYNC_BATCH_ROWS)
+                    if not rows:
+                        break
+                    self._append_rows(table_name, rows)
+                    appended += len(rows)
+                    count += len(rows)
+                    watermark = rows[-1][0]
+            finally:
+                cursor.close()
+
+            # synced_at - dane do tej chwili są w magazynie kompletne (także gdy nic nie dopisano)
+            self._write_meta(table_name, {'table': table_name, 'count': count, 'watermark': watermark,
+                                          'synced_at': sync_started})
+            if appended:
+                self._maps.pop(table_name, None)  # Mapowanie do odświeżenia
+
+            return appended
+
+    def _append_rows(self, table_name: str, rows):
+        """Dopisuje porcję wierszy na koniec plików kolumn"""
+        for index, (column, dtype) in enumerate(STORE_COLUMNS.items()):
+            values = np.fromiter((row[index] or 0 for row in rows), dtype=dtype, count=len(rows))
+            with open(self._column_path(table_name, column), 'ab') as f:
+                f.write(values.tobytes())
+
+    def _truncate_to(self, table_name: str, count: int):
+        """Przycina pliki kolumn do count elementów"""
+        for column, dtype in STORE_COLUMNS.items():
+            path = self._column_path(table_name, column)
+            expected = count * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != expected:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+
+    def _write_meta(self, table_name: str, meta: Dict):
+        """Zapisuje metadane atomowo (plik tymczasowy + zamiana)"""
+        path = self._meta_path(table_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _get_columns(self, table_name: str) -> Optional[Dict[str, np.ndarray]]:
+        """Zwraca zmapowane kolumny tabeli (mapowanie jest zapamiętywane)"""
+        meta = self.read_meta(table_name)
+        count = meta.get('count', 0)
+        if count == 0:
+            return None
+
+        with self._lock:
+            cached = self._maps.get(table_name)
+            if cached is not None and cached[0] == count:
+                return cached[1]
+
+            columns = {
+                column: np.memmap(self._column_path(table_name, column), dtype=dtype, mode='r', shape=(count,))
+                for column, dtype in STORE_COLUMNS.items()
+            }
+            self._maps[table_name] = (count, columns)
+            return columns
+
+    def get_range(self, table_name: str, start_time: int, end_time: int) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Zwraca świeczki z przedziału start_time <= time <= end_time jako widoki kolumn
+
+        Returns:
+            Słownik kolumna -> tablica (widok memmap) lub None gdy magazyn
+            nie pokrywa przedziału (brak tabeli lub synchronizacja starsza niż end_time)
+        """
+        meta = self.read_meta(table_name)
+        if meta.get('watermark') is None:
+            return None
+        if max(meta['watermark'], meta.get('synced_at', 0)) < end_time:
+            return None  # Końcówka przedziału mogła jeszcze nie zostać zsynchronizowana
+
+        columns = self._get_columns(table_name)
+        if columns is None:
+            return None
+
+        times = columns['time']
+        i0 = int(np.searchsorted(times, start_time, side='left'))
+        i1 = int(np.searchsorted(times, end_time, side='right'))
+        return {column: values[i0:max(i0, i1)] for column, values in columns.items()}
+
+    def close(self):
+        """Zwalnia mapowania plików"""
+        with self._lock:
+            self._maps.clear()
+
+
+def sync_all_candle_tables(connection: sqlite3.Connection, store: Optional[ColumnarCandleStore] = None,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+    """
+    Synchronizuje magazyn ze wszystkimi tabelami świeczkowymi bazy
+
+    should_stop jest sprawdzane przed każdą tabelą - przerwana synchronizacja
+    zostawia magazyn spójny (tabele zsynchronizowane do końca albo wcale).
+
+    Returns:
+        Słownik tabela -> liczba dopisanych świeczek
+    """
+    from database.table_registry import CandleTableRegistry
+
+    store = store or ColumnarCandleStore()
+    registry = CandleTableRegistry()
+    registry.refresh_if_changed(connection)
+
+    synced = {}
+    for table_name in registry.get_candle_tables().values():
+        if should_stop is not None and should_stop():
+            print("[CandleStore] Synchronizacja przerwana")
+            break
+        try:
+            synced[table_name] = store.sync_table(connection, table_name)
+            print(f"[CandleStore] {table_name}: dopisano {synced[table_name]} świeczek")
+        except Exception as e:
+            print(f"[CandleStore] Błąd synchronizacji {table_name}: {e}")
+    return synced
+
+
+# Singleton instance - magazyn dla domyślnej bazy (DB_PATH)
+_store_instance: Optional[ColumnarCandleStore] = None
+
+def get_candle_store() -> ColumnarCandleStore:
+    """Zwraca singleton instance magazynu świeczek"""
+    global _store_instance
+    if _store_instance is None:
+        _store_instance = ColumnarCandleStore()
+    return _store_instance
@@ -0,0 +1,192 @@
+"""
+Zarządzanie indeksami schematu (positions, tabele świeczkowe, tp_calculation_results)
+
+Tabele tworzy EA, więc nie mają indeksów pod zapytania aplikacji. Manager
+sprawdza istniejące indeksy, tworzy brakujące, odświeża statystyki planera
+(ANALYZE / PRAGMA optimize) i raportuje EXPLAIN QUERY PLAN przed i po.
+"""
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+from database.connection import get_db_connection
+from database.queries import CandleQueries, PositionQueries, TPCalculationQueries
+from database.table_registry import CandleTableRegistry, normalize_symbol
+from config.database_config import POSITIONS_TABLE, TP_RESULTS_TABLE
+
+# Indeksy pod zapytania aplikacji: (nazwa, tabela, kolumny)
+# Kolumny nieistniejące w tabeli są obcinane (indeks na najdłuższym istniejącym prefiksie)
+INDEX_SPECS = [
+    # load_data: zakres open_time + filtry symbol/setup/trendy/magic (indeks pokrywający filtry)
+    ("idx_positions_open_time_filters", POSITIONS_TABLE,
+     ("open_time", "symbol", "setup", "trends", "trendl", "magic_number")),
+    # Zakres dat dla jednego instrumentu
+    ("idx_positions_symbol_open_time", POSITIONS_TABLE, ("symbol", "open_time")),
+    # get_positions_by_tickets, aktualizacje po ticket
+    ("idx_positions_ticket", POSITIONS_TABLE, ("ticket",)),
+    # Wyniki kalkulacji TP
+    ("idx_tp_results_ticket_date", TP_RESULTS_TABLE, ("ticket", "calculation_date")),
+    ("idx_tp_results_calculation_date", TP_RESULTS_TABLE, ("calculation_date",)),
+]
+
+# Limit wierszy próbkowanych przez ANALYZE na indeks (tabele świeczek są duże)
+ANALYSIS_LIMIT = 1000
+
+
+class IndexManager:
+    """Tworzy brakujące indeksy i raportuje plany zapytań"""
+
+    def __init__(self, connection: Optional[sqlite3.Connection] = None):
+        self._connection = connection
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        return get_db_connection().get_connection()
+
+    def _table_exists(self, table_name: str) -> bool:
+        rows = self._get_connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
+        ).fetchall()
+        return bool(rows)
+
+    def _table_columns(self, table_name: str) -> List[str]:
+        return [row[1] for row in self._get_connection().execute(f"PRAGMA table_info(`{table_name}`)")]
+
+    def _existing_index_columns(self, table_name: str) -> List[Tuple[str, ...]]:
+        """Zwraca kolumny istniejących indeksów (w tym INTEGER PRIMARY KEY jako rowid)"""
+        conn = self._get_connection()
+        indexes = []
+        for row in conn.execute(f"PRAGMA index_list(`{table_name}`)").fetchall():
+            index_name = row[1]
+            columns = tuple(info[2] for info in conn.execute(f"PRAGMA index_info(`{index_name}`)"))
+            indexes.append(columns)
+
+        # INTEGER PRIMARY KEY jest aliasem rowid - nie pojawia się w index_list
+        pk_columns = [c for c in conn.execute(f"PRAGMA table_info(`{table_name}`)").fetchall() if c[5] > 0]
+        if len(pk_columns) == 1 and str(pk_columns[0][2]).upper() == "INTEGER":
+            indexes.append((pk_columns[0][1],))
+        return indexes
+
+    def _is_covered(self, table_name: str, columns: Tuple[str, ...]) -> bool:
+        """Czy istniejący indeks zaczyna się od podanych kolumn"""
+        return any(existing[:len(columns)] == columns for existing in self._existing_index_columns(table_name))
+
+    def get_index_specs(self) -> List[Tuple[str, str, Tuple[str, ...]]]:
+        """Zwraca listę indeksów do zapewnienia (stałe + indeks time dla każdej tabeli świeczek)"""
+        specs = []
+        for index_name, table_name, columns in INDEX_SPECS:
+            if not self._table_exists(table_name):
+                continue
+            available = self._table_columns(table_name)
+            prefix = []
+            for column in columns:
+                if column not in available:
+                    break
+                prefix.append(column)
+            if prefix:
+                specs.append((index_name, table_name, tuple(prefix)))
+
+        for table_name in self._get_candle_tables():
+            safe_name = "".join(ch if ch.isalnum() else "_" for ch in normalize_symbol(table_name))
+            specs.append((f"idx_{safe_name}_time", table_name, ("time",)))
+        return specs
+
+    def _get_candle_tables(self) -> List[str]:
+        registry = CandleTableRegistry()
+        registry.refresh_if_changed(self._get_connection())
+        return sorted(registry.get_candle_tables().values())
+
+    def get_registered_queries(self) -> List[Tuple[str, str, tuple]]:
+        """Zwraca zapytania aplikacji (nazwa, SQL, parametry) do raportu planów"""
+        queries = []
+        if self._table_exists(POSITIONS_TABLE):
+            queries.append(("positions_date_range", PositionQueries.get_positions_by_date_range(), (0, 0)))
+            queries.append(("positions_date_range_symbol",
+                            PositionQueries.get_positions_by_date_range_and_symbol(), (0, 0, "")))
+            queries.append(("positions_by_tickets",
+                            f"SELECT * FROM {POSITIONS_TABLE} WHERE ticket IN (?, ?) ORDER BY open_time", (0, 0)))
+        if self._table_exists(TP_RESULTS_TABLE):
+            queries.append(("tp_results_by_date_range", TPCalculationQueries.get_tp_results_by_date_range(), ("", "")))
+            queries.append(("tp_results_by_ticket_date",
+                            f"SELECT * FROM {TP_RESULTS_TABLE} WHERE ticket = ? AND calculation_date = ?", (0, "")))
+        for table_name in self._get_candle_tables():
+            queries.append((f"candles {table_name}", CandleQueries.get_candles_by_time_range(table_name), (0, 0)))
+        return queries
+
+    def explain(self, query: str, params: tuple = ()) -> List[str]:
+        """Zwraca opis planu zapytania (kolumna detail z EXPLAIN QUERY PLAN)"""
+        rows = self._get_connection().execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        return [row[-1] for row in rows]
+
+    def _explain_all(self) -> Dict[str, List[str]]:
+        plans = {}
+        for name, query, params in self.get_registered_queries():
+            try:
+                plans[name] = self.explain(query, params)
+            except sqlite3.Error as e:
+                plans[name] = [f"błąd: {e}"]
+        return plans
+
+    def ensure_indexes(self, analyze: bool = True) -> Dict:
+        """
+        Tworzy brakujące indeksy i odświeża statystyki planera
+
+        Args:
+            analyze: Czy uruchomić ANALYZE po utworzeniu indeksów
+
+        Returns:
+            Raport: {'created': [...], 'skipped': [...], 'plans': {nazwa: {'before': [...], 'after': [...]}}}
+        """
+        conn = self._get_connection()
+        plans_before = self._explain_all()
+
+        created, skipped = [], []
+        for index_name, table_name, columns in self.get_index_specs():
+            if self._is_covered(table_name, columns):
+                skipped.append(index_name)
+                continue
+            column_list = ", ".join(columns)
+            try:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON `{table_name}` ({column_list})')
+                conn.commit()
+                created.append(index_name)
+                print(f"[IndexManager] Utworzono indeks {index_name} na {table_name}({column_list})")
+            except sqlite3.Error as e:
+                print(f"[IndexManager] Nie udało się utworzyć indeksu {index_name}: {e}")
+
+        if analyze:
+            try:
+                if created:
+                    conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+                    conn.execute("ANALYZE")
+                conn.execute("PRAGMA optimize")
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[IndexManager] Błąd odświeżania statystyk: {e}")
+
+        plans_after = self._explain_all()
+        plans = {name: {'before': plans_before.get(name, []), 'after': plans_after[name]}
+                 for name in plans_after}
+
+        print(f"[IndexManager] Utworzono {len(created)} indeksów, {len(skipped)} już istniało")
+        return {'created': created, 'skipped': skipped, 'plans': plans}
+
+    @staticmethod
+    def format_report(report: Dict) -> str:
+        """Formatuje raport planów zapytań do wyświetlenia"""
+        lines = [f"Utworzone indeksy: {', '.join(report['created']) or 'brak'}"]
+        for name, plan in report['plans'].items():
+            lines.append(f"{name}:")
+            lines.append(f"  przed: {' | '.join(plan['before'])}")
+            lines.append(f"  po:    {' | '.join(plan['after'])}")
+        return "\n".join(lines)
+
+
+# Singleton instance
+_index_manager_instance = None
+
+def get_index_manager():
+    """Zwraca singleton instance index managera"""
+    global _index_manager_instance
+    if _index_manager_instance is None:
+        _index_manager_instance = IndexManager()
+    return _index_manager_instance
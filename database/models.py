@@ -1,9 +1,10 @@
 """
 Modele danych reprezentujące struktury z bazy danych
 """
-from dataclasses import dataclass
+import numpy as np
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
 
 
 @dataclass
@@ -107,6 +108,133 @@ class Candle:
         return datetime.utcfromtimestamp(self.time)
 
 
+class CandleView:
+    """Lekki widok jednej świeczki z CandleSeries (bez __dict__)"""
+    __slots__ = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+    
+    def __init__(self, time, open, high, low, close, tick_volume=None, spread=None, real_volume=None):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.tick_volume = tick_volume
+        self.spread = spread
+        self.real_volume = real_volume
+    
+    @property
+    def datetime(self) -> datetime:
+        """Konwersja time na datetime"""
+        return datetime.utcfromtimestamp(self.time)
+    
+    def __repr__(self) -> str:
+        return (f"CandleView(time={self.time}, open={self.open}, high={self.high}, "
+                f"low={self.low}, close={self.close})")
+
+
+class CandleWindowOrigin(NamedTuple):
+    """Pochodzenie wycinka sięgającego końca dnia: klucz dnia, indeks pierwszej świeczki, seria dnia"""
+    key: tuple
+    offset: int
+    day: 'CandleSeries'
+
+
+@dataclass
+class CandleSeries:
+    """
+    Seria świeczek w zwartych tablicach kolumnowych (NumPy)
+    
+    Zastępuje listę obiektów Candle: wycinki nie kopiują danych, a iteracja
+    i indeksowanie zwracają lekkie widoki CandleView dla kodu, który
+    potrzebuje obiektów (pętle referencyjne, logi).
+    """
+    time: np.ndarray         # int64, posortowane rosnąco
+    open: np.ndarray         # float64
+    high: np.ndarray         # float64
+    low: np.ndarray          # float64
+    close: np.ndarray        # float64
+    tick_volume: np.ndarray  # int64 (NULL -> 0)
+    spread: np.ndarray       # int64 (NULL -> 0)
+    real_volume: np.ndarray  # int64 (NULL -> 0)
+    # Wycinek dnia (CandleSeries.day_window) - indeks zakresowy liczony raz na dzień, nie na pozycję
+    origin: Optional[CandleWindowOrigin] = field(default=None, compare=False, repr=False)
+    
+    @classmethod
+    def from_rows(cls, rows) -> 'CandleSeries':
+        """Tworzy serię z wierszy (time, open, high, low, close, tick_volume, spread, real_volume)"""
+        count = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 8
+        
+        def ints(values):
+            return np.fromiter((v or 0 for v in values), dtype=np.int64, count=count)
+        
+        def floats(values):
+            return np.fromiter(values, dtype=np.float64, count=count)
+        
+        return cls(
+            time=ints(columns[0]),
+            open=floats(columns[1]),
+            high=floats(columns[2]),
+            low=floats(columns[3]),
+            close=floats(columns[4]),
+            tick_volume=ints(columns[5]) if len(columns) > 5 else np.zeros(count, dtype=np.int64),
+            spread=ints(columns[6]) if len(columns) > 6 else np.zeros(count, dtype=np.int64),
+            real_volume=ints(columns[7]) if len(columns) > 7 else np.zeros(count, dtype=np.int64)
+        )
+    
+    @classmethod
+    def empty(cls) -> 'CandleSeries':
+        """Pusta seria"""
+        return cls.from_rows([])
+    
+    def __len__(self) -> int:
+        return len(self.time)
+    
+    def __iter__(self) -> Iterator[CandleView]:
+        rows = zip(self.time.tolist(), self.open.tolist(), self.high.tolist(), self.low.tolist(),
+                   self.close.tolist(), self.tick_volume.tolist(), self.spread.tolist(),
+                   self.real_volume.tolist())
+        for row in rows:
+            yield CandleView(*row)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[CandleView, 'CandleSeries']:
+        if isinstance(index, slice):
+            return CandleSeries(*(column[index] for column in self._columns()))
+        return CandleView(*(column[index].item() for column in self._columns()))
+    
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (self.time, self.open, self.high, self.low, self.close,
+                self.tick_volume, self.spread, self.real_volume)
+    
+    @property
+    def nbytes(self) -> int:
+        """Rozmiar danych w bajtach (do budżetu pamięci)"""
+        return sum(column.nbytes for column in self._columns())
+    
+    def slice(self, start: int, stop: int) -> 'CandleSeries':
+        """Zwraca widok świeczek [start, stop) bez kopiowania danych"""
+        return self[start:stop]
+    
+    def window_bounds(self, start_time: int, end_time: int) -> Tuple[int, int]:
+        """Zwraca indeksy [i0, i1) świeczek z przedziału start_time <= time <= end_time"""
+        i0 = int(np.searchsorted(self.time, start_time, side='left'))
+        i1 = int(np.searchsorted(self.time, end_time, side='right'))
+        return i0, max(i0, i1)
+    
+    def window(self, start_time: int, end_time: int) -> 'CandleSeries':
+        """Zwraca widok świeczek z przedziału start_time <= time <= end_time"""
+        i0, i1 = self.window_bounds(start_time, end_time)
+        return self[i0:i1]
+    
+    def day_window(self, key: tuple, start_time: int, end_time: int) -> 'CandleSeries':
+        """Jak window(), ale wycinek do końca serii (dnia) pamięta klucz dnia i przesunięcie (origin)"""
+        i0, i1 = self.window_bounds(start_time, end_time)
+        window = self[i0:i1]
+        if i1 == len(self):
+            window.origin = CandleWindowOrigin(key, i0, self)
+        return window
+
+
 @dataclass
 class TPCalculationResult:
     """Model reprezentujący wynik kalkulacji TP"""
@@ -126,3 +254,11 @@ class TPCalculationResult:
     spread: Optional[float] = None
     calculation_date: Optional[str] = None
     notes: Optional[str] = None
+    # Klucz cache wyników (calculations/result_cache.py)
+    param_hash: Optional[str] = None
+    candle_version: Optional[str] = None
+    # SL z bazy (position.sl) użyty dla sl_baza - walidacja wyniku z cache
+    sl_baza_value: Optional[float] = None
+    # Trendy pozycji - grupowanie optymalizacji TP (calculations/tp_optimizer.py), poza tabelą wyników
+    trends: Optional[int] = None
+    trendl: Optional[int] = None
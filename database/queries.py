@@ -1,12 +1,83 @@
 """
 Zapytania SQL dla aplikacji
 """
-from config.database_config import POSITIONS_TABLE, TP_RESULTS_TABLE
+from config.database_config import POSITIONS_TABLE, TP_RESULTS_TABLE, TP_RUNS_TABLE, EXCURSION_PROFILES_TABLE
 
 
 class PositionQueries:
     """Zapytania związane z pozycjami"""
     
+    # Tryby filtra "Wątpliwe trejdy" (jak w oknie głównym)
+    SUSPICIOUS_ALL = "nieaktywny"
+    SUSPICIOUS_ONLY = "tylko wątpliwe"
+    SUSPICIOUS_HIDE = "nie pokazuj wątpliwych"
+    SUSPICIOUS_MAGIC_NUMBER = 7
+    
+    @staticmethod
+    def build_filtered_positions_query(columns, start_unix, end_unix, symbols=None, setups=None,
+                                       trends=None, trendl=None, suspicious=SUSPICIOUS_ALL):
+        """
+        Buduje zapytanie pobierające pozycje z filtrami okna głównego
+        
+        Args:
+            columns: Kolumny (lista lub tekst)
+            start_unix, end_unix: Zakres open_time
+            symbols: Instrumenty (None = wszystkie; dopasowanie z i bez \\x00)
+            setups: Setupy (None = bez filtra, pusta lista = brak wyników)
+            trends, trendl: Wartości trendów - liczby lub "NULL" (None = bez filtra)
+            suspicious: Tryb filtra wątpliwych trejdów (SUSPICIOUS_*)
+        
+        Returns:
+            Krotka (zapytanie, parametry)
+        """
+        if isinstance(columns, list):
+            columns = ", ".join(columns)
+        
+        params = [start_unix, end_unix]
+        where_conditions = ["open_time BETWEEN ? AND ?"]
+        
+        if symbols is not None:
+            # Uwzględnij oba formaty nazw (z i bez \x00)
+            expanded_symbols = []
+            for clean_symbol in symbols:
+                expanded_symbols.append(clean_symbol)
+                expanded_symbols.append(clean_symbol + '\x00')
+            placeholders = ", ".join(["?" for _ in expanded_symbols])
+            where_conditions.append(f"symbol IN ({placeholders})" if expanded_symbols else "0")
+            params.extend(expanded_symbols)
+        
+        if setups is not None:
+            placeholders = ", ".join(["?" for _ in setups])
+            where_conditions.append(f"setup IN ({placeholders})" if setups else "0")
+            params.extend(setups)
+        
+        for column, values in (("trends", trends), ("trendl", trendl)):
+            if not values:
+                continue
+            trend_conditions = []
+            for trend_val in values:
+                if trend_val is None or str(trend_val) == "NULL":
+                    trend_conditions.append(f"{column} IS NULL")
+                else:
+                    trend_conditions.append(f"{column} = ?")
+                    params.append(int(trend_val))
+            where_conditions.append(f"({' OR '.join(trend_conditions)})")
+        
+        if suspicious == PositionQueries.SUSPICIOUS_ONLY:
+            where_conditions.append("magic_number = ?")
+            params.append(PositionQueries.SUSPICIOUS_MAGIC_NUMBER)
+        elif suspicious == PositionQueries.SUSPICIOUS_HIDE:
+            where_conditions.append("(magic_number IS NULL OR magic_number != ?)")
+            params.append(PositionQueries.SUSPICIOUS_MAGIC_NUMBER)
+        
+        query = f"""
+        SELECT {columns}
+        FROM {POSITIONS_TABLE} 
+        WHERE {" AND ".join(where_conditions)}
+        ORDER BY open_time
+        """
+        return query, params
+    
     @staticmethod
     def get_positions_by_date_range(columns=None):
         """Zapytanie pobierające pozycje z zakresu dat"""
@@ -37,6 +108,21 @@ class PositionQueries:
         ORDER BY open_time
         """
     
+    @staticmethod
+    def get_positions_after_time(columns=None):
+        """Zapytanie pobierające pozycje otwarte po podanym czasie (watermark)"""
+        if columns is None:
+            columns = "*"
+        elif isinstance(columns, list):
+            columns = ", ".join(columns)
+            
+        return f"""
+        SELECT {columns}
+        FROM {POSITIONS_TABLE} 
+        WHERE open_time > ?
+        ORDER BY open_time
+        """
+    
     @staticmethod
     def update_position():
         """Zapytanie aktualizujące pozycję"""
@@ -71,6 +157,73 @@ class CandleQueries:
         ORDER BY time
         """
     
+    @staticmethod
+    def get_first_candle_time_from(instrument):
+        """Zapytanie zwracające czas pierwszej świecy od określonego czasu (jeden odczyt indeksu)"""
+        return f"""
+        SELECT time
+        FROM `{instrument}`
+        WHERE time >= ?
+        ORDER BY time
+        LIMIT 1
+        """
+    
+    @staticmethod
+    def get_first_candle_in_range(instrument):
+        """Zapytanie zwracające pierwszą świecę z zakresu czasowego (świeczka otwarcia pozycji)"""
+        return f"""
+        SELECT time, high, low, close
+        FROM `{instrument}`
+        WHERE time BETWEEN ? AND ?
+        ORDER BY time
+        LIMIT 1
+        """
+    
+    @staticmethod
+    def get_first_time_low_at_or_below(instrument):
+        """Zapytanie zwracające czas pierwszej świecy z low <= poziom w przedziale (od, do]"""
+        return f"""
+        SELECT MIN(time)
+        FROM `{instrument}`
+        WHERE time > ? AND time <= ? AND low <= ?
+        """
+    
+    @staticmethod
+    def get_first_time_high_at_or_above(instrument):
+        """Zapytanie zwracające czas pierwszej świecy z high >= poziom w przedziale (od, do]"""
+        return f"""
+        SELECT MIN(time)
+        FROM `{instrument}`
+        WHERE time > ? AND time <= ? AND high >= ?
+        """
+    
+    @staticmethod
+    def get_max_high_in_range(instrument):
+        """Zapytanie zwracające najwyższe high w przedziale (od, do)"""
+        return f"""
+        SELECT MAX(high)
+        FROM `{instrument}`
+        WHERE time > ? AND time < ?
+        """
+    
+    @staticmethod
+    def get_min_low_in_range(instrument):
+        """Zapytanie zwracające najniższe low w przedziale (od, do)"""
+        return f"""
+        SELECT MIN(low)
+        FROM `{instrument}`
+        WHERE time > ? AND time < ?
+        """
+    
+    @staticmethod
+    def get_candle_version(instrument):
+        """Zapytanie zwracające liczbę świec i czas ostatniej w zakresie (wersja danych dnia)"""
+        return f"""
+        SELECT COUNT(*), MAX(time)
+        FROM `{instrument}`
+        WHERE time BETWEEN ? AND ?
+        """
+    
     @staticmethod
     def check_table_exists():
         """Zapytanie sprawdzające czy tabela istnieje"""
@@ -80,6 +233,8 @@ class CandleQueries:
 class TPCalculationQueries:
     """Zapytania związane z kalkulacją TP"""
     
+    RESULTS_UNIQUE_INDEX = "idx_tp_results_param_ticket_unique"
+    
     @staticmethod
     def create_tp_results_table():
         """Zapytanie tworzące tabelę wyników kalkulacji TP"""
@@ -102,20 +257,137 @@ class TPCalculationQueries:
             spread REAL,
             calculation_date TEXT,
             notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            param_hash TEXT,
+            candle_version TEXT,
+            run_id INTEGER,
+            sl_baza_value REAL
+        )
+        """
+    
+    @staticmethod
+    def create_tp_runs_table():
+        """Zapytanie tworzące tabelę przebiegów kalkulacji (parametry, silnik, czasy)"""
+        return f"""
+        CREATE TABLE IF NOT EXISTS {TP_RUNS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            param_hash TEXT NOT NULL,
+            engine TEXT,
+            sl_types TEXT,
+            sl_staly_values TEXT,
+            be_prog REAL,
+            be_offset REAL,
+            spread REAL,
+            calculation_date TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            result_count INTEGER
         )
         """
     
+    @staticmethod
+    def insert_tp_run():
+        """Zapytanie wstawiające przebieg kalkulacji"""
+        return f"""
+        INSERT INTO {TP_RUNS_TABLE}
+        (param_hash, engine, sl_types, sl_staly_values, be_prog, be_offset, spread,
+         calculation_date, started_at, finished_at, result_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+    
+    @staticmethod
+    def finish_tp_run():
+        """Zapytanie aktualizujące koniec i liczbę wyników przebiegu (zapis porcjami)"""
+        return f"UPDATE {TP_RUNS_TABLE} SET finished_at = ?, result_count = ? WHERE id = ?"
+
+    @staticmethod
+    def get_tp_results_columns():
+        """Zapytanie zwracające kolumny tabeli wyników (migracja starszych baz)"""
+        return f"PRAGMA table_info({TP_RESULTS_TABLE})"
+    
+    @staticmethod
+    def add_tp_results_column(column, column_type):
+        """Zapytanie dodające kolumnę do tabeli wyników"""
+        return f"ALTER TABLE {TP_RESULTS_TABLE} ADD COLUMN {column} {column_type}"
+    
+    @staticmethod
+    def drop_tp_results_cache_index():
+        """Zapytanie usuwające dawny nieunikalny indeks (param_hash, ticket)"""
+        return "DROP INDEX IF EXISTS idx_tp_results_param_ticket"
+    
+    @staticmethod
+    def deduplicate_tp_results():
+        """Zapytanie usuwające powtórzone wyniki (param_hash, ticket) - zostaje najnowszy"""
+        return f"""
+        DELETE FROM {TP_RESULTS_TABLE}
+        WHERE param_hash IS NOT NULL
+          AND id NOT IN (
+              SELECT MAX(id) FROM {TP_RESULTS_TABLE}
+              WHERE param_hash IS NOT NULL
+              GROUP BY param_hash, ticket
+          )
+        """
+    
+    @staticmethod
+    def create_tp_results_unique_index():
+        """Zapytanie tworzące unikalny indeks wyników (param_hash, ticket) - klucz upsertu i cache"""
+        return (f"CREATE UNIQUE INDEX IF NOT EXISTS {TPCalculationQueries.RESULTS_UNIQUE_INDEX} "
+                f"ON {TP_RESULTS_TABLE} (param_hash, ticket)")
+    
+    @staticmethod
+    def check_index_exists():
+        """Zapytanie sprawdzające istnienie indeksu (parametr: nazwa)"""
+        return "SELECT name FROM sqlite_master WHERE type='index' AND name=?"
+    
+    @staticmethod
+    def get_cached_tp_results(count):
+        """Zapytanie pobierające zapisane wyniki dla hasha parametrów i listy ticketów (najnowsze pierwsze)"""
+        placeholders = ", ".join("?" for _ in range(count))
+        return f"""
+        SELECT ticket, open_price, open_time, position_type, symbol, setup,
+               max_tp_sl_staly, max_tp_sl_recznie, max_tp_sl_be,
+               sl_staly_value, sl_recznie_value, be_prog, be_offset, spread,
+               calculation_date, notes, param_hash, candle_version, sl_baza_value
+        FROM {TP_RESULTS_TABLE}
+        WHERE param_hash = ? AND ticket IN ({placeholders})
+        ORDER BY id DESC
+        """
+    
     @staticmethod
     def insert_tp_result():
-        """Zapytanie wstawiające wynik kalkulacji TP"""
+        """
+        Zapytanie zapisujące wynik kalkulacji TP
+        
+        Upsert po (param_hash, ticket) - ponowne obliczenie z tymi samymi
+        parametrami nadpisuje wiersz zamiast dodawać nowy.
+        """
         return f"""
         INSERT INTO {TP_RESULTS_TABLE} 
         (ticket, open_price, open_time, position_type, symbol, setup,
          max_tp_sl_staly, max_tp_sl_recznie, max_tp_sl_be,
          sl_staly_value, sl_recznie_value, be_prog, be_offset, spread,
-         calculation_date, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+         calculation_date, notes, param_hash, candle_version, run_id, sl_baza_value)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (param_hash, ticket) DO UPDATE SET
+            open_price = excluded.open_price,
+            open_time = excluded.open_time,
+            position_type = excluded.position_type,
+            symbol = excluded.symbol,
+            setup = excluded.setup,
+            max_tp_sl_staly = excluded.max_tp_sl_staly,
+            max_tp_sl_recznie = excluded.max_tp_sl_recznie,
+            max_tp_sl_be = excluded.max_tp_sl_be,
+            sl_staly_value = excluded.sl_staly_value,
+            sl_recznie_value = excluded.sl_recznie_value,
+            be_prog = excluded.be_prog,
+            be_offset = excluded.be_offset,
+            spread = excluded.spread,
+            calculation_date = excluded.calculation_date,
+            notes = excluded.notes,
+            candle_version = excluded.candle_version,
+            run_id = excluded.run_id,
+            sl_baza_value = excluded.sl_baza_value,
+            created_at = CURRENT_TIMESTAMP
         """
     
     @staticmethod
@@ -131,3 +403,61 @@ class TPCalculationQueries:
     def delete_tp_results_by_ticket():
         """Zapytanie usuwające wyniki kalkulacji dla konkretnego ticket"""
         return f"DELETE FROM {TP_RESULTS_TABLE} WHERE ticket = ?"
+
+
+class ExcursionProfileQueries:
+    """Zapytania związane z profilami wychyleń cenowych pozycji"""
+    
+    @staticmethod
+    def create_profiles_table():
+        """Zapytanie tworzące tabelę profili"""
+        return f"""
+        CREATE TABLE IF NOT EXISTS {EXCURSION_PROFILES_TABLE} (
+            ticket INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            open_time INTEGER NOT NULL,
+            position_type INTEGER NOT NULL,
+            open_price REAL NOT NULL,
+            candle_count INTEGER NOT NULL,
+            max_profit REAL,
+            record_prices BLOB,
+            record_mfe BLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    
+    @staticmethod
+    def create_open_time_index():
+        """Zapytanie tworzące indeks po open_time (watermark)"""
+        return f"CREATE INDEX IF NOT EXISTS idx_excursion_profiles_open_time ON {EXCURSION_PROFILES_TABLE} (open_time)"
+    
+    @staticmethod
+    def get_watermark():
+        """Zapytanie zwracające open_time ostatniej zapisanej pozycji"""
+        return f"SELECT MAX(open_time) FROM {EXCURSION_PROFILES_TABLE}"
+    
+    @staticmethod
+    def get_tickets_without_candles():
+        """Zapytanie zwracające tickety z profilem bez świeczek (do ponownej budowy)"""
+        return f"SELECT ticket FROM {EXCURSION_PROFILES_TABLE} WHERE candle_count = 0"
+    
+    @staticmethod
+    def upsert_profile():
+        """Zapytanie zapisujące profil (nadpisuje istniejący dla ticketu)"""
+        return f"""
+        INSERT OR REPLACE INTO {EXCURSION_PROFILES_TABLE}
+        (ticket, symbol, open_time, position_type, open_price, candle_count,
+         max_profit, record_prices, record_mfe)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+    
+    @staticmethod
+    def get_profiles_by_tickets(count):
+        """Zapytanie pobierające profile dla listy ticketów"""
+        placeholders = ", ".join("?" for _ in range(count))
+        return f"""
+        SELECT ticket, symbol, open_time, position_type, open_price, candle_count,
+               max_profit, record_prices, record_mfe
+        FROM {EXCURSION_PROFILES_TABLE}
+        WHERE ticket IN ({placeholders})
+        """
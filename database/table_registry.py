@@ -0,0 +1,72 @@
+"""
+Rejestr tabel świeczkowych - mapowanie symboli na prawdziwe nazwy tabel
+"""
+import sqlite3
+from typing import Dict, Optional, Set
+
+
+def normalize_symbol(name: str) -> str:
+    """Normalizuje nazwę symbolu/tabeli (małe litery, bez null bytes i spacji)"""
+    return name.lower().replace('\x00', '').strip()
+
+
+def is_candle_table(name: str) -> bool:
+    """Czy tabela wygląda na tabelę świeczkową EA (np. 'ger40.cash', 'XAUUSD')"""
+    lowered = name.lower()
+    return 'cash' in lowered or 'xauusd' in lowered
+
+
+class CandleTableRegistry:
+    """
+    Rejestr tabel świeczkowych budowany raz na połączenie
+
+    Mapuje znormalizowane symbole (w tym warianty z '\\x00' i różną wielkością
+    liter) na prawdziwe nazwy tabel. Katalog (sqlite_master) jest czytany
+    ponownie tylko gdy zmieni się PRAGMA schema_version.
+    """
+
+    def __init__(self):
+        self._schema_version: Optional[int] = None
+        self._all_tables: Set[str] = set()
+        self._candle_tables: Dict[str, str] = {}
+
+    def resolve(self, connection: sqlite3.Connection, instrument: str) -> Optional[str]:
+        """
+        Zwraca prawdziwą nazwę tabeli dla instrumentu lub None
+
+        Args:
+            connection: Połączenie SQLite, dla którego prowadzony jest rejestr
+            instrument: Nazwa instrumentu (np. "GER40.cash " lub "ger40.cash\\x00")
+        """
+        self.refresh_if_changed(connection)
+
+        # Najpierw dokładna nazwa, potem dopasowanie znormalizowane
+        if instrument in self._all_tables:
+            return instrument
+        return self._candle_tables.get(normalize_symbol(instrument))
+
+    def refresh_if_changed(self, connection: sqlite3.Connection):
+        """Przebudowuje rejestr jeśli schemat bazy się zmienił"""
+        schema_version = connection.execute("PRAGMA schema_version").fetchone()[0]
+        if schema_version != self._schema_version:
+            self._rebuild(connection, schema_version)
+
+    def _rebuild(self, connection: sqlite3.Connection, schema_version: int):
+        """Czyta listę tabel z sqlite_master"""
+        rows = connection.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        self._all_tables = {row[0] for row in rows}
+        self._candle_tables = {}
+        for name in sorted(self._all_tables):
+            if is_candle_table(name):
+                self._candle_tables.setdefault(normalize_symbol(name), name)
+        self._schema_version = schema_version
+        print(f"CandleTableRegistry: Zarejestrowano {len(self._candle_tables)} tabel świeczkowych "
+              f"(schema_version={schema_version})")
+
+    def get_candle_tables(self) -> Dict[str, str]:
+        """Zwraca mapowanie znormalizowany symbol -> nazwa tabeli"""
+        return dict(self._candle_tables)
+
+    def invalidate(self):
+        """Wymusza przebudowę przy następnym zapytaniu (np. po zmianie połączenia)"""
+        self._schema_version = None
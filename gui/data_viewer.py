@@ -5,18 +5,22 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import date, timedelta
 import csv
+import os
 from tkcalendar import DateEntry
 from config.field_definitions import (
-    TEXT_FIELDS, CHECKBOX_FIELDS, ALL_FIELDS, COLUMNS, 
-    COLUMN_HEADERS, COLUMN_WIDTHS, COLUMN_ALIGNMENTS, SETUP_SHORTCUTS
+    CHECKBOX_FIELDS, COLUMNS, COLUMN_HEADERS, COLUMN_WIDTHS, COLUMN_ALIGNMENTS
 )
-from config.database_config import AVAILABLE_INSTRUMENTS
-from database.connection import execute_query, execute_update
+from config.database_config import AVAILABLE_INSTRUMENTS, CANDLE_STORE_SYNC_ON_STARTUP, DB_PATH
+from database.connection import execute_query
 from database.queries import PositionQueries
-from gui.widgets.custom_entries import SetupEntry
+from gui.jobs import JobScheduler
+from gui.widgets.tp_statistics_view import TPStatisticsView
+from gui.widgets.tp_optimizer_view import TPOptimizerView
+from calculations.statistics import compute_statistics
 from utils.date_utils import date_range_to_unix, format_time_for_display
 from utils.formatting import format_profit_points, format_checkbox_value
 from database.migration.sl_opening_migrator import get_sl_migrator
+from database.migration.index_manager import get_index_manager
 from monitoring.order_monitor import get_order_monitor
 from config.monitor_config import DEFAULT_MONITOR_SETTINGS
 from config.setup_config import get_setup_config
@@ -198,6 +202,9 @@ class CheckboxDropdown:
 class DataViewer:
     """Przeglądarka danych transakcji"""
     
+    # Zadania uruchamiane przez użytkownika - przycisk "Anuluj" (bez zadań utrzymaniowych, np. synchronizacji)
+    VIEW_JOB_KEYS = ("load_data", "export", "tp_calculation", "diagnostics")
+    
     def __init__(self, parent):
         self.parent = parent
         self.position_queries = PositionQueries()
@@ -215,6 +222,10 @@ class DataViewer:
         self.order_monitor = get_order_monitor()
         self.order_monitor.add_new_order_callback(self._on_new_order_detected)
         
+        # Zadania w tle (wczytywanie, kalkulacja TP, eksport, diagnostyka)
+        self.jobs = JobScheduler(self.parent)
+        self._job_progress_running = False
+        
         self._create_widgets()
         self._setup_layout()
         
@@ -488,6 +499,20 @@ class DataViewer:
         )
         self.edit_status_label.pack(padx=10, pady=5)
         
+        # Pasek zadań w tle - postęp i anulowanie
+        self.job_status_frame = ttk.Frame(self.parent)
+        self.job_status_frame.pack(fill="x", padx=10, pady=(0, 5))
+        
+        self.job_cancel_button = ttk.Button(
+            self.job_status_frame, text="Anuluj", command=self._cancel_jobs, state="disabled"
+        )
+        self.job_cancel_button.pack(side="right", padx=5)
+        self.job_progress = ttk.Progressbar(self.job_status_frame, mode='determinate', length=200)
+        self.job_progress.pack(side="right", padx=5)
+        self.job_status_label = ttk.Label(self.job_status_frame, text="", foreground="gray")
+        self.job_status_label.pack(side="left", padx=5)
+        self.jobs.add_listener(self._on_job_state)
+        
         # Sprawdzaj status co 1 sekundę
         self._update_edit_status()
         self.parent.after(1000, self._update_edit_status_loop)
@@ -588,12 +613,56 @@ class DataViewer:
     
 
     def _show_symbol_diagnostics(self):
-        """Pokazuje diagnostykę symbolów z bazy danych"""
-        try:
-            # Pobierz wszystkie symbole z bazy (nie unikalne)
-            query = "SELECT symbol, COUNT(*) as count FROM positions GROUP BY symbol ORDER BY symbol"
-            rows = execute_query(query)
+        """Pokazuje diagnostykę symbolów z bazy danych (zapytanie i analiza w tle)"""
+        self.jobs.submit(
+            "diagnostics",
+            lambda job: self._build_symbol_diagnostics(),
+            on_done=self._show_symbol_diagnostics_window,
+            on_error=lambda e: messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}"),
+            description="Diagnostyka symbolów"
+        )
+    
+    def _build_symbol_diagnostics(self):
+        """Treść diagnostyki symbolów (wątek roboczy)"""
+        # Pobierz wszystkie symbole z bazy (nie unikalne)
+        query = "SELECT symbol, COUNT(*) as count FROM positions GROUP BY symbol ORDER BY symbol"
+        rows = execute_query(query)
+        
+        # Analiza symbolów
+        content = "=== DIAGNOSTYKA SYMBOLÓW Z BAZY DANYCH ===\n\n"
+        content += f"Znaleziono {len(rows)} unikalnych symbolów:\n\n"
+        
+        for symbol, count in rows:
+            # Szczegółowa analiza symbolu
+            repr_symbol = repr(symbol)  # Pokaże ukryte znaki
+            length = len(symbol) if symbol else 0
+            
+            content += f"Symbol: {symbol}\n"
+            content += f"  Reprezentacja: {repr_symbol}\n"
+            content += f"  Długość: {length} znaków\n"
+            content += f"  Liczba transakcji: {count}\n"
+            
+            # Sprawdź czy pasuje do AVAILABLE_INSTRUMENTS
+            matches = []
+            for avail in AVAILABLE_INSTRUMENTS:
+                if symbol and (symbol.lower() == avail.lower() or symbol.upper() == avail.upper()):
+                    matches.append(avail)
+            
+            if matches:
+                content += f"  Pasuje do: {matches}\n"
+            else:
+                content += f"  \u26a0\ufe0f BRAK DOPASOWANIA w AVAILABLE_INSTRUMENTS\n"
             
+            content += "\n"
+        
+        content += "\n=== AVAILABLE_INSTRUMENTS (konfiguracja) ===\n\n"
+        for instr in AVAILABLE_INSTRUMENTS:
+            content += f"  {instr}\n"
+        return content
+    
+    def _show_symbol_diagnostics_window(self, content):
+        """Okno z diagnostyką symbolów (główny wątek)"""
+        try:
             # Stwórz okno diagnostyczne
             diag_window = tk.Toplevel(self.parent)
             diag_window.title("Diagnostyka symbolów")
@@ -610,37 +679,6 @@ class DataViewer:
             text_widget.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
             
-            # Analiza symbolów
-            content = "=== DIAGNOSTYKA SYMBOLÓW Z BAZY DANYCH ===\n\n"
-            content += f"Znaleziono {len(rows)} unikalnych symbolów:\n\n"
-            
-            for symbol, count in rows:
-                # Szczegółowa analiza symbolu
-                repr_symbol = repr(symbol)  # Pokaże ukryte znaki
-                length = len(symbol) if symbol else 0
-                
-                content += f"Symbol: {symbol}\n"
-                content += f"  Reprezentacja: {repr_symbol}\n"
-                content += f"  Długość: {length} znaków\n"
-                content += f"  Liczba transakcji: {count}\n"
-                
-                # Sprawdź czy pasuje do AVAILABLE_INSTRUMENTS
-                matches = []
-                for avail in AVAILABLE_INSTRUMENTS:
-                    if symbol and (symbol.lower() == avail.lower() or symbol.upper() == avail.upper()):
-                        matches.append(avail)
-                
-                if matches:
-                    content += f"  Pasuje do: {matches}\n"
-                else:
-                    content += f"  \u26a0\ufe0f BRAK DOPASOWANIA w AVAILABLE_INSTRUMENTS\n"
-                
-                content += "\n"
-            
-            content += "\n=== AVAILABLE_INSTRUMENTS (konfiguracja) ===\n\n"
-            for instr in AVAILABLE_INSTRUMENTS:
-                content += f"  {instr}\n"
-            
             # Wyświetl treść
             text_widget.insert("1.0", content)
             text_widget.config(state="disabled")  # Tylko do odczytu
@@ -689,7 +727,18 @@ class DataViewer:
             messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}")
     
     def _quick_diagnostics(self):
-        """Szybka diagnostyka - tylko wydruk do konsoli"""
+        """Szybka diagnostyka - tylko wydruk do konsoli (w tle)"""
+        self.jobs.submit(
+            "diagnostics",
+            lambda job: self._print_quick_diagnostics(),
+            on_done=lambda _: messagebox.showinfo("Diagnostyka",
+                                                  "Wyniki wyświetlone w konsoli!\nSkopiuj z okna terminala."),
+            on_error=lambda e: messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}"),
+            description="Quick diagnostyka"
+        )
+    
+    def _print_quick_diagnostics(self):
+        """Wydruk diagnostyki symbolów do konsoli (wątek roboczy)"""
         try:
             print("\n" + "="*80)
             print("QUICK DIAGNOSTYKA SYMBOLÓW - WYNIKI W KONSOLI")
@@ -727,11 +776,9 @@ class DataViewer:
             print("KONIEC DIAGNOSTYKI - skopiuj powyższe wyniki")
             print("="*80 + "\n")
             
-            messagebox.showinfo("Diagnostyka", "Wyniki wyświetlone w konsoli!\nSkopiuj z okna terminala.")
-            
         except Exception as e:
             print(f"Błąd quick diagnostyki: {e}")
-            messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}")
+            raise
     
     def _set_today(self):
         """Ustawia daty na dzisiejszy dzień"""
@@ -776,6 +823,39 @@ class DataViewer:
                 
         except Exception as e:
             print(f"[DataViewer] Błąd migracji przy starcie: {e}")
+        
+        try:
+            # Indeksy pod zapytania filtrów, ticketów, świeczek i wyników TP
+            report = get_index_manager().ensure_indexes()
+            if report['created']:
+                print(f"[DataViewer] Plany zapytań po utworzeniu indeksów:\n{get_index_manager().format_report(report)}")
+        except Exception as e:
+            print(f"[DataViewer] Błąd tworzenia indeksów przy starcie: {e}")
+        
+        if CANDLE_STORE_SYNC_ON_STARTUP:
+            self._start_candle_store_sync()
+    
+    def _start_candle_store_sync(self):
+        """Dopisuje w tle nowe świeczki EA do magazynu kolumnowego (odczyt świeczek bez SQLite)"""
+        if not os.path.exists(DB_PATH):
+            print(f"[DataViewer] Pomijam synchronizację magazynu świeczek - brak bazy {DB_PATH}")
+            return
+        
+        def sync(job):
+            from calculations.candle_analyzer import CandleAnalyzer
+            analyzer = CandleAnalyzer()
+            try:
+                return analyzer.sync_candle_store(should_stop=lambda: job.cancelled)
+            finally:
+                analyzer.close_connection()
+        
+        def done(synced):
+            print(f"[DataViewer] Magazyn świeczek zsynchronizowany: dopisano {sum(synced.values())} świeczek "
+                  f"({len(synced)} tabel)")
+        
+        self.jobs.submit("candle_store_sync", sync, on_done=done,
+                         on_error=lambda e: print(f"[DataViewer] Błąd synchronizacji magazynu świeczek: {e}"),
+                         description="Synchronizacja magazynu świeczek")
     
     def _restore_from_backup(self):
         """Uruchamia przywracanie danych z backupu"""
@@ -835,15 +915,13 @@ class DataViewer:
             print(f"[DataViewer] Błąd obsługi nowego zlecenia: {e}")
     
     def load_data(self):
-        """Ładuje dane z bazy danych dla podanego zakresu dat i wybranych instrumentów"""
-        # Uruchom migrację przed każdym wyszukiwaniem
-        try:
-            migrated_count = self.sl_migrator.run_migration()
-            if migrated_count > 0:
-                print(f"[DataViewer] Zmigrowano dodatkowo {migrated_count} rekordów SL opening")
-        except Exception as e:
-            print(f"[DataViewer] Błąd migracji przy wyszukiwaniu: {e}")
+        """
+        Ładuje dane z bazy danych dla podanego zakresu dat i wybranych instrumentów
         
+        Filtry są czytane z widgetów w głównym wątku, migracja i zapytanie
+        wykonują się w tle (zadanie "load_data" - nowsze wyszukiwanie zastępuje
+        poprzednie), a tabela jest wypełniana po zakończeniu zadania.
+        """
         start_date = self.start_date_entry.get()
         end_date = self.end_date_entry.get()
 
@@ -863,183 +941,147 @@ class DataViewer:
             
             if not selected_symbols:
                 # Jeśli żaden nie jest zaznaczony, nie pokazuj nic
-                self.total_profit_label.config(text="0.00")
-                self.transactions_count_label.config(text="0")
-                self.winning_trades_label.config(text="0")
-                self.losing_trades_label.config(text="0")
-                self.winrate_label.config(text="0.00%")
+                self.jobs.cancel("load_data")
+                self._show_positions_summary(0.0, 0, 0, 0)
                 return
             
             # Sprawdź czy wszystkie są wybrane
             all_symbols_count = len(self.instruments_dropdown.items)
             all_selected = len(selected_symbols) == all_symbols_count
             
-            # Dynamiczne generowanie zapytania SQL
-            columns_str = ", ".join(COLUMNS)
-            
-            # Podstawowe parametry
-            base_params = [start_unix, end_unix]
-            
-            # Buduj warunki WHERE
-            where_conditions = ["open_time BETWEEN ? AND ?"]
-            
-            # Warunek dla instrumentów
-            if not all_selected:
-                # Wybrane instrumenty - uwzględnij oba formaty (z i bez \x00)
-                expanded_symbols = []
-                for clean_symbol in selected_symbols:
-                    expanded_symbols.append(clean_symbol)  # Oryginalny format
-                    expanded_symbols.append(clean_symbol + '\x00')  # Format z null character
-                
-                placeholders = ", ".join(["?" for _ in expanded_symbols])
-                where_conditions.append(f"symbol IN ({placeholders})")
-                base_params.extend(expanded_symbols)
-            
-            # Warunek dla Setup (jeśli filtr jest aktywny)
+            # Setup (jeśli filtr jest aktywny)
+            selected_setups = None
             setup_filter_active = self.setup_filter_active_var.get()
             if setup_filter_active:
                 selected_setups = self.setup_dropdown.get_selected()
                 if selected_setups:
-                    # Dodaj warunek dla setupów
-                    setup_placeholders = ", ".join(["?" for _ in selected_setups])
-                    where_conditions.append(f"setup IN ({setup_placeholders})")
-                    base_params.extend(selected_setups)
                     print(f"Filtr Setup aktywny - wybrane setupy: {selected_setups}")
                 else:
                     print("Filtr Setup aktywny ale brak wybranych setupów - zwracam puste wyniki")
                     # Jeśli filtr aktywny ale nic nie wybrano, zwróć puste wyniki
-                    self.total_profit_label.config(text="0.00")
-                    self.transactions_count_label.config(text="0")
-                    self.winning_trades_label.config(text="0")
-                    self.losing_trades_label.config(text="0")
-                    self.winrate_label.config(text="0.00%")
+                    self.jobs.cancel("load_data")
+                    self._show_positions_summary(0.0, 0, 0, 0)
                     return
             
-            # Warunek dla filtra TrendS
+            # TrendS / TrendL - filtr tylko gdy nie wszystkie wartości wybrane
             selected_trends = self.trends_dropdown.get_selected()
             if selected_trends and len(selected_trends) < len(self.trends_dropdown.items):
-                # Nie wszystkie wartości TrendS wybrane - dodaj filtr
-                trend_conditions = []
-                for trend_val in selected_trends:
-                    if trend_val == "NULL":
-                        trend_conditions.append("trends IS NULL")
-                    else:
-                        trend_conditions.append("trends = ?")
-                        base_params.append(int(trend_val))
-                
-                if trend_conditions:
-                    trends_clause = " OR ".join(trend_conditions)
-                    where_conditions.append(f"({trends_clause})")
-                    print(f"Filtr TrendS aktywny - wybrane wartości: {selected_trends}")
+                print(f"Filtr TrendS aktywny - wybrane wartości: {selected_trends}")
+            else:
+                selected_trends = None
             
-            # Warunek dla filtra TrendL
             selected_trendl = self.trendl_dropdown.get_selected()
             if selected_trendl and len(selected_trendl) < len(self.trendl_dropdown.items):
-                # Nie wszystkie wartości TrendL wybrane - dodaj filtr
-                trendl_conditions = []
-                for trend_val in selected_trendl:
-                    if trend_val == "NULL":
-                        trendl_conditions.append("trendl IS NULL")
-                    else:
-                        trendl_conditions.append("trendl = ?")
-                        base_params.append(int(trend_val))
-                
-                if trendl_conditions:
-                    trendl_clause = " OR ".join(trendl_conditions)
-                    where_conditions.append(f"({trendl_clause})")
-                    print(f"Filtr TrendL aktywny - wybrane wartości: {selected_trendl}")
+                print(f"Filtr TrendL aktywny - wybrane wartości: {selected_trendl}")
+            else:
+                selected_trendl = None
             
-            # Warunek dla filtra Wątpliwe trejdy
+            # Wątpliwe trejdy (magic_number = 7)
             suspicious_filter = self.suspicious_trades_var.get()
-            if suspicious_filter == "tylko wątpliwe":
-                # Pokazuj tylko trejdy z magic_number = 7
-                where_conditions.append("magic_number = ?")
-                base_params.append(7)
-                print("Filtr 'Wątpliwe trejdy' - pokazuję tylko wątpliwe (magic_number = 7)")
-            elif suspicious_filter == "nie pokazuj wątpliwych":
-                # Ukryj trejdy z magic_number = 7
-                where_conditions.append("(magic_number IS NULL OR magic_number != ?)")
-                base_params.append(7)
-                print("Filtr 'Wątpliwe trejdy' - ukrywam wątpliwe (magic_number = 7)")
-            else:  # nieaktywny
-                # Nie dodawaj żadnych warunków - pokazuj wszystkie trejdy
-                print("Filtr 'Wątpliwe trejdy' - nieaktywny, pokazuję wszystkie trejdy")
-            
-            # Złóż zapytanie
-            where_clause = " AND ".join(where_conditions)
-            query = f"""
-            SELECT {columns_str}
-            FROM positions 
-            WHERE {where_clause}
-            ORDER BY open_time
-            """
-            
-            rows = execute_query(query, base_params)
-            
-            print(f"Pobrano {len(rows)} transakcji dla wybranych filtrów")
+            print(f"Filtr 'Wątpliwe trejdy' - {suspicious_filter}")
+            
+            # Zapytanie budowane tak samo jak w trybie wsadowym (tp_cli.py)
+            query, base_params = PositionQueries.build_filtered_positions_query(
+                COLUMNS, start_unix, end_unix,
+                symbols=None if all_selected else selected_symbols,
+                setups=selected_setups,
+                trends=selected_trends,
+                trendl=selected_trendl,
+                suspicious=suspicious_filter
+            )
             print(f"Wybrane symbole: {selected_symbols if not all_selected else 'wszystkie'}")
-            if not all_selected:
-                print(f"Rozszerzone symbole (z \\x00): {expanded_symbols}")
-
-            # Przygotowanie zmiennych do obliczenia sumy profitu i statystyk
-            total_profit = 0.0
-            transaction_count = len(rows)
-            winning_trades = 0
-            losing_trades = 0
-
-            # Wypełnianie tabeli danymi
-            for row in rows:
-                display_values = []
-                current_profit = None
-                
-                for i, col in enumerate(COLUMNS):
-                    value = row[i]
+            
+            self.jobs.submit(
+                "load_data",
+                lambda job: self._query_positions(job, query, base_params),
+                on_done=self._fill_positions_table,
+                on_error=lambda e: messagebox.showerror(
+                    "Błąd bazy danych", f"Wystąpił błąd podczas ładowania danych: {e}"),
+                description="Wczytywanie transakcji"
+            )
 
-                    if col == "open_time":
-                        display_values.append(format_time_for_display(value))
-                    elif col == "profit_points":
-                        adjusted_value = value / 100 if value is not None else None
-                        current_profit = adjusted_value
-                        if adjusted_value is not None:
-                            total_profit += adjusted_value
-                        display_values.append(format_profit_points(value))
-                    elif col in [field.name for field in CHECKBOX_FIELDS]:
-                        display_values.append(format_checkbox_value(value))
-                    else:
-                        display_values.append(value or "")
-                
-                # Obliczanie statystyk winrate na podstawie profitu
-                if current_profit is not None:
-                    if current_profit > 0:
-                        winning_trades += 1
-                    elif current_profit < 0:
-                        losing_trades += 1
-                    # Ignorujemy transakcje z profilem = 0 (Break Even)
+        except Exception as e:
+            print(f"Błąd bazy danych: {e}")
+            messagebox.showerror("Błąd bazy danych", f"Wystąpił błąd podczas ładowania danych: {e}")
+    
+    def _query_positions(self, job, query, params):
+        """Migracja SL opening, zapytanie i przygotowanie wierszy tabeli (wątek roboczy)"""
+        # Uruchom migrację przed każdym wyszukiwaniem
+        try:
+            migrated_count = self.sl_migrator.run_migration()
+            if migrated_count > 0:
+                print(f"[DataViewer] Zmigrowano dodatkowo {migrated_count} rekordów SL opening")
+        except Exception as e:
+            print(f"[DataViewer] Błąd migracji przy wyszukiwaniu: {e}")
+        job.check_cancelled()
+        
+        rows = execute_query(query, params)
+        job.check_cancelled()
+        print(f"Pobrano {len(rows)} transakcji dla wybranych filtrów")
 
-                self.tree.insert("", "end", values=tuple(display_values))
+        # Przygotowanie zmiennych do obliczenia sumy profitu i statystyk
+        total_profit = 0.0
+        winning_trades = 0
+        losing_trades = 0
+        checkbox_names = {field.name for field in CHECKBOX_FIELDS}
+        display_rows = []
 
-            # Obliczanie winrate
-            total_counted_trades = winning_trades + losing_trades
-            winrate = (winning_trades / total_counted_trades * 100) if total_counted_trades > 0 else 0.0
+        for row in rows:
+            display_values = []
+            current_profit = None
+            
+            for i, col in enumerate(COLUMNS):
+                value = row[i]
 
-            # Aktualizacja etykiet z podsumowaniem
-            self.total_profit_label.config(text=f"{total_profit:.2f}")
-            self.transactions_count_label.config(text=f"{transaction_count}")
-            self.winning_trades_label.config(text=f"{winning_trades}")
-            self.losing_trades_label.config(text=f"{losing_trades}")
-            self.winrate_label.config(text=f"{winrate:.2f}%")
+                if col == "open_time":
+                    display_values.append(format_time_for_display(value))
+                elif col == "profit_points":
+                    adjusted_value = value / 100 if value is not None else None
+                    current_profit = adjusted_value
+                    if adjusted_value is not None:
+                        total_profit += adjusted_value
+                    display_values.append(format_profit_points(value))
+                elif col in checkbox_names:
+                    display_values.append(format_checkbox_value(value))
+                else:
+                    display_values.append(value or "")
+            
+            # Obliczanie statystyk winrate na podstawie profitu
+            if current_profit is not None:
+                if current_profit > 0:
+                    winning_trades += 1
+                elif current_profit < 0:
+                    losing_trades += 1
+                # Ignorujemy transakcje z profilem = 0 (Break Even)
+            
+            display_rows.append(tuple(display_values))
+        
+        return display_rows, total_profit, winning_trades, losing_trades
+    
+    def _fill_positions_table(self, loaded):
+        """Wypełnia tabelę wierszami z zadania wczytywania (główny wątek)"""
+        display_rows, total_profit, winning_trades, losing_trades = loaded
+        
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        for values in display_rows:
+            self.tree.insert("", "end", values=values)
 
-            if not rows:
-                messagebox.showinfo("Informacja", "Brak danych dla podanych filtrów.")
-                self.total_profit_label.config(text="0.00")
-                self.transactions_count_label.config(text="0")
-                self.winning_trades_label.config(text="0")
-                self.losing_trades_label.config(text="0")
-                self.winrate_label.config(text="0.00%")
+        if not display_rows:
+            messagebox.showinfo("Informacja", "Brak danych dla podanych filtrów.")
+        self._show_positions_summary(total_profit, len(display_rows), winning_trades, losing_trades)
+    
+    def _show_positions_summary(self, total_profit, transaction_count, winning_trades, losing_trades):
+        """Aktualizuje etykiety podsumowania (suma profitu, liczba transakcji, winrate)"""
+        # Obliczanie winrate
+        total_counted_trades = winning_trades + losing_trades
+        winrate = (winning_trades / total_counted_trades * 100) if total_counted_trades > 0 else 0.0
 
-        except Exception as e:
-            print(f"Błąd bazy danych: {e}")
-            messagebox.showerror("Błąd bazy danych", f"Wystąpił błąd podczas ładowania danych: {e}")
+        self.total_profit_label.config(text=f"{total_profit:.2f}")
+        self.transactions_count_label.config(text=f"{transaction_count}")
+        self.winning_trades_label.config(text=f"{winning_trades}")
+        self.losing_trades_label.config(text=f"{losing_trades}")
+        self.winrate_label.config(text=f"{winrate:.2f}%")
     
     def edit_item(self, event):
         """Obsługuje edycję elementu po podwójnym kliknięciu - używa EditWindowManager"""
@@ -1087,6 +1129,47 @@ class DataViewer:
             save_current_first=save_current_first
         )
     
+    def _on_job_state(self, job):
+        """Aktualizuje pasek zadań w tle (job = ostatnie aktywne zadanie lub None)"""
+        if job is None:
+            self.job_status_label.config(text="")
+            self.job_progress.stop()
+            self._job_progress_running = False
+            self.job_progress.config(mode='determinate', value=0)
+            self.job_cancel_button.config(state="disabled")
+        else:
+            text = job.description
+            if job.stopping:
+                text += " - anulowanie..."
+            elif job.total:
+                text += f": {job.done}/{job.total}"
+            if job.message and not job.stopping:
+                text += f" ({job.message})"
+            self.job_status_label.config(text=text)
+            if job.total:
+                if self._job_progress_running:
+                    self.job_progress.stop()
+                    self._job_progress_running = False
+                self.job_progress.config(mode='determinate', maximum=job.total, value=job.done)
+            elif not self._job_progress_running:
+                self.job_progress.config(mode='indeterminate')
+                self.job_progress.start()
+                self._job_progress_running = True
+            cancellable = any(active.key in self.VIEW_JOB_KEYS and not active.cancelled
+                              for active in self.jobs.active_jobs())
+            self.job_cancel_button.config(state="normal" if cancellable else "disabled")
+        
+        # Przycisk TP zablokowany na czas kalkulacji w tle
+        if self.jobs.is_running("tp_calculation"):
+            self.calculate_tp_button.config(state="disabled", text="Obliczam...")
+        else:
+            self.calculate_tp_button.config(state="normal", text="Oblicz TP dla zakresu")
+    
+    def _cancel_jobs(self):
+        """Anuluje zadania w tle tego widoku (zadania utrzymaniowe działają dalej)"""
+        for key in self.VIEW_JOB_KEYS:
+            self.jobs.cancel(key)
+    
     def _update_edit_status(self):
         """Aktualizuje status edycji w interfejsie"""
         try:
@@ -1124,7 +1207,10 @@ class DataViewer:
         )
         
         if filename:
-            try:
+            # Wartości z tabeli czytane w głównym wątku, zapis pliku w tle
+            rows = [self.tree.item(item, "values") for item in items]
+            
+            def write_file(job):
                 with open(filename, 'w', newline='', encoding='utf-8') as file:
                     writer = csv.writer(file)
                     
@@ -1133,14 +1219,19 @@ class DataViewer:
                     writer.writerow(headers)
                     
                     # Dane
-                    for item in items:
-                        values = self.tree.item(item, "values")
+                    for i, values in enumerate(rows, 1):
                         writer.writerow(values)
-                
-                messagebox.showinfo("Sukces", f"Dane zostały wyeksportowane do:\n{filename}")
-                
-            except Exception as e:
-                messagebox.showerror("Błąd", f"Nie można zapisać pliku:\n{e}")
+                        if i % 1000 == 0:
+                            job.check_cancelled()
+                            job.progress(i, len(rows))
+            
+            self.jobs.submit(
+                "export",
+                write_file,
+                on_done=lambda _: messagebox.showinfo("Sukces", f"Dane zostały wyeksportowane do:\n{filename}"),
+                on_error=lambda e: messagebox.showerror("Błąd", f"Nie można zapisać pliku:\n{e}"),
+                description="Eksport do CSV"
+            )
     
     def highlight_ticket(self, ticket):
         """Podświetla (zaznacza) pozycję z podanym ticket w tabeli"""
@@ -1251,29 +1342,6 @@ class DataViewer:
                 messagebox.showerror("Błąd", "Spread nie może być ujemny")
                 return
             
-            # Importuj i uruchom kalkulator
-            from calculations.tp_calculator import TPCalculator
-            
-            print("[DataViewer] Uruchamianie kalkulatora TP dla ticketów...")
-            calculator = TPCalculator()
-            
-            # Wyłącz przycisk na czas obliczeń
-            self.calculate_tp_button.config(state="disabled", text="Obliczam...")
-            
-            # Wykonaj kalkulację dla konkretnych ticketów (NOWA METODA)
-            results = calculator.calculate_tp_for_tickets(
-                tickets=displayed_tickets,
-                sl_types=sl_types,
-                sl_staly_values=sl_staly_values,
-                be_prog=be_prog,
-                be_offset=be_offset,
-                spread=spread,
-                save_to_db=save_to_db,
-                detailed_logs=detailed_logs
-            )
-            
-            print(f"[DataViewer] Kalkulacja zakończona. Wyników: {len(results)}")
-            
             # Pokaż informację o filtrach w wynikach
             active_filters = []
             if self.setup_filter_active_var.get():
@@ -1293,18 +1361,67 @@ class DataViewer:
             if suspicious_filter != "nieaktywny":
                 active_filters.append(f"Wątpliwe trejdy: {suspicious_filter}")
             
-            # Pokaż wyniki z informacją o filtrach
-            self._show_tp_results(results, calculator, active_filters)
+            # Kalkulacja w tle - przycisk zablokowany do końca zadania (_on_job_state)
+            print("[DataViewer] Uruchamianie kalkulatora TP dla ticketów...")
+            params = dict(
+                tickets=displayed_tickets,
+                sl_types=sl_types,
+                sl_staly_values=sl_staly_values,
+                be_prog=be_prog,
+                be_offset=be_offset,
+                spread=spread,
+                save_to_db=save_to_db,
+                detailed_logs=detailed_logs
+            )
+            self.jobs.submit(
+                "tp_calculation",
+                lambda job: self._run_tp_calculation(job, params),
+                on_done=lambda done: self._show_tp_results(done[0], done[1], active_filters),
+                on_error=lambda e: messagebox.showerror("Błąd kalkulacji", f"Nie można obliczyć TP:\n{e}"),
+                description="Kalkulacja TP"
+            )
             
         except Exception as e:
             print(f"[DataViewer] Błąd kalkulacji TP: {e}")
             import traceback
             traceback.print_exc()
             messagebox.showerror("Błąd kalkulacji", f"Nie można obliczyć TP:\n{e}")
-        
+    
+    def _run_tp_calculation(self, job, params):
+        """
+        Kalkulacja TP dla ticketów (wątek roboczy) - strumień wyników z postępem
+        
+        Kalkulator ma własne połączenia (zamykane na końcu), anulowanie
+        przerywa strumień po bieżącej porcji pozycji (pierwsze porcje są małe).
+        
+        Returns:
+            Krotka (TPResultList, kalkulator)
+        """
+        from calculations.tp_calculator import TPCalculator
+        from calculations.tp_stream import EVENT_RESULT, EVENT_FINISHED, TPResultList
+        
+        calculator = TPCalculator()
+        results = TPResultList()
+        events = calculator.iter_tp_for_tickets(**params)
+        try:
+            for event in events:
+                job.check_cancelled()
+                if event.kind == EVENT_RESULT:
+                    results.append(event.result)
+                elif event.kind == EVENT_FINISHED:
+                    results.stats = event.stats
+                # Postęp co 1% pozycji (pasek statusu nie musi odświeżać się po każdej)
+                if event.kind == EVENT_FINISHED or event.done % max(1, event.total // 100) == 0:
+                    missing = f"bez świeczek: {event.missing}" if event.missing else ""
+                    job.progress(event.done, event.total, missing)
         finally:
-            # Przywróć przycisk
-            self.calculate_tp_button.config(state="normal", text="Oblicz TP dla zakresu")
+            events.close()
+            calculator.close_connection()
+            calculator.candle_analyzer.close_connection()
+            calculator.position_analyzer.close_connection()
+        
+        print(f"[DataViewer] Kalkulacja zakończona. Wyników: {len(results)}")
+        return results, calculator
     
     def _show_tp_results(self, results, calculator, active_filters=None):
         """Pokazuje wyniki kalkulacji TP w osobnym oknie"""
@@ -1398,8 +1515,9 @@ class DataViewer:
             summary_frame = ttk.LabelFrame(main_frame, text="Podsumowanie")
             summary_frame.pack(fill="x", pady=10)
             
-            # Oblicz statystyki
-            summary = calculator.get_calculation_summary(results)
+            # Oblicz statystyki (podsumowanie i tabela statystyk z jednego silnika)
+            statistics = compute_statistics(results)
+            summary = statistics.to_summary()
             
             # Wyświetl statystyki
             stats_frame = ttk.Frame(summary_frame)
@@ -1432,6 +1550,15 @@ class DataViewer:
             ttk.Label(stats_frame, text="Max TP (BE):").grid(row=2, column=4, padx=5, pady=2, sticky="w")
             ttk.Label(stats_frame, text=f"{summary['max_tp_sl_be']:.1f} pkt").grid(row=2, column=5, padx=5, pady=2)
             
+            # Wiersz 4 - czasy etapów i liczniki przebiegu
+            run_stats = getattr(results, 'stats', None)
+            if run_stats is not None:
+                ttk.Label(stats_frame, text=run_stats.format_summary(), foreground="gray", justify="left").grid(
+                    row=3, column=0, columnspan=6, padx=5, pady=2, sticky="w")
+            
+            # === STATYSTYKI (percentyle, trafienia, wartość oczekiwana, podziały) ===
+            TPStatisticsView(main_frame, statistics).pack(fill="x", pady=(0, 10))
+            
             # === PRZYCISKI ===
             buttons_frame = ttk.Frame(main_frame)
             buttons_frame.pack(fill="x", pady=10)
@@ -1485,6 +1612,8 @@ class DataViewer:
                         messagebox.showerror("Błąd", f"Nie można zapisać pliku:\n{e}")
             
             ttk.Button(buttons_frame, text="Eksportuj wyniki", command=export_results).pack(side="left", padx=5)
+            ttk.Button(buttons_frame, text="Optymalny TP",
+                       command=lambda: self._show_tp_optimizer(results, results_window)).pack(side="left", padx=5)
             ttk.Button(buttons_frame, text="Zamknij", command=results_window.destroy).pack(side="right", padx=5)
             
             print(f"[DataViewer] Okno wyników utworzone z {len(results)} pozycjami")
@@ -1495,6 +1624,13 @@ class DataViewer:
             traceback.print_exc()
             messagebox.showerror("Błąd", f"Nie można pokazać wyników:\n{e}")
     
+    def _show_tp_optimizer(self, results, parent):
+        """Okno optymalnego stałego TP dla wyników (grupy setup, instrument, TrendS, TrendL)"""
+        window = tk.Toplevel(parent)
+        window.title(f"Optymalny TP - {len(results)} pozycji")
+        window.geometry("900x600")
+        TPOptimizerView(window, results).pack(fill="both", expand=True, padx=5, pady=5)
+    
     def _format_time(self, unix_timestamp):
         """Formatuje timestamp do wyświetlenia"""
         from utils.date_utils import format_time_for_display
@@ -0,0 +1,253 @@
+"""
+Zadania w tle dla GUI - wątki robocze, postęp przez kolejkę, anulowanie
+
+Długie operacje (wczytanie danych, kalkulacja TP, eksport, diagnostyka)
+wykonują się w wątkach roboczych, a wszystkie wywołania zwrotne (postęp,
+wynik, błąd, porcje danych) trafiają do bezpiecznej wątkowo kolejki, którą
+główny wątek Tk opróżnia przez after(). Okno pozostaje responsywne.
+
+Zadania mają klucz widoku (np. "load_data") - nowe zadanie z tym samym
+kluczem anuluje poprzednie, a komunikaty nieaktualnego zadania są
+odrzucane. Anulowanie jest kooperacyjne: funkcja zadania sprawdza
+job.cancelled (lub wywołuje job.check_cancelled()) między krokami.
+Anulowane zadanie pozostaje aktywne (stan "anulowanie") do zakończenia
+wątku, a zadanie, które je zastąpiło, startuje dopiero po nim - dwa
+zadania z tym samym kluczem nigdy nie działają równocześnie.
+
+Wątek roboczy korzysta z własnych połączeń z bazą (połączenia
+database.connection są per wątek) i zamyka je po zakończeniu zadania.
+
+Użycie:
+    scheduler = JobScheduler(root)
+    scheduler.submit("load_data", lambda job: query(job),
+                     on_done=fill_table, on_progress=show_progress)
+"""
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from database.connection import get_db_connection
+
+# Co ile ms główny wątek odbiera komunikaty zadań
+JOB_POLL_INTERVAL_MS = 50
+
+
+class JobCancelled(Exception):
+    """Zadanie przerwane (anulowane przez użytkownika lub zastąpione nowszym)"""
+
+
+class Job:
+    """Zadanie w tle - uchwyt dla funkcji zadania (wątek roboczy) i dla GUI"""
+
+    def __init__(self, scheduler: 'JobScheduler', job_id: int, key: str, description: str):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.key = key
+        self.description = description
+        self.done = 0
+        self.total: Optional[int] = None
+        self.message = ""
+        self.finished = False
+        self._cancel_event = threading.Event()
+        self._exited = threading.Event()  # Wątek zadania zakończony
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def stopping(self) -> bool:
+        """Anulowane, ale wątek jeszcze działa"""
+        return self.cancelled and not self.finished
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """Przerywa funkcję zadania jeśli zadanie anulowano"""
+        if self.cancelled:
+            raise JobCancelled(self.description)
+
+    def progress(self, done: int, total: Optional[int] = None, message: str = ""):
+        """Zgłasza postęp (wątek roboczy) - dotrze do on_progress w głównym wątku"""
+        self.scheduler._post(self, self.scheduler._dispatch_progress, self, done, total, message)
+
+    def post(self, callback: Callable, *args):
+        """Wywołuje callback w głównym wątku (np. porcja wyników), chyba że zadanie jest nieaktualne"""
+        self.scheduler._post(self, callback, *args)
+
+
+class JobScheduler:
+    """
+    Uruchamia zadania w wątkach i przekazuje ich komunikaty do głównego wątku Tk
+
+    root musi mieć metodę after(ms, callback) - dowolny widget Tk.
+    Listenery (add_listener) dostają zmiany stanu zadań: pasek statusu,
+    przycisk anulowania.
+    """
+
+    def __init__(self, root, poll_interval_ms: int = JOB_POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._ids = itertools.count(1)
+        self._active: Dict[str, Job] = {}  # Aktualne zadanie per klucz (tylko główny wątek)
+        self._stopping: List[Job] = []     # Anulowane zadania, których wątki jeszcze działają
+        self._progress_callbacks: Dict[int, Callable] = {}
+        self._listeners: List[Callable[[Optional[Job]], None]] = []
+        self._polling = False
+
+    def submit(self, key: str, func: Callable[[Job], Any],
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_progress: Optional[Callable[[Job], None]] = None,
+               description: str = "") -> Job:
+        """
+        Uruchamia func(job) w wątku roboczym (wywołanie z głównego wątku)
+
+        Poprzednie zadanie z tym samym kluczem jest anulowane, a jego
+        komunikaty odrzucane - nowe zadanie startuje po zakończeniu jego
+        wątku. on_done(wynik) / on_error(wyjątek) / on_progress(job) są
+        wywoływane w głównym wątku; anulowane zadanie nie wywołuje żadnego
+        z nich.
+        """
+        if key in self._active:
+            print(f"JobScheduler: Zadanie '{self._active[key].description}' zastąpione nowszym")
+            self._stop(self._active[key])
+        previous = next((job for job in reversed(self._stopping) if job.key == key), None)
+
+        job = Job(self, next(self._ids), key, description or key)
+        self._active[key] = job
+        if on_progress is not None:
+            self._progress_callbacks[job.id] = on_progress
+
+        thread = threading.Thread(target=self._run, args=(job, func, on_done, on_error, previous),
+                                  name=f"job-{key}-{job.id}", daemon=True)
+        thread.start()
+        self._notify(job)
+        self._schedule_poll()
+        return job
+
+    def cancel(self, key: Optional[str] = None):
+        """Anuluje zadanie o danym kluczu (None = wszystkie) - aktywne do zakończenia wątku"""
+        jobs = list(self._active.values()) if key is None else [self._active.get(key)]
+        for job in jobs:
+            if job is not None:
+                print(f"JobScheduler: Anulowano zadanie '{job.description}'")
+                self._stop(job)
+        self._notify(self._current_job())
+
+    def is_running(self, key: str) -> bool:
+        """Czy zadanie z kluczem działa (także anulowane, którego wątek jeszcze się kończy)"""
+        return key in self._active or any(job.key == key for job in self._stopping)
+
+    def active_jobs(self) -> List[Job]:
+        return self._stopping + list(self._active.values())
+
+    def add_listener(self, listener: Callable[[Optional[Job]], None]):
+        """Listener zmian stanu zadań (job albo None gdy nic nie działa) - główny wątek"""
+        self._listeners.append(listener)
+
+    def poll(self):
+        """Opróżnia kolejkę komunikatów (główny wątek) - wywoływane przez after()"""
+        self._polling = False
+        while True:
+            try:
+                job, callback, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if callback != self._finish and not self._is_current(job):
+                continue  # Zadanie anulowane lub zastąpione - komunikat nieaktualny
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"JobScheduler: Błąd obsługi zadania '{job.description}': {e}")
+        if self._active or self._stopping:
+            self._schedule_poll()
+
+    # --- wątek roboczy ---
+
+    def _run(self, job: Job, func: Callable, on_done: Optional[Callable], on_error: Optional[Callable],
+             previous: Optional[Job] = None):
+        try:
+            if previous is not None:
+                previous._exited.wait()  # Zastąpione zadanie kończy się przed startem nowego
+            job.check_cancelled()
+            result = func(job)
+            job.check_cancelled()
+            self._post(job, self._complete, job, on_done, result)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            print(f"JobScheduler: Błąd zadania '{job.description}': {e}")
+            self._post(job, self._complete_with_error, job, on_error, e)
+        finally:
+            # Połączenie wątku (database.connection) - wątek kończy się razem z zadaniem
+            get_db_connection().close_connection()
+            job._exited.set()
+            self._queue.put((job, self._finish, (job,)))  # Także dla anulowanego - koniec stanu "anulowanie"
+
+    def _post(self, job: Job, callback: Callable, *args):
+        if not job.cancelled:
+            self._queue.put((job, callback, args))
+
+    # --- główny wątek ---
+
+    def _is_current(self, job: Job) -> bool:
+        return not job.cancelled and self._active.get(job.key) is job
+
+    def _dispatch_progress(self, job: Job, done: int, total: Optional[int], message: str):
+        job.done, job.total, job.message = done, total, message
+        callback = self._progress_callbacks.get(job.id)
+        if callback is not None:
+            callback(job)
+        self._notify(job)
+
+    # Zadanie zostaje aktywne do komunikatu o końcu wątku (_finish)
+
+    def _complete(self, job: Job, on_done: Optional[Callable], result):
+        if on_done is not None:
+            on_done(result)
+
+    def _complete_with_error(self, job: Job, on_error: Optional[Callable], error: Exception):
+        if on_error is not None:
+            on_error(error)
+
+    def _stop(self, job: Job):
+        """Anuluje zadanie - do zakończenia wątku na liście kończących się"""
+        job.cancel()
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        if not job.finished and job not in self._stopping:
+            self._stopping.append(job)
+        self._progress_callbacks.pop(job.id, None)
+
+    def _finish(self, job: Job):
+        if job.finished:
+            return
+        job.finished = True
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        if job in self._stopping:
+            self._stopping.remove(job)
+        self._progress_callbacks.pop(job.id, None)
+        self._notify(self._current_job())
+
+    def _current_job(self) -> Optional[Job]:
+        """Zadanie do pokazania w pasku statusu - ostatnie aktywne, inaczej ostatnie kończące się"""
+        if self._active:
+            return list(self._active.values())[-1]
+        return self._stopping[-1] if self._stopping else None
+
+    def _notify(self, job: Optional[Job]):
+        for listener in self._listeners:
+            try:
+                listener(job)
+            except Exception as e:
+                print(f"JobScheduler: Błąd listenera: {e}")
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self.poll)
@@ -2,11 +2,10 @@
 Główne okno aplikacji z menu i zakładkami
 """
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox
 from gui.data_viewer import DataViewer
 from gui.tp_calculator import TPCalculatorWindow
-from database.connection import get_current_database_info, execute_query
-from config.database_config import AVAILABLE_INSTRUMENTS
+from database.connection import get_current_database_info
 from database.migration.sl_opening_migrator import get_sl_migrator
 from config.setup_config import get_setup_config
 
@@ -417,149 +416,12 @@ class MainWindow:
         messagebox.showinfo("Informacja", message)
     
     def _show_symbol_diagnostics(self):
-        """Pokazuje diagnostykę symbolów z bazy danych"""
-        try:
-            # Pobierz wszystkie symbole z bazy (nie unikalne)
-            query = "SELECT symbol, COUNT(*) as count FROM positions GROUP BY symbol ORDER BY symbol"
-            rows = execute_query(query)
-            
-            # Stwórz okno diagnostyczne
-            diag_window = tk.Toplevel(self.root)
-            diag_window.title("Diagnostyka symbolów")
-            diag_window.geometry("600x400")
-            
-            # Text widget z scrollbarem
-            text_frame = ttk.Frame(diag_window)
-            text_frame.pack(fill="both", expand=True, padx=10, pady=10)
-            
-            text_widget = tk.Text(text_frame, wrap=tk.WORD)
-            scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
-            text_widget.configure(yscrollcommand=scrollbar.set)
-            
-            text_widget.pack(side="left", fill="both", expand=True)
-            scrollbar.pack(side="right", fill="y")
-            
-            # Analiza symbolów
-            content = "=== DIAGNOSTYKA SYMBOLÓW Z BAZY DANYCH ===\n\n"
-            content += f"Znaleziono {len(rows)} unikalnych symbolów:\n\n"
-            
-            for symbol, count in rows:
-                # Szczegółowa analiza symbolu
-                repr_symbol = repr(symbol)  # Pokaże ukryte znaki
-                length = len(symbol) if symbol else 0
-                
-                content += f"Symbol: {symbol}\n"
-                content += f"  Reprezentacja: {repr_symbol}\n"
-                content += f"  Długość: {length} znaków\n"
-                content += f"  Liczba transakcji: {count}\n"
-                
-                # Sprawdź czy pasuje do AVAILABLE_INSTRUMENTS
-                matches = []
-                for avail in AVAILABLE_INSTRUMENTS:
-                    if symbol and (symbol.lower() == avail.lower() or symbol.upper() == avail.upper()):
-                        matches.append(avail)
-                
-                if matches:
-                    content += f"  Pasuje do: {matches}\n"
-                else:
-                    content += f"  ⚠️ BRAK DOPASOWANIA w AVAILABLE_INSTRUMENTS\n"
-                
-                content += "\n"
-            
-            content += "\n=== AVAILABLE_INSTRUMENTS (konfiguracja) ===\n\n"
-            for instr in AVAILABLE_INSTRUMENTS:
-                content += f"  {instr}\n"
-            
-            # Wyświetl treść
-            text_widget.insert("1.0", content)
-            text_widget.config(state="disabled")  # Tylko do odczytu
-            
-            # Przyciski
-            button_frame = ttk.Frame(diag_window)
-            button_frame.pack(fill="x", padx=10, pady=10)
-            
-            def save_to_file():
-                """Zapisuje diagnostykę do pliku"""
-                try:
-                    filename = filedialog.asksaveasfilename(
-                        defaultextension=".txt",
-                        filetypes=[("Pliki tekstowe", "*.txt"), ("Wszystkie pliki", "*.*")],
-                        title="Zapisz diagnostykę jako..."
-                    )
-                    
-                    if filename:
-                        with open(filename, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                        messagebox.showinfo("Sukces", f"Diagnostyka zapisana do:\n{filename}")
-                except Exception as e:
-                    messagebox.showerror("Błąd", f"Nie można zapisać pliku: {e}")
-            
-            def copy_to_clipboard():
-                """Kopiuje diagnostykę do schowka"""
-                try:
-                    diag_window.clipboard_clear()
-                    diag_window.clipboard_append(content)
-                    messagebox.showinfo("Sukces", "Diagnostyka skopiowana do schowka!")
-                except Exception as e:
-                    messagebox.showerror("Błąd", f"Nie można skopiować do schowka: {e}")
-            
-            # Dodaj przyciski
-            ttk.Button(button_frame, text="Zapisz do pliku", command=save_to_file).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Kopiuj do schowka", command=copy_to_clipboard).pack(side="left", padx=5)
-            ttk.Button(button_frame, text="Zamknij", command=diag_window.destroy).pack(side="right", padx=5)
-            
-            # Dodaj również wydruk do konsoli
-            print("\n" + "="*60)
-            print(content)
-            print("="*60 + "\n")
-            
-        except Exception as e:
-            messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}")
+        """Pokazuje diagnostykę symbolów z bazy danych (zadanie w tle przeglądarki transakcji)"""
+        self.data_viewer._show_symbol_diagnostics()
     
     def _quick_diagnostics(self):
-        """Szybka diagnostyka - tylko wydruk do konsoli"""
-        try:
-            print("\n" + "="*80)
-            print("QUICK DIAGNOSTYKA SYMBOLÓW - WYNIKI W KONSOLI")
-            print("="*80)
-            
-            # Pobierz symbole z bazy
-            query = "SELECT symbol, COUNT(*) as count FROM positions GROUP BY symbol ORDER BY symbol"
-            rows = execute_query(query)
-            
-            print(f"\nZnaleziono {len(rows)} unikalnych symbolów w bazie:\n")
-            
-            for symbol, count in rows:
-                print(f"Symbol: '{symbol}'")
-                print(f"  repr(): {repr(symbol)}")
-                print(f"  len(): {len(symbol) if symbol else 0}")
-                print(f"  transakcje: {count}")
-                
-                # Sprawdź dopasowania
-                matches = []
-                for avail in AVAILABLE_INSTRUMENTS:
-                    if symbol and (symbol.lower() == avail.lower() or symbol.upper() == avail.upper()):
-                        matches.append(avail)
-                
-                if matches:
-                    print(f"  STATUS: ✅ PASUJE do {matches}")
-                else:
-                    print(f"  STATUS: ❌ BRAK DOPASOWANIA!")
-                print()
-            
-            print("AVAILABLE_INSTRUMENTS z konfiguracji:")
-            for instr in AVAILABLE_INSTRUMENTS:
-                print(f"  '{instr}'")
-            
-            print("\n" + "="*80)
-            print("KONIEC DIAGNOSTYKI - skopiuj powyższe wyniki")
-            print("="*80 + "\n")
-            
-            messagebox.showinfo("Diagnostyka", "Wyniki wyświetlone w konsoli!\nSkopiuj z okna terminala.")
-            
-        except Exception as e:
-            print(f"Błąd quick diagnostyki: {e}")
-            messagebox.showerror("Błąd", f"Błąd diagnostyki: {e}")
+        """Szybka diagnostyka - tylko wydruk do konsoli (zadanie w tle przeglądarki transakcji)"""
+        self.data_viewer._quick_diagnostics()
     
     def _restore_from_backup(self):
         """Uruchamia przywracanie danych z backupu"""
@@ -909,6 +771,9 @@ Data: 2025"""
         except Exception as e:
             print(f"[MainWindow] Błąd zapisu konfiguracji: {e}")
         
+        # Przerwij zadania w tle (wątki robocze są demonami)
+        self.data_viewer.jobs.cancel()
+        
         # Zamknij aplikację
         self.root.quit()
         self.root.destroy()
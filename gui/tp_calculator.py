@@ -6,9 +6,16 @@ from tkinter import ttk, messagebox
 from gui.widgets.date_picker import DateRangePicker, InstrumentSelector, StopLossSelector
 from gui.widgets.custom_entries import NumericEntry
 from calculations.tp_calculator import TPCalculator
+from calculations.tp_stream import EVENT_RESULT, EVENT_FINISHED
+from calculations.statistics import compute_statistics
+from gui.widgets.tp_statistics_view import TPStatisticsView
 from config.database_config import AVAILABLE_INSTRUMENTS
 from utils.formatting import format_points, format_price
 import threading
+import time
+
+# Co ile sekund wątek kalkulacji przekazuje porcję wyników do tabeli
+RESULTS_FLUSH_INTERVAL = 0.2
 
 
 class TPCalculatorWindow:
@@ -235,6 +242,14 @@ class TPCalculatorWindow:
         ttk.Label(stats_frame, text="Max TP (BE):").grid(row=2, column=4, padx=5, pady=2, sticky="w")
         self.max_tp_be_label = ttk.Label(stats_frame, text="0.0 pkt")
         self.max_tp_be_label.grid(row=2, column=5, padx=5, pady=2)
+        
+        # Wiersz 4 - czasy etapów i liczniki przebiegu
+        self.run_stats_label = ttk.Label(stats_frame, text="", foreground="gray", justify="left")
+        self.run_stats_label.grid(row=3, column=0, columnspan=6, padx=5, pady=2, sticky="w")
+        
+        # Statystyki po zakończeniu przebiegu (percentyle, trafienia, wartość oczekiwana, podziały)
+        self.statistics_view = TPStatisticsView(summary_frame, height=4)
+        self.statistics_view.pack(fill="x", padx=5, pady=(0, 5))
     
     def _setup_layout(self):
         """Konfiguruje układ okna"""
@@ -253,8 +268,14 @@ class TPCalculatorWindow:
         if not self._validate_parameters():
             return
         
-        # Wyłącz przycisk i pokaż progress
+        # Wyłącz przycisk, wyczyść poprzednie wyniki i pokaż progress
         self.calculate_button.config(state="disabled")
+        self.export_button.config(state="disabled")
+        self.results = []
+        for item in self.results_tree.get_children():
+            self.results_tree.delete(item)
+        self.run_stats_label.config(text="")
+        self.progress.config(mode='indeterminate')
         self.progress.start()
         
         # Uruchom kalkulację w osobnym wątku
@@ -293,7 +314,12 @@ class TPCalculatorWindow:
         return True
     
     def _perform_calculation(self):
-        """Wykonuje kalkulację (uruchamiane w osobnym wątku)"""
+        """
+        Wykonuje kalkulację (uruchamiane w osobnym wątku)
+        
+        Wyniki przychodzą strumieniem - co RESULTS_FLUSH_INTERVAL porcja trafia
+        do tabeli w głównym wątku razem z postępem i bieżącym podsumowaniem.
+        """
         try:
             print("Rozpoczynam kalkulację...")
             
@@ -313,7 +339,7 @@ class TPCalculatorWindow:
             
             # Wykonaj kalkulację
             print("Wywołuję kalkulator...")
-            self.results = self.calculator.calculate_tp_for_date_range(
+            events = self.calculator.iter_tp_for_date_range(
                 start_date=start_date,
                 end_date=end_date,
                 instruments=instruments,
@@ -326,10 +352,19 @@ class TPCalculatorWindow:
                 detailed_logs=detailed_logs
             )
             
-            print(f"Kalkulacja zakończona. Wyników: {len(self.results)}")
-            
-            # Zaktualizuj GUI w głównym wątku
-            self.window.after(0, self._update_results_display)
+            batch = []
+            last_flush = time.perf_counter()
+            for event in events:
+                if event.kind == EVENT_RESULT:
+                    batch.append(event.result)
+                if event.kind == EVENT_FINISHED or time.perf_counter() - last_flush >= RESULTS_FLUSH_INTERVAL:
+                    self.window.after(0, self._append_results, batch, event.done, event.total, event.missing,
+                                      event.summary.to_dict())
+                    batch = []
+                    last_flush = time.perf_counter()
+                if event.kind == EVENT_FINISHED:
+                    print(f"Kalkulacja zakończona. Wyników: {event.summary.total_positions}")
+                    self.window.after(0, self._finish_results_display, event.stats)
             
         except Exception as e:
             import traceback
@@ -339,19 +374,9 @@ class TPCalculatorWindow:
             self.window.after(0, lambda: messagebox.showerror("Błąd kalkulacji", error_msg))
             self.window.after(0, self._calculation_finished)
     
-    def _update_results_display(self):
-        """Aktualizuje wyświetlanie wyników"""
-        print(f"GUI: Aktualizuję wyświetlanie. Wyników: {len(self.results)}")
-        
-        # Wyczyść tabelę
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
-        
-        # Wypełnij tabelę wynikami
-        for i, result in enumerate(self.results):
-            print(f"GUI: Przetwarzam wynik {i+1}: ticket={result.ticket}")
-            print(f"     TP stały: {result.max_tp_sl_staly}, TP ręczne: {result.max_tp_sl_recznie}, TP BE: {result.max_tp_sl_be}")
-            
+    def _append_results(self, results, done, total, missing, summary):
+        """Dopisuje porcję wyników do tabeli i aktualizuje postęp (główny wątek)"""
+        for result in results:
             values = (
                 result.ticket,
                 result.symbol,
@@ -363,28 +388,32 @@ class TPCalculatorWindow:
                 format_points(result.max_tp_sl_recznie) if result.max_tp_sl_recznie is not None else "",
                 format_points(result.max_tp_sl_be) if result.max_tp_sl_be is not None else ""
             )
-            print(f"     Wartości do tabeli: {values}")
             self.results_tree.insert("", "end", values=values)
+        self.results.extend(results)
         
-        print(f"GUI: Dodano {len(self.results)} wierszy do tabeli")
-        
-        # Aktualizuj podsumowanie
-        self._update_summary()
+        # Postęp: pierwsza porcja przełącza pasek na znaną liczbę pozycji
+        self.progress.stop()
+        self.progress.config(mode='determinate', maximum=max(total, 1), value=done)
+        missing_text = f", bez świeczek: {missing}" if missing else ""
+        self.run_stats_label.config(text=f"Przetworzono {done}/{total} pozycji{missing_text}")
         
-        # Włącz przycisk eksportu
+        self._update_summary(summary)
         if self.results:
             self.export_button.config(state="normal")
-            print("GUI: Włączyłem przycisk eksportu")
+    
+    def _finish_results_display(self, run_stats):
+        """Kończy wyświetlanie wyników - czasy etapów i liczniki przebiegu"""
+        print(f"GUI: Dodano {len(self.results)} wierszy do tabeli")
+        self.run_stats_label.config(text=run_stats.format_summary() if run_stats else "")
         
-        # Zakończ kalkulację
+        # Końcowe liczby z silnika statystyk (te same co w tp_cli.py i eksporcie)
+        statistics = compute_statistics(self.results)
+        self._update_summary(statistics.to_summary())
+        self.statistics_view.set_statistics(statistics)
         self._calculation_finished()
     
-    def _update_summary(self):
-        """Aktualizuje sekcję podsumowania"""
-        print("GUI: Aktualizuję podsumowanie...")
-        summary = self.calculator.get_calculation_summary(self.results)
-        print(f"GUI: Podsumowanie: {summary}")
-        
+    def _update_summary(self, summary):
+        """Aktualizuje sekcję podsumowania (słownik jak TPCalculator.get_calculation_summary)"""
         self.total_positions_label.config(text=str(summary['total_positions']))
         self.successful_calcs_label.config(text=str(summary['successful_calculations']))
         
@@ -395,12 +424,11 @@ class TPCalculatorWindow:
         self.max_tp_staly_label.config(text=f"{summary['max_tp_sl_staly']:.1f} pkt")
         self.max_tp_recznie_label.config(text=f"{summary['max_tp_sl_recznie']:.1f} pkt")
         self.max_tp_be_label.config(text=f"{summary['max_tp_sl_be']:.1f} pkt")
-        
-        print("GUI: Podsumowanie zaktualizowane")
     
     def _calculation_finished(self):
         """Wykonywane po zakończeniu kalkulacji"""
         self.progress.stop()
+        self.progress.config(value=0)
         self.calculate_button.config(state="normal")
         
         # Zamknij połączenia z bazy danych w analizatorach
@@ -0,0 +1,128 @@
+"""
+Optymalny stały TP (calculations/tp_optimizer.py) - tabela grup i krzywa wybranej grupy
+"""
+import csv
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from calculations.statistics import ResultColumns
+from calculations.tp_optimizer import GROUP_DIMENSIONS, optimize_tp
+from config.database_config import TP_OPTIMIZER_GROUP_BY, TP_OPTIMIZER_MIN_POSITIONS
+from gui.widgets.tp_statistics_view import SL_TYPE_LABELS
+
+
+class TPOptimizerView(ttk.Frame):
+    """Wybór grupowania, optymalne poziomy TP i krzywa punktów dla zaznaczonego wiersza"""
+
+    def __init__(self, parent, results, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.columns = ResultColumns.from_results(results)  # Raz - przeliczenia tylko grupują i sortują
+        self.optimization = None
+
+        options_frame = ttk.Frame(self)
+        options_frame.pack(fill="x", padx=5, pady=5)
+        ttk.Label(options_frame, text="Grupuj:").pack(side="left")
+        self.group_vars = {}
+        for name, label in GROUP_DIMENSIONS:
+            var = tk.BooleanVar(value=name in TP_OPTIMIZER_GROUP_BY)
+            ttk.Checkbutton(options_frame, text=label, variable=var, command=self.refresh).pack(side="left", padx=5)
+            self.group_vars[name] = var
+        ttk.Label(options_frame, text="Min. pozycji:").pack(side="left", padx=(15, 5))
+        self.min_positions_var = tk.StringVar(value=str(TP_OPTIMIZER_MIN_POSITIONS))
+        min_entry = ttk.Entry(options_frame, textvariable=self.min_positions_var, width=6)
+        min_entry.pack(side="left")
+        min_entry.bind("<Return>", lambda event: self.refresh())
+        ttk.Button(options_frame, text="Eksportuj", command=self._export).pack(side="right")
+
+        panes = ttk.PanedWindow(self, orient="vertical")
+        panes.pack(fill="both", expand=True, padx=5, pady=5)
+        self.tree = self._create_tree(panes, height=10)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.curve_tree = self._create_tree(panes, height=8, columns=[
+            ("level", "Poziom TP"), ("hits", "Trafienia"), ("total_points", "Suma pkt"), ("expectancy", "Pkt/pozycję")
+        ])
+        self.status_label = ttk.Label(self, foreground="gray",
+                                      text="Poziom maksymalizujący sumę punktów: trafienie +TP, chybienie -SL, "
+                                           "przy BE +offset po aktywacji")
+        self.status_label.pack(fill="x", padx=5, pady=(0, 5))
+
+        self.refresh()
+
+    def _create_tree(self, panes, height, columns=None):
+        frame = ttk.Frame(panes)
+        panes.add(frame, weight=1)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical")
+        tree = ttk.Treeview(frame, height=height, show="headings", yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+        if columns:
+            self._set_columns(tree, columns)
+        return tree
+
+    @staticmethod
+    def _set_columns(tree, columns):
+        tree["columns"] = [name for name, _ in columns]
+        for name, heading in columns:
+            tree.column(name, width=95, anchor=tk.CENTER)
+            tree.heading(name, text=heading)
+
+    def refresh(self):
+        """Przelicza optima dla zaznaczonego grupowania"""
+        group_by = [name for name, _ in GROUP_DIMENSIONS if self.group_vars[name].get()]
+        try:
+            min_positions = max(1, int(self.min_positions_var.get()))
+        except ValueError:
+            min_positions = TP_OPTIMIZER_MIN_POSITIONS
+            self.min_positions_var.set(str(min_positions))
+        self.optimization = optimize_tp(self.columns, group_by=group_by, min_positions=min_positions)
+
+        labels = dict(GROUP_DIMENSIONS)
+        self._set_columns(self.tree, [(name, labels[name]) for name in group_by] + [
+            ("sl_type", "Typ SL"), ("positions", "Pozycje"), ("level", "Optymalny TP"), ("hit_rate", "Trafienia"),
+            ("total_points", "Suma pkt"), ("expectancy", "Pkt/pozycję")
+        ])
+        self.tree.delete(*self.tree.get_children())
+        self.curve_tree.delete(*self.curve_tree.get_children())
+        for index, optimum in enumerate(self.optimization.optima):
+            values = [optimum.group[name] for name in group_by] + [
+                SL_TYPE_LABELS.get(optimum.sl_type, optimum.sl_type),
+                optimum.positions,
+                "" if optimum.level is None else f"{optimum.level:.1f}",
+                "" if optimum.hit_rate is None else f"{optimum.hit_rate * 100:.1f}%",
+                "" if optimum.total_points is None else f"{optimum.total_points:.1f}",
+                "" if optimum.expectancy is None else f"{optimum.expectancy:.2f}",
+            ]
+            self.tree.insert("", "end", iid=str(index), values=values)
+
+    def _on_select(self, event=None):
+        """Krzywa punktów dla zaznaczonej grupy"""
+        self.curve_tree.delete(*self.curve_tree.get_children())
+        selection = self.tree.selection()
+        if not selection:
+            return
+        optimum = self.optimization.optima[int(selection[0])]
+        for row in optimum.curve.to_rows():
+            tags = ("best",) if row["level"] == optimum.level else ()
+            self.curve_tree.insert("", "end", tags=tags, values=(
+                f"{row['level']:.1f}", row["hits"], f"{row['total_points']:.1f}", f"{row['expectancy']:.2f}"
+            ))
+        self.curve_tree.tag_configure("best", background="#c8e6c9")
+
+    def _export(self):
+        """Zapisuje optima do CSV (kolumny jak tp_cli.py tp --optimize)"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Zapisz optymalne TP jako..."
+        )
+        if not filename:
+            return
+        try:
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=self.optimization.row_fields())
+                writer.writeheader()
+                writer.writerows(self.optimization.to_rows())
+            messagebox.showinfo("Sukces", f"Optymalne TP zostały zapisane do pliku:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie można zapisać pliku:\n{e}")
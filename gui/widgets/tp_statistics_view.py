@@ -0,0 +1,100 @@
+"""
+Tabela statystyk TP (calculations/statistics.py) dla okien wyników
+"""
+import csv
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from calculations.statistics import BREAKDOWNS
+
+# Opisy grup i typów SL w tabeli
+GROUP_LABELS = dict(BREAKDOWNS, all="Wszystkie")
+SL_TYPE_LABELS = {"sl_staly": "SL stały", "sl_recznie": "SL ręczne", "sl_be": "BE"}
+
+
+class TPStatisticsView(ttk.LabelFrame):
+    """Statystyki wyników: wiersz na grupę (całość, setup, symbol) i typ SL, eksport do CSV"""
+
+    def __init__(self, parent, statistics=None, height=6, **kwargs):
+        super().__init__(parent, text="Statystyki TP", **kwargs)
+        self.statistics = None
+
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        h_scrollbar = ttk.Scrollbar(table_frame, orient="horizontal")
+        v_scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+        self.tree = ttk.Treeview(table_frame, height=height, show="headings",
+                                 xscrollcommand=h_scrollbar.set, yscrollcommand=v_scrollbar.set)
+        h_scrollbar.config(command=self.tree.xview)
+        v_scrollbar.config(command=self.tree.yview)
+        v_scrollbar.pack(side="right", fill="y")
+        h_scrollbar.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        buttons_frame = ttk.Frame(self)
+        buttons_frame.pack(fill="x", padx=5, pady=(0, 5))
+        self.export_button = ttk.Button(buttons_frame, text="Eksportuj statystyki", command=self._export,
+                                        state="disabled")
+        self.export_button.pack(side="left")
+        ttk.Label(buttons_frame, foreground="gray",
+                  text="Traf. T - odsetek pozycji z max TP >= T; E(T) - punkty na pozycję przy stałym TP = T "
+                       "(chybione: -SL, przy BE +offset po aktywacji)").pack(side="left", padx=10)
+
+        if statistics is not None:
+            self.set_statistics(statistics)
+
+    def set_statistics(self, statistics):
+        """Wypełnia tabelę (TPStatistics z compute_statistics)"""
+        self.statistics = statistics
+        columns = ["group", "value", "sl_type", "count", "mean", "median"]
+        headings = ["Grupa", "Wartość", "Typ SL", "Pozycje", "Średnia", "Mediana"]
+        columns += [f"p{p:g}" for p in statistics.percentiles]
+        headings += [f"P{p:g}" for p in statistics.percentiles]
+        columns.append("max")
+        headings.append("Max")
+        for target in statistics.targets:
+            columns += [f"hit_rate_{target:g}", f"expectancy_{target:g}"]
+            headings += [f"Traf. {target:g}", f"E({target:g})"]
+
+        self.tree.delete(*self.tree.get_children())
+        self.tree["columns"] = columns
+        for column, heading in zip(columns, headings):
+            width = 110 if column == "value" else 80
+            self.tree.column(column, width=width, anchor=tk.W if column in ("group", "value") else tk.CENTER,
+                             stretch=False)
+            self.tree.heading(column, text=heading)
+
+        for row in statistics.to_rows():
+            values = []
+            for column in columns:
+                value = row.get(column)
+                if column == "group":
+                    values.append(GROUP_LABELS.get(value, value))
+                elif column == "sl_type":
+                    values.append(SL_TYPE_LABELS.get(value, value))
+                elif column.startswith("hit_rate_"):
+                    values.append(f"{value * 100:.1f}%" if value is not None else "")
+                elif isinstance(value, float):
+                    values.append(f"{value:.1f}")
+                else:
+                    values.append("" if value is None else value)
+            self.tree.insert("", "end", values=values)
+        self.export_button.config(state="normal" if self.tree.get_children() else "disabled")
+
+    def _export(self):
+        """Zapisuje statystyki do CSV (kolumny jak tp_cli.py tp --stats)"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Zapisz statystyki jako..."
+        )
+        if not filename:
+            return
+        try:
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=self.statistics.row_fields())
+                writer.writeheader()
+                writer.writerows(self.statistics.to_rows())
+            messagebox.showinfo("Sukces", f"Statystyki zostały zapisane do pliku:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie można zapisać pliku:\n{e}")
@@ -105,6 +105,14 @@ if __name__ == "__main__":
         print("Zainstaluj go poleceniem: pip install tkcalendar")
         missing_modules.append('tkcalendar')
     
+    # Sprawdź numpy (silnik obliczeń TP)
+    try:
+        import numpy
+    except ImportError:
+        print("UWAGA: Moduł 'numpy' nie jest zainstalowany.")
+        print("Zainstaluj go poleceniem: pip install numpy")
+        missing_modules.append('numpy')
+    
     if missing_modules:
         print(f"Brakujące moduły: {', '.join(missing_modules)}")
         print("Zainstaluj je przed uruchomieniem aplikacji.")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test generatora syntetycznej bazy i uruchomienia benchmarków (format JSON wyników)
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+# Dodaj katalog główny do PATH
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.dataset import DatasetSpec, generate_dataset, trading_dates
+from benchmarks.run import BENCHMARK_NAMES
+
+
+def test_dataset_schema_and_clustering():
+    """Baza ma schemat EA, świeczki tylko w dni robocze, transakcje skupione przy otwarciu rynku"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        spec = DatasetSpec(trading_days=5, instruments=["ger40.cash", "us100.cash"], trades_per_day=20,
+                           pending_opening_sl=10, seed=3)
+        counts = generate_dataset(db_path, spec)
+
+        conn = sqlite3.connect(db_path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        weekdays = {row[0] for row in conn.execute(
+            "SELECT DISTINCT strftime('%w', time, 'unixepoch') FROM `ger40.cash`")}
+        ticket_type = conn.execute("SELECT typeof(ticket) FROM positions LIMIT 1").fetchone()[0]
+        open_times = [row[0] for row in conn.execute("SELECT open_time FROM positions")]
+        conn.close()
+
+        assert {"positions", "ger40.cash", "us100.cash", "position_opening_sl"} <= tables
+        assert counts["positions"] == len(open_times) > 0 and counts["position_opening_sl"] == 10
+        assert weekdays <= {"1", "2", "3", "4", "5"}
+        assert ticket_type == "integer"
+        assert len(trading_dates(spec.start_date, 5)) == 5
+        # Skupienie: wiele transakcji w tej samej godzinie dnia
+        hours = [(t % 86400) // 3600 for t in open_times]
+        assert max(hours.count(h) for h in set(hours)) > len(hours) / 6
+    print(f"✅ Syntetyczna baza: {counts}")
+
+
+def test_runner_writes_json_report():
+    """python -m benchmarks.run zapisuje wyniki wszystkich benchmarków w JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "bench.json")
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--days", "2", "--repeat", "1",
+             "--workdir", tmp, "--output", output],
+            cwd=ROOT_DIR, capture_output=True, text=True, timeout=300
+        )
+        assert completed.returncode == 0, completed.stderr
+        with open(output, encoding="utf-8") as f:
+            report = json.load(f)
+
+    assert report["schema"] == 1 and report["dataset"]["synthetic"]
+    assert [b["name"] for b in report["benchmarks"]] == BENCHMARK_NAMES
+    for benchmark in report["benchmarks"]:
+        assert benchmark["repeat"] == 1
+        assert 0 <= benchmark["min_s"] <= benchmark["median_s"] <= benchmark["max_s"]
+    counters = {b["name"]: b["counters"] for b in report["benchmarks"]}
+    positions = report["dataset"]["rows"]["positions"]
+    assert counters["tp_for_tickets"]["results"] == positions
+    assert counters["tp_for_date_range"]["results"] == positions
+    print(f"✅ Raport benchmarków: {len(report['benchmarks'])} pomiarów")
+
+
+if __name__ == "__main__":
+    test_dataset_schema_and_clustering()
+    test_runner_writes_json_report()
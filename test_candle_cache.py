@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test cache świeczek dziennych (LRU, budżet pamięci, liczniki trafień)
+"""
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer
+from calculations.candle_cache import CandleCache, DayCandles
+from conftest import DAY_START, create_test_database
+from database.models import Position
+from database.queries import CandleQueries
+
+
+def direct_candles(path, table, open_time, end_time):
+    """Świeczki pobrane bezpośrednio zapytaniem (bez cache)"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(CandleQueries.get_candles_by_time_range(table), (open_time - 60, end_time)).fetchall()
+    conn.close()
+    return rows
+
+
+def test_positions_share_cached_day():
+    """Pozycje z tego samego dnia dostają wycinek dnia z cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path)
+
+        cache = CandleCache()
+        analyzer = CandleAnalyzer(db_path=db_path, candle_cache=cache)
+
+        open_times = [DAY_START + 3600 * h + 17 for h in range(1, 11)]
+        with redirect_stdout(io.StringIO()):
+            for open_time in open_times:
+                candles = analyzer.get_candles_for_position("GER40.cash", open_time)
+                expected = direct_candles(db_path, "ger40.cash", open_time, candles[-1].time)
+                assert [(c.time, c.open, c.high, c.low, c.close, c.tick_volume, c.spread, c.real_volume)
+                        for c in candles] == expected
+        analyzer.close_connection()
+
+        stats = cache.get_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == len(open_times) - 1
+        assert stats['entries'] == 1
+        print(f"✅ Cache: {stats}")
+
+
+def test_lru_eviction_respects_budget():
+    """Budżet pamięci wypiera najdawniej używane dni"""
+    rows = [(DAY_START + i * 60, 1.0, 2.0, 0.5, 1.5, 1, 1, 0) for i in range(100)]
+    day = DayCandles.from_rows(rows)
+    cache = CandleCache(max_bytes=day.nbytes * 2)
+
+    cache.put(("db", "t", 1), day)
+    cache.put(("db", "t", 2), day)
+    assert cache.get(("db", "t", 1)) is day  # 1 staje się najświeższy
+    cache.put(("db", "t", 3), day)           # wypiera 2
+
+    assert cache.get(("db", "t", 2)) is None
+    assert cache.get(("db", "t", 1)) is day
+    assert cache.get(("db", "t", 3)) is day
+    assert cache.evictions == 1
+    assert cache.current_bytes <= cache.max_bytes
+    print("✅ Wypieranie LRU działa")
+
+
+def test_window_bounds():
+    """Wycinek okna czasowego przez wyszukiwanie binarne"""
+    day = DayCandles.from_rows([(t, 1.0, 1.0, 1.0, 1.0, None, None, None) for t in (0, 60, 120, 180)])
+    assert day.window_bounds(60, 120) == (1, 3)
+    assert day.window_bounds(61, 179) == (2, 3)
+    assert day.window_bounds(500, 600) == (4, 4)
+    assert day.tick_volume.tolist() == [0, 0, 0, 0]
+    print("✅ Granice okna poprawne")
+
+
+def test_data_availability_probe():
+    """Sprawdzenie dostępności danych zwraca czas pierwszej świeczki"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=1)
+        analyzer = CandleAnalyzer(db_path=db_path, candle_cache=CandleCache())
+
+        with redirect_stdout(io.StringIO()):
+            assert analyzer.get_data_availability("ger40.cash", DAY_START + 90) == DAY_START + 60
+            assert analyzer.get_data_availability("ger40.cash", DAY_START + 2 * 86400) is None
+            assert analyzer.get_data_availability("us100.cash", DAY_START) is None
+            assert analyzer.has_sufficient_data("ger40.cash", DAY_START)
+        analyzer.close_connection()
+    print("✅ Sprawdzenie dostępności danych działa")
+
+
+def test_preload_batches_queries():
+    """Preload wczytuje dni wszystkich pozycji jednym zapytaniem na instrument"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=3)
+
+        cache = CandleCache()
+        analyzer = CandleAnalyzer(db_path=db_path, candle_cache=cache)
+        positions = [
+            Position(ticket=i, open_time=DAY_START + day * 86400 + 3600 * (i % 5 + 1), type=0,
+                     volume=1.0, symbol="ger40.cash\x00", open_price=15000.0)
+            for day in range(3) for i in range(10)
+        ]
+
+        candle_queries = []
+        analyzer._get_connection().set_trace_callback(
+            lambda sql: candle_queries.append(sql) if "ger40.cash" in sql else None
+        )
+
+        with redirect_stdout(io.StringIO()):
+            assert analyzer.preload_candles(positions) == 1
+            loaded = [analyzer.get_candles_for_position(p.symbol, p.open_time) for p in positions]
+
+        assert len(candle_queries) == 1
+        assert all(candles for candles in loaded)
+        assert cache.get_stats()['entries'] == 3
+        analyzer.close_connection()
+    print("✅ Preload: jedno zapytanie na instrument dla 30 pozycji")
+
+
+if __name__ == "__main__":
+    test_positions_share_cached_day()
+    test_lru_eviction_respects_budget()
+    test_window_bounds()
+    test_data_availability_probe()
+    test_preload_batches_queries()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test kolumnowego magazynu świeczek (synchronizacja przyrostowa, odczyt przez memmap)
+"""
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer
+from calculations.candle_cache import CandleCache
+from conftest import DAY_START, create_test_database
+from database.columnar_store import ColumnarCandleStore, sync_all_candle_tables
+from test_candle_cache import direct_candles
+
+
+def test_incremental_sync():
+    """Druga synchronizacja dopisuje tylko świeczki nowsze niż watermark"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=1)
+        store = ColumnarCandleStore(os.path.join(tmp, "store"))
+
+        conn = sqlite3.connect(db_path)
+        assert store.sync_table(conn, "ger40.cash") == 1440
+        assert store.sync_table(conn, "ger40.cash") == 0
+
+        conn.execute("INSERT INTO `ger40.cash` VALUES (?, 1, 2, 0.5, 1.5, 1, 3, 0)", (DAY_START + 1440 * 60,))
+        conn.commit()
+        assert store.sync_table(conn, "ger40.cash") == 1
+        conn.close()
+
+        meta = store.read_meta("ger40.cash")
+        assert meta['count'] == 1441
+        assert meta['watermark'] == DAY_START + 1440 * 60
+
+        columns = store.get_range("ger40.cash", DAY_START + 1439 * 60, DAY_START + 1440 * 60)
+        assert columns['time'].tolist() == [DAY_START + 1439 * 60, DAY_START + 1440 * 60]
+        assert columns['spread'].tolist()[-1] == 3
+        store.close()
+    print("✅ Synchronizacja przyrostowa działa")
+
+
+def test_analyzer_reads_from_store():
+    """CandleAnalyzer czyta świeczki z magazynu bez zapytań do tabeli świeczek"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        store = ColumnarCandleStore(os.path.join(tmp, "store"))
+        analyzer = CandleAnalyzer(db_path=db_path, candle_cache=CandleCache(), candle_store=store)
+
+        with redirect_stdout(io.StringIO()):
+            assert analyzer.sync_candle_store() == {"ger40.cash": 2880}
+
+        candle_queries = []
+        analyzer._get_connection().set_trace_callback(
+            lambda sql: candle_queries.append(sql) if "ger40.cash" in sql else None
+        )
+
+        open_time = DAY_START + 5 * 3600 + 17
+        with redirect_stdout(io.StringIO()):
+            candles = analyzer.get_candles_for_position("GER40.cash", open_time)
+
+        assert candle_queries == []
+        expected = direct_candles(db_path, "ger40.cash", open_time, candles[-1].time)
+        assert [(c.time, c.open, c.high, c.low, c.close, c.spread) for c in candles] == \
+               [(r[0], r[1], r[2], r[3], r[4], r[6]) for r in expected]
+        analyzer.close_connection()
+        store.close()
+    print("✅ Odczyt świeczek z magazynu kolumnowego")
+
+
+def test_sync_stops_between_tables():
+    """should_stop przerywa synchronizację przed kolejną tabelą - zsynchronizowane tabele są kompletne"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=1)
+        store = ColumnarCandleStore(os.path.join(tmp, "store"))
+        checks = []
+
+        conn = sqlite3.connect(db_path)
+        with redirect_stdout(io.StringIO()):
+            stopped = sync_all_candle_tables(conn, store, should_stop=lambda: checks.append(1) or len(checks) > 1)
+            synced = sync_all_candle_tables(conn, store)
+        conn.close()
+
+        assert len(stopped) == 1
+        (table, appended), = stopped.items()
+        assert store.read_meta(table)['count'] == appended > 0
+        assert synced[table] == 0 and len(synced) >= 1
+        store.close()
+    print(f"✅ Synchronizacja przerwana po {len(stopped)} tabeli")
+
+
+if __name__ == "__main__":
+    test_incremental_sync()
+    test_analyzer_reads_from_store()
+    test_sync_stops_between_tables()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test profili wychyleń (budowa przyrostowa, TP dla stałego SL bez świeczek)
+"""
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_PYTHON
+from calculations.candle_cache import CandleCache
+from calculations.excursion_profile import ExcursionProfileBuilder
+from calculations.position_analyzer import PositionAnalyzer
+from conftest import DAY_START, add_positions, create_test_database
+
+
+def test_profiles_answer_fixed_sl_like_loop():
+    """TP z profilu dla dowolnego SL i spreadu identyczny z pętlą na świeczkach"""
+    rng = random.Random(13)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 41))
+
+        analyzer = CandleAnalyzer(engine=ENGINE_PYTHON, db_path=db_path, candle_cache=CandleCache())
+        with redirect_stdout(io.StringIO()):
+            builder = ExcursionProfileBuilder(db_path, analyzer, PositionAnalyzer(db_path))
+            assert builder.build_incremental() == 40
+
+            checked = 0
+            for open_time, ticket, type_, _, symbol, open_price, *_ in rows:
+                candles = analyzer.get_candles_for_position(symbol, open_time)
+                position_type = 0 if type_ == "buy" else 1
+                for sl_points in (1, 3, 6, 10, 25, 80):
+                    for spread in (0, 0.5, 2):
+                        stop_loss = open_price - sl_points if position_type == 0 else open_price + sl_points
+                        expected = analyzer.calculate_max_tp_basic(candles, position_type, open_price,
+                                                                   stop_loss, spread)
+                        assert builder.max_tp_for_fixed_sl(ticket, sl_points, spread) == expected
+                        checked += 1
+        builder.close_connection()
+        analyzer.close_connection()
+    print(f"✅ Profile zgodne z pętlą ({checked} zapytań)")
+
+
+def test_incremental_build_uses_watermark():
+    """Druga budowa przetwarza tylko nowe pozycje (i te z open_time równym watermarkowi)"""
+    rng = random.Random(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        first = add_positions(db_path, rng, range(1, 11))
+
+        analyzer = CandleAnalyzer(db_path=db_path, candle_cache=CandleCache())
+        with redirect_stdout(io.StringIO()):
+            builder = ExcursionProfileBuilder(db_path, analyzer, PositionAnalyzer(db_path))
+            assert builder.build_incremental() == 10
+            watermark = builder.get_watermark()
+            assert watermark == max(row[0] for row in first)
+
+            conn = sqlite3.connect(db_path)
+            conn.execute("INSERT INTO positions VALUES (?, 99, 'buy', 1.0, 'ger40.cash', 15000, NULL, NULL, NULL, NULL, NULL)",
+                         (watermark + 60,))
+            conn.commit()
+            conn.close()
+            assert builder.build_incremental() == 2
+            assert builder.max_tp_for_fixed_sl(99, 10) is not None
+            assert builder.max_tp_for_fixed_sl(12345, 10) is None
+        builder.close_connection()
+        analyzer.close_connection()
+    print("✅ Budowa przyrostowa z watermarkiem")
+
+
+def test_positions_without_candles_are_retried():
+    """Pozycja bez świeczek nie zostaje za watermarkiem - profil powstaje, gdy świeczki dojdą"""
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 6))
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO positions VALUES (?, 50, 'sell', 1.0, 'us100.cash', 15000, NULL, NULL, NULL, NULL, NULL)",
+                     (min(row[0] for row in rows),))
+        conn.commit()
+        conn.close()
+
+        with redirect_stdout(io.StringIO()):
+            builder = ExcursionProfileBuilder(db_path, CandleAnalyzer(db_path=db_path, candle_cache=CandleCache()),
+                                              PositionAnalyzer(db_path))
+            assert builder.build_incremental() == 6
+            assert builder.max_tp_for_fixed_sl(50, 10) is None
+            builder.close_connection()
+
+            # EA dogrywa tabelę instrumentu - kolejna budowa uzupełnia profil mimo watermarku
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE `us100.cash` AS SELECT * FROM `ger40.cash`")
+            conn.commit()
+            conn.close()
+            builder = ExcursionProfileBuilder(db_path, CandleAnalyzer(db_path=db_path, candle_cache=CandleCache()),
+                                              PositionAnalyzer(db_path))
+            assert builder.build_incremental() == 2  # Ponowiona pozycja + pozycja z open_time watermarku
+            assert builder.max_tp_for_fixed_sl(50, 10) is not None
+            assert builder.get_profiles([50])[50].candle_count > 0
+            builder.close_connection()
+    print("✅ Pozycje bez świeczek budowane ponownie")
+
+
+if __name__ == "__main__":
+    test_profiles_answer_fixed_sl_like_loop()
+    test_incremental_build_uses_watermark()
+    test_positions_without_candles_are_retried()
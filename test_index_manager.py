@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test managera indeksów (tworzenie brakujących indeksów, raport planów zapytań)
+"""
+import io
+import os
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.migration.index_manager import IndexManager
+
+
+def create_ea_schema():
+    """Schemat jak tworzony przez EA - bez indeksów"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE positions (
+            open_time INTEGER, ticket INTEGER, type INTEGER, volume REAL, symbol TEXT,
+            open_price REAL, sl REAL, sl_recznie REAL, setup TEXT, trends INTEGER,
+            trendl INTEGER, magic_number INTEGER
+        )
+    """)
+    conn.execute("CREATE TABLE `ger40.cash` (time INTEGER, open REAL, high REAL, low REAL, close REAL, "
+                 "tick_volume INTEGER, spread INTEGER, real_volume INTEGER)")
+    conn.execute("CREATE TABLE `us100.cash` (time INTEGER PRIMARY KEY, open REAL, high REAL, low REAL, "
+                 "close REAL, tick_volume INTEGER, spread INTEGER, real_volume INTEGER)")
+    conn.executemany("INSERT INTO positions (open_time, ticket, symbol) VALUES (?, ?, ?)",
+                     [(i * 60, i, "ger40.cash") for i in range(200)])
+    conn.commit()
+    return conn
+
+
+def test_creates_missing_indexes():
+    """Brakujące indeksy są tworzone, pełne skany znikają z planów"""
+    conn = create_ea_schema()
+    manager = IndexManager(conn)
+
+    with redirect_stdout(io.StringIO()):
+        report = manager.ensure_indexes()
+
+    assert "idx_positions_open_time_filters" in report['created']
+    assert "idx_positions_ticket" in report['created']
+    assert "idx_ger40_cash_time" in report['created']
+    assert "idx_us100_cash_time" not in report['created']  # time jest już INTEGER PRIMARY KEY
+
+    plan = report['plans']['positions_by_tickets']
+    assert any("SCAN" in step for step in plan['before'])
+    assert any("idx_positions_ticket" in step for step in plan['after'])
+    candle_plan = report['plans']['candles ger40.cash']
+    assert any("idx_ger40_cash_time" in step for step in candle_plan['after'])
+    print(manager.format_report(report))
+
+    with redirect_stdout(io.StringIO()):
+        second = manager.ensure_indexes()
+    assert second['created'] == []
+    print("✅ Indeksy utworzone, druga analiza niczego nie zmienia")
+
+
+if __name__ == "__main__":
+    test_creates_missing_indexes()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test zadań w tle GUI (kolejka komunikatów, zastępowanie nieaktualnych zadań, anulowanie)
+"""
+import os
+import sys
+import threading
+import time
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gui.jobs import JobScheduler
+
+
+class FakeRoot:
+    """Zastępuje widget Tk - after() zapamiętuje wywołanie, test opróżnia kolejkę ręcznie"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def run_until(self, condition, timeout=5.0):
+        """Pętla zdarzeń: wywołuje zaplanowane after() aż do spełnienia warunku"""
+        deadline = time.time() + timeout
+        while not condition():
+            assert time.time() < deadline, "Przekroczono czas oczekiwania"
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+
+
+def test_callbacks_run_on_main_thread():
+    """Postęp i wynik docierają przez kolejkę do wątku wywołującego poll(), w kolejności"""
+    root = FakeRoot()
+    scheduler = JobScheduler(root)
+    main_thread = threading.get_ident()
+    events = []
+    states = []
+    scheduler.add_listener(lambda job: states.append(None if job is None else job.description))
+
+    def work(job):
+        worker_thread = threading.get_ident()
+        for i in range(1, 4):
+            job.progress(i, 3)
+        job.post(events.append, ("porcja", threading.get_ident() == worker_thread))
+        return 42
+
+    scheduler.submit("view", work,
+                     on_done=lambda result: events.append(("wynik", result, threading.get_ident() == main_thread)),
+                     on_progress=lambda job: events.append(("postęp", job.done, job.total)),
+                     description="Zadanie testowe")
+    assert scheduler.is_running("view")
+    root.run_until(lambda: not scheduler.is_running("view"))
+
+    assert events == [("postęp", 1, 3), ("postęp", 2, 3), ("postęp", 3, 3), ("porcja", True),
+                      ("wynik", 42, True)]
+    assert states[0] == "Zadanie testowe" and states[-1] is None
+    print("✅ Komunikaty zadań w głównym wątku")
+
+
+def test_newer_job_supersedes_stale_one():
+    """Nowe zadanie z tym samym kluczem anuluje poprzednie (wynik odrzucony) i startuje po jego wątku"""
+    root = FakeRoot()
+    scheduler = JobScheduler(root)
+    release = threading.Event()
+    results = []
+    second_started = threading.Event()
+
+    def slow(job):
+        release.wait(5)
+        return "stare"
+
+    def newer(job):
+        second_started.set()
+        return "nowe"
+
+    first = scheduler.submit("load_data", slow, on_done=results.append)
+    second = scheduler.submit("load_data", newer, on_done=results.append)
+    other = scheduler.submit("export", lambda job: "eksport", on_done=results.append)
+    assert first.cancelled and not second.cancelled and not other.cancelled
+
+    # Zastąpione zadanie nadal działa - nowe czeka, stare widoczne jako kończące się
+    root.run_until(lambda: results == ["eksport"])
+    assert not second_started.wait(0.05)
+    assert first.stopping and first in scheduler.active_jobs()
+
+    release.set()
+    root.run_until(lambda: not scheduler.active_jobs())
+
+    assert sorted(results) == ["eksport", "nowe"] and first.finished
+    print("✅ Nieaktualne zadanie zastąpione")
+
+
+def test_cancel_and_error():
+    """Anulowanie przerywa zadanie bez wywołań zwrotnych; błąd trafia do on_error"""
+    root = FakeRoot()
+    scheduler = JobScheduler(root)
+    started = threading.Event()
+    stopped = threading.Event()
+    calls = []
+
+    def endless(job):
+        started.set()
+        try:
+            while True:
+                job.check_cancelled()
+                job.progress(1)
+                time.sleep(0.001)
+        finally:
+            stopped.set()
+
+    states = []
+    scheduler.add_listener(lambda current: states.append(None if current is None else
+                                                         (current.description, current.stopping)))
+    job = scheduler.submit("tp_calculation", endless, on_done=calls.append, on_error=calls.append)
+    assert started.wait(5)
+    scheduler.cancel("tp_calculation")
+    assert job.stopping and states[-1] == ("tp_calculation", True)
+    assert stopped.wait(5) and job.cancelled
+    root.run_until(lambda: not scheduler.is_running("tp_calculation"))
+    assert states[-1] is None
+
+    def failing(job):
+        raise ValueError("brak bazy")
+
+    scheduler.submit("diagnostics", failing, on_done=calls.append,
+                     on_error=lambda e: calls.append(("błąd", str(e))))
+    root.run_until(lambda: not scheduler.active_jobs())
+
+    assert calls == [("błąd", "brak bazy")]
+    print("✅ Anulowanie i obsługa błędów")
+
+
+if __name__ == "__main__":
+    test_callbacks_run_on_main_thread()
+    test_newer_job_supersedes_stale_one()
+    test_cancel_and_error()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test równoległych obliczeń TP (procesy robocze, kolejność wyników jak w ścieżce szeregowej)
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations import parallel_tp
+from calculations.parallel_tp import partition_positions
+from calculations.tp_stream import collect_results
+from calculations.tp_calculator import TPCalculator
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.models import Position
+from conftest import DAY_START, add_positions, create_test_database
+from utils.date_utils import get_day_start_unix
+
+
+def test_partition_keeps_instrument_days_together():
+    """Porcje nie rozdzielają pozycji z tego samego instrumentu i dnia"""
+    positions = [
+        Position(ticket=i, open_time=DAY_START + (i % 3) * 86400 + i * 60, type=0, volume=1.0,
+                 symbol="ger40.cash" if i % 2 else "US100.cash\x00", open_price=1.0)
+        for i in range(60)
+    ]
+    chunks = partition_positions(positions, 4)
+    assert sorted(index for chunk in chunks for index in chunk) == list(range(60))
+
+    owner = {}
+    for chunk_index, chunk in enumerate(chunks):
+        for index in chunk:
+            key = (positions[index].symbol.lower().strip("\x00"), get_day_start_unix(positions[index].open_time))
+            assert owner.setdefault(key, chunk_index) == chunk_index
+    print(f"✅ {len(chunks)} porcji, grupy instrument/dzień nierozdzielone")
+
+
+def test_parallel_matches_serial():
+    """Wyniki z puli procesów identyczne i w tej samej kolejności co szeregowo"""
+    rng = random.Random(8)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 61))
+        tickets = [str(row[1]) for row in rows]
+
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+        params = dict(sl_types={'sl_staly': True}, sl_staly_values={main_instrument: 6},
+                      be_prog=4, be_offset=1, spread=0.5, use_cache=False)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            serial = calculator.calculate_tp_for_tickets(tickets, workers=1, **params)
+            parallel = calculator.calculate_tp_for_tickets(tickets, workers=2, **params)
+            calculator.close_connection()
+
+        assert len(serial) == 60
+        assert [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in parallel] == \
+               [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in serial]
+    print("✅ Wyniki równoległe zgodne ze szeregowymi")
+
+
+def test_stream_reuses_one_pool():
+    """Strumień porcjami (rosnącymi od pozycji na proces) liczy wszystkie porcje w jednej puli procesów"""
+    rng = random.Random(9)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 41))
+        tickets = [str(row[1]) for row in rows]
+
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+        params = dict(sl_types={'sl_staly': True}, sl_staly_values={main_instrument: 6},
+                      be_prog=4, be_offset=1, spread=0.5, use_cache=False)
+
+        created = []
+        executor_class = parallel_tp.ProcessPoolExecutor
+
+        class CountingExecutor(executor_class):
+            def __init__(self, *args, **kwargs):
+                created.append(kwargs.get("max_workers"))
+                super().__init__(*args, **kwargs)
+
+        parallel_tp.ProcessPoolExecutor = CountingExecutor
+        try:
+            with redirect_stdout(io.StringIO()):
+                calculator = TPCalculator(db_path=db_path)
+                serial = calculator.calculate_tp_for_tickets(tickets, workers=1, **params)
+                streamed = collect_results(calculator.iter_tp_for_tickets(tickets, workers=2, **params))
+                calculator.close_connection()
+        finally:
+            parallel_tp.ProcessPoolExecutor = executor_class
+
+        assert created == [2]
+        assert calculator._worker_pool is None
+        assert [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in streamed] == \
+               [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in serial]
+    print(f"✅ Strumień: {len(streamed)} wyników z jednej puli procesów")
+
+
+if __name__ == "__main__":
+    test_partition_keeps_instrument_days_together()
+    test_parallel_matches_serial()
+    test_stream_reuses_one_pool()
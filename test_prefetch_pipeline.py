@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test potoku wczytywania świeczek z wyprzedzeniem (kolejność, back-pressure, błędy)
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer
+from calculations.candle_cache import CandleCache
+from calculations.prefetch_pipeline import CandlePrefetcher
+from calculations.tp_calculator import TPCalculator
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.models import Position
+from conftest import DAY_START, add_positions, create_test_database
+
+
+def make_positions(count):
+    return [Position(ticket=i, open_time=DAY_START + 600 * i + 7, type=0, volume=1.0,
+                     symbol="ger40.cash", open_price=15000.0) for i in range(count)]
+
+
+def test_prefetch_order_and_back_pressure():
+    """Świeczki wracają w kolejności pozycji, czytelnicy nie wyprzedzają o więcej niż depth"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=1)
+        positions = make_positions(40)
+
+        max_buffered = 0
+        with redirect_stdout(io.StringIO()):
+            with CandlePrefetcher(positions, db_path, depth=3, readers=3, candle_cache=CandleCache()) as prefetcher:
+                for position, candles in prefetcher:
+                    max_buffered = max(max_buffered, len(prefetcher._slots))
+                    assert candles[0].time <= position.open_time
+                    assert candles[-1].time >= position.open_time
+                    seen = position.ticket
+        assert seen == 39
+        assert max_buffered <= 3
+    print(f"✅ Kolejność zachowana, maksymalnie {max_buffered} pozycji w buforze")
+
+
+def test_reader_error_stops_pipeline():
+    """Błąd wątku czytającego jest zgłaszany konsumentowi, a wątki kończą pracę"""
+    original = CandleAnalyzer.get_candles_for_position
+
+    def failing(self, instrument, open_time):
+        if open_time == DAY_START + 600 * 5 + 7:
+            raise RuntimeError("dysk niedostępny")
+        return original(self, instrument, open_time)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=1)
+        CandleAnalyzer.get_candles_for_position = failing
+        try:
+            consumed = []
+            with redirect_stdout(io.StringIO()):
+                prefetcher = CandlePrefetcher(make_positions(20), db_path, depth=4, readers=2,
+                                              candle_cache=CandleCache())
+                try:
+                    with prefetcher:
+                        for position, _ in prefetcher:
+                            consumed.append(position.ticket)
+                    raise AssertionError("oczekiwano błędu")
+                except RuntimeError as e:
+                    assert "dysk" in str(e)
+        finally:
+            CandleAnalyzer.get_candles_for_position = original
+
+        assert consumed == [0, 1, 2, 3, 4]
+        assert not [t for t in threading.enumerate() if t.name.startswith("CandlePrefetcher")]
+    print("✅ Błąd czytelnika zatrzymuje potok")
+
+
+def test_pipelined_calculation_matches_serial():
+    """Wyniki TP z potokiem identyczne z obliczeniami bez potoku"""
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 31))
+        tickets = [str(row[1]) for row in rows]
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+        params = dict(sl_types={'sl_staly': True}, sl_staly_values={main_instrument: 6},
+                      be_prog=4, be_offset=1, spread=0.5, workers=1, use_cache=False)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            serial = calculator.calculate_tp_for_tickets(tickets, prefetch_depth=0, **params)
+            calculator.candle_analyzer.candle_cache.clear()
+            pipelined = calculator.calculate_tp_for_tickets(tickets, prefetch_depth=4, **params)
+            calculator.close_connection()
+
+        assert [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in pipelined] == \
+               [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_be) for r in serial]
+    print("✅ Potok zgodny z obliczeniami szeregowymi")
+
+
+if __name__ == "__main__":
+    test_prefetch_order_and_back_pressure()
+    test_reader_error_stops_pipeline()
+    test_pipelined_calculation_matches_serial()
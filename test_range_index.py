@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test indeksu zakresowego (sparse table) i opartych na nim symulacji TP
+"""
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations import range_index, vectorized_tp
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_NUMPY, ENGINE_RANGE_INDEX
+from calculations.candle_cache import CandleCache
+from conftest import DAY_START, create_test_database
+from test_vectorized_tp import make_random_candles, run_loop, run_be_loop
+
+
+def test_sparse_table_queries():
+    """Zapytania max/min i pierwsze przekroczenie zgodne z przeglądem liniowym"""
+    rng = np.random.default_rng(5)
+    values = rng.normal(size=257)
+    max_table = range_index.SparseTable(values, use_max=True)
+    min_table = range_index.SparseTable(values, use_max=False)
+
+    for _ in range(500):
+        i = int(rng.integers(0, 256))
+        j = int(rng.integers(i + 1, 258))
+        assert max_table.query(i, j) == values[i:j].max()
+        assert min_table.query(i, j) == values[i:j].min()
+
+        level = float(rng.normal())
+        above = np.nonzero(values[i:] >= level)[0]
+        below = np.nonzero(values[i:] <= level)[0]
+        assert max_table.first_index(lambda v: v >= level, i) == (i + above[0] if len(above) else -1)
+        assert min_table.first_index(lambda v: v <= level, i) == (i + below[0] if len(below) else -1)
+    print("✅ Sparse table zgodna z przeglądem liniowym")
+
+
+def test_range_index_engine_matches_loop():
+    """Silnik range_index daje identyczne wyniki jak pętla (basic i BE)"""
+    rng = random.Random(7)
+    analyzer = CandleAnalyzer(engine=ENGINE_RANGE_INDEX)
+
+    for _ in range(300):
+        candles = make_random_candles(rng, rng.randint(1, 150))
+        position_type = rng.choice([0, 1])
+        open_price = candles[0].open
+        sl_distance = rng.choice([2, 5, 10, 20])
+        stop_loss = open_price - sl_distance if position_type == 0 else open_price + sl_distance
+        be_prog = rng.choice([1, 3, 8, 15])
+        be_offset = rng.choice([0, 1, 2])
+        spread = rng.choice([0, 0.5])
+
+        expected = run_loop(analyzer, candles, position_type, open_price, stop_loss, spread)
+        assert analyzer.calculate_max_tp_basic(candles, position_type, open_price, stop_loss, spread) == expected
+
+        expected_be = run_be_loop(analyzer, candles, position_type, open_price, stop_loss,
+                                  be_prog, be_offset, spread)
+        actual_be = analyzer.calculate_max_tp_with_be(candles, position_type, open_price, stop_loss,
+                                                      be_prog, be_offset, spread)
+        assert actual_be == expected_be, f"range_index={actual_be} pętla={expected_be}"
+    print("✅ Silnik range_index zgodny z pętlą")
+
+
+def test_grid_matches_vectorized_grid():
+    """Siatka na indeksie (także od świeczki w środku dnia) zgodna z vectorized_tp.max_tp_grid"""
+    rng = random.Random(3)
+    for _ in range(50):
+        candles = make_random_candles(rng, rng.randint(20, 200))
+        start = rng.randint(0, 10)
+        high, low, close = vectorized_tp.candles_to_arrays(candles)
+        index = range_index.CandleRangeIndex(high, low, close)
+        position_type = rng.choice([0, 1])
+        open_price = candles[start].open
+        sign = -1 if position_type == 0 else 1
+        sl_levels = [open_price + sign * d for d in (2, 4, 8, 16, 32)]
+
+        expected = vectorized_tp.max_tp_grid(high[start:], low[start:], close[start:], position_type,
+                                             open_price, sl_levels, [2, 6, 12], [0, 1], 0.5)
+        actual = range_index.max_tp_grid(index, position_type, open_price, sl_levels,
+                                         [2, 6, 12], [0, 1], 0.5, start=start)
+        assert np.array_equal(actual[0], expected[0])
+        assert np.array_equal(actual[1], expected[1])
+    print("✅ Siatka na indeksie zgodna z siatką wektorową")
+
+
+def test_day_index_shared_by_positions():
+    """Pozycje jednego dnia korzystają z jednego indeksu dnia (start = świeczka otwarcia), wyniki jak numpy"""
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        cache = CandleCache()
+        analyzer = CandleAnalyzer(engine=ENGINE_RANGE_INDEX, db_path=db_path, candle_cache=cache)
+        reference = CandleAnalyzer(engine=ENGINE_NUMPY, db_path=db_path, candle_cache=CandleCache())
+
+        with redirect_stdout(io.StringIO()):
+            starts = set()
+            for _ in range(60):
+                open_time = DAY_START + rng.randint(0, 2 * 86400 - 600)
+                candles = analyzer.get_candles_for_position("ger40.cash", open_time)
+                index, start = analyzer.get_range_index(candles)
+                assert len(index) - start == len(candles)
+                starts.add(start)
+
+                position_type = rng.choice([0, 1])
+                open_price = float(candles.open[0])
+                sign = -1 if position_type == 0 else 1
+                for sl_distance in (2, 6, 15):
+                    stop_loss = open_price + sign * sl_distance
+                    expected_candles = reference.get_candles_for_position("ger40.cash", open_time)
+                    assert analyzer.calculate_max_tp_basic(candles, position_type, open_price, stop_loss, 0.5) == \
+                        reference.calculate_max_tp_basic(expected_candles, position_type, open_price, stop_loss, 0.5)
+                    assert analyzer.calculate_max_tp_with_be(candles, position_type, open_price, stop_loss,
+                                                             4, 1, 0.5) == \
+                        reference.calculate_max_tp_with_be(expected_candles, position_type, open_price, stop_loss,
+                                                           4, 1, 0.5)
+        analyzer.close_connection()
+        reference.close_connection()
+
+    index_keys = [key for key in cache._entries if key[-1] == "range_index"]
+    assert len(index_keys) == 2  # Jeden indeks na dzień, nie na pozycję
+    assert len(starts) > 2
+    print(f"✅ Indeks dnia współdzielony ({len(index_keys)} indeksy dla 60 pozycji)")
+
+
+if __name__ == "__main__":
+    test_sparse_table_queries()
+    test_range_index_engine_matches_loop()
+    test_grid_matches_vectorized_grid()
+    test_day_index_shared_by_positions()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test pomiarów przebiegu TP (czasy etapów, liczniki zapytań, wierszy i świeczek)
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.run_stats import RunStats, STAGES
+from calculations.tp_stream import TPResultList
+from calculations.tp_calculator import TPCalculator
+from conftest import add_positions, create_test_database, make_params
+
+
+def test_nested_stages_are_exclusive():
+    """Etap zagnieżdżony wstrzymuje zewnętrzny; inne wątki tylko liczą"""
+    stats = RunStats()
+    with stats.stage("candle_fetch"):
+        time.sleep(0.02)
+        with stats.stage("table_resolution"):
+            time.sleep(0.03)
+
+    def other_thread():
+        with stats.stage("simulation"):
+            time.sleep(0.02)
+        stats.add("queries", 2)
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+    stats.finish()
+
+    assert 0.02 <= stats.stage_seconds["candle_fetch"] < 0.05  # bez czasu etapu zagnieżdżonego
+    assert stats.stage_seconds["table_resolution"] >= 0.03
+    assert stats.stage_seconds["simulation"] == 0.0
+    assert stats.counters["queries"] == 2
+    assert sum(stats.stage_seconds.values()) <= stats.total_seconds
+    print("✅ Etapy rozłączne, liczniki z innych wątków")
+
+
+def test_calculation_returns_stats():
+    """Wyniki kalkulacji niosą czasy etapów i liczniki (szeregowo, potok, procesy, zapis)"""
+    rng = random.Random(20)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 31))
+        tickets = [str(row[1]) for row in rows]
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            serial = calculator.calculate_tp_for_tickets(tickets, use_cache=False, workers=1, prefetch_depth=0,
+                                                         save_to_db=True, **make_params())
+            piped = calculator.calculate_tp_for_tickets(tickets, use_cache=False, workers=1, prefetch_depth=4,
+                                                        **make_params())
+            parallel = calculator.calculate_tp_for_tickets(tickets, use_cache=False, workers=2, **make_params())
+            calculator.calculate_tp_for_tickets(tickets, **make_params())
+            cached = calculator.calculate_tp_for_tickets(tickets, **make_params())
+            empty = calculator.calculate_tp_for_tickets(["999999"], **make_params())
+            calculator.close_connection()
+
+    for results in (serial, piped, parallel, cached, empty):
+        assert isinstance(results, TPResultList) and results.stats is not None
+        assert set(results.stats.stage_seconds) == {name for name, _ in STAGES}
+
+    stats = serial.stats
+    assert stats.counters["positions"] == 30 and len(serial) == 30
+    assert stats.counters["queries"] > 0
+    # Wiersze pozycji i świeczek (dzień czytany raz), symulacja na świeczkach każdej pozycji
+    assert stats.counters["rows_read"] > 30 and stats.counters["candles_simulated"] > 30
+    assert stats.stage_seconds["simulation"] > 0 and stats.stage_seconds["save"] > 0
+    assert stats.stage_seconds["position_fetch"] > 0 and stats.stage_seconds["candle_fetch"] > 0
+    assert sum(stats.stage_seconds.values()) <= stats.total_seconds
+
+    assert piped.stats.counters["candles_simulated"] == stats.counters["candles_simulated"]
+    assert piped.stats.counters["rows_read"] > 0
+    assert parallel.stats.counters["candles_simulated"] == stats.counters["candles_simulated"]
+    assert cached.stats.counters["cache_hits"] == 30 and cached.stats.counters["candles_simulated"] == 0
+    assert empty.stats.counters["positions"] == 0
+    assert "Symulacja" in serial.stats.format_summary()
+    # Kalkulator nie trzyma pomiarów po przebiegu
+    assert calculator.run_stats is None and calculator.candle_analyzer.run_stats is None
+    print(f"✅ Pomiary przebiegu: {stats.format_summary()}")
+
+
+if __name__ == "__main__":
+    test_nested_stages_are_exclusive()
+    test_calculation_returns_stats()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test silnika sql (TP bez BE liczony zapytaniami agregującymi) względem pętli
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_PYTHON
+from calculations.candle_cache import CandleCache
+from conftest import DAY_START, create_test_database
+
+
+def test_sql_engine_matches_python_engine():
+    """Wyniki z zapytań agregujących identyczne z pętlą świeczka po świeczce"""
+    rng = random.Random(21)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        analyzer = CandleAnalyzer(engine=ENGINE_PYTHON, db_path=db_path, candle_cache=CandleCache())
+
+        checked = 0
+        with redirect_stdout(io.StringIO()):
+            for _ in range(200):
+                open_time = DAY_START + rng.randint(0, 2 * 86400 - 120)
+                position_type = rng.choice([0, 1])
+                candles = analyzer.get_candles_for_position("GER40.cash", open_time)
+                open_price = candles[0].open + rng.uniform(-2, 2)
+                sl_distance = rng.choice([3, 6, 10, 25])
+                stop_loss = open_price - sl_distance if position_type == 0 else open_price + sl_distance
+                spread = rng.choice([0, 0.5, 1.0])
+
+                expected = analyzer.calculate_max_tp_basic(candles, position_type, open_price, stop_loss, spread)
+                actual = analyzer.calculate_max_tp_basic_sql("GER40.cash", open_time, position_type,
+                                                             open_price, stop_loss, spread)
+                assert actual == expected, f"sql={actual} pętla={expected}"
+                checked += 1
+
+            assert analyzer.calculate_max_tp_basic_sql("GER40.cash", DAY_START + 5 * 86400, 0, 1.0, 0.0) is None
+            assert analyzer.calculate_max_tp_basic_sql("us100.cash", DAY_START, 0, 1.0, 0.0) is None
+        analyzer.close_connection()
+    print(f"✅ Silnik sql zgodny z pętlą ({checked} scenariuszy)")
+
+
+if __name__ == "__main__":
+    test_sql_engine_matches_python_engine()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test statystyk wyników TP (percentyle, trafienia, wartość oczekiwana, podziały, tp_cli --stats)
+"""
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.statistics import NO_VALUE, SL_TYPES, compute_statistics
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.models import TPCalculationResult
+from test_tp_cli import create_journal, date_args, run_cli
+
+TARGETS = (2, 5, 10, 25)
+
+
+def make_results(rng, count=300):
+    """Wyniki z brakami (None), pustym setupem i symbolem z bajtem zerowym jak w bazie EA"""
+    results = []
+    for ticket in range(1, count + 1):
+        open_price = 15000 + rng.uniform(-50, 50)
+        position_type = rng.choice(["buy", "sell"])
+        direction = 1 if position_type == "buy" else -1
+
+        def maybe_tp():
+            return None if rng.random() < 0.1 else round(rng.expovariate(0.1), 1)
+
+        results.append(TPCalculationResult(
+            ticket=ticket, open_price=open_price, open_time=1700000000 + ticket, position_type=position_type,
+            symbol=rng.choice(["ger40.cash\x00", "us100.cash"]), setup=rng.choice(["A", "B", None, ""]),
+            max_tp_sl_staly=maybe_tp(), max_tp_sl_recznie=maybe_tp(), max_tp_sl_be=maybe_tp(),
+            sl_staly_value=open_price - direction * 10,
+            sl_recznie_value=None if rng.random() < 0.2 else open_price - direction * rng.uniform(3, 20),
+            be_prog=6.0, be_offset=1.0
+        ))
+    return results
+
+
+def brute_force(results, attribute, targets):
+    """Definicje miar pętlą po wynikach - punkt odniesienia dla wersji wektorowej"""
+    values = [getattr(r, attribute) for r in results if getattr(r, attribute) is not None]
+    hit_rates = {t: sum(v >= t for v in values) / len(values) for t in targets}
+    expectancy = {}
+    for target in targets:
+        points = []
+        for r in results:
+            tp = getattr(r, attribute)
+            sl_price = r.sl_recznie_value if attribute == "max_tp_sl_recznie" else r.sl_staly_value
+            if tp is None or sl_price is None:
+                continue
+            if tp >= target:
+                points.append(target)
+            elif attribute == "max_tp_sl_be" and tp >= r.be_prog:
+                points.append(r.be_offset)
+            else:
+                points.append(-abs(r.open_price - sl_price))
+        expectancy[target] = sum(points) / len(points)
+    return values, hit_rates, expectancy
+
+
+def test_statistics_match_definitions():
+    """Miary wektorowe zgodne z pętlą po wynikach i z np.percentile"""
+    results = make_results(random.Random(24))
+    statistics = compute_statistics(results, targets=TARGETS, percentiles=(10, 90))
+
+    for name, attribute in SL_TYPES:
+        values, hit_rates, expectancy = brute_force(results, attribute, TARGETS)
+        stats = statistics.overall.by_sl_type[name]
+        assert stats.count == len(values)
+        assert math.isclose(stats.mean, sum(values) / len(values))
+        assert stats.median == np.percentile(values, 50) and stats.max == max(values) and stats.min == min(values)
+        assert stats.percentiles == {10.0: np.percentile(values, 10), 90.0: np.percentile(values, 90)}
+        assert stats.hit_rates == {float(t): rate for t, rate in hit_rates.items()}
+        for target in TARGETS:
+            assert math.isclose(stats.expectancy[target], expectancy[target]), (name, target)
+    assert statistics.overall.by_sl_type["sl_recznie"].expectancy_count < statistics.overall.by_sl_type[
+        "sl_recznie"].count  # Pozycje bez SL ręcznego poza wartością oczekiwaną
+    print("✅ Statystyki zgodne z definicjami")
+
+
+def test_summary_breakdowns_and_empty():
+    """Podsumowanie jak dotychczasowe get_calculation_summary, podziały sumują się do całości"""
+    results = make_results(random.Random(25), count=120)
+    statistics = compute_statistics(results, targets=TARGETS)
+
+    summary = statistics.to_summary()
+    assert summary["total_positions"] == len(results)
+    assert summary["successful_calculations"] == sum(
+        any(getattr(r, attribute) is not None for _, attribute in SL_TYPES) for r in results)
+    for name, attribute in SL_TYPES:
+        values = [getattr(r, attribute) for r in results if getattr(r, attribute) is not None]
+        assert math.isclose(summary[f"avg_tp_{name}"], sum(values) / len(values))
+        assert summary[f"max_tp_{name}"] == max(values)
+        assert summary["positions_with_data"][name] == len(values)
+
+    setups = statistics.breakdowns["setup"]
+    assert sorted(setups) == sorted([NO_VALUE, "A", "B"])
+    assert setups[NO_VALUE].count == sum(not r.setup for r in results)
+    assert sorted(statistics.breakdowns["symbol"]) == ["ger40.cash", "us100.cash"]
+    for by, groups in statistics.breakdowns.items():
+        assert sum(group.count for group in groups.values()) == len(results), by
+
+    rows = statistics.to_rows()
+    assert all(set(row) == set(statistics.row_fields()) for row in rows)
+    assert rows[0]["group"] == "all" and len(rows) == 3 * (1 + len(setups) + 2)
+
+    empty = compute_statistics([])
+    assert empty.to_summary() == {"total_positions": 0, "successful_calculations": 0,
+                                  "avg_tp_sl_staly": 0, "avg_tp_sl_recznie": 0, "avg_tp_sl_be": 0,
+                                  "max_tp_sl_staly": 0, "max_tp_sl_recznie": 0, "max_tp_sl_be": 0}
+    assert empty.to_rows() == [] and empty.breakdowns == {"setup": {}, "symbol": {}}
+    print("✅ Podsumowanie, podziały i pusty wynik")
+
+
+def test_cli_stats():
+    """tp --stats: wiersze statystyk zamiast wyników, poziomy z --targets"""
+    rng = random.Random(26)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        rows = create_journal(db_path, rng)
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+
+        code, out, err = run_cli(["--db", db_path, "tp"] + date_args() +
+                                 ["--sl-staly", f"{main_instrument}=6", "--stats", "--targets", "3,8",
+                                  "--format", "json", "-q"])
+        assert code == 0, err
+        records = json.loads(out)
+        overall = records[0]
+        assert overall["group"] == "all" and overall["sl_type"] == "sl_staly"
+        assert overall["positions"] == len(rows)
+        assert "hit_rate_3" in overall and "expectancy_8" in overall and "hit_rate_5" not in overall
+        assert {r["value"] for r in records if r["group"] == "setup"} == {r["setup"] for r in rows}
+    print(f"✅ tp --stats: {len(records)} wierszy statystyk")
+
+
+if __name__ == "__main__":
+    test_statistics_match_definitions()
+    test_summary_breakdowns_and_empty()
+    test_cli_stats()
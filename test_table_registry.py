@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test rejestru tabel świeczkowych (mapowanie symboli, przebudowa po zmianie schematu)
+"""
+import io
+import os
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.table_registry import CandleTableRegistry
+
+
+def test_symbol_variants_resolve_to_real_table():
+    """Warianty z \\x00, spacjami i różną wielkością liter wskazują tę samą tabelę"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE `GER40.cash` (time INTEGER, open REAL, high REAL, low REAL, close REAL)")
+    conn.execute("CREATE TABLE `XAUUSD` (time INTEGER, open REAL, high REAL, low REAL, close REAL)")
+    conn.execute("CREATE TABLE positions (ticket INTEGER)")
+
+    catalog_reads = []
+    conn.set_trace_callback(lambda sql: catalog_reads.append(sql) if "sqlite_master" in sql else None)
+
+    registry = CandleTableRegistry()
+    with redirect_stdout(io.StringIO()):
+        assert registry.resolve(conn, "GER40.cash") == "GER40.cash"
+        assert registry.resolve(conn, "ger40.cash\x00") == "GER40.cash"
+        assert registry.resolve(conn, " Ger40.CASH ") == "GER40.cash"
+        assert registry.resolve(conn, "xauusd") == "XAUUSD"
+        assert registry.resolve(conn, "us100.cash") is None
+
+    assert len(catalog_reads) == 1, catalog_reads
+    print("✅ Warianty symboli rozwiązane jednym odczytem katalogu")
+
+
+def test_registry_rebuilds_after_schema_change():
+    """Nowa tabela jest widoczna po zmianie PRAGMA schema_version"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE `ger40.cash` (time INTEGER)")
+
+    registry = CandleTableRegistry()
+    with redirect_stdout(io.StringIO()):
+        assert registry.resolve(conn, "us100.cash") is None
+        conn.execute("CREATE TABLE `us100.cash` (time INTEGER)")
+        assert registry.resolve(conn, "US100.cash") == "us100.cash"
+    print("✅ Rejestr przebudowany po zmianie schematu")
+
+
+if __name__ == "__main__":
+    test_symbol_variants_resolve_to_real_table()
+    test_registry_rebuilds_after_schema_change()
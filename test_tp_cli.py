@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test trybu wsadowego (tp_cli.py): filtry jak w oknie głównym, CSV/JSON, kody wyjścia
+"""
+import csv
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tp_cli
+from config.field_definitions import COLUMNS
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.columnar_store import ColumnarCandleStore
+from conftest import DAY_START, create_test_database
+from utils.date_utils import unix_to_date_string
+
+
+def create_journal(db_path, rng, count=40):
+    """Baza z pełną tabelą positions (kolumny okna głównego) i świeczkami"""
+    create_test_database(db_path, days=2)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE positions ({', '.join(COLUMNS)}, sl_recznie REAL)")
+    rows = []
+    for ticket in range(1, count + 1):
+        record = dict.fromkeys(COLUMNS)
+        record.update(
+            open_time=DAY_START + rng.randint(0, 2 * 86400 - 600), ticket=ticket,
+            type=rng.choice(["buy", "sell"]), volume=1.0, symbol="ger40.cash\x00",
+            open_price=15000 + rng.uniform(-3, 3), setup=rng.choice(["A", "B"]),
+            trends=rng.choice([1, -1, None]), trendl=rng.choice([1, None]),
+            magic_number=7 if ticket % 5 == 0 else None
+        )
+        rows.append(record)
+    conn.executemany(f"INSERT INTO positions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                     [[record[column] for column in COLUMNS] for record in rows])
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def run_cli(argv):
+    """Uruchamia CLI, zwraca (kod wyjścia, stdout, stderr)"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        code = tp_cli.main(argv)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def date_args():
+    return ["--from", unix_to_date_string(DAY_START)[:10], "--to", unix_to_date_string(DAY_START + 86400)[:10]]
+
+
+def test_positions_filters_match_gui_semantics():
+    """positions: setup, TrendS z NULL i ukrywanie wątpliwych jak w oknie głównym"""
+    rng = random.Random(18)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        rows = create_journal(db_path, rng)
+
+        code, out, err = run_cli(["--db", db_path, "positions"] + date_args() +
+                                 ["--setup", "A", "--trends", "1,NULL", "--suspicious", "hide", "--format", "json"])
+        assert code == 0, err
+        records = json.loads(out)
+        expected = sorted(r["ticket"] for r in rows
+                          if r["setup"] == "A" and r["trends"] in (1, None) and r["magic_number"] != 7)
+        assert sorted(r["ticket"] for r in records) == expected
+        assert all(r["symbol"] == "ger40.cash" for r in records)
+        assert "Czasy" in err
+    print(f"✅ positions: {len(records)} pozycji zgodnych z filtrami")
+
+
+def test_tp_csv_and_exit_codes():
+    """tp: wyniki w CSV (tylko wątpliwe), zapis do bazy, kod != 0 przy błędzie"""
+    rng = random.Random(19)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        rows = create_journal(db_path, rng)
+        output = os.path.join(tmp, "wyniki.csv")
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+
+        code, out, err = run_cli(["--db", db_path, "tp"] + date_args() +
+                                 ["--suspicious", "only", "--sl-staly", f"{main_instrument}=6",
+                                  "--be-prog", "4", "--be-offset", "1", "--save", "-o", output, "-q"])
+        assert code == 0, err
+        assert out == ""
+        with open(output, encoding="utf-8") as f:
+            results = list(csv.DictReader(f))
+        assert sorted(int(r["ticket"]) for r in results) == sorted(r["ticket"] for r in rows if r["magic_number"] == 7)
+        assert all(r["max_tp_sl_staly"] != "" for r in results)
+
+        conn = sqlite3.connect(db_path)
+        saved = conn.execute("SELECT COUNT(*) FROM tp_calculation_results").fetchone()[0]
+        conn.close()
+        assert saved == len(results)
+
+        assert run_cli(["--db", os.path.join(tmp, "brak.db"), "tp"] + date_args())[0] == 1
+        assert run_cli(["--db", db_path, "tp"] + date_args() + ["--sl", "staly"])[0] == 1  # brak --sl-staly
+        assert run_cli(["--db", db_path, "tp"] + date_args() +
+                       ["--sl-staly", f"{main_instrument}=6", "--engine", "gpu", "-q"])[0] == 1
+    print(f"✅ tp: {len(results)} wyników w CSV, błędy zwracają kod 1")
+
+
+def test_tp_trace_ticket():
+    """tp --trace: przebieg świeczka po świeczce wybranego ticketu na stderr"""
+    rng = random.Random(20)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        create_journal(db_path, rng, count=5)
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+
+        code, out, err = run_cli(["--db", db_path, "tp"] + date_args() +
+                                 ["--sl-staly", f"{main_instrument}=6", "--trace", "3", "--format", "json"])
+        assert code == 0, err
+        assert len(json.loads(out)) == 5
+        trace = err.split("Przebieg ticketu 3:", 1)[1]
+        assert "Świeczka 1/" in trace and "TP dla sl_staly" in trace
+    print("✅ tp --trace wypisuje przebieg ticketu")
+
+
+def test_profiles_backfill_and_what_if():
+    """profiles: dobudowanie profili, max TP dla stałego SL zgodny z tp --sl-staly"""
+    rng = random.Random(21)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        rows = create_journal(db_path, rng, count=20)
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+
+        code, out, err = run_cli(["--db", db_path, "profiles"] + date_args() +
+                                 ["--sl-points", "6", "--sl-points", "12", "--format", "json"])
+        assert code == 0, err
+        records = json.loads(out)
+        assert sorted(r["ticket"] for r in records) == sorted(r["ticket"] for r in rows)
+        assert "profiles_built=20" in err
+        assert all(r["candle_count"] > 0 and r["max_tp_sl_12"] >= r["max_tp_sl_6"] for r in records)
+
+        code, out, err = run_cli(["--db", db_path, "tp"] + date_args() +
+                                 ["--sl-staly", f"{main_instrument}=6", "--no-cache", "--format", "json", "-q"])
+        assert code == 0, err
+        expected = {r["ticket"]: r["max_tp_sl_staly"] for r in json.loads(out)}
+        assert {r["ticket"]: r["max_tp_sl_6"] for r in records} == expected
+
+        # Ponowne wywołanie bez budowy - tylko zapytanie o zapisane profile
+        code, out, err = run_cli(["--db", db_path, "profiles"] + date_args() + ["--sl-points", "6", "--no-build"])
+        assert code == 0, err
+        assert "profiles_built=0" in err and "without_profile=0" in err
+    print(f"✅ profiles: {len(records)} pozycji z profilu zgodnych z kalkulacją TP")
+
+
+def test_sync_store():
+    """sync-store: magazyn kolumnowy obok bazy z wszystkimi świeczkami, drugi przebieg bez dopisywania"""
+    rng = random.Random(22)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        create_journal(db_path, rng, count=5)
+
+        code, out, err = run_cli(["--db", db_path, "sync-store", "--format", "json"])
+        assert code == 0, err
+        records = json.loads(out)
+        assert records
+        conn = sqlite3.connect(db_path)
+        counts = {r["table"]: conn.execute(f"SELECT COUNT(*) FROM `{r['table']}`").fetchone()[0] for r in records}
+        conn.close()
+        assert all(r["appended"] == r["candles"] == counts[r["table"]] > 0 for r in records)
+
+        store = ColumnarCandleStore(os.path.join(tmp, "candle_store"))
+        table = records[0]["table"]
+        assert len(store.get_range(table, DAY_START, DAY_START + 86400)["time"]) > 0
+        store.close()
+
+        code, out, err = run_cli(["--db", db_path, "sync-store", "--format", "json"])
+        assert code == 0, err
+        assert all(r["appended"] == 0 for r in json.loads(out)) and "appended=0" in err
+    print(f"✅ sync-store: {len(records)} tabel w magazynie")
+
+
+if __name__ == "__main__":
+    test_positions_filters_match_gui_semantics()
+    test_tp_csv_and_exit_codes()
+    test_tp_trace_ticket()
+    test_profiles_backfill_and_what_if()
+    test_sync_store()
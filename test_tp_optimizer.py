@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test optymalnego stałego TP (krzywa z sum prefiksowych vs przegląd poziomów, grupy, trendy z kalkulatora, CLI)
+"""
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from dataclasses import replace
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.tp_calculator import TPCalculator
+from calculations.tp_optimizer import optimize_tp
+from config.instrument_tickets_config import get_instrument_tickets_config
+from conftest import add_positions, create_test_database, make_params
+from test_statistics import make_results
+from test_tp_cli import create_journal, date_args, run_cli
+
+
+def sweep(results, attribute, level):
+    """Suma punktów stałego TP pętlą po pozycjach (definicja jak w statystykach)"""
+    total, count = 0.0, 0
+    for r in results:
+        tp = getattr(r, attribute)
+        sl_price = r.sl_recznie_value if attribute == "max_tp_sl_recznie" else r.sl_staly_value
+        if tp is None or sl_price is None:
+            continue
+        count += 1
+        if tp >= level:
+            total += level
+        elif attribute == "max_tp_sl_be" and tp >= r.be_prog:
+            total += r.be_offset
+        else:
+            total -= abs(r.open_price - sl_price)
+    return total, count
+
+
+def test_optimum_matches_brute_force_sweep():
+    """Optimum i krzywa zgodne z przeglądem poziomów co 0.1 pkt dla każdej grupy"""
+    rng = random.Random(25)
+    results = [replace(r, trends=rng.choice([1, -1, None]), trendl=rng.choice([1, -1]))
+               for r in make_results(rng, count=400)]
+    attributes = {"sl_staly": "max_tp_sl_staly", "sl_recznie": "max_tp_sl_recznie", "sl_be": "max_tp_sl_be"}
+    optimization = optimize_tp(results, group_by=("setup", "trends"), min_positions=5)
+
+    assert optimization.optima
+    for optimum in optimization.optima:
+        group = [r for r in results
+                 if (r.setup or "(brak)") == optimum.group["setup"] and str(r.trends if r.trends is not None
+                                                                          else "(brak)") == optimum.group["trends"]]
+        attribute = attributes[optimum.sl_type]
+        grid = [i / 10 for i in range(1, int(optimum.curve.levels[-1] * 10) + 2)]
+        best_total, count = max(sweep(group, attribute, level) for level in grid)
+        assert optimum.positions == count >= 5
+        assert math.isclose(optimum.total_points, best_total, abs_tol=1e-6), optimum.group
+        assert math.isclose(sweep(group, attribute, optimum.level)[0], optimum.total_points, abs_tol=1e-6)
+        for level, total in zip(optimum.curve.levels[::7], optimum.curve.total_points[::7]):
+            assert math.isclose(sweep(group, attribute, level)[0], total, abs_tol=1e-6)
+    assert all(list(o.group) == ["setup", "trends"] for o in optimization.optima)
+    print(f"✅ Optimum zgodne z przeglądem poziomów ({len(optimization.optima)} grup x typ SL)")
+
+
+def test_grouping_and_arguments():
+    """Brak podziału = całość, min_positions odcina małe grupy, nieznany wymiar to błąd"""
+    results = make_results(random.Random(26), count=200)
+    overall = optimize_tp(results, group_by=(), min_positions=1)
+    assert [o.group for o in overall.optima] == [{}, {}, {}]
+    assert [o.sl_type for o in overall.optima] == ["sl_staly", "sl_recznie", "sl_be"]
+
+    by_instrument = optimize_tp(results, group_by=("instrument",), sl_types=("sl_staly",), min_positions=1)
+    main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+    assert {o.group["instrument"] for o in by_instrument.optima} >= {main_instrument}
+    assert sum(o.positions for o in by_instrument.optima) == overall.optima[0].positions
+
+    assert optimize_tp(results, group_by=("setup",), min_positions=10 ** 6).optima == []
+    assert optimize_tp([], group_by=()).optima == []
+    rows = by_instrument.to_rows()
+    assert all(set(row) == set(by_instrument.row_fields()) for row in rows)
+    try:
+        optimize_tp(results, group_by=("magic",))
+        assert False, "Oczekiwano ValueError"
+    except ValueError:
+        pass
+    print("✅ Grupowanie i parametry optymalizacji")
+
+
+def test_results_carry_position_trends():
+    """Wyniki kalkulatora (także z cache) mają TrendS/TrendL pozycji"""
+    rng = random.Random(27)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 13))
+        expected = {row[1]: (row[9], row[10]) for row in rows}
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            tickets = [str(row[1]) for row in rows]
+            first = calculator.calculate_tp_for_tickets(tickets, workers=1, **make_params("sl_staly", "sl_be"))
+            cached = calculator.calculate_tp_for_tickets(tickets, workers=1, **make_params("sl_staly", "sl_be"))
+            calculator.close_connection()
+
+    for results in (first, cached):
+        assert len(results) == len(rows)
+        assert {r.ticket: (r.trends, r.trendl) for r in results} == expected
+    print("✅ Trendy pozycji w wynikach")
+
+
+def test_cli_optimize():
+    """tp --optimize: wiersz na grupę i typ SL z optymalnym poziomem"""
+    rng = random.Random(28)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        create_journal(db_path, rng)
+        main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+        base = ["--db", db_path, "tp"] + date_args() + ["--sl-staly", f"{main_instrument}=6", "-q"]
+
+        code, out, err = run_cli(base + ["--optimize", "--group-by", "setup", "--min-positions", "1",
+                                         "--format", "json"])
+        assert code == 0, err
+        records = json.loads(out)
+        assert sorted(r["setup"] for r in records) == ["A", "B"]
+        assert all(r["sl_type"] == "sl_staly" and r["level"] > 0 for r in records)
+
+        assert run_cli(base + ["--optimize", "--group-by", "magic"])[0] == 1
+    print(f"✅ tp --optimize: {len(records)} grup")
+
+
+if __name__ == "__main__":
+    test_optimum_matches_brute_force_sweep()
+    test_grouping_and_arguments()
+    test_results_carry_position_trends()
+    test_cli_optimize()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test zapisu wyników TP (upsert, jedna transakcja, tabela przebiegów, migracja duplikatów)
+"""
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.tp_calculator import TPCalculator
+from config.database_config import TP_RESULTS_TABLE, TP_RUNS_TABLE
+from conftest import add_positions, create_test_database, make_params
+
+
+def test_rerun_does_not_duplicate_results():
+    """Ponowny zapis tych samych obliczeń nadpisuje wiersze i dodaje przebieg"""
+    rng = random.Random(21)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 41))
+        tickets = [str(row[1]) for row in rows]
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            calculator.calculate_tp_for_tickets(tickets, save_to_db=True, engine="numpy", **make_params(workers=1))
+            calculator.calculate_tp_for_tickets(tickets, save_to_db=True, use_cache=False, **make_params(workers=1))
+            calculator.close_connection()
+
+        conn = sqlite3.connect(db_path)
+        result_count = conn.execute(f"SELECT COUNT(*) FROM {TP_RESULTS_TABLE}").fetchone()[0]
+        runs = conn.execute(f"SELECT id, engine, result_count, started_at, finished_at FROM {TP_RUNS_TABLE} "
+                            f"ORDER BY id").fetchall()
+        run_ids = {row[0] for row in conn.execute(f"SELECT DISTINCT run_id FROM {TP_RESULTS_TABLE}")}
+        conn.close()
+
+        assert result_count == 40
+        assert len(runs) == 2 and runs[0][1] == "numpy" and runs[1][2] == 40
+        assert all(run[3] and run[4] for run in runs)
+        assert run_ids == {runs[1][0]}
+    print("✅ Ponowny zapis bez duplikatów, przebiegi zapisane")
+
+
+def test_save_uses_single_transaction():
+    """Wszystkie wyniki zapisane jednym commitem"""
+    rng = random.Random(22)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 31))
+        tickets = [str(row[1]) for row in rows]
+
+        statements = []
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            results = calculator.calculate_tp_for_tickets(tickets, **make_params(workers=1))
+            calculator._get_connection().set_trace_callback(statements.append)
+            params = make_params(workers=1)
+            run_info = calculator._build_run_info(params['sl_types'], params['sl_staly_values'], 4, 1, 0.5,
+                                                  None, "filtered_data", datetime.now())
+            run_id = calculator._save_results_to_db(results, run_info)
+            calculator.close_connection()
+
+        assert run_id is not None
+        assert sum(1 for statement in statements if statement.strip().upper() == "COMMIT") == 1
+    print("✅ Zapis w jednej transakcji")
+
+
+def test_migration_removes_duplicates():
+    """Starsza tabela z powtórzonymi wynikami - zostaje najnowszy wiersz, powstaje unikalny indeks"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(f"""
+            CREATE TABLE {TP_RESULTS_TABLE} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, ticket INTEGER NOT NULL, open_price REAL NOT NULL,
+                open_time INTEGER NOT NULL, position_type TEXT NOT NULL, symbol TEXT NOT NULL, setup TEXT,
+                max_tp_sl_staly REAL, max_tp_sl_recznie REAL, max_tp_sl_be REAL, sl_staly_value REAL,
+                sl_recznie_value REAL, be_prog REAL, be_offset REAL, spread REAL, calculation_date TEXT,
+                notes TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, param_hash TEXT, candle_version TEXT
+            )
+        """)
+        for param_hash, tp in (("a", 1.0), ("a", 2.0), ("b", 3.0), (None, 4.0), (None, 5.0)):
+            conn.execute(f"INSERT INTO {TP_RESULTS_TABLE} (ticket, open_price, open_time, position_type, symbol, "
+                         f"max_tp_sl_staly, param_hash) VALUES (7, 1.0, 0, 'buy', 'ger40.cash', ?, ?)",
+                         (tp, param_hash))
+        conn.commit()
+        conn.close()
+
+        with redirect_stdout(io.StringIO()):
+            TPCalculator(db_path=db_path).close_connection()
+
+        conn = sqlite3.connect(db_path)
+        remaining = conn.execute(f"SELECT param_hash, max_tp_sl_staly FROM {TP_RESULTS_TABLE} ORDER BY id").fetchall()
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TP_RESULTS_TABLE})")}
+        try:
+            conn.execute(f"INSERT INTO {TP_RESULTS_TABLE} (ticket, open_price, open_time, position_type, symbol, "
+                         f"param_hash) VALUES (7, 1.0, 0, 'buy', 'ger40.cash', 'a')")
+            raise AssertionError("oczekiwano naruszenia unikalności")
+        except sqlite3.IntegrityError:
+            pass
+        conn.close()
+
+        # Wiersze bez hasha (sprzed cache) zostają nietknięte
+        assert remaining == [("a", 2.0), ("b", 3.0), (None, 4.0), (None, 5.0)]
+        assert "run_id" in columns
+    print("✅ Migracja usuwa duplikaty")
+
+
+def test_startup_skips_migration_with_unique_index():
+    """Z unikalnym indeksem kolejne uruchomienie kalkulatora nie skanuje tabeli wyników i nie zapisuje"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "journal.db")
+        statements = []
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            calculator._get_connection().set_trace_callback(statements.append)
+            calculator._ensure_tp_table_exists()
+            calculator.close_connection()
+
+        executed = [statement.strip().split()[0].upper() for statement in statements]
+        assert "DELETE" not in executed and "DROP" not in executed and "BEGIN" not in executed, executed
+    print("✅ Start bez ponownej migracji duplikatów")
+
+
+if __name__ == "__main__":
+    test_rerun_does_not_duplicate_results()
+    test_save_uses_single_transaction()
+    test_migration_removes_duplicates()
+    test_startup_skips_migration_with_unique_index()
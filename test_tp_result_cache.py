@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test cache wyników TP (hash parametrów, trafienia z pamięci i z bazy, unieważnianie)
+"""
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.result_cache import compute_param_hash
+from calculations.tp_calculator import TPCalculator
+from conftest import add_positions, create_test_database, make_params
+from utils.date_utils import get_day_start_unix
+
+
+def summary(results):
+    return [(r.ticket, r.max_tp_sl_staly, r.max_tp_sl_recznie, r.max_tp_sl_be) for r in results]
+
+
+def test_param_hash_is_canonical():
+    """Kolejność słowników, int/float i wyłączone typy SL nie zmieniają hasha"""
+    base = compute_param_hash({'sl_staly': True, 'sl_recznie': False}, {'DAX': 10, 'NQ': 20}, 4, 1, 0.5)
+    assert base == compute_param_hash({'sl_staly': True}, {'NQ': 20.0, 'DAX': 10.0}, 4.0, 1.0, 0.5)
+    assert base != compute_param_hash({'sl_staly': True}, {'DAX': 10, 'NQ': 20}, 4, 1, 0.6)
+    assert base != compute_param_hash({'sl_staly': True}, {'DAX': 10, 'NQ': 20}, None, None, 0.5)
+    assert base != compute_param_hash({'sl_staly': True, 'sl_recznie': True}, {'DAX': 10, 'NQ': 20}, 4, 1, 0.5)
+    print("✅ Hash parametrów kanoniczny")
+
+
+def test_hits_from_memory_and_database():
+    """Drugie obliczenie z pamięci, nowy kalkulator z tabeli wyników - wyniki identyczne"""
+    rng = random.Random(16)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 41))
+        tickets = [str(row[1]) for row in rows]
+        params = make_params("sl_staly", "sl_recznie", workers=1)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            reference = calculator.calculate_tp_for_tickets(tickets, use_cache=False, **params)
+            first = calculator.calculate_tp_for_tickets(tickets, save_to_db=True, **params)
+            second = calculator.calculate_tp_for_date_range("2000-01-01", "2100-01-01", ["ger40.cash"], **params)
+            calculator.close_connection()
+
+            fresh = TPCalculator(db_path=db_path)
+            from_db = fresh.calculate_tp_for_tickets(tickets, **params)
+            fresh.close_connection()
+
+        assert len(reference) == 40
+        assert summary(first) == summary(reference)
+        assert sorted(summary(second)) == sorted(summary(reference))
+        assert summary(from_db) == summary(reference)
+        assert calculator.result_cache.hits_memory == 40
+        assert fresh.result_cache.hits_db == 40 and fresh.result_cache.misses == 0
+        # Trafienie dostaje datę bieżącego obliczenia
+        assert {r.calculation_date for r in second} == {"2000-01-01_2100-01-01"}
+        assert {r.calculation_date for r in from_db} == {"filtered_data"}
+    print("✅ Trafienia z pamięci i z bazy zgodne z obliczeniami")
+
+
+def test_new_candles_and_edited_sl_invalidate():
+    """Dopisana świeczka unieważnia wyniki dnia, zmieniony sl_recznie - wynik pozycji"""
+    rng = random.Random(17)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 31))
+        tickets = [str(row[1]) for row in rows]
+        params = make_params("sl_staly", "sl_recznie", workers=1)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            calculator.calculate_tp_for_tickets(tickets, save_to_db=True, **params)
+
+            # Dopisz świeczkę w dniu pierwszej pozycji i zmień sl_recznie innej pozycji z drugiego dnia
+            day_start = get_day_start_unix(rows[0][0])
+            same_day = sum(1 for row in rows if get_day_start_unix(row[0]) == day_start)
+            other = next(row for row in rows if get_day_start_unix(row[0]) != day_start)
+            conn = sqlite3.connect(db_path)
+            conn.execute("INSERT INTO `ger40.cash` VALUES (?, 15000, 15001, 14999, 15000, 1, 1, 0)",
+                         (day_start + 30,))
+            conn.execute("UPDATE positions SET sl_recznie = ? WHERE ticket = ?", (other[5] - 5, other[1]))
+            conn.commit()
+            conn.close()
+            calculator.candle_analyzer.candle_cache.clear()
+            calculator.result_cache.clear()
+            misses_before = calculator.result_cache.misses
+            hits_before = calculator.result_cache.hits_db
+
+            results = calculator.calculate_tp_for_tickets(tickets, **params)
+            reference = calculator.calculate_tp_for_tickets(tickets, use_cache=False, **params)
+            calculator.close_connection()
+
+        assert calculator.result_cache.misses - misses_before == same_day + 1
+        assert calculator.result_cache.hits_db - hits_before == 30 - same_day - 1
+        assert summary(results) == summary(reference)
+    print("✅ Nowe świeczki i zmiana SL unieważniają wyniki")
+
+
+def test_edited_sl_baza_invalidates():
+    """Zmieniony SL z bazy (sl_baza) unieważnia wynik pozycji w pamięci i w tabeli wyników"""
+    rng = random.Random(18)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 21))
+        tickets = [str(row[1]) for row in rows]
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE positions SET sl = CASE type WHEN 'buy' THEN open_price - 4 ELSE open_price + 4 END")
+        conn.commit()
+        conn.close()
+        params = dict(sl_types={'sl_baza': True}, spread=0.5, workers=1)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            calculator.calculate_tp_for_tickets(tickets, save_to_db=True, **params)
+
+            edited = rows[3]
+            conn = sqlite3.connect(db_path)
+            conn.execute("UPDATE positions SET sl = ? WHERE ticket = ?",
+                         (edited[5] - 9 if edited[2] == "buy" else edited[5] + 9, edited[1]))
+            conn.commit()
+            conn.close()
+            memory_results = calculator.calculate_tp_for_tickets(tickets, **params)
+            hits_memory = calculator.result_cache.hits_memory
+            calculator.close_connection()
+
+            fresh = TPCalculator(db_path=db_path)
+            db_results = fresh.calculate_tp_for_tickets(tickets, **params)
+            reference = fresh.calculate_tp_for_tickets(tickets, use_cache=False, **params)
+            fresh.close_connection()
+
+        assert hits_memory == 19
+        assert fresh.result_cache.hits_db == 19 and fresh.result_cache.misses == 1
+        assert summary(memory_results) == summary(reference) and summary(db_results) == summary(reference)
+        assert next(r for r in reference if r.ticket == edited[1]).sl_baza_value == \
+            (edited[5] - 9 if edited[2] == "buy" else edited[5] + 9)
+    print("✅ Zmiana SL z bazy unieważnia wynik")
+
+
+if __name__ == "__main__":
+    test_param_hash_is_canonical()
+    test_hits_from_memory_and_database()
+    test_new_candles_and_edited_sl_invalidate()
+    test_edited_sl_baza_invalidates()
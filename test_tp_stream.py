@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test strumienia wyników TP (zdarzenia w kolejności pozycji, podsumowanie na bieżąco, zapis porcjami)
+"""
+import gc
+import io
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import weakref
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.tp_calculator import TPCalculator
+from calculations.tp_stream import EVENT_FINISHED, EVENT_MISSING_DATA, EVENT_RESULT, RunningTPSummary
+from config.database_config import TP_RESULTS_TABLE, TP_RUNS_TABLE
+from conftest import DAY_START, add_positions, create_test_database, make_params
+
+MISSING_TICKETS = (901, 902)
+SL_TYPES = ("sl_staly", "sl_be")
+
+
+def create_journal(db_path, rng):
+    """Baza z 30 pozycjami na świeczkach i dwiema pozycjami bez świeczek (dzień bez danych)"""
+    create_test_database(db_path, days=2)
+    rows = add_positions(db_path, rng, range(1, 31))
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (DAY_START + 5 * 86400 + 3600 * i, ticket, "buy", 1.0, "ger40.cash\x00", 15000.0, None, None, "test",
+         None, None)
+        for i, ticket in enumerate(MISSING_TICKETS, 1)
+    ])
+    conn.commit()
+    conn.close()
+    return [str(row[1]) for row in rows] + [str(ticket) for ticket in MISSING_TICKETS]
+
+
+def assert_summaries_equal(actual, expected):
+    """Średnie liczone narastająco i wektorowo mogą różnić się o błąd zaokrąglenia"""
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert math.isclose(actual[key], value, rel_tol=1e-9), key
+        else:
+            assert actual[key] == value, key
+
+
+def test_stream_matches_list_api():
+    """Strumień porcjami daje te same wyniki i podsumowanie co lista, zdarzenia w kolejności pozycji"""
+    rng = random.Random(22)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        tickets = create_journal(db_path, rng)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            expected = calculator.calculate_tp_for_tickets(tickets, use_cache=False, workers=1,
+                                                           **make_params(*SL_TYPES))
+            expected_summary = calculator.get_calculation_summary(expected)
+            events = list(calculator.iter_tp_for_tickets(tickets, use_cache=False, workers=1, chunk_size=7,
+                                                         **make_params(*SL_TYPES)))
+            calculator.close_connection()
+
+    results = [event.result for event in events if event.kind == EVENT_RESULT]
+    missing = [event.ticket for event in events if event.kind == EVENT_MISSING_DATA]
+    assert results == list(expected) and len(results) == 30
+    assert sorted(missing) == sorted(MISSING_TICKETS)
+    assert [event.done for event in events[:-1]] == list(range(1, len(tickets) + 1))
+    assert all(event.total == len(tickets) for event in events)
+
+    finished = events[-1]
+    assert finished.kind == EVENT_FINISHED and finished.missing == len(MISSING_TICKETS)
+    assert finished.stats.counters["positions"] == len(tickets)
+    assert finished.stats.counters["missing_data"] == len(MISSING_TICKETS)
+    assert_summaries_equal(finished.summary.to_dict(), expected_summary)
+    assert RunningTPSummary().to_dict() == calculator.get_calculation_summary([])
+    assert calculator.run_stats is None
+    print(f"✅ Strumień zgodny z listą: {len(results)} wyników, {len(missing)} bez świeczek")
+
+
+def test_stream_does_not_keep_results():
+    """Wynik oddany konsumentowi nie jest trzymany przez strumień (pamięć nie rośnie z przebiegiem)"""
+    rng = random.Random(23)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        tickets = create_journal(db_path, rng)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            events = calculator.iter_tp_for_tickets(tickets, use_cache=False, workers=1, chunk_size=5,
+                                                    **make_params(*SL_TYPES))
+            first = next(event for event in events if event.kind == EVENT_RESULT)
+            first_ref = weakref.ref(first.result)
+            del first
+            remaining = sum(1 for event in events if event.kind == EVENT_RESULT)
+            gc.collect()
+            calculator.close_connection()
+
+    assert first_ref() is None
+    assert remaining == 29
+    print("✅ Strumień nie trzyma oddanych wyników")
+
+
+def test_chunked_save_and_early_stop():
+    """Zapis porcjami tworzy jeden przebieg; przerwany strumień zostawia przebieg z dotychczasowymi wynikami"""
+    rng = random.Random(24)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        tickets = create_journal(db_path, rng)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            for _ in calculator.iter_tp_for_tickets(tickets, use_cache=False, workers=1, chunk_size=8,
+                                                    save_to_db=True, **make_params(*SL_TYPES)):
+                pass
+
+            params = dict(make_params(*SL_TYPES), be_prog=5)
+            stream = calculator.iter_tp_for_tickets(tickets, use_cache=False, workers=1, chunk_size=8,
+                                                    save_to_db=True, **params)
+            for event in stream:
+                if event.done >= 12:
+                    break
+            stream.close()
+            calculator.close_connection()
+
+        conn = sqlite3.connect(db_path)
+        runs = conn.execute(f"SELECT id, result_count FROM {TP_RUNS_TABLE} ORDER BY id").fetchall()
+        per_run = dict(conn.execute(f"SELECT run_id, COUNT(*) FROM {TP_RESULTS_TABLE} GROUP BY run_id").fetchall())
+        conn.close()
+
+    assert len(runs) == 2
+    (full_id, full_count), (partial_id, partial_count) = runs
+    assert full_count == per_run[full_id] == 30
+    assert partial_count == per_run[partial_id] == 16  # Dwie zapisane porcje po 8 pozycji
+    assert calculator.run_stats is None
+    print(f"✅ Zapis porcjami: przebieg {full_count} wyników, przerwany {partial_count}")
+
+
+def test_default_chunks_start_small():
+    """Porcje domyślne: pierwsza to pozycja na proces, potem podwajane - pierwsze zdarzenie bez pełnej porcji"""
+    rng = random.Random(25)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        tickets = create_journal(db_path, rng)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            sizes = []
+            calculate = calculator._calculate_for_positions
+
+            def record_chunk(positions, *args, **kwargs):
+                sizes.append(len(positions))
+                return calculate(positions, *args, **kwargs)
+
+            calculator._calculate_for_positions = record_chunk
+            stream = calculator.iter_tp_for_tickets(tickets, use_cache=False, workers=1, **make_params(*SL_TYPES))
+            first = next(stream)
+            assert sizes == [1] and first.done == 1
+            events = [first] + list(stream)
+            calculator.close_connection()
+
+    assert sizes == [1, 2, 4, 8, 16, 1] and sum(sizes) == len(tickets)
+    assert [event.done for event in events[:-1]] == list(range(1, len(tickets) + 1))
+    print(f"✅ Porcje domyślne: {sizes}")
+
+
+if __name__ == "__main__":
+    test_stream_matches_list_api()
+    test_stream_does_not_keep_results()
+    test_chunked_save_and_early_stop()
+    test_default_chunks_start_small()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test śledzenia obliczeń (poziomy, leniwe formatowanie, bufor per ticket)
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_PYTHON
+from calculations.tp_calculator import TPCalculator
+from config.instrument_tickets_config import get_instrument_tickets_config
+from database.models import CandleSeries
+from conftest import add_positions, create_test_database
+from utils.trace import (
+    TRACE, TraceBuffer, get_trace_buffer, get_trace_levels, get_tracer, set_trace_levels, trace_ticket
+)
+
+
+class CountingArg:
+    """Argument liczący formatowania"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "arg"
+
+
+def make_candles(rng, count=300):
+    rows, price = [], 15000.0
+    for i in range(count):
+        high, low = price + rng.uniform(0, 4), price - rng.uniform(0, 4)
+        rows.append((i * 60, price, high, low, rng.uniform(low, high), 1, 1, 0))
+        price = rows[-1][4]
+    return CandleSeries.from_rows(rows)
+
+
+def test_levels_and_lazy_formatting():
+    """Komunikat poniżej poziomu nie jest formatowany ani wypisywany"""
+    levels = get_trace_levels()
+    tracer = get_tracer("TestTrace")
+    arg = CountingArg()
+    try:
+        set_trace_levels(console="info", buffer="off")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            tracer.debug("debug %s", arg)
+            tracer.trace("trace %s", arg)
+            tracer.info("info %s", arg)
+            tracer.trace("wymuszony %s", arg, force=True)
+        assert arg.formatted == 2
+        assert output.getvalue() == "TestTrace: info arg\nTestTrace: wymuszony arg\n"
+        assert not tracer.enabled(TRACE)
+    finally:
+        set_trace_levels(**levels)
+    print("✅ Poziomy i leniwe formatowanie")
+
+
+def test_loops_silent_and_ring_buffer():
+    """Pętle świeczek bez śledzenia nic nie wypisują; ze śledzeniem - bufor per ticket"""
+    rng = random.Random(21)
+    candles = make_candles(rng)
+    analyzer = CandleAnalyzer(engine=ENGINE_PYTHON)
+    open_price = candles.close[0]
+    levels = get_trace_levels()
+    buffer = get_trace_buffer()
+    try:
+        set_trace_levels(console="info", buffer="off")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            silent_basic = [analyzer.calculate_max_tp_basic(candles, t, open_price, open_price + (30 if t else -30))
+                            for t in (0, 1)]
+            silent_be = [analyzer.calculate_max_tp_with_be(candles, t, open_price, open_price + (30 if t else -30),
+                                                           5, 1) for t in (0, 1)]
+        assert output.getvalue() == ""
+
+        set_trace_levels(buffer="trace")
+        buffer.clear()
+        with redirect_stdout(output), trace_ticket(101):
+            traced_basic = [analyzer.calculate_max_tp_basic(candles, t, open_price, open_price + (30 if t else -30))
+                            for t in (0, 1)]
+            traced_be = [analyzer.calculate_max_tp_with_be(candles, t, open_price, open_price + (30 if t else -30),
+                                                           5, 1) for t in (0, 1)]
+        assert output.getvalue() == ""  # Bufor, nie konsola
+        assert traced_basic == silent_basic and traced_be == silent_be
+        lines = buffer.dump(101)
+        assert any("Świeczka 1/" in line for line in lines) and any("BE świeczka" in line for line in lines)
+        assert buffer.dump(102) == []
+    finally:
+        set_trace_levels(**levels)
+        buffer.clear()
+
+    small = TraceBuffer(max_tickets=2, max_lines_per_ticket=3)
+    for ticket in (1, 2, 3):
+        for i in range(5):
+            small.append(ticket, f"linia {i}")
+    assert small.tickets() == [2, 3] and small.dump(3) == ["linia 2", "linia 3", "linia 4"]
+    print(f"✅ Pętle ciche bez śledzenia, bufor: {len(lines)} linii")
+
+
+def test_calculation_dumps_per_ticket():
+    """Kalkulacja ze śledzeniem zapisuje przebieg każdej pozycji pod jej ticketem"""
+    rng = random.Random(22)
+    main_instrument = get_instrument_tickets_config().get_main_instrument_for_ticket("ger40.cash")
+    levels = get_trace_levels()
+    buffer = get_trace_buffer()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        create_test_database(db_path, days=2)
+        rows = add_positions(db_path, rng, range(1, 6))
+        tickets = [str(row[1]) for row in rows]
+        try:
+            set_trace_levels(console="info", buffer="trace")
+            buffer.clear()
+            output = io.StringIO()
+            with redirect_stdout(output):
+                calculator = TPCalculator(db_path=db_path)
+                calculator.calculate_tp_for_tickets(tickets, {'sl_staly': True}, {main_instrument: 6}, 4, 1,
+                                                    engine=ENGINE_PYTHON, use_cache=False, workers=1)
+                calculator.close_connection()
+            dumped = {ticket: buffer.dump(ticket) for ticket in buffer.tickets()}
+        finally:
+            set_trace_levels(**levels)
+            buffer.clear()
+
+    assert sorted(dumped) == sorted(row[1] for row in rows)
+    assert all(any("TP dla sl_staly" in line for line in lines) for lines in dumped.values())
+    assert "Świeczka" not in output.getvalue()
+    print(f"✅ Przebieg zapisany dla {len(dumped)} ticketów")
+
+
+if __name__ == "__main__":
+    test_levels_and_lazy_formatting()
+    test_loops_silent_and_ring_buffer()
+    test_calculation_dumps_per_ticket()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Test zgodności wektorowego silnika TP (NumPy) z pętlą świeczka po świeczce
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Dodaj katalog główny do PATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculations.candle_analyzer import CandleAnalyzer, ENGINE_NUMPY, ENGINE_PYTHON
+from calculations import vectorized_tp
+from calculations.statistics import compute_statistics
+from calculations.tp_calculator import TPCalculator
+from database.models import Candle, CandleSeries
+
+
+def make_random_candles(rng, count, start_price=18000.0, start_time=1700000000):
+    """Generuje losowy przebieg świeczek minutowych"""
+    candles = []
+    price = start_price
+    for i in range(count):
+        open_ = price
+        close = round(open_ + rng.uniform(-8, 8), 2)
+        high = round(max(open_, close) + rng.uniform(0, 5), 2)
+        low = round(min(open_, close) - rng.uniform(0, 5), 2)
+        candles.append(Candle(time=start_time + 60 * i, open=open_, high=high, low=low, close=close))
+        price = close
+    return candles
+
+
+def run_loop(analyzer, *args):
+    """Uruchamia pętlę referencyjną bez zaśmiecania konsoli"""
+    with redirect_stdout(io.StringIO()):
+        return analyzer._calculate_max_tp_basic_loop(*args)
+
+
+def run_be_loop(analyzer, *args):
+    """Uruchamia pętlę referencyjną BE bez zaśmiecania konsoli"""
+    with redirect_stdout(io.StringIO()):
+        return analyzer._calculate_max_tp_with_be_loop(*args)
+
+
+def test_basic_engine_matches_loop():
+    """Silnik numpy daje identyczne wyniki jak pętla"""
+    rng = random.Random(42)
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+    checked = 0
+
+    for _ in range(300):
+        candles = make_random_candles(rng, rng.randint(1, 120))
+        position_type = rng.choice([0, 1])
+        open_price = candles[0].open
+        sl_distance = rng.choice([2, 5, 10, 20, 40])
+        stop_loss = open_price - sl_distance if position_type == 0 else open_price + sl_distance
+        spread = rng.choice([0, 0.5, 1.0])
+
+        expected = run_loop(analyzer, candles, position_type, open_price, stop_loss, spread)
+        actual = analyzer.calculate_max_tp_basic(candles, position_type, open_price, stop_loss, spread)
+
+        assert actual == expected, f"numpy={actual} pętla={expected}"
+        checked += 1
+
+    print(f"✅ Sprawdzono {checked} scenariuszy - wyniki identyczne")
+
+
+def test_first_candle_rules():
+    """Pierwsza świeczka: SL uderzony -> 0.0, inaczej zysk tylko na close"""
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+
+    # BUY wybity na pierwszej świeczce
+    candles = [Candle(time=0, open=100, high=130, low=89, close=120)]
+    assert analyzer.calculate_max_tp_basic(candles, 0, 100, 90) == 0.0
+
+    # BUY - high pierwszej świeczki nie liczy się, tylko close
+    candles = [Candle(time=0, open=100, high=130, low=95, close=103),
+               Candle(time=60, open=103, high=104, low=85, close=90)]
+    assert analyzer.calculate_max_tp_basic(candles, 0, 100, 90) == 3.0
+
+    # SELL - kolejne świeczki liczone na low
+    candles = [Candle(time=0, open=100, high=101, low=99, close=99),
+               Candle(time=60, open=99, high=100, low=92, close=95)]
+    assert analyzer.calculate_max_tp_basic(candles, 1, 100, 110) == 8.0
+
+    # Brak świeczek
+    assert analyzer.calculate_max_tp_basic([], 0, 100, 90) is None
+    print("✅ Reguły pierwszej świeczki zachowane")
+
+
+def test_detailed_logs_use_loop():
+    """Szczegółowe logi wymuszają pętlę (logi świeczka po świeczce)"""
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+    candles = [Candle(time=0, open=100, high=101, low=99, close=100.5)]
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = analyzer.calculate_max_tp_basic(candles, 0, 100, 90, 0, True)
+
+    assert result == 0.5
+    assert "Świeczka 1/1" in output.getvalue()
+    assert CandleAnalyzer(engine=ENGINE_PYTHON).engine == ENGINE_PYTHON
+    print("✅ detailed_logs używa pętli referencyjnej")
+
+
+def test_be_engine_matches_loop():
+    """Silnik numpy dla BE daje identyczne wyniki jak pętla"""
+    rng = random.Random(7)
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+    checked = 0
+
+    for _ in range(400):
+        candles = make_random_candles(rng, rng.randint(1, 120))
+        position_type = rng.choice([0, 1])
+        open_price = candles[0].open
+        sl_distance = rng.choice([5, 10, 20, 40])
+        initial_sl = open_price - sl_distance if position_type == 0 else open_price + sl_distance
+        be_prog = rng.choice([0.5, 3, 5, 10, 20])
+        be_offset = rng.choice([0, 1, 2, 5])
+        spread = rng.choice([0, 0.5, 1.0])
+
+        args = (candles, position_type, open_price, initial_sl, be_prog, be_offset, spread)
+        expected = run_be_loop(analyzer, *args)
+        actual = analyzer.calculate_max_tp_with_be(*args)
+
+        assert actual == expected, f"numpy={actual} pętla={expected}"
+        checked += 1
+
+    print(f"✅ Sprawdzono {checked} scenariuszy BE - wyniki identyczne")
+
+
+def test_be_not_checked_on_activation_candle():
+    """Na świeczce aktywacji BE przesunięty SL nie jest sprawdzany"""
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+    candles = [
+        Candle(time=0, open=100, high=101, low=99, close=100),
+        # BE aktywowane na high=112, low=99 jest poniżej nowego SL (101) - pomijamy
+        Candle(time=60, open=100, high=112, low=99, close=105),
+        Candle(time=120, open=105, high=115, low=104, close=110),
+        # Nowy SL uderzony
+        Candle(time=180, open=110, high=111, low=100, close=100),
+    ]
+    args = (candles, 0, 100, 90, 10, 1, 0)
+    assert analyzer.calculate_max_tp_with_be(*args) == 15.0
+    assert run_be_loop(analyzer, *args) == 15.0
+    print("✅ Semantyka be_activated_this_candle zachowana")
+
+
+def test_grid_matches_single_cells():
+    """Siatka SL × BE prog × BE offset daje te same wyniki co pojedyncze wywołania"""
+    rng = random.Random(3)
+    sl_distances = [3, 5, 10, 20]
+    be_progs = [0.5, 5, 10, 25]
+    be_offsets = [0, 1, 3]
+
+    for _ in range(60):
+        candles = make_random_candles(rng, rng.randint(1, 150))
+        position_type = rng.choice([0, 1])
+        open_price = candles[0].open
+        spread = rng.choice([0, 1.0])
+        if position_type == 0:
+            sl_levels = [open_price - d for d in sl_distances]
+        else:
+            sl_levels = [open_price + d for d in sl_distances]
+
+        high, low, close = vectorized_tp.candles_to_arrays(candles)
+        basic, be = vectorized_tp.max_tp_grid(high, low, close, position_type, open_price,
+                                              sl_levels, be_progs, be_offsets, spread)
+
+        for s_index, stop_loss in enumerate(sl_levels):
+            assert basic[s_index] == vectorized_tp.max_tp_basic(
+                high, low, close, position_type, open_price, stop_loss, spread)
+            for b_index, be_prog in enumerate(be_progs):
+                for o_index, be_offset in enumerate(be_offsets):
+                    expected = vectorized_tp.max_tp_with_be(high, low, close, position_type, open_price,
+                                                            stop_loss, be_prog, be_offset, spread)
+                    assert be[s_index, b_index, o_index] == expected
+
+    print("✅ Siatka parametrów zgodna z pojedynczymi obliczeniami")
+
+
+def test_candle_series_end_to_end():
+    """CandleSeries: wycinki bez kopiowania, pętla i numpy dają te same wyniki co lista Candle"""
+    rng = random.Random(11)
+    analyzer = CandleAnalyzer(engine=ENGINE_NUMPY)
+
+    for _ in range(100):
+        candles = make_random_candles(rng, rng.randint(2, 120))
+        series = CandleSeries.from_rows([(c.time, c.open, c.high, c.low, c.close, None, None, None)
+                                         for c in candles])
+        window = series[1:]
+        assert window.high.base is series.high  # widok, nie kopia
+        assert [c.close for c in window] == [c.close for c in candles[1:]]
+        assert series[-1].time == candles[-1].time
+
+        position_type = rng.choice([0, 1])
+        open_price = candles[0].open
+        stop_loss = open_price - 10 if position_type == 0 else open_price + 10
+
+        expected = run_loop(analyzer, candles, position_type, open_price, stop_loss, 0.5)
+        assert run_loop(analyzer, series, position_type, open_price, stop_loss, 0.5) == expected
+        assert analyzer.calculate_max_tp_basic(series, position_type, open_price, stop_loss, 0.5) == expected
+
+        expected_be = run_be_loop(analyzer, candles, position_type, open_price, stop_loss, 8, 1, 0.5)
+        assert analyzer.calculate_max_tp_with_be(series, position_type, open_price, stop_loss,
+                                                 8, 1, 0.5) == expected_be
+
+    print("✅ CandleSeries zgodna z listą Candle")
+
+
+def test_sweep_scales_sl_per_instrument():
+    """sweep_tp_parameters z sl_staly_values: mnożnik 1 daje wyniki kalkulacji, instrument bez SL pominięty"""
+    from conftest import make_params
+    from test_tp_stream import MISSING_TICKETS, create_journal
+
+    rng = random.Random(12)
+    params = make_params("sl_staly", "sl_be")
+    (main_instrument, sl_points), = params["sl_staly_values"].items()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "candles.db")
+        tickets = create_journal(db_path, rng)
+
+        with redirect_stdout(io.StringIO()):
+            calculator = TPCalculator(db_path=db_path)
+            expected = {r.ticket: r for r in calculator.calculate_tp_for_tickets(tickets, use_cache=False,
+                                                                                 workers=1, **params)}
+            scaled = calculator.sweep_tp_parameters(tickets, [0.5, 1.0], [params["be_prog"]],
+                                                    [params["be_offset"]], params["spread"],
+                                                    sl_staly_values=params["sl_staly_values"])
+            points = calculator.sweep_tp_parameters(tickets, [sl_points / 2, sl_points], [params["be_prog"]],
+                                                    [params["be_offset"]], params["spread"])
+            unmapped = calculator.sweep_tp_parameters(tickets, [1.0], spread=params["spread"],
+                                                      sl_staly_values={main_instrument + "_X": sl_points})
+            calculator.close_connection()
+
+    for index, ticket in enumerate(scaled.tickets):
+        if ticket in expected:
+            assert scaled.basic_tp[index, 1] == expected[ticket].max_tp_sl_staly
+            assert scaled.be_tp[index, 1, 0, 0] == expected[ticket].max_tp_sl_be
+    assert np.array_equal(scaled.basic_tp, points.basic_tp, equal_nan=True)
+    assert sorted(scaled.missing_data_tickets) == sorted(MISSING_TICKETS) and scaled.no_sl_tickets == []
+    assert scaled.positions_with_data == len(expected)
+
+    # Wartość oczekiwana komórki jak w statystykach wyników kalkulacji dla tych samych parametrów
+    targets = (2, 5, 10)
+    statistics = compute_statistics(list(expected.values()), targets=targets).overall.by_sl_type
+    assert np.allclose(scaled.basic_expectancy(targets)[1], [statistics["sl_staly"].expectancy[t] for t in targets])
+    assert np.allclose(scaled.be_expectancy(targets)[1, 0, 0], [statistics["sl_be"].expectancy[t] for t in targets])
+    best = scaled.best_be_cell(targets)
+    assert best["expectancy"] == np.nanmax(scaled.be_expectancy(targets)) and best["target"] in targets
+
+    assert sorted(unmapped.no_sl_tickets) == sorted(int(t) for t in tickets)
+    assert unmapped.positions_with_data == 0 and np.isnan(unmapped.basic_mean_max_tp()).all()
+    print(f"✅ Sweep: SL stały skalowany per instrument ({scaled.positions_with_data} pozycji)")
+
+
+if __name__ == "__main__":
+    test_basic_engine_matches_loop()
+    test_first_candle_rules()
+    test_detailed_logs_use_loop()
+    test_be_engine_matches_loop()
+    test_be_not_checked_on_activation_candle()
+    test_grid_matches_single_cells()
+    test_candle_series_end_to_end()
+    test_sweep_scales_sl_per_instrument()
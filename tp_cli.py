@@ -0,0 +1,393 @@
+"""
+Tryb wsadowy (bez okien) - kalkulacja TP i zapytania dziennika z linii poleceń
+
+Filtry jak w oknie głównym (zakres dat, instrumenty, setup, TrendS/TrendL,
+wątpliwe trejdy). Wyniki trafiają do CSV/JSON, podsumowanie czasów na stderr.
+Kod wyjścia różny od zera przy błędzie - do uruchamiania z crona.
+
+Przykłady:
+    python tp_cli.py tp --from 2025-01-01 --to 2025-01-31 --sl staly --sl-staly DAX=10 -o wyniki.csv
+    python tp_cli.py tp --from 2025-01-01 --to 2025-01-31 --sl-staly DAX=10 --stats --targets 10,20,30
+    python tp_cli.py tp --from 2025-01-01 --to 2025-06-30 --sl-staly DAX=10 --optimize --group-by setup,instrument
+    python tp_cli.py positions --from 2025-01-01 --to 2025-01-31 --setup "Wybicie" --format json
+    python tp_cli.py profiles --from 2025-01-01 --to 2025-03-31 --sl-points 8 --sl-points 12 --spread 0.5
+    python tp_cli.py sync-store
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import redirect_stdout
+from dataclasses import asdict
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config.database_config import DB_PATH
+from config.field_definitions import COLUMNS
+from database.queries import PositionQueries
+from utils.date_utils import date_range_to_unix
+
+# Kody wyjścia
+EXIT_OK = 0
+EXIT_FAILURE = 1  # 2 zwraca argparse przy błędnych argumentach
+
+SUSPICIOUS_CHOICES = {
+    "all": PositionQueries.SUSPICIOUS_ALL,
+    "only": PositionQueries.SUSPICIOUS_ONLY,
+    "hide": PositionQueries.SUSPICIOUS_HIDE,
+}
+
+SL_TYPE_CHOICES = {"staly": "sl_staly", "recznie": "sl_recznie", "baza": "sl_baza"}
+
+
+def _split_list(value):
+    """Lista z argumentu "a,b,c" (None gdy brak)"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _parse_sl_staly(values):
+    """Wartości SL stałego z argumentów INSTRUMENT=PUNKTY"""
+    result = {}
+    for value in values or []:
+        instrument, sep, points = value.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Oczekiwano INSTRUMENT=PUNKTY, otrzymano: {value}")
+        result[instrument.strip()] = float(points)
+    return result
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser argumentów (podkomendy tp, positions, profiles i sync-store)"""
+    parser = argparse.ArgumentParser(description="Dziennik - kalkulacja TP i zapytania w trybie wsadowym")
+    parser.add_argument("--db", default=None, help="Ścieżka do bazy (domyślnie DZIENNIK_DB_PATH / DB_PATH)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_output(subparser):
+        subparser.add_argument("-o", "--output", help="Plik wynikowy (domyślnie stdout)")
+        subparser.add_argument("--format", choices=["csv", "json"],
+                               help="Format wyników (domyślnie z rozszerzenia pliku, inaczej csv)")
+        subparser.add_argument("-q", "--quiet", action="store_true", help="Bez logów obliczeń na stderr")
+
+    def add_filters(subparser):
+        subparser.add_argument("--from", dest="start_date", required=True, help="Data początkowa YYYY-MM-DD")
+        subparser.add_argument("--to", dest="end_date", required=True, help="Data końcowa YYYY-MM-DD")
+        subparser.add_argument("--instruments", help="Instrumenty, np. ger40.cash,us100.cash (domyślnie wszystkie)")
+        subparser.add_argument("--setup", help="Setupy oddzielone przecinkami (domyślnie bez filtra)")
+        subparser.add_argument("--trends", help="Wartości TrendS, np. 1,-1,NULL (domyślnie bez filtra)")
+        subparser.add_argument("--trendl", help="Wartości TrendL, np. 1,NULL (domyślnie bez filtra)")
+        subparser.add_argument("--suspicious", choices=sorted(SUSPICIOUS_CHOICES), default="all",
+                               help="Wątpliwe trejdy (magic_number = 7): all / only / hide")
+        add_output(subparser)
+
+    tp_parser = subparsers.add_parser("tp", help="Kalkulacja maksymalnego TP")
+    add_filters(tp_parser)
+    tp_parser.add_argument("--sl", default="staly",
+                           help="Typy SL oddzielone przecinkami: staly, recznie, baza (domyślnie staly)")
+    tp_parser.add_argument("--sl-staly", action="append", metavar="INSTRUMENT=PUNKTY",
+                           help="SL stały dla głównego instrumentu, np. DAX=10 (można powtarzać)")
+    tp_parser.add_argument("--be-prog", type=float, help="Próg BE w punktach")
+    tp_parser.add_argument("--be-offset", type=float, help="Offset BE w punktach")
+    tp_parser.add_argument("--spread", type=float, default=0, help="Spread w punktach")
+    tp_parser.add_argument("--engine", help="Silnik obliczeń (python, numpy, range_index, sql)")
+    tp_parser.add_argument("--workers", type=int, help="Liczba procesów roboczych")
+    tp_parser.add_argument("--save", action="store_true", help="Zapisz wyniki do tabeli wyników")
+    tp_parser.add_argument("--no-cache", action="store_true", help="Licz wszystko od nowa (bez cache wyników)")
+    tp_parser.add_argument("--trace", type=int, action="append", metavar="TICKET",
+                           help="Przebieg świeczka po świeczce dla ticketu na stderr (silnik python, bez cache)")
+    report = tp_parser.add_mutually_exclusive_group()
+    report.add_argument("--stats", action="store_true",
+                        help="Zamiast wyników pozycji - statystyki TP (całość, setup, symbol)")
+    report.add_argument("--optimize", action="store_true",
+                        help="Zamiast wyników pozycji - optymalny stały TP dla grup i typów SL")
+    tp_parser.add_argument("--targets", help="Poziomy TP statystyk w punktach, np. 10,20,30 "
+                                             "(domyślnie TP_STATS_TARGETS)")
+    tp_parser.add_argument("--group-by", help="Grupy optymalizacji: setup, instrument, trends, trendl "
+                                              "(domyślnie TP_OPTIMIZER_GROUP_BY, \"\" = wszystkie pozycje razem)")
+    tp_parser.add_argument("--min-positions", type=int,
+                           help="Minimalna liczba pozycji grupy optymalizacji (domyślnie TP_OPTIMIZER_MIN_POSITIONS)")
+
+    add_filters(subparsers.add_parser("positions", help="Pozycje dziennika dla filtrów"))
+
+    profiles_parser = subparsers.add_parser(
+        "profiles", help="Profile wychyleń: dobudowanie profili i max TP dla stałego SL bez czytania świeczek")
+    add_filters(profiles_parser)
+    profiles_parser.add_argument("--sl-points", type=float, action="append", required=True, metavar="PUNKTY",
+                                 help="Stały SL w punktach (można powtarzać - kolumna na wartość)")
+    profiles_parser.add_argument("--spread", type=float, default=0, help="Spread w punktach")
+    profiles_parser.add_argument("--no-build", action="store_true",
+                                 help="Tylko zapytanie - bez dobudowania brakujących profili")
+
+    sync_parser = subparsers.add_parser(
+        "sync-store", help="Dopisanie nowych świeczek do magazynu kolumnowego (np. z crona po zamknięciu sesji)")
+    sync_parser.add_argument("--store-dir",
+                             help="Katalog magazynu (domyślnie candle_store obok bazy, jak CANDLE_STORE_DIR)")
+    add_output(sync_parser)
+    return parser
+
+
+def _output_format(args) -> str:
+    if args.format:
+        return args.format
+    if args.output and args.output.lower().endswith(".json"):
+        return "json"
+    return "csv"
+
+
+def write_records(records, fieldnames, args):
+    """Zapisuje rekordy (słowniki) do pliku lub stdout w formacie CSV/JSON"""
+    output_format = _output_format(args)
+    stream = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if output_format == "json":
+            json.dump(records, stream, ensure_ascii=False, indent=2)
+            stream.write("\n")
+        else:
+            writer = csv.DictWriter(stream, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(records)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def run_tp(args, db_path: str, timings: dict):
+    """
+    Podkomenda tp - kalkulacja (i zapis do bazy przy --save)
+    
+    Returns:
+        Krotka (rekordy, kolumny, podsumowanie)
+    """
+    from calculations.candle_analyzer import ENGINE_PYTHON
+    from calculations.statistics import compute_statistics
+    from calculations.tp_calculator import TPCalculator
+    from calculations.tp_optimizer import GROUP_DIMENSIONS, optimize_tp
+    from database.models import TPCalculationResult
+    from utils.trace import get_trace_buffer, get_trace_levels, set_trace_levels
+
+    sl_types = {}
+    for name in _split_list(args.sl) or []:
+        if name not in SL_TYPE_CHOICES:
+            raise ValueError(f"Nieznany typ SL: {name} (dostępne: {', '.join(SL_TYPE_CHOICES)})")
+        sl_types[SL_TYPE_CHOICES[name]] = True
+    if not sl_types:
+        raise ValueError("Wybierz przynajmniej jeden typ SL")
+    sl_staly_values = _parse_sl_staly(args.sl_staly)
+    if sl_types.get("sl_staly") and not sl_staly_values:
+        raise ValueError("SL stały wymaga wartości --sl-staly INSTRUMENT=PUNKTY")
+    targets = [float(target) for target in _split_list(args.targets)] if args.targets else None
+    group_by = None if args.group_by is None else _split_list(args.group_by) or []
+    unknown = [by for by in group_by or [] if by not in dict(GROUP_DIMENSIONS)]
+    if unknown:
+        raise ValueError(f"Nieznana grupa: {', '.join(unknown)} (dostępne: {', '.join(dict(GROUP_DIMENSIONS))})")
+
+    levels = get_trace_levels()
+    if args.trace:
+        # Śledzenie świeczek mają tylko pętle silnika python; wynik z cache nie ma przebiegu
+        set_trace_levels(buffer="trace")
+        get_trace_buffer().clear()
+    
+    started = time.perf_counter()
+    calculator = TPCalculator(db_path=db_path)
+    try:
+        timings["init_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        results = calculator.calculate_tp_for_filters(
+            args.start_date, args.end_date, sl_types,
+            instruments=_split_list(args.instruments),
+            setups=_split_list(args.setup),
+            trends=_split_list(args.trends),
+            trendl=_split_list(args.trendl),
+            suspicious=SUSPICIOUS_CHOICES[args.suspicious],
+            sl_staly_values=sl_staly_values,
+            be_prog=args.be_prog,
+            be_offset=args.be_offset,
+            spread=args.spread,
+            save_to_db=args.save,
+            engine=args.engine or (ENGINE_PYTHON if args.trace else None),
+            workers=1 if args.trace else args.workers,
+            use_cache=not (args.no_cache or args.trace)
+        )
+        timings["calculation_s"] = time.perf_counter() - started
+        missing = list(calculator.last_missing_data_tickets)
+        statistics = compute_statistics(results, targets=targets, breakdowns=args.stats)
+        summary = statistics.to_summary()
+        for ticket in args.trace or []:
+            print(f"[tp_cli] Przebieg ticketu {ticket}:")
+            print("\n".join(get_trace_buffer().dump(ticket)) or "(brak - ticket poza wynikami)")
+    finally:
+        calculator.close_connection()
+        set_trace_levels(**levels)
+
+    if args.stats:
+        records, fieldnames = statistics.to_rows(), statistics.row_fields()
+    elif args.optimize:
+        optimization = optimize_tp(results, group_by=group_by, min_positions=args.min_positions)
+        records, fieldnames = optimization.to_rows(), optimization.row_fields()
+    else:
+        records, fieldnames = [asdict(result) for result in results], list(TPCalculationResult.__dataclass_fields__)
+    return records, fieldnames, {
+        "results": len(results),
+        "missing_data": len(missing),
+        "avg_tp_sl_staly": round(summary["avg_tp_sl_staly"], 2),
+        "avg_tp_sl_recznie": round(summary["avg_tp_sl_recznie"], 2),
+        "avg_tp_sl_be": round(summary["avg_tp_sl_be"], 2),
+    }
+
+
+def run_positions(args, db_path: str, timings: dict):
+    """
+    Podkomenda positions - pozycje dziennika dla filtrów (kolumny jak w tabeli okna głównego)
+    
+    Returns:
+        Krotka (rekordy, kolumny, podsumowanie)
+    """
+    started = time.perf_counter()
+    rows = _query_positions(args, db_path, COLUMNS)
+    timings["query_s"] = time.perf_counter() - started
+
+    records = [dict(zip(COLUMNS, row)) for row in rows]
+    for record in records:
+        if isinstance(record.get("symbol"), str):
+            record["symbol"] = record["symbol"].replace("\x00", "")
+    return records, COLUMNS, {"positions": len(records)}
+
+
+def run_profiles(args, db_path: str, timings: dict):
+    """
+    Podkomenda profiles - dobudowanie profili wychyleń i max TP dla stałych SL (co gdyby)
+    
+    Returns:
+        Krotka (rekordy, kolumny, podsumowanie)
+    """
+    from calculations.excursion_profile import ExcursionProfileBuilder
+
+    builder = ExcursionProfileBuilder(db_path)
+    try:
+        built = 0
+        if not args.no_build:
+            started = time.perf_counter()
+            built = builder.build_incremental()
+            timings["build_s"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows = _query_positions(args, db_path, ["ticket", "symbol", "open_time", "type"])
+        profiles = builder.get_profiles([row[0] for row in rows])
+        timings["query_s"] = time.perf_counter() - started
+    finally:
+        builder.candle_analyzer.close_connection()
+        builder.position_analyzer.close_connection()
+        builder.close_connection()
+
+    tp_fields = [f"max_tp_sl_{points:g}" for points in args.sl_points]
+    records = []
+    for ticket, symbol, open_time, position_type in rows:
+        profile = profiles.get(ticket)
+        record = {
+            "ticket": ticket,
+            "symbol": symbol.replace("\x00", "") if isinstance(symbol, str) else symbol,
+            "open_time": open_time,
+            "type": position_type,
+            "candle_count": profile.candle_count if profile else None,
+            "max_profit": profile.max_profit if profile else None,
+        }
+        for field, points in zip(tp_fields, args.sl_points):
+            record[field] = profile.max_tp_for_fixed_sl(points, args.spread) if profile else None
+        records.append(record)
+    fieldnames = ["ticket", "symbol", "open_time", "type", "candle_count", "max_profit"] + tp_fields
+    return records, fieldnames, {
+        "positions": len(records),
+        "profiles_built": built,
+        "without_profile": sum(1 for record in records if not record["candle_count"]),
+    }
+
+
+def run_sync_store(args, db_path: str, timings: dict):
+    """
+    Podkomenda sync-store - synchronizacja magazynu kolumnowego z tabelami świeczek bazy
+    
+    Returns:
+        Krotka (rekordy, kolumny, podsumowanie)
+    """
+    from database.columnar_store import ColumnarCandleStore, sync_all_candle_tables
+
+    store_dir = args.store_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), "candle_store")
+    store = ColumnarCandleStore(store_dir)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        started = time.perf_counter()
+        synced = sync_all_candle_tables(conn, store)
+        timings["sync_s"] = time.perf_counter() - started
+    finally:
+        conn.close()
+        store.close()
+
+    records = [{"table": table, "appended": appended, "candles": store.read_meta(table).get("count", 0)}
+               for table, appended in sorted(synced.items())]
+    return records, ["table", "appended", "candles"], {
+        "tables": len(records),
+        "appended": sum(synced.values()),
+    }
+
+
+def _query_positions(args, db_path: str, columns):
+    """Wiersze pozycji dla filtrów z argumentów (semantyka jak w oknie głównym)"""
+    start_unix, end_unix = date_range_to_unix(args.start_date, args.end_date)
+    query, params = PositionQueries.build_filtered_positions_query(
+        columns, start_unix, end_unix,
+        symbols=_split_list(args.instruments),
+        setups=_split_list(args.setup),
+        trends=_split_list(args.trends),
+        trendl=_split_list(args.trendl),
+        suspicious=SUSPICIOUS_CHOICES[args.suspicious]
+    )
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> int:
+    """Punkt wejścia - zwraca kod wyjścia"""
+    args = build_parser().parse_args(argv)
+    db_path = args.db or DB_PATH
+    timings = {}
+    started = time.perf_counter()
+
+    try:
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Baza danych nie istnieje: {db_path}")
+        # Logi obliczeń na stderr (stdout może zawierać wyniki), przy --quiet wyciszone
+        log_stream = open(os.devnull, "w") if args.quiet else sys.stderr
+        try:
+            with redirect_stdout(log_stream):
+                handler = {"tp": run_tp, "positions": run_positions, "profiles": run_profiles,
+                           "sync-store": run_sync_store}[args.command]
+                records, fieldnames, summary = handler(args, db_path, timings)
+        finally:
+            if log_stream is not sys.stderr:
+                log_stream.close()
+        
+        output_started = time.perf_counter()
+        write_records(records, fieldnames, args)
+        timings["output_s"] = time.perf_counter() - output_started
+    except Exception as e:
+        print(f"[tp_cli] Błąd: {e}", file=sys.stderr)
+        return EXIT_FAILURE
+
+    timings["total_s"] = time.perf_counter() - started
+    report = ", ".join(f"{name}={value:.3f}" for name, value in timings.items())
+    details = ", ".join(f"{name}={value}" for name, value in summary.items())
+    print(f"[tp_cli] {args.command}: {details}", file=sys.stderr)
+    print(f"[tp_cli] Czasy [s]: {report}", file=sys.stderr)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
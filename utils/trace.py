@@ -0,0 +1,176 @@
+"""
+Śledzenie obliczeń - poziomy, leniwe formatowanie, bufor per ticket
+
+Komunikaty są formatowane dopiero gdy poziom je przepuszcza (styl
+"tekst %s", argumenty), a pętle świeczek sprawdzają enabled() raz przed
+pętlą - przy wyłączonym śledzeniu nie formatują ani nie wypisują nic.
+Śledzenie świeczka po świeczce (poziom trace) trafia do ograniczonego
+bufora w pamięci, z którego można wypisać przebieg wybranego ticketu.
+
+Użycie:
+    tracer = get_tracer("CandleAnalyzer")
+    tracer.info("Znaleziono %d świeczek", len(candles))
+    if tracer.enabled(TRACE):
+        ...
+    print("\\n".join(get_trace_buffer().dump(ticket)))
+"""
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+
+from config.database_config import (
+    TRACE_CONSOLE_LEVEL, TRACE_BUFFER_LEVEL, TRACE_BUFFER_TICKETS, TRACE_BUFFER_LINES_PER_TICKET
+)
+
+# Poziomy (jak w logging, plus trace poniżej debug)
+TRACE = 5
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {"trace": TRACE, "debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+
+
+def parse_level(level: Union[int, str]) -> int:
+    """Poziom z liczby lub nazwy ("trace", "debug", ...)"""
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVEL_NAMES[level.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Nieznany poziom śledzenia: {level}. Dostępne: {', '.join(LEVEL_NAMES)}")
+
+
+class TraceBuffer:
+    """Bufor pierścieniowy komunikatów per ticket (ograniczona liczba ticketów i linii)"""
+
+    def __init__(self, max_tickets: int = TRACE_BUFFER_TICKETS,
+                 max_lines_per_ticket: int = TRACE_BUFFER_LINES_PER_TICKET):
+        self.max_tickets = max_tickets
+        self.max_lines_per_ticket = max_lines_per_ticket
+        self._lines: 'OrderedDict[int, deque]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, ticket: int, line: str):
+        with self._lock:
+            lines = self._lines.get(ticket)
+            if lines is None:
+                lines = self._lines[ticket] = deque(maxlen=self.max_lines_per_ticket)
+                while len(self._lines) > self.max_tickets:
+                    self._lines.popitem(last=False)
+            lines.append(line)
+
+    def dump(self, ticket: int) -> List[str]:
+        """Zapamiętane linie ticketu (najstarsze pierwsze)"""
+        with self._lock:
+            return list(self._lines.get(ticket, ()))
+
+    def tickets(self) -> List[int]:
+        with self._lock:
+            return list(self._lines)
+
+    def clear(self, ticket: Optional[int] = None):
+        with self._lock:
+            if ticket is None:
+                self._lines.clear()
+            else:
+                self._lines.pop(ticket, None)
+
+
+class _TraceState:
+    """Wspólne poziomy i bieżący ticket (per wątek) wszystkich tracerów"""
+
+    def __init__(self):
+        self.console_level = parse_level(TRACE_CONSOLE_LEVEL)
+        self.buffer_level = parse_level(TRACE_BUFFER_LEVEL)
+        self.min_level = min(self.console_level, self.buffer_level)
+        self.buffer = TraceBuffer()
+        self.local = threading.local()
+
+
+_state = _TraceState()
+_tracers: Dict[str, 'Tracer'] = {}
+
+
+class Tracer:
+    """Komunikaty jednego komponentu (prefiks "Nazwa: ")"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: int) -> bool:
+        """Czy komunikat o danym poziomie trafi gdziekolwiek (konsola lub bufor)"""
+        return level >= _state.min_level
+
+    def log(self, level: int, message: str, *args, force: bool = False):
+        """
+        Zapisuje komunikat - formatowanie (message % args) tylko gdy poziom go przepuszcza
+
+        Args:
+            force: Wypisz na konsolę niezależnie od poziomu (szczegółowe logi na żądanie)
+        """
+        to_console = force or level >= _state.console_level
+        ticket = getattr(_state.local, "ticket", None)
+        to_buffer = ticket is not None and level >= _state.buffer_level
+        if not (to_console or to_buffer):
+            return
+        text = message % args if args else message
+        if to_console:
+            print(f"{self.name}: {text}")
+        if to_buffer:
+            _state.buffer.append(ticket, f"{self.name}: {text}")
+
+    def trace(self, message: str, *args, force: bool = False):
+        self.log(TRACE, message, *args, force=force)
+
+    def debug(self, message: str, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message: str, *args):
+        self.log(INFO, message, *args)
+
+    def warning(self, message: str, *args):
+        self.log(WARNING, message, *args)
+
+    def error(self, message: str, *args):
+        self.log(ERROR, message, *args)
+
+
+def get_tracer(name: str) -> Tracer:
+    """Tracer komponentu (jeden na nazwę)"""
+    tracer = _tracers.get(name)
+    if tracer is None:
+        tracer = _tracers[name] = Tracer(name)
+    return tracer
+
+
+def set_trace_levels(console: Optional[Union[int, str]] = None, buffer: Optional[Union[int, str]] = None):
+    """Ustawia poziomy konsoli i bufora dla wszystkich tracerów"""
+    if console is not None:
+        _state.console_level = parse_level(console)
+    if buffer is not None:
+        _state.buffer_level = parse_level(buffer)
+    _state.min_level = min(_state.console_level, _state.buffer_level)
+
+
+def get_trace_levels() -> Dict[str, int]:
+    return {"console": _state.console_level, "buffer": _state.buffer_level}
+
+
+def get_trace_buffer() -> TraceBuffer:
+    """Wspólny bufor komunikatów per ticket"""
+    return _state.buffer
+
+
+@contextmanager
+def trace_ticket(ticket):
+    """Komunikaty z bloku (w tym wątku) trafiają do bufora ticketu"""
+    previous = getattr(_state.local, "ticket", None)
+    _state.local.ticket = ticket
+    try:
+        yield
+    finally:
+        _state.local.ticket = previous